@@ -95,7 +95,7 @@ class AdvancedAnalyticsEngine:
             'trends': trend_analysis,
             'patterns': patterns,
             'anomalies': anomalies,
-            'daily_breakdown': daily_sentiment.to_dict('index') if not daily_sentiment.empty else {},
+            'daily_breakdown': {day.isoformat(): counts for day, counts in daily_sentiment.to_dict('index').items()},
             'insights': self._generate_sentiment_insights(df, trend_analysis, patterns)
         }
     
@@ -208,7 +208,7 @@ class AdvancedAnalyticsEngine:
         peak_hour = hourly_usage.idxmax()
         
         # Weekly patterns
-        daily_usage = df['day_of_week'].value_calls().sort_index()
+        daily_usage = df['day_of_week'].value_counts().sort_index()
         peak_day = daily_usage.idxmax()
         
         # Session analysis
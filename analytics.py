@@ -7,18 +7,213 @@ import json
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Tuple
-from collections import defaultdict, Counter
+from typing import Dict, List, Any, Tuple, Optional
+from collections import defaultdict, Counter, deque
+from fractions import Fraction
+from itertools import islice
 import statistics
 
+# Analyses kept for reports; the oldest is evicted (and un-counted) beyond this
+DEFAULT_HISTORY_CAPACITY = 10_000
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+ENGLISH_INDICATORS = ['the', 'and', 'you', 'this', 'that', 'with', 'for']
+SWAHILI_INDICATORS = ['na', 'wa', 'ya', 'poa', 'sawa', 'karibu', 'asante']
+LANGUAGE_CLASSES = ('english_dominant', 'swahili_dominant', 'mixed_language', 'unclear')
+SENTIMENT_SCORE_HALVES = {'positive': 2, 'negative': -2, 'mixed': 1}  # twice the report's sentiment score
+
+
+def _language_class(text: str) -> str:
+    """Simplified language detection based on common patterns"""
+    english_count = sum(1 for word in ENGLISH_INDICATORS if word in text)
+    swahili_count = sum(1 for word in SWAHILI_INDICATORS if word in text)
+    if english_count > swahili_count and english_count > 0:
+        return 'english_dominant'
+    if swahili_count > english_count and swahili_count > 0:
+        return 'swahili_dominant'
+    if english_count > 0 and swahili_count > 0:
+        return 'mixed_language'
+    return 'unclear'
+
+
+def _analysis_facts(analysis: Dict[str, Any]) -> tuple:
+    """What the report needs from one analysis, extracted once when it is added"""
+    comments = tuple(
+        (comment.get('sentiment', 'neutral'), comment.get('tag', 'neutral'), tuple(comment.get('emotion', [])),
+         _language_class(comment.get('text', '').lower()))
+        for comment in analysis.get('comments', [])
+    )
+    if comments:
+        emotions = set()
+        for comment in comments:
+            emotions.update(comment[2])
+        active = sum(1 for comment in comments if comment[0] != 'neutral')
+        engagement = (len(emotions) * 2 + active) / len(comments)
+    else:
+        engagement = 0
+    return (analysis.get('video_sentiment', 'neutral'), tuple(analysis.get('video_emotion', [])), comments,
+            analysis.get('hour', 0), analysis.get('day_of_week', 0), engagement)
+
+
+class _Tally:
+    """
+    Additive report counters over a run of analyses
+
+    Counters fill in first-occurrence order, so merging tallies oldest first
+    breaks most_common() ties exactly as a pass over the analyses would.
+    """
+
+    def __init__(self):
+        self.videos = 0
+        self.comments = 0
+        self.score_halves = 0
+        self.mixed = 0
+        self.video_sentiments = Counter()
+        self.comment_sentiments = Counter()
+        self.video_emotions = Counter()
+        self.comment_emotions = Counter()
+        self.emotion_pairs = Counter()
+        self.tags = Counter()
+        self.tag_sentiments: Dict[str, Counter] = {}
+        self.hours = Counter()
+        self.days = Counter()
+        self.hour_sentiments: Dict[int, Counter] = {}
+        self.languages = Counter(dict.fromkeys(LANGUAGE_CLASSES, 0))
+        self.engagement_sum = Fraction(0)
+        self.engagement_scores = Counter()
+        self.float_engagement = False
+
+    def add(self, facts: tuple):
+        sentiment, video_emotions, comments, hour, day, engagement = facts
+        self.videos += 1
+        self.comments += len(comments)
+        self.video_sentiments[sentiment] += 1
+        self.score_halves += SENTIMENT_SCORE_HALVES.get(sentiment, 0)
+        self.mixed += sentiment == 'mixed'
+        self.video_emotions.update(video_emotions)
+        for comment_sentiment, tag, emotions, language in comments:
+            self.comment_sentiments[comment_sentiment] += 1
+            self.comment_emotions.update(emotions)
+            for i in range(len(emotions)):
+                for j in range(i + 1, len(emotions)):
+                    self.emotion_pairs[f"{emotions[i]}+{emotions[j]}"] += 1
+            self.tags[tag] += 1
+            self.tag_sentiments.setdefault(tag, Counter())[comment_sentiment] += 1
+            self.languages[language] += 1
+        self.hours[hour] += 1
+        self.days[DAY_NAMES[day]] += 1
+        self.hour_sentiments.setdefault(hour, Counter())[sentiment] += 1
+        self.engagement_sum += Fraction(engagement)
+        self.engagement_scores[engagement] += 1
+        self.float_engagement |= isinstance(engagement, float)
+
+    def merge(self, other: '_Tally'):
+        for name in ('videos', 'comments', 'score_halves', 'mixed', 'engagement_sum'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.float_engagement |= other.float_engagement
+        for name in ('video_sentiments', 'comment_sentiments', 'video_emotions', 'comment_emotions',
+                     'emotion_pairs', 'tags', 'hours', 'days', 'languages', 'engagement_scores'):
+            getattr(self, name).update(getattr(other, name))
+        for name in ('tag_sentiments', 'hour_sentiments'):
+            mine = getattr(self, name)
+            for key, counts in getattr(other, name).items():
+                mine.setdefault(key, Counter()).update(counts)
+
+
+class _Bucket:
+    """The ring entries of one clock hour and their tally"""
+
+    __slots__ = ('hour', 'entries', 'tally', 'trimmed')
+
+    def __init__(self, hour: datetime):
+        self.hour = hour
+        self.entries: deque = deque()  # (timestamp, analysis, facts), oldest first
+        self.tally = _Tally()
+        self.trimmed = False  # lost entries to eviction since the tally was built
+
+
+class RollingAggregator:
+    """
+    Bounded analysis history with running per-hour report counters
+
+    Analyses live in a fixed-capacity ring (the oldest is evicted when it is
+    full). Each is reduced to its report facts once, on add(), and counted
+    into the bucket of its clock hour, so tally(cutoff) merges O(hours)
+    buckets instead of re-reading every analysis. Only the bucket straddling
+    the cutoff is counted from its entries, and the oldest bucket's tally is
+    rebuilt after eviction trims it, keeping the report identical to a pass
+    over the same analyses.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self._buckets: deque = deque()  # oldest first
+        self._size = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def analyses(self) -> List[Dict[str, Any]]:
+        return [analysis for bucket in self._buckets for _, analysis, _ in bucket.entries]
+
+    def latest(self, count: int) -> List[Dict[str, Any]]:
+        newest = (analysis for bucket in reversed(self._buckets) for _, analysis, _ in reversed(bucket.entries))
+        return list(islice(newest, count))[::-1]
+
+    def add(self, timestamp: datetime, analysis: Dict[str, Any]):
+        if self._size >= self.capacity:
+            self._evict()
+        facts = _analysis_facts(analysis)
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        if not self._buckets or self._buckets[-1].hour != hour:
+            self._buckets.append(_Bucket(hour))
+        bucket = self._buckets[-1]
+        bucket.entries.append((timestamp, analysis, facts))
+        bucket.tally.add(facts)
+        self._size += 1
+
+    def _evict(self):
+        bucket = self._buckets[0]
+        bucket.entries.popleft()
+        if bucket.entries:
+            bucket.trimmed = True
+        else:
+            self._buckets.popleft()
+        self._size -= 1
+        self.evicted += 1
+
+    def tally(self, cutoff: Optional[datetime] = None) -> _Tally:
+        """Counters of the analyses at or after cutoff (all of them without one)"""
+        total = _Tally()
+        for bucket in self._buckets:
+            if cutoff is None or bucket.hour >= cutoff:
+                if bucket.trimmed:
+                    bucket.tally = _Tally()
+                    for _, _, facts in bucket.entries:
+                        bucket.tally.add(facts)
+                    bucket.trimmed = False
+                total.merge(bucket.tally)
+            elif bucket.hour + timedelta(hours=1) > cutoff:
+                for timestamp, _, facts in bucket.entries:
+                    if timestamp >= cutoff:
+                        total.add(facts)
+        return total
+
+
 class SentimentAnalytics:
     """
     Advanced analytics engine for sentiment data
     """
     
-    def __init__(self):
-        self.analysis_history = []
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY):
+        self.history = RollingAggregator(capacity)
         self.trends_data = defaultdict(list)
+    
+    @property
+    def analysis_history(self) -> List[Dict[str, Any]]:
+        """Retained analyses, oldest first (at most `capacity`)"""
+        return self.history.analyses()
         
     def add_analysis(self, analysis_result: Dict[str, Any]):
         """Add analysis result to historical data"""
@@ -28,16 +223,42 @@ class SentimentAnalytics:
         analysis_result['hour'] = timestamp.hour
         analysis_result['day_of_week'] = timestamp.weekday()
         
-        self.analysis_history.append(analysis_result)
+        self.history.add(timestamp, analysis_result)
         
     def generate_comprehensive_report(self, days_back: int = 7) -> Dict[str, Any]:
-        """Generate comprehensive analytics report"""
-        if not self.analysis_history:
+        """Generate comprehensive analytics report from the running counters"""
+        if not len(self.history):
+            return {"error": "No analysis data available"}
+            
+        cutoff_date = datetime.now() - timedelta(days=days_back)
+        tally = self.history.tally(cutoff_date)
+        
+        if not tally.videos:
+            return {"error": f"No data available for the last {days_back} days"}
+            
+        return {
+            "report_period": f"Last {days_back} days",
+            "total_analyses": tally.videos,
+            "sentiment_overview": self._sentiment_section(tally),
+            "emotion_insights": self._emotion_section(tally),
+            "comment_classification": self._comment_type_section(tally),
+            "toxicity_report": self._toxicity_section(tally),
+            "temporal_patterns": self._temporal_section(tally),
+            "language_distribution": self._language_section(tally),
+            "engagement_metrics": self._engagement_section(tally),
+            "anomaly_detection": self._anomaly_section(tally),
+            "recommendations": self._recommendation_section(tally),
+            "generated_at": datetime.now().isoformat()
+        }
+    
+    def generate_report_for(self, analyses: List[Dict[str, Any]], days_back: int = 7) -> Dict[str, Any]:
+        """Generate the same report over an explicit list of analyses (e.g. loaded from the database)"""
+        if not analyses:
             return {"error": "No analysis data available"}
             
         cutoff_date = datetime.now() - timedelta(days=days_back)
         recent_data = [
-            analysis for analysis in self.analysis_history 
+            analysis for analysis in analyses 
             if datetime.fromisoformat(analysis['timestamp']) >= cutoff_date
         ]
         
@@ -61,6 +282,205 @@ class SentimentAnalytics:
         
         return report
     
+    # -- report sections from running counters --------------------------------
+    
+    @staticmethod
+    def _sentiment_section(tally: _Tally) -> Dict[str, Any]:
+        total = tally.videos
+        average = Fraction(tally.score_halves, 2 * total)
+        # statistics.mean keeps int results for int-only scores ('mixed' scores 0.5)
+        avg_sentiment_score = int(average) if not tally.mixed and average.denominator == 1 else float(average)
+        return {
+            "video_sentiment_distribution": dict(tally.video_sentiments),
+            "video_sentiment_percentages": {
+                k: round((v/total)*100, 2) for k, v in tally.video_sentiments.items()
+            },
+            "comment_sentiment_distribution": dict(tally.comment_sentiments),
+            "average_sentiment_score": round(avg_sentiment_score, 3),
+            "sentiment_trend": "positive" if avg_sentiment_score > 0.2 else "negative" if avg_sentiment_score < -0.2 else "neutral",
+            "total_comments_analyzed": tally.comments
+        }
+    
+    @staticmethod
+    def _emotion_section(tally: _Tally) -> Dict[str, Any]:
+        emotion_counts = tally.video_emotions + tally.comment_emotions
+        return {
+            "most_common_emotions": dict(emotion_counts.most_common(10)),
+            "video_emotions": dict(tally.video_emotions),
+            "comment_emotions": dict(tally.comment_emotions),
+            "emotion_co_occurrences": dict(tally.emotion_pairs.most_common(5)),
+            "total_emotion_instances": sum(emotion_counts.values()),
+            "emotional_diversity": len(emotion_counts)
+        }
+    
+    @staticmethod
+    def _comment_type_section(tally: _Tally) -> Dict[str, Any]:
+        total_comments = tally.comments
+        return {
+            "comment_type_distribution": dict(tally.tags),
+            "comment_type_percentages": {
+                k: round((v/total_comments)*100, 2) for k, v in tally.tags.items()
+            },
+            "tag_sentiment_analysis": {
+                tag: {
+                    "count": sum(sentiments.values()),
+                    "sentiment_distribution": dict(sentiments),
+                    "dominant_sentiment": sentiments.most_common(1)[0][0] if sentiments else "neutral"
+                }
+                for tag, sentiments in tally.tag_sentiments.items()
+            },
+            "most_common_tags": dict(tally.tags.most_common(5)),
+            "total_comments": total_comments
+        }
+    
+    @staticmethod
+    def _toxicity_section(tally: _Tally) -> Dict[str, Any]:
+        hateful_comments = tally.tags['hateful']
+        spam_comments = tally.tags['spam']
+        safe_comments = tally.comments - hateful_comments - spam_comments
+        levels = {'hateful': 'high', 'spam': 'moderate'}
+        toxicity_counts = Counter()
+        for tag, count in tally.tags.items():
+            toxicity_counts[levels.get(tag, 'safe')] += count
+        total_comments = tally.comments
+        safety_score = (safe_comments / total_comments * 100) if total_comments > 0 else 100
+        return {
+            "toxicity_distribution": dict(toxicity_counts),
+            "hateful_comments": hateful_comments,
+            "spam_comments": spam_comments,
+            "safe_comments": safe_comments,
+            "safety_score": round(safety_score, 2),
+            "safety_level": "high" if safety_score > 80 else "moderate" if safety_score > 60 else "low",
+            "total_comments_assessed": total_comments
+        }
+    
+    @staticmethod
+    def _temporal_section(tally: _Tally) -> Dict[str, Any]:
+        hourly_activity = dict(tally.hours)
+        daily_activity = dict(tally.days)
+        return {
+            "hourly_activity": hourly_activity,
+            "daily_activity": daily_activity,
+            "peak_hour": max(hourly_activity, key=hourly_activity.get) if hourly_activity else 0,
+            "peak_day": max(daily_activity, key=daily_activity.get) if daily_activity else "Unknown",
+            "hourly_sentiment_patterns": {
+                hour: {
+                    "dominant_sentiment": sentiments.most_common(1)[0][0] if sentiments else "neutral",
+                    "activity_count": sum(sentiments.values())
+                }
+                for hour, sentiments in tally.hour_sentiments.items()
+            },
+            "most_active_hours": sorted(hourly_activity.items(), key=lambda x: x[1], reverse=True)[:5]
+        }
+    
+    @staticmethod
+    def _language_section(tally: _Tally) -> Dict[str, Any]:
+        language_stats = dict(tally.languages)
+        total = sum(language_stats.values())
+        language_percentages = {
+            k: round((v/total)*100, 2) if total > 0 else 0 
+            for k, v in language_stats.items()
+        }
+        return {
+            "language_distribution": language_stats,
+            "language_percentages": language_percentages,
+            "code_switching_rate": language_percentages['mixed_language'],
+            "total_comments_analyzed": total
+        }
+    
+    @staticmethod
+    def _engagement_section(tally: _Tally) -> Dict[str, Any]:
+        total_videos = tally.videos
+        avg_comments = tally.comments / total_videos if total_videos > 0 else 0
+        average = tally.engagement_sum / total_videos
+        avg_engagement = float(average) if tally.float_engagement else int(average)
+        return {
+            "total_videos_analyzed": total_videos,
+            "total_comments": tally.comments,
+            "average_comments_per_video": round(avg_comments, 2),
+            "average_engagement_score": round(avg_engagement, 3),
+            "engagement_level": "high" if avg_engagement > 2 else "moderate" if avg_engagement > 1 else "low",
+            "most_engaging_videos": sum(count for score, count in tally.engagement_scores.items()
+                                        if score > avg_engagement)
+        }
+    
+    @staticmethod
+    def _anomaly_section(tally: _Tally) -> Dict[str, Any]:
+        anomalies = []
+        
+        negative_ratio = tally.video_sentiments['negative'] / tally.videos if tally.videos else 0
+        if negative_ratio > 0.7:
+            anomalies.append({
+                "type": "high_negativity",
+                "description": f"Unusually high negative sentiment rate: {negative_ratio:.2%}",
+                "severity": "high"
+            })
+        
+        spam_ratio = tally.tags['spam'] / tally.comments if tally.comments > 0 else 0
+        if spam_ratio > 0.3:
+            anomalies.append({
+                "type": "spam_spike",
+                "description": f"High spam detection rate: {spam_ratio:.2%}",
+                "severity": "moderate"
+            })
+        
+        emotions = sum(tally.video_emotions.values()) + sum(tally.comment_emotions.values())
+        anger_ratio = (tally.video_emotions['anger'] + tally.comment_emotions['anger']) / emotions if emotions else 0
+        if anger_ratio > 0.4:
+            anomalies.append({
+                "type": "high_anger",
+                "description": f"Elevated anger levels detected: {anger_ratio:.2%}",
+                "severity": "moderate"
+            })
+        
+        return {
+            "anomalies_detected": len(anomalies),
+            "anomalies": anomalies,
+            "overall_health": "healthy" if len(anomalies) == 0 else "concerning" if len(anomalies) > 2 else "attention_needed"
+        }
+    
+    @staticmethod
+    def _recommendation_section(tally: _Tally) -> Dict[str, Any]:
+        recommendations = []
+        
+        positive_ratio = tally.video_sentiments['positive'] / tally.videos if tally.videos else 0
+        if positive_ratio < 0.3:
+            recommendations.append({
+                "category": "content_strategy",
+                "suggestion": "Consider creating more positive, uplifting content to improve audience sentiment",
+                "priority": "high"
+            })
+        
+        avg_comments = tally.comments / tally.videos if tally.videos else 0
+        if avg_comments < 2:
+            recommendations.append({
+                "category": "engagement",
+                "suggestion": "Low comment engagement detected. Consider asking questions or encouraging discussion",
+                "priority": "medium"
+            })
+        
+        if tally.tags['hateful'] > 0:
+            recommendations.append({
+                "category": "moderation",
+                "suggestion": "Implement stronger comment moderation to reduce toxic content",
+                "priority": "high"
+            })
+        
+        if tally.tags['spam'] > tally.comments * 0.1:
+            recommendations.append({
+                "category": "security",
+                "suggestion": "Enable spam filtering and consider verification requirements for comments",
+                "priority": "medium"
+            })
+        
+        return {
+            "total_recommendations": len(recommendations),
+            "recommendations": recommendations,
+            "action_required": any(rec["priority"] == "high" for rec in recommendations)
+        }
+    
+    # -- report sections over an explicit list of analyses --------------------
+    
     def _analyze_sentiment_trends(self, data: List[Dict]) -> Dict[str, Any]:
         """Analyze sentiment distribution and trends"""
         video_sentiments = [item.get('video_sentiment', 'neutral') for item in data]
@@ -449,10 +869,10 @@ class SentimentAnalytics:
     
     def get_trend_summary(self, metric: str = 'sentiment') -> Dict[str, Any]:
         """Get trend summary for a specific metric"""
-        if len(self.analysis_history) < 2:
+        if len(self.history) < 2:
             return {"error": "Insufficient data for trend analysis"}
         
-        recent_data = self.analysis_history[-10:]  # Last 10 analyses
+        recent_data = self.history.latest(10)  # Last 10 analyses
         
         if metric == 'sentiment':
             scores = []
@@ -8,7 +8,6 @@ import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import json
-import statistics
 from collections import defaultdict, Counter
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.cluster import KMeans
@@ -16,13 +15,63 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics.pairwise import cosine_similarity
 import re
 import math
+import time
+import threading
 from database_manager import db_manager
 
+# Report sections of one window share its frame, reloaded at most this often
+FRAME_TTL_SECONDS = 30
+
+
+def _category_code(categories: pd.Index, value: str) -> int:
+    """Code of value among the categories (-2, matching no row, when absent)"""
+    return int(categories.get_loc(value)) if value in categories else -2
+
+
+def sentiment_scores(sentiment: pd.Series, confidence: np.ndarray) -> np.ndarray:
+    """Signed confidence per row (positive +c, negative -c, anything else 0) from the category codes"""
+    codes = sentiment.cat.codes.to_numpy()
+    categories = sentiment.cat.categories
+    base = np.select([codes == _category_code(categories, 'positive'), codes == _category_code(categories, 'negative')],
+                     [1.0, -1.0], 0.0)
+    return base * confidence
+
+
+def frame_from_columns(timestamp, sentiment, confidence, source, content_length) -> pd.DataFrame:
+    """
+    Typed, time-ordered frame of one window: timestamps parsed once (datetimes
+    or ISO strings), sentiment and source categorical, hour and sentiment_score
+    derived column-wise
+    """
+    df = pd.DataFrame({
+        'timestamp': pd.to_datetime(pd.Series(timestamp), format='ISO8601'),
+        'sentiment': pd.Categorical(sentiment),
+        'confidence': np.asarray(confidence, dtype=float),
+        'source': pd.Categorical(source),
+        'content_length': np.asarray(content_length, dtype=np.int64),
+    })
+    df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+    df['hour'] = df['timestamp'].dt.hour
+    df['sentiment_score'] = sentiment_scores(df['sentiment'], df['confidence'].to_numpy())
+    return df
+
+
+def analyses_frame(records: List) -> pd.DataFrame:
+    """frame_from_columns() of AnalysisRecords"""
+    return frame_from_columns([r.timestamp for r in records], [r.sentiment for r in records],
+                              [r.confidence for r in records], [r.source for r in records],
+                              [len(r.content) for r in records])
+
+
+# Reports read the latest database snapshot (fresh=False), off the request write path
 class AdvancedAnalytics:
     def __init__(self):
         self.sentiment_history = []
         self.trend_data = defaultdict(list)
         self.ml_models = {}
+        self._frames: Dict[Tuple[int, int], Tuple[float, pd.DataFrame]] = {}  # (hours, limit) -> (loaded, frame)
+        self._frames_lock = threading.Lock()  # the module instance is shared by Flask request threads
+        self.stats = {'frame_loads': 0, 'frame_hits': 0}
         self.initialize_models()
     
     def initialize_models(self):
@@ -33,29 +82,47 @@ class AdvancedAnalytics:
             'tfidf_vectorizer': TfidfVectorizer(max_features=100, stop_words='english')
         }
     
+    def window_frame(self, hours: int = 24, limit: int = 1000) -> pd.DataFrame:
+        """
+        The newest `limit` analyses of the last `hours` as one shared frame (see
+        frame_from_columns), loaded at most once per FRAME_TTL_SECONDS; a cached
+        frame of the same window with a larger limit serves smaller ones. Callers
+        must not modify it.
+        """
+        now = time.monotonic()
+        with self._frames_lock:
+            for (cached_hours, cached_limit), (loaded_at, frame) in self._frames.items():
+                if cached_hours == hours and cached_limit >= limit and now - loaded_at < FRAME_TTL_SECONDS:
+                    self.stats['frame_hits'] += 1
+                    return frame if cached_limit == limit else frame.tail(limit)
+        
+        # Loaded outside the lock; concurrent misses of one window may each load it
+        frame = analyses_frame(db_manager.get_recent_analyses(limit=limit, hours=hours, fresh=False))
+        with self._frames_lock:
+            self._frames = {key: entry for key, entry in self._frames.items() if now - entry[0] < FRAME_TTL_SECONDS}
+            self._frames[(hours, limit)] = (now, frame)
+            self.stats['frame_loads'] += 1
+        return frame
+    
+    def generate_window_report(self, hours: int = 24, limit: int = 1000) -> Dict[str, Any]:
+        """Trend, risk and engagement sections of one window, all from its single frame"""
+        df = self.window_frame(hours, limit)
+        return {
+            'window': {'hours': hours, 'analyses': len(df)},
+            'trends': self._trend_report(df),
+            'anomaly_detection': self._detect_anomalies(df),
+            'risk_assessment': self._assess_sentiment_risks(df),
+            'engagement': self._engagement_report(df)
+        }
+    
     def analyze_sentiment_trends(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze sentiment trends over time"""
-        recent_analyses = db_manager.get_recent_analyses(limit=1000, hours=hours)
-        
-        if not recent_analyses:
+        return self._trend_report(self.window_frame(hours, 1000))
+    
+    def _trend_report(self, df: pd.DataFrame) -> Dict[str, Any]:
+        if df.empty:
             return self._get_empty_trend_analysis()
         
-        # Convert to DataFrame for easier analysis
-        df = pd.DataFrame([
-            {
-                'timestamp': analysis.timestamp,
-                'sentiment': analysis.sentiment,
-                'confidence': analysis.confidence,
-                'source': analysis.source,
-                'content_length': len(analysis.content)
-            }
-            for analysis in recent_analyses
-        ])
-        
-        # Time-based analysis
-        df['hour'] = df['timestamp'].dt.hour
-        df['sentiment_score'] = df.apply(self._sentiment_to_score, axis=1)
-        
         # Trend calculations
         hourly_trends = self._calculate_hourly_trends(df)
         sentiment_momentum = self._calculate_momentum(df)
@@ -82,7 +149,7 @@ class AdvancedAnalytics:
     
     def perform_content_clustering(self, limit: int = 500) -> Dict[str, Any]:
         """Perform ML-based content clustering to identify themes"""
-        recent_analyses = db_manager.get_recent_analyses(limit=limit, hours=72)
+        recent_analyses = db_manager.get_recent_analyses(limit=limit, hours=72, fresh=False)
         
         if len(recent_analyses) < 10:
             return {'error': 'Insufficient data for clustering analysis'}
@@ -118,8 +185,8 @@ class AdvancedAnalytics:
     def generate_predictive_insights(self) -> Dict[str, Any]:
         """Generate predictive insights and forecasts"""
         # Get historical data
-        stats = db_manager.get_sentiment_statistics(hours=168)  # 1 week
-        recent_data = db_manager.get_recent_analyses(limit=1000, hours=24)
+        stats = db_manager.get_sentiment_statistics(hours=168, fresh=False)  # 1 week
+        recent_data = self.window_frame(24, 1000)
         
         insights = {
             'volume_prediction': self._predict_volume_trends(),
@@ -133,9 +200,10 @@ class AdvancedAnalytics:
     
     def calculate_engagement_metrics(self) -> Dict[str, Any]:
         """Calculate advanced engagement and interaction metrics"""
-        recent_data = db_manager.get_recent_analyses(limit=500, hours=24)
-        
-        if not recent_data:
+        return self._engagement_report(self.window_frame(24, 500))
+    
+    def _engagement_report(self, recent_data: pd.DataFrame) -> Dict[str, Any]:
+        if recent_data.empty:
             return {'error': 'No recent data available'}
         
         # Content analysis
@@ -156,16 +224,6 @@ class AdvancedAnalytics:
             )
         }
     
-    def _sentiment_to_score(self, row) -> float:
-        """Convert sentiment to numerical score"""
-        sentiment_scores = {
-            'positive': 1.0,
-            'neutral': 0.0,
-            'negative': -1.0
-        }
-        base_score = sentiment_scores.get(row['sentiment'], 0.0)
-        return base_score * row['confidence']
-    
     def _calculate_hourly_trends(self, df: pd.DataFrame) -> Dict[str, List]:
         """Calculate hourly sentiment trends"""
         hourly_data = df.groupby('hour').agg({
@@ -186,10 +244,9 @@ class AdvancedAnalytics:
         if len(df) < 10:
             return {'score': 0.0, 'direction': 'stable', 'strength': 'weak'}
         
-        # Sort by timestamp and get recent vs older sentiment
-        df_sorted = df.sort_values('timestamp')
-        recent_sentiment = df_sorted.tail(len(df) // 3)['sentiment_score'].mean()
-        older_sentiment = df_sorted.head(len(df) // 3)['sentiment_score'].mean()
+        # Recent vs older sentiment (window frames are in timestamp order)
+        recent_sentiment = df['sentiment_score'].iloc[-(len(df) // 3):].mean()
+        older_sentiment = df['sentiment_score'].iloc[:len(df) // 3].mean()
         
         momentum_score = recent_sentiment - older_sentiment
         
@@ -208,16 +265,15 @@ class AdvancedAnalytics:
             return {'prediction': 0.0, 'confidence': 0.0, 'method': 'insufficient_data'}
         
         try:
-            # Prepare time-series data
-            df_sorted = df.sort_values('timestamp')
-            X = np.arange(len(df_sorted)).reshape(-1, 1)
-            y = df_sorted['sentiment_score'].values
+            # Prepare time-series data (window frames are in timestamp order)
+            X = np.arange(len(df)).reshape(-1, 1)
+            y = df['sentiment_score'].values
             
             # Fit linear regression
             self.ml_models['sentiment_predictor'].fit(X, y)
             
             # Predict next point
-            next_prediction = self.ml_models['sentiment_predictor'].predict([[len(df_sorted)]])[0]
+            next_prediction = self.ml_models['sentiment_predictor'].predict([[len(df)]])[0]
             
             # Calculate prediction confidence based on R²
             confidence = max(0, self.ml_models['sentiment_predictor'].score(X, y))
@@ -268,7 +324,7 @@ class AdvancedAnalytics:
         }
         
         # Confidence by sentiment
-        confidence_by_sentiment = df.groupby('sentiment')['confidence'].mean().to_dict()
+        confidence_by_sentiment = df.groupby('sentiment', observed=True)['confidence'].mean().to_dict()
         
         # Quality assessment
         high_confidence_pct = (df['confidence'] > 0.8).mean() * 100
@@ -282,7 +338,7 @@ class AdvancedAnalytics:
     
     def _analyze_source_performance(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Analyze performance by data source"""
-        source_stats = df.groupby('source').agg({
+        source_stats = df.groupby('source', observed=True).agg({
             'sentiment_score': ['count', 'mean', 'std'],
             'confidence': 'mean',
             'content_length': 'mean'
@@ -341,8 +397,7 @@ class AdvancedAnalytics:
         if momentum['direction'] == 'negative' and momentum['strength'] in ['moderate', 'strong']:
             recommendations.append("Monitor closely - negative sentiment momentum detected")
         
-        source_counts = df['source'].value_counts()
-        if len(source_counts) == 1:
+        if df['source'].nunique() == 1:
             recommendations.append("Diversify data sources to get more comprehensive sentiment analysis")
         
         hourly_volume = df.groupby('hour').size()
@@ -453,18 +508,18 @@ class AdvancedAnalytics:
             'time_horizon': '2_hours'
         }
     
-    def _detect_anomalies(self, recent_data: List) -> List[Dict[str, Any]]:
+    def _detect_anomalies(self, recent_data: pd.DataFrame) -> List[Dict[str, Any]]:
         """Detect anomalies in recent data"""
         anomalies = []
         
         if len(recent_data) > 10:
-            confidences = [analysis.confidence for analysis in recent_data]
-            avg_confidence = statistics.mean(confidences)
-            std_confidence = statistics.stdev(confidences)
+            confidences = recent_data['confidence']
+            avg_confidence = confidences.mean()
+            std_confidence = confidences.std()
             
             # Detect unusually low confidence scores
             threshold = avg_confidence - 2 * std_confidence
-            low_confidence_count = sum(1 for c in confidences if c < threshold)
+            low_confidence_count = int((confidences < threshold).sum())
             
             if low_confidence_count > len(confidences) * 0.1:  # More than 10%
                 anomalies.append({
@@ -499,17 +554,16 @@ class AdvancedAnalytics:
             'peak_to_low_ratio': round(hourly_counts[peak_hour] / max(hourly_counts[low_hour], 1), 2)
         }
     
-    def _assess_sentiment_risks(self, recent_data: List) -> Dict[str, Any]:
+    def _assess_sentiment_risks(self, recent_data: pd.DataFrame) -> Dict[str, Any]:
         """Assess sentiment-related risks"""
-        if not recent_data:
+        if recent_data.empty:
             return {'risk_level': 'unknown', 'factors': []}
         
         risk_factors = []
         risk_score = 0
         
         # Check for negative sentiment concentration
-        negative_count = sum(1 for analysis in recent_data if analysis.sentiment == 'negative')
-        negative_ratio = negative_count / len(recent_data)
+        negative_ratio = float((recent_data['sentiment'] == 'negative').mean())
         
         if negative_ratio > 0.6:
             risk_factors.append('High concentration of negative sentiment')
@@ -519,7 +573,7 @@ class AdvancedAnalytics:
             risk_score += 1
         
         # Check confidence levels
-        avg_confidence = sum(analysis.confidence for analysis in recent_data) / len(recent_data)
+        avg_confidence = recent_data['confidence'].mean()
         if avg_confidence < 0.5:
             risk_factors.append('Low average confidence in predictions')
             risk_score += 2
@@ -551,49 +605,50 @@ class AdvancedAnalytics:
         
         return recommendations
     
-    def _analyze_content_patterns(self, recent_data: List) -> Dict[str, Any]:
+    def _analyze_content_patterns(self, recent_data: pd.DataFrame) -> Dict[str, Any]:
         """Analyze content patterns and characteristics"""
-        if not recent_data:
+        if recent_data.empty:
             return {}
         
-        content_lengths = [len(analysis.content) for analysis in recent_data]
+        content_lengths = recent_data['content_length']
         
         return {
-            'avg_length': round(statistics.mean(content_lengths), 1),
-            'median_length': statistics.median(content_lengths),
-            'length_std': round(statistics.stdev(content_lengths), 1) if len(content_lengths) > 1 else 0,
-            'short_content_ratio': sum(1 for l in content_lengths if l < 50) / len(content_lengths),
-            'long_content_ratio': sum(1 for l in content_lengths if l > 200) / len(content_lengths)
+            'avg_length': round(float(content_lengths.mean()), 1),
+            'median_length': float(content_lengths.median()),
+            'length_std': round(float(content_lengths.std()), 1) if len(content_lengths) > 1 else 0,
+            'short_content_ratio': float((content_lengths < 50).mean()),
+            'long_content_ratio': float((content_lengths > 200).mean())
         }
     
-    def _calculate_quality_scores(self, recent_data: List) -> Dict[str, Any]:
+    def _calculate_quality_scores(self, recent_data: pd.DataFrame) -> Dict[str, Any]:
         """Calculate content and analysis quality scores"""
-        if not recent_data:
+        if recent_data.empty:
             return {}
         
-        confidence_scores = [analysis.confidence for analysis in recent_data]
+        confidence_scores = recent_data['confidence']
         
-        quality_score = statistics.mean(confidence_scores) * 100
-        consistency_score = (1 - statistics.stdev(confidence_scores)) * 100 if len(confidence_scores) > 1 else 100
+        quality_score = float(confidence_scores.mean()) * 100
+        consistency_score = (1 - float(confidence_scores.std())) * 100 if len(confidence_scores) > 1 else 100
         
         return {
             'overall_quality': round(quality_score, 1),
             'consistency': round(max(0, consistency_score), 1),
-            'high_quality_ratio': sum(1 for c in confidence_scores if c > 0.8) / len(confidence_scores)
+            'high_quality_ratio': float((confidence_scores > 0.8).mean())
         }
     
-    def _analyze_engagement_patterns(self, recent_data: List) -> Dict[str, Any]:
+    def _analyze_engagement_patterns(self, recent_data: pd.DataFrame) -> Dict[str, Any]:
         """Analyze engagement and interaction patterns"""
-        if not recent_data:
+        if recent_data.empty:
             return {}
         
-        sources = [analysis.source for analysis in recent_data]
-        source_distribution = Counter(sources)
+        source_distribution = recent_data['source'].value_counts(sort=False)
+        source_distribution = source_distribution[source_distribution > 0]
+        top = source_distribution.idxmax()
         
         return {
             'source_diversity': len(source_distribution),
-            'dominant_source': source_distribution.most_common(1)[0][0] if source_distribution else 'unknown',
-            'source_concentration': source_distribution.most_common(1)[0][1] / len(sources) if source_distribution else 0
+            'dominant_source': top,
+            'source_concentration': int(source_distribution[top]) / len(recent_data)
         }
     
     def _generate_optimization_suggestions(self, content_metrics: Dict, quality_metrics: Dict) -> List[str]:
@@ -0,0 +1,220 @@
+"""
+API Usage Accounting
+Per-request API accounting aggregated in memory per (minute, endpoint, status) and
+flushed as compacted rollup rows, so recording a request costs a dict update
+instead of an INSERT and a commit
+
+Usage:
+    python api_accounting.py sentiment_analytics.db              # per-endpoint statistics, last 24 hours
+    python api_accounting.py sentiment_analytics.db --hours 1
+"""
+
+import os
+import time
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from rollups import API_LATENCY_CUBE, API_USAGE_CUBE, GRANULARITIES, latency_bin
+
+logger = logging.getLogger(__name__)
+
+_MINUTE = GRANULARITIES['minute']
+
+
+class ApiUsageAccountant:
+    """
+    In-memory API usage aggregates of one pooled database
+
+    record() adds a request to its minute's (endpoint, status_code) aggregate:
+    count, response-time sum/count/min/max and a response-time histogram (error
+    counts are the aggregates of 4xx/5xx status codes). flush() writes the
+    aggregates in one transaction straight into the api_usage_rollups and
+    api_latency_rollups cubes, which summaries already read, so nothing is
+    written per request. A sample_rate share of requests (and, with
+    keep_errors, every failed one, for its error message) is also kept as a raw
+    api_usage row; those rows are written at flush too and reach the cubes
+    through the insert trigger instead of the aggregates. Aggregates are flushed
+    every flush_interval, on close and as soon as max_pending keys are buffered.
+    """
+
+    def __init__(self, pool, flush_interval: float = 10.0, sample_rate: float = 0.0, keep_errors: bool = True,
+                 max_pending: int = 10_000, name: str = 'api_accounting',
+                 clock: Callable[[], datetime] = datetime.now):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.sample_rate = sample_rate
+        self.keep_errors = keep_errors
+        self.max_pending = max_pending
+        self.name = name
+        self.clock = clock
+
+        # (minute, endpoint, status_code) -> [count, time_sum, time_n, time_min, time_max, {bin: count}]
+        self._aggregates: Dict[Tuple[str, str, Optional[int]], list] = {}
+        self._raw: List[tuple] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'requests': 0, 'errors': 0, 'sampled': 0, 'flushes': 0, 'rows_written': 0,
+                      'flush_failures': 0, 'last_flush_ms': 0.0}
+
+    # -- recording ------------------------------------------------------------
+
+    def record(self, endpoint: str, response_time: Optional[float] = None, status_code: Optional[int] = None,
+               error_message: Optional[str] = None, timestamp: Optional[datetime] = None):
+        """Account one request (no database access unless max_pending is reached)"""
+        timestamp = timestamp or self.clock()
+        failed = error_message is not None or (status_code is not None and int(status_code) >= 400)
+        with self._lock:
+            self.stats['requests'] += 1
+            self.stats['errors'] += failed
+            if (failed and self.keep_errors) or (self.sample_rate and random.random() < self.sample_rate):
+                self.stats['sampled'] += 1
+                self._raw.append((endpoint, timestamp, response_time, status_code, error_message))
+            else:
+                key = (timestamp.strftime(_MINUTE), endpoint, status_code)
+                aggregate = self._aggregates.get(key)
+                if aggregate is None:
+                    aggregate = self._aggregates[key] = [0, 0.0, 0, None, None, {}]
+                aggregate[0] += 1
+                if response_time is not None:
+                    aggregate[1] += response_time
+                    aggregate[2] += 1
+                    aggregate[3] = response_time if aggregate[3] is None else min(aggregate[3], response_time)
+                    aggregate[4] = response_time if aggregate[4] is None else max(aggregate[4], response_time)
+                    label = latency_bin(response_time)
+                    aggregate[5][label] = aggregate[5].get(label, 0) + 1
+            full = len(self._aggregates) + len(self._raw) >= self.max_pending
+        if full:
+            self.flush()
+
+    def pending(self) -> int:
+        """Buffered aggregates plus raw rows not yet written"""
+        with self._lock:
+            return len(self._aggregates) + len(self._raw)
+
+    # -- flushing -------------------------------------------------------------
+
+    @staticmethod
+    def _cube_rows(aggregates: Dict[Tuple[str, str, Optional[int]], list]) -> Tuple[list, list]:
+        usage, latency = [], {}
+        for (minute, endpoint, status_code), (count, total, n, low, high, bins) in aggregates.items():
+            moment = datetime.strptime(minute, _MINUTE)
+            usage.append((moment, (endpoint, status_code), count, [(total, n, low, high)]))
+            for label, binned in bins.items():
+                latency[(moment, endpoint, label)] = latency.get((moment, endpoint, label), 0) + binned
+        return usage, [(moment, (endpoint, label), count, []) for (moment, endpoint, label), count in latency.items()]
+
+    def flush(self) -> int:
+        """Write buffered aggregates and raw rows in one transaction; returns rows written"""
+        with self._flush_lock:
+            with self._lock:
+                aggregates, self._aggregates = self._aggregates, {}
+                raw, self._raw = self._raw, []
+            if not aggregates and not raw:
+                return 0
+            started = time.perf_counter()
+            usage, latency = self._cube_rows(aggregates)
+            try:
+                with self.pool.write() as conn:
+                    conn.executemany("INSERT INTO api_usage (endpoint, timestamp, response_time, status_code, "
+                                     "error_message) VALUES (?, ?, ?, ?, ?)", raw)
+                    written = len(raw) + API_USAGE_CUBE.merge(conn, usage) + API_LATENCY_CUBE.merge(conn, latency)
+            except Exception:
+                self.stats['flush_failures'] += 1
+                self._restore(aggregates, raw)
+                raise
+            self.stats['flushes'] += 1
+            self.stats['rows_written'] += written
+            self.stats['last_flush_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return written
+
+    def _restore(self, aggregates: Dict[Tuple[str, str, Optional[int]], list], raw: List[tuple]):
+        """Put back what a failed flush took, merged with anything recorded meanwhile"""
+        with self._lock:
+            for key, (count, total, n, low, high, bins) in aggregates.items():
+                current = self._aggregates.setdefault(key, [0, 0.0, 0, None, None, {}])
+                current[0] += count
+                current[1] += total
+                current[2] += n
+                current[3] = low if current[3] is None else current[3] if low is None else min(current[3], low)
+                current[4] = high if current[4] is None else current[4] if high is None else max(current[4], high)
+                for label, binned in bins.items():
+                    current[5][label] = current[5].get(label, 0) + binned
+            self._raw[:0] = raw
+
+    # -- background flushing --------------------------------------------------
+
+    def start(self) -> 'ApiUsageAccountant':
+        """Flush every flush_interval in a background thread, and flush on exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"❌ {self.name} flush failed: {e}")
+
+    def close(self):
+        """Stop the flusher and write everything recorded"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ {self.name} final flush failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = {'pending_aggregates': len(self._aggregates), 'pending_raw_rows': len(self._raw)}
+        return {**self.stats, **pending, 'sample_rate': self.sample_rate, 'flush_interval': self.flush_interval}
+
+
+_accountants: Dict[str, ApiUsageAccountant] = {}
+_accountants_lock = threading.Lock()
+
+
+def get_accounting(pool, **options) -> ApiUsageAccountant:
+    """Return the shared (started) accountant for a pool's database, creating it on first use"""
+    if pool.in_memory:
+        return ApiUsageAccountant(pool, **options).start()
+    key = os.path.abspath(pool.db_path)
+    with _accountants_lock:
+        accountant = _accountants.get(key)
+        if accountant is None:
+            accountant = ApiUsageAccountant(pool, name=f"api_accounting:{os.path.basename(key)}", **options).start()
+            _accountants[key] = accountant
+        return accountant
+
+
+def close_all_accounting():
+    """Flush and stop every shared accountant (used on shutdown and in tests)"""
+    with _accountants_lock:
+        for accountant in _accountants.values():
+            accountant.close()
+        _accountants.clear()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Print API usage statistics from the rollup cubes')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('--hours', type=int, default=24)
+    args = parser.parse_args()
+
+    from database_manager import DatabaseManager
+
+    for key, value in DatabaseManager(args.db_path).get_api_statistics(hours=args.hours).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,235 @@
+"""
+Parquet Archive Tier
+Moves aged-out rows from a hot SQLite table into date-partitioned, zstd-compressed
+Parquet files described by a JSON manifest, and reads them back (memory-mapped
+Arrow or DuckDB) for queries that reach past the hot window
+
+Usage:
+    python archive.py sentiment_analytics.db archive/ --hot-days 30        # move cold days out
+    python archive.py sentiment_analytics.db archive/ --status
+"""
+
+import os
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlite_pool import BULK_CHUNK_SIZE
+from streaming_export import PARQUET_AVAILABLE, fetch_chunks, parquet_writer, write_file
+
+if PARQUET_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+try:
+    import duckdb
+    DUCKDB_AVAILABLE = True
+except ImportError:
+    DUCKDB_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _sql_time(moment: datetime) -> str:
+    """Bound for comparisons with timestamps stored by sqlite3's datetime adapter"""
+    return moment.isoformat(' ')
+
+
+def _arrow_type(declared: str):
+    """Arrow type for a SQLite declared column type (by affinity); anything else is text"""
+    declared = declared.upper()
+    if 'INT' in declared:
+        return pa.int64()
+    if any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+        return pa.float64()
+    if 'BOOL' in declared:
+        return pa.bool_()
+    if 'BLOB' in declared:
+        return pa.binary()
+    return pa.string()
+
+
+class ParquetArchive:
+    """
+    Archive of one table: <root>/<table>/date=YYYY-MM-DD/part-*.parquet + manifest.json
+
+    Each manifest partition records its file, date, first/last timestamp, row count
+    and size. Whole days are archived: a day's rows are written to a new part file,
+    the manifest is replaced atomically and only then are the rows deleted, all while
+    holding the pool's writer, so a crash can repeat a day but never lose it.
+    """
+
+    def __init__(self, root: str, table: str, time_column: str = 'timestamp',
+                 transform: Optional[Callable[[Sequence[str], List[tuple]], List[tuple]]] = None):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("The Parquet archive requires pyarrow")
+        self.table = table
+        self.time_column = time_column
+        # (column names, rows) -> rows applied while archiving, so part files are
+        # self-contained (e.g. binary JSON back to text, text store hashes to text)
+        self.transform = transform
+        self.directory = os.path.join(root, table)
+        self.manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    # -- manifest -----------------------------------------------------------
+
+    def partitions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Manifest entries whose time range overlaps [start, end)"""
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, encoding='utf-8') as f:
+            entries = json.load(f)['partitions']
+        return [entry for entry in entries
+                if (start is None or entry['end'] >= _sql_time(start))
+                and (end is None or entry['start'] < _sql_time(end))]
+
+    def _write_manifest(self, entries: List[Dict[str, Any]]):
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'table': self.table, 'time_column': self.time_column,
+                       'partitions': sorted(entries, key=lambda e: (e['start'], e['path']))}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.manifest_path)
+
+    # -- tiering ------------------------------------------------------------
+
+    def archive(self, pool, before: datetime, chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """Move every whole day older than before's day into Parquet; returns rows moved"""
+        cutoff = before.replace(hour=0, minute=0, second=0, microsecond=0)
+        t = self.time_column
+        moved = 0
+        while True:
+            with pool.write() as conn:
+                first = conn.execute(f"SELECT MIN({t}) FROM {self.table} WHERE {t} < ?",
+                                     (_sql_time(cutoff),)).fetchone()[0]
+                if first is None:
+                    return moved
+                day = datetime.fromisoformat(str(first)[:10])
+                bounds = (_sql_time(day), _sql_time(day + timedelta(days=1)))
+                moved += self._archive_day(conn, day, bounds, chunk_size)
+
+    def _archive_day(self, conn, day: datetime, bounds, chunk_size: int) -> int:
+        t = self.time_column
+        where = f"WHERE {t} >= ? AND {t} < ?"
+        rows, start, end = conn.execute(f"SELECT COUNT(*), MIN({t}), MAX({t}) FROM {self.table} {where}",
+                                        bounds).fetchone()
+
+        folder = os.path.join(self.directory, f"date={day:%Y-%m-%d}")
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"part-{uuid.uuid4().hex[:12]}.parquet")
+        # Schema from the declared column types, so every part file has the same one
+        declared = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({self.table})")]
+        schema = pa.schema([(name, _arrow_type(col_type)) for name, col_type in declared])
+        cursor = conn.execute(f"SELECT {', '.join(name for name, _ in declared)} FROM {self.table} "
+                              f"{where} ORDER BY {t}", bounds)
+        chunks = fetch_chunks(cursor, chunk_size)
+        if self.transform is not None:
+            chunks = (self.transform(schema.names, rows) for rows in chunks)
+        size = write_file(parquet_writer(schema.names, chunks, 'zstd', schema), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+        with self._lock:
+            entries = self.partitions()
+            entries.append({
+                'date': f"{day:%Y-%m-%d}",
+                'path': os.path.relpath(path, self.directory),
+                'start': str(start),
+                'end': str(end),
+                'rows': rows,
+                'bytes': size,
+                'archived_at': datetime.now().isoformat(),
+            })
+            self._write_manifest(entries)
+
+        conn.execute(f"DELETE FROM {self.table} {where}", bounds)
+        logger.info(f"📦 Archived {rows} {self.table} rows of {day:%Y-%m-%d} to {path}")
+        return rows
+
+    def expire(self, older_than: datetime) -> int:
+        """Drop archived partitions that end before older_than; returns rows dropped"""
+        with self._lock:
+            entries = self.partitions()
+            keep = [e for e in entries if e['end'] >= _sql_time(older_than)]
+            dropped = [e for e in entries if e['end'] < _sql_time(older_than)]
+            if not dropped:
+                return 0
+            self._write_manifest(keep)
+        for entry in dropped:
+            path = os.path.join(self.directory, entry['path'])
+            if os.path.exists(path):
+                os.remove(path)
+            folder = os.path.dirname(path)
+            if os.path.isdir(folder) and not os.listdir(folder):
+                os.rmdir(folder)
+        return sum(entry['rows'] for entry in dropped)
+
+    # -- reading ------------------------------------------------------------
+
+    def paths(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        return [os.path.join(self.directory, entry['path']) for entry in self.partitions(start, end)]
+
+    def read_table(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   columns: Optional[Sequence[str]] = None):
+        """Archived rows in [start, end) as a pyarrow Table (files are memory-mapped)"""
+        paths = self.paths(start, end)
+        if not paths:
+            return None
+        wanted = None if columns is None else list(dict.fromkeys([*columns, self.time_column]))
+        table = pa.concat_tables([pq.read_table(path, columns=wanted, memory_map=True) for path in paths],
+                                 promote_options='default')
+        times = table[self.time_column].cast(pa.string())
+        mask = None
+        if start is not None:
+            mask = pc.greater_equal(times, _sql_time(start))
+        if end is not None:
+            upper = pc.less(times, _sql_time(end))
+            mask = upper if mask is None else pc.and_(mask, upper)
+        if mask is not None:
+            table = table.filter(mask)
+        return table.select(list(columns)) if columns is not None else table
+
+    def duckdb(self, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """DuckDB connection with an `archive` view over the partitions in range"""
+        if not DUCKDB_AVAILABLE:
+            raise RuntimeError("DuckDB queries require the duckdb package")
+        conn = duckdb.connect()
+        paths = self.paths(start, end)
+        if paths:
+            conn.execute(f"CREATE VIEW archive AS SELECT * FROM read_parquet({paths!r}, union_by_name = true)")
+        return conn
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Move aged-out analysis rows into the Parquet archive')
+    parser.add_argument('db_path', help='SQLite database file (database_manager schema)')
+    parser.add_argument('archive_dir', help='Archive root directory')
+    parser.add_argument('--table', default='analysis_results')
+    parser.add_argument('--hot-days', type=int, default=30, help='Days kept in SQLite')
+    parser.add_argument('--retention-days', type=int, default=None, help='Drop archived days older than this')
+    parser.add_argument('--status', action='store_true', help='Show the archived partitions')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from sqlite_pool import get_pool
+
+    archive = ParquetArchive(args.archive_dir, args.table)
+    if args.status:
+        for entry in archive.partitions():
+            print(f"  {entry['date']}  {entry['rows']:>9} rows  {entry['bytes'] / 1024:>9.1f} KB  {entry['path']}")
+    else:
+        now = datetime.now()
+        moved = archive.archive(get_pool(args.db_path), now - timedelta(days=args.hot_days))
+        print(f"✅ Archived {moved} rows")
+        if args.retention_days:
+            print(f"🗑️  Dropped {archive.expire(now - timedelta(days=args.retention_days))} archived rows")
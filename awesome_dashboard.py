@@ -35,8 +35,10 @@ import torch
 from textblob import TextBlob
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import feedparser
-import sqlite3
 from urllib.parse import urlparse
+from sqlite_pool import get_pool, iter_chunks, BULK_CHUNK_SIZE
+from migrations import apply_migrations
+from pagination import InvalidCursor, decode_cursor, next_cursor, page_size
 import hashlib
 import time
 import random
@@ -390,14 +392,18 @@ class AwesomeDatabase:
     
     def __init__(self):
         self.db_path = 'awesome_sentiment_analysis.db'
+        self.pool = get_pool(self.db_path)
         self._init_database()
         logger.info("💾 Database initialized")
     
     def _init_database(self):
         """Initialize database tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
+        with self.pool.write() as conn:
+            self._create_tables(conn.cursor())
+        apply_migrations(self.pool, 'awesome')
+    
+    def _create_tables(self, cursor):
+        """Create tables on the writer connection"""
         # Sentiment analyses table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sentiment_analyses (
@@ -431,60 +437,75 @@ class AwesomeDatabase:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        conn.commit()
-        conn.close()
+    
+    _INSERT_ANALYSIS = '''
+        INSERT INTO sentiment_analyses 
+        (text, sentiment, confidence, scores, emotions, toxicity, subjectivity, 
+         model_used, processing_time, word_count, char_count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
+    @staticmethod
+    def _analysis_row(result):
+        return (
+            result['text'],
+            result['sentiment'],
+            result['confidence'],
+            json.dumps(result.get('scores', {})),
+            json.dumps(result.get('emotions', {})),
+            result.get('toxicity', 0),
+            result.get('subjectivity', 0),
+            result['model_used'],
+            result['processing_time'],
+            result['word_count'],
+            result['char_count']
+        )
     
     def save_analysis(self, result):
         """Save sentiment analysis result"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO sentiment_analyses 
-                (text, sentiment, confidence, scores, emotions, toxicity, subjectivity, 
-                 model_used, processing_time, word_count, char_count)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                result['text'],
-                result['sentiment'],
-                result['confidence'],
-                json.dumps(result.get('scores', {})),
-                json.dumps(result.get('emotions', {})),
-                result.get('toxicity', 0),
-                result.get('subjectivity', 0),
-                result['model_used'],
-                result['processing_time'],
-                result['word_count'],
-                result['char_count']
-            ))
-            
-            conn.commit()
-            analysis_id = cursor.lastrowid
-            conn.close()
-            
-            return analysis_id
+            with self.pool.write() as conn:
+                cursor = conn.cursor()
+                cursor.execute(self._INSERT_ANALYSIS, self._analysis_row(result))
+                return cursor.lastrowid
             
         except Exception as e:
             logger.error(f"❌ Database save failed: {e}")
             return None
     
-    def get_recent_analyses(self, limit=50):
-        """Get recent analyses"""
+    def save_analyses(self, results, chunk_size=BULK_CHUNK_SIZE):
+        """Save many analysis results in one transaction; returns rows written"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM sentiment_analyses 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            ''', (limit,))
+            saved = 0
+            with self.pool.write() as conn:
+                for chunk in iter_chunks(results, chunk_size):
+                    conn.executemany(self._INSERT_ANALYSIS, [self._analysis_row(r) for r in chunk])
+                    saved += len(chunk)
+            return saved
             
-            columns = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            conn.close()
+        except Exception as e:
+            logger.error(f"❌ Database bulk save failed: {e}")
+            return 0
+    
+    def get_recent_analyses(self, limit=50, cursor=None):
+        """Get recent analyses, optionally the page after a (created_at, id) keyset cursor"""
+        try:
+            if cursor:
+                where, params = "WHERE (created_at, id) < (?, ?)", (*decode_cursor(cursor), limit)
+            else:
+                where, params = "", (limit,)
+            with self.pool.read() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute(f'''
+                    SELECT * FROM sentiment_analyses 
+                    {where}
+                    ORDER BY created_at DESC, id DESC 
+                    LIMIT ?
+                ''', params)
+                
+                columns = [desc[0] for desc in cursor.description]
+                rows = cursor.fetchall()
             
             analyses = []
             for row in rows:
@@ -502,34 +523,32 @@ class AwesomeDatabase:
     def get_analytics(self):
         """Get analytics summary"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Total analyses
-            cursor.execute('SELECT COUNT(*) FROM sentiment_analyses')
-            total_analyses = cursor.fetchone()[0]
-            
-            # Sentiment distribution
-            cursor.execute('''
-                SELECT sentiment, COUNT(*) 
-                FROM sentiment_analyses 
-                GROUP BY sentiment
-            ''')
-            sentiment_dist = dict(cursor.fetchall())
-            
-            # Average confidence
-            cursor.execute('SELECT AVG(confidence) FROM sentiment_analyses')
-            avg_confidence = cursor.fetchone()[0] or 0
-            
-            # Model usage
-            cursor.execute('''
-                SELECT model_used, COUNT(*) 
-                FROM sentiment_analyses 
-                GROUP BY model_used
-            ''')
-            model_usage = dict(cursor.fetchall())
-            
-            conn.close()
+            with self.pool.read() as conn:
+                cursor = conn.cursor()
+                
+                # Total analyses
+                cursor.execute('SELECT COUNT(*) FROM sentiment_analyses')
+                total_analyses = cursor.fetchone()[0]
+                
+                # Sentiment distribution
+                cursor.execute('''
+                    SELECT sentiment, COUNT(*) 
+                    FROM sentiment_analyses 
+                    GROUP BY sentiment
+                ''')
+                sentiment_dist = dict(cursor.fetchall())
+                
+                # Average confidence
+                cursor.execute('SELECT AVG(confidence) FROM sentiment_analyses')
+                avg_confidence = cursor.fetchone()[0] or 0
+                
+                # Model usage
+                cursor.execute('''
+                    SELECT model_used, COUNT(*) 
+                    FROM sentiment_analyses 
+                    GROUP BY model_used
+                ''')
+                model_usage = dict(cursor.fetchall())
             
             return {
                 'total_analyses': total_analyses,
@@ -631,12 +650,18 @@ def get_analytics():
 def get_recent_analyses():
     """📋 Get recent analyses"""
     try:
-        limit = int(request.args.get('limit', 20))
-        analyses = database.get_recent_analyses(limit)
+        limit = page_size(request.args.get('limit', 20))
+        cursor = request.args.get('cursor')
+        if cursor:
+            decode_cursor(cursor)
+        analyses = database.get_recent_analyses(limit, cursor=cursor)
         return jsonify({
             'analyses': analyses,
-            'total': len(analyses)
+            'total': len(analyses),
+            'next_cursor': next_cursor(analyses, limit)
         })
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"❌ Recent API failed: {e}")
         return jsonify({'error': 'Failed to fetch recent analyses'}), 500
@@ -654,12 +679,8 @@ def batch_analyze():
         if len(texts) > 50:
             return jsonify({'error': 'Too many texts (max 50)'}), 400
         
-        results = []
-        for text in texts:
-            if text.strip():
-                result = nlp_engine.analyze_sentiment(text.strip())
-                database.save_analysis(result)
-                results.append(result)
+        results = [nlp_engine.analyze_sentiment(text.strip()) for text in texts if text.strip()]
+        database.save_analyses(results)
         
         return jsonify({
             'results': results,
@@ -0,0 +1,610 @@
+"""
+Online Backup and Point-in-Time Restore
+Base copies taken with the SQLite online backup API in small, throttled steps,
+plus continuous archiving of committed WAL frames into checksummed segments, so
+a database can be restored to any archived moment while the application keeps
+writing
+
+Usage:
+    python backup.py sentiment_analytics.db                          # new base backup (generation)
+    python backup.py sentiment_analytics.db --watch                  # base backup, then archive the WAL
+    python backup.py sentiment_analytics.db --verify
+    python backup.py sentiment_analytics.db --restore restored.db --at 2024-05-01T10:00:00
+"""
+
+import os
+import gzip
+import json
+import time
+import uuid
+import atexit
+import shutil
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from sqlite_pool import SQLiteConnectionPool
+
+logger = logging.getLogger(__name__)
+
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+WAL_MAGIC = (0x377f0682, 0x377f0683)  # little- / big-endian frame checksums
+
+GENERATION_FILE = 'generation.json'
+SEGMENTS_FILE = 'segments.jsonl'
+BASE_FILE = 'base.db'
+
+WalHeader = namedtuple('WalHeader', 'page_size salt checksum big_endian')
+
+
+class WalGap(RuntimeError):
+    """Raised when WAL frames were reset before they could be archived"""
+
+
+class BackupError(RuntimeError):
+    """Raised for missing, corrupt or inconsistent backup files"""
+
+
+class _BackupRestarted(Exception):
+    """Aborts a paged base copy that concurrent writes keep restarting"""
+
+
+# ---------------------------------------------------------------------------
+# WAL format (https://www.sqlite.org/fileformat.html#the_write_ahead_log)
+# ---------------------------------------------------------------------------
+
+def wal_checksum(data: bytes, s0: int, s1: int, big_endian: bool) -> Tuple[int, int]:
+    """SQLite's cumulative WAL checksum of data (a multiple of 8 bytes), continuing from (s0, s1)"""
+    words = struct.unpack(f"{'>' if big_endian else '<'}{len(data) // 4}I", data)
+    for i in range(0, len(words), 2):
+        s0 = (s0 + words[i] + s1) & 0xFFFFFFFF
+        s1 = (s1 + words[i + 1] + s0) & 0xFFFFFFFF
+    return s0, s1
+
+
+def read_wal_header(data: bytes) -> Optional[WalHeader]:
+    """The WAL header at the start of data, or None for an empty, reset or corrupt WAL"""
+    if len(data) < WAL_HEADER_SIZE:
+        return None
+    magic, _, page_size, _, salt1, salt2, c1, c2 = struct.unpack('>8I', data[:WAL_HEADER_SIZE])
+    if magic not in WAL_MAGIC:
+        return None
+    big_endian = bool(magic & 1)
+    if wal_checksum(data[:24], 0, 0, big_endian) != (c1, c2):
+        return None
+    return WalHeader(page_size, (salt1, salt2), (c1, c2), big_endian)
+
+
+@lru_cache(maxsize=8)
+def _checksum_powers(pairs: int) -> Tuple[np.ndarray, Tuple[int, int, int, int]]:
+    """
+    Coefficients for checksumming a whole frame at once
+
+    One word pair (a, b) maps (s0, s1) to M(s0, s1) + (a, a + b) with M = [[1, 1], [1, 2]],
+    so a frame of n pairs adds sum_k M^(n-1-k) u_k to M^n (s0, s1). Returns the
+    M^(n-1-k) entries per pair (uint64 wraps modulo 2^64, hence correctly
+    modulo 2^32) and M^n.
+    """
+    powers = np.empty((pairs + 1, 4), dtype=np.uint64)
+    a, b, c, d = 1, 0, 0, 1
+    for j in range(pairs + 1):
+        powers[j] = (a, b, c, d)
+        a, b, c, d = (a + c) & 0xFFFFFFFF, (b + d) & 0xFFFFFFFF, (a + 2 * c) & 0xFFFFFFFF, (b + 2 * d) & 0xFFFFFFFF
+    return powers[pairs - 1::-1], tuple(int(x) for x in powers[pairs])
+
+
+def scan_frames(data: bytes, header: WalHeader, checksum: Tuple[int, int]) -> Tuple[int, int, int, Tuple[int, int]]:
+    """
+    Committed prefix of the frames in data (starting at a frame boundary)
+
+    Frames must carry the header's salt and continue the checksum chain from
+    checksum; returns (bytes, frames, commits, checksum after the last commit).
+    Each frame's own contribution to the chain is computed for all frames at
+    once with numpy; only the 2x2 carry between frames is a Python loop.
+    """
+    frame_size = FRAME_HEADER_SIZE + header.page_size
+    count = len(data) // frame_size
+    if not count:
+        return 0, 0, 0, checksum
+    big = np.frombuffer(data, dtype='>u4', count=count * frame_size // 4).reshape(count, -1)
+    fields = big[:, :6].astype(np.int64)  # page, db size, salt1, salt2, checksum1, checksum2
+    words = big if header.big_endian else np.frombuffer(data, dtype='<u4', count=big.size).reshape(count, -1)
+    words = np.concatenate([words[:, :2], words[:, 6:]], axis=1).astype(np.uint64)
+    coefficients, (m00, m01, m10, m11) = _checksum_powers(words.shape[1] // 2)
+    first, second = words[:, 0::2], words[:, 0::2] + words[:, 1::2]
+    own0 = (first * coefficients[:, 0] + second * coefficients[:, 1]).sum(axis=1) & 0xFFFFFFFF
+    own1 = (first * coefficients[:, 2] + second * coefficients[:, 3]).sum(axis=1) & 0xFFFFFFFF
+
+    s0, s1 = checksum
+    frames = end_frames = commits = 0
+    committed = checksum
+    for page, db_size, salt1, salt2, c1, c2, x0, x1 in zip(*fields.T.tolist(), own0.tolist(), own1.tolist()):
+        s0, s1 = (m00 * s0 + m01 * s1 + x0) & 0xFFFFFFFF, (m10 * s0 + m11 * s1 + x1) & 0xFFFFFFFF
+        if (salt1, salt2) != header.salt or (s0, s1) != (c1, c2):
+            break
+        frames += 1
+        if db_size:
+            end_frames, committed = frames, (s0, s1)
+            commits += 1
+    return end_frames * frame_size, end_frames, commits, committed
+
+
+def apply_frames(db_file, data: bytes, page_size: int):
+    """Write a segment's page images into an open database file, truncating at each commit"""
+    frame_size = FRAME_HEADER_SIZE + page_size
+    for pos in range(0, len(data), frame_size):
+        page_number, db_size = struct.unpack_from('>2I', data, pos)
+        db_file.seek((page_number - 1) * page_size)
+        db_file.write(data[pos + FRAME_HEADER_SIZE:pos + frame_size])
+        if db_size:
+            db_file.truncate(db_size * page_size)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json(path: str, data: Dict[str, Any]):
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+# ---------------------------------------------------------------------------
+# Archiving
+# ---------------------------------------------------------------------------
+
+class BackupManager:
+    """
+    Continuous backup of one pooled WAL-mode database
+
+    A generation starts with a base copy made by the online backup API,
+    pages_per_step pages at a time with step_sleep between steps, so writers
+    are never held behind it (a copy that concurrent commits restart more than
+    max_restarts times finishes in one step under a single read transaction).
+    sync() then appends every newly committed WAL frame to the generation as a
+    gzip segment, validated against the WAL's own frame checksums and recorded
+    with its sha256. A guard read transaction, renewed at each sync while the
+    pool's writer is briefly held, stops the WAL being reset over frames not yet
+    archived; once the WAL passes checkpoint_bytes the manager checkpoints it
+    (TRUNCATE) itself. Base copy plus segments replayed in order rebuild the
+    database as of any sync (restore()). A new generation starts every
+    base_interval, and after a gap (another process reset the WAL first).
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool, backup_dir: Optional[str] = None, sync_interval: float = 10.0,
+                 base_interval: float = 24 * 3600, pages_per_step: int = 256, step_sleep: float = 0.005,
+                 max_restarts: int = 3, checkpoint_bytes: int = 16 * 1024 * 1024, keep_generations: int = 2,
+                 name: str = 'backups', clock: Callable[[], datetime] = datetime.now):
+        self.pool = pool
+        self.directory = backup_dir or f"{pool.db_path}.backups"
+        self.sync_interval = sync_interval
+        self.base_interval = base_interval
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self.max_restarts = max_restarts
+        self.checkpoint_bytes = checkpoint_bytes
+        self.keep_generations = keep_generations
+        self.name = name
+        self.clock = clock
+        self.enabled = not pool.in_memory  # an in-memory database has no file or WAL to archive
+        self.wal_path = f"{pool.db_path}-wal"
+
+        self._guard: Optional[sqlite3.Connection] = None
+        self._header: Optional[WalHeader] = None  # WAL being archived; None until its first frame
+        self._offset = 0
+        self._checksum: Tuple[int, int] = (0, 0)
+        self._caught_up = True  # nothing uncopied when the guard last began
+        self._generation: Optional[Dict[str, Any]] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'generations': 0, 'segments': 0, 'frames': 0, 'bytes_archived': 0, 'gaps': 0,
+                      'checkpoints': 0, 'base_restarts': 0, 'failures': 0, 'last_base_ms': 0.0,
+                      'last_sync_ms': 0.0, 'last_writer_hold_ms': 0.0}
+
+    # -- WAL position ---------------------------------------------------------
+
+    def _hold(self):
+        """(Re)start the guard read transaction; the caller holds the pool's writer"""
+        if self._guard is None:
+            self._guard = sqlite3.connect(self.pool.db_path, timeout=self.pool.timeout, isolation_level=None,
+                                          check_same_thread=False)
+        if self._guard.in_transaction:
+            self._guard.execute("COMMIT")
+        self._guard.execute("BEGIN")
+        self._guard.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        # Frames committed by other processes since the last copy are at risk until the next sync
+        self._caught_up = not self._peek()
+
+    def _release(self):
+        if self._guard is not None and self._guard.in_transaction:
+            self._guard.execute("COMMIT")
+
+    def _read_wal(self) -> Tuple[Optional[WalHeader], bytes]:
+        try:
+            with open(self.wal_path, 'rb') as f:
+                header = read_wal_header(f.read(WAL_HEADER_SIZE))
+                if header is None:
+                    return None, b''
+                f.seek(self._offset if self._header is not None and header.salt == self._header.salt
+                       else WAL_HEADER_SIZE)
+                return header, f.read()
+        except FileNotFoundError:
+            return None, b''
+
+    def _peek(self) -> bool:
+        """True when the WAL holds committed frames past the archived position"""
+        header, data = self._read_wal()
+        if header is None:
+            return False
+        if self._header is None or header.salt != self._header.salt:
+            return scan_frames(data, header, header.checksum)[0] > 0
+        return scan_frames(data, header, self._checksum)[0] > 0
+
+    def _skip_to_end(self):
+        """Start archiving at the current end of the WAL (the next base copy covers what is before)"""
+        self._header, self._offset = None, 0
+        header, data = self._read_wal()
+        if header is not None:
+            end, _, _, checksum = scan_frames(data, header, header.checksum)
+            self._header, self._offset, self._checksum = header, WAL_HEADER_SIZE + end, checksum
+
+    def _capture(self) -> Optional[Dict[str, Any]]:
+        """Committed frames past the archived position as an unsaved segment, or None"""
+        header, data = self._read_wal()
+        if header is None:
+            return None
+        if self._header is None or header.salt != self._header.salt:
+            if self._header is not None and not self._caught_up:
+                raise WalGap(f"{self.wal_path} was reset before frames at offset {self._offset} were archived")
+            self._header, self._offset, self._checksum = header, WAL_HEADER_SIZE, header.checksum
+        end, frames, commits, checksum = scan_frames(data, header, self._checksum)
+        if not end:
+            return None
+        segment = {'epoch': list(header.salt), 'offset': self._offset, 'page_size': header.page_size,
+                   'big_endian': header.big_endian, 'prev_checksum': list(self._checksum),
+                   'frames': frames, 'commits': commits, 'bytes': end, 'data': data[:end]}
+        self._offset += end
+        self._checksum = checksum
+        self._caught_up = True  # everything up to here is (about to be) archived
+        return segment
+
+    # -- segments and generations ---------------------------------------------
+
+    def _save(self, segment: Dict[str, Any]):
+        generation = self._generation
+        generation['next_segment'] += 1
+        name = f"{generation['next_segment']:08d}.wal.gz"
+        path = os.path.join(self.directory, generation['id'], name)
+        with gzip.open(f"{path}.tmp", 'wb', compresslevel=1) as f:
+            f.write(segment.pop('data'))
+        os.replace(f"{path}.tmp", path)
+        segment.update(file=name, captured_at=self.clock().isoformat(), sha256=_sha256(path))
+        with open(os.path.join(self.directory, generation['id'], SEGMENTS_FILE), 'a') as f:
+            f.write(json.dumps(segment) + '\n')
+        self.stats['segments'] += 1
+        self.stats['frames'] += segment['frames']
+        self.stats['bytes_archived'] += os.path.getsize(path)
+
+    def _copy_base(self, target: str):
+        """Online backup API copy in throttled steps, or one step once restarts pile up"""
+        source = sqlite3.connect(self.pool.db_path, timeout=self.pool.timeout)
+        destination = sqlite3.connect(target)
+        remaining_before = [None, 0]
+
+        def progress(status, remaining, total):
+            if remaining_before[0] is not None and remaining > remaining_before[0]:
+                remaining_before[1] += 1
+                self.stats['base_restarts'] += 1
+                if remaining_before[1] > self.max_restarts:
+                    raise _BackupRestarted
+            remaining_before[0] = remaining
+
+        try:
+            try:
+                source.backup(destination, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+            except _BackupRestarted:
+                logger.info(f"🔁 Base copy of {self.pool.db_path} kept restarting; finishing in one step")
+                source.backup(destination)
+        finally:
+            destination.close()
+            source.close()
+
+    def new_generation(self) -> Dict[str, Any]:
+        """Take a new base copy and archive the WAL from there; returns the generation"""
+        with self._lock:
+            started = self.clock()
+            generation_id = f"{started:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:6]}"
+            directory = os.path.join(self.directory, generation_id)
+            os.makedirs(directory)
+            with self.pool.write():
+                self._release()
+                self._skip_to_end()
+                self._hold()
+            self._generation = {'id': generation_id, 'database': os.path.abspath(self.pool.db_path),
+                                'started_at': started.isoformat(), 'completed_at': None, 'next_segment': 0}
+
+            t0 = time.perf_counter()
+            self._copy_base(os.path.join(directory, f"{BASE_FILE}.tmp"))
+            os.replace(os.path.join(directory, f"{BASE_FILE}.tmp"), os.path.join(directory, BASE_FILE))
+            self.stats['last_base_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+
+            self.sync()  # commits made during the copy: a restore must replay at least these
+            self._generation.update(base_sha256=_sha256(os.path.join(directory, BASE_FILE)),
+                                    base_bytes=os.path.getsize(os.path.join(directory, BASE_FILE)),
+                                    completed_at=self.clock().isoformat(),
+                                    required_segments=self._generation['next_segment'])
+            _write_json(os.path.join(directory, GENERATION_FILE),
+                        {k: v for k, v in self._generation.items() if k != 'next_segment'})
+            self.stats['generations'] += 1
+            self._prune()
+            logger.info(f"💾 Base backup {generation_id} of {self.pool.db_path} "
+                        f"({self._generation['base_bytes']} bytes, {self.stats['last_base_ms']} ms)")
+            return self._generation
+
+    def _prune(self):
+        """Remove generations beyond keep_generations (oldest first)"""
+        finished = [g['id'] for g in list_generations(self.directory)]
+        for generation_id in finished[:-self.keep_generations] if self.keep_generations else []:
+            shutil.rmtree(os.path.join(self.directory, generation_id), ignore_errors=True)
+
+    def sync(self) -> int:
+        """Archive newly committed WAL frames; returns the number of frames archived"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            if self._generation is None:
+                self.new_generation()
+                return 0
+            started = time.perf_counter()
+            try:
+                segments = [self._capture()]  # the bulk, while writers carry on
+                held = time.perf_counter()
+                with self.pool.write() as writer:
+                    segments.append(self._capture())  # the tail, with in-process writers held
+                    self._release()
+                    if os.path.exists(self.wal_path) and os.path.getsize(self.wal_path) > self.checkpoint_bytes:
+                        busy = writer.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+                        if not busy:
+                            self._header, self._offset = None, 0
+                            self.stats['checkpoints'] += 1
+                    self._hold()
+                self.stats['last_writer_hold_ms'] = round((time.perf_counter() - held) * 1000, 3)
+            except WalGap as e:
+                self.stats['gaps'] += 1
+                logger.warning(f"⚠️  {e}; starting a new generation")
+                self._release()
+                self.new_generation()
+                return 0
+            frames = 0
+            for segment in filter(None, segments):
+                frames += segment['frames']
+                self._save(segment)
+            self.stats['last_sync_ms'] = round((time.perf_counter() - started) * 1000, 2)
+            return frames
+
+    # -- background archiving -------------------------------------------------
+
+    def start(self) -> 'BackupManager':
+        """Archive every sync_interval (new base copy every base_interval) in a background thread"""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _due(self) -> bool:
+        if self._generation is None:
+            return True
+        started = datetime.fromisoformat(self._generation['started_at'])
+        return (self.clock() - started).total_seconds() >= self.base_interval
+
+    def _run(self):
+        while True:
+            try:
+                if self._due():
+                    self.new_generation()
+                else:
+                    self.sync()
+            except Exception as e:
+                self.stats['failures'] += 1
+                logger.error(f"❌ {self.name} failed: {e}")
+            if self._stop.wait(self.sync_interval):
+                return
+
+    def close(self):
+        """Stop archiving after a final sync, and let the WAL be checkpointed again"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=30)
+        with self._lock:
+            try:
+                if self._generation is not None:
+                    self.sync()
+            except Exception as e:
+                logger.error(f"❌ {self.name} final sync failed: {e}")
+            if self._guard is not None:
+                self._release()
+                self._guard.close()
+                self._guard = None
+
+    def get_metrics(self) -> Dict[str, Any]:
+        generation = self._generation
+        return {**self.stats, 'enabled': self.enabled, 'directory': self.directory,
+                'generation': generation['id'] if generation else None,
+                'wal_offset': self._offset, 'sync_interval': self.sync_interval}
+
+
+# ---------------------------------------------------------------------------
+# Verification and restore
+# ---------------------------------------------------------------------------
+
+def list_generations(backup_dir: str) -> List[Dict[str, Any]]:
+    """Completed generations of a backup directory, oldest first"""
+    generations = []
+    for entry in sorted(os.listdir(backup_dir)) if os.path.isdir(backup_dir) else []:
+        path = os.path.join(backup_dir, entry, GENERATION_FILE)
+        if os.path.exists(path):
+            with open(path) as f:
+                generations.append(json.load(f))
+    return sorted(generations, key=lambda g: g['started_at'])
+
+
+def _segments(backup_dir: str, generation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    path = os.path.join(backup_dir, generation['id'], SEGMENTS_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _load_segment(backup_dir: str, generation: Dict[str, Any], segment: Dict[str, Any]) -> bytes:
+    """A segment's frames, after checking its file hash and the WAL checksum chain"""
+    path = os.path.join(backup_dir, generation['id'], segment['file'])
+    if not os.path.exists(path) or _sha256(path) != segment['sha256']:
+        raise BackupError(f"segment {path} is missing or fails its sha256 check")
+    with gzip.open(path, 'rb') as f:
+        data = f.read()
+    header = WalHeader(segment['page_size'], tuple(segment['epoch']), None, segment['big_endian'])
+    if scan_frames(data, header, tuple(segment['prev_checksum']))[0] != len(data) or len(data) != segment['bytes']:
+        raise BackupError(f"segment {path} fails the WAL frame checksums")
+    return data
+
+
+def verify(backup_dir: str) -> Dict[str, Any]:
+    """Check every base copy and segment of a backup directory; raises BackupError on the first bad file"""
+    report = {'generations': 0, 'segments': 0, 'frames': 0}
+    for generation in list_generations(backup_dir):
+        base = os.path.join(backup_dir, generation['id'], BASE_FILE)
+        if not os.path.exists(base) or _sha256(base) != generation['base_sha256']:
+            raise BackupError(f"base copy {base} is missing or fails its sha256 check")
+        position = None
+        for segment in _segments(backup_dir, generation):
+            _load_segment(backup_dir, generation, segment)
+            if position and position[0] == segment['epoch'] and position[1] != segment['offset']:
+                raise BackupError(f"segment {segment['file']} of {generation['id']} leaves a hole in the WAL")
+            position = (segment['epoch'], segment['offset'] + segment['bytes'])
+            report['segments'] += 1
+            report['frames'] += segment['frames']
+        report['generations'] += 1
+    return report
+
+
+def restore(backup_dir: str, target: str, at: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Rebuild a database from a backup directory as of `at` (default: the latest archived state)
+
+    Uses the newest generation completed by `at`, replays its segments captured
+    up to `at`, checks the result with PRAGMA integrity_check and only then
+    replaces target (removing any WAL or shared-memory file left beside it).
+    """
+    generations = [g for g in list_generations(backup_dir)
+                   if at is None or datetime.fromisoformat(g['completed_at']) <= at]
+    if not generations:
+        raise BackupError(f"no backup in {backup_dir} completed by {at}")
+    generation = generations[-1]
+    base = os.path.join(backup_dir, generation['id'], BASE_FILE)
+    if not os.path.exists(base) or _sha256(base) != generation['base_sha256']:
+        raise BackupError(f"base copy {base} is missing or fails its sha256 check")
+
+    segments = _segments(backup_dir, generation)
+    count = len(segments) if at is None else sum(datetime.fromisoformat(s['captured_at']) <= at for s in segments)
+    count = max(count, generation['required_segments'])
+    work = f"{target}.restoring"
+    shutil.copyfile(base, work)
+    try:
+        with open(work, 'r+b') as db_file:
+            for segment in segments[:count]:
+                apply_frames(db_file, _load_segment(backup_dir, generation, segment), segment['page_size'])
+        conn = sqlite3.connect(work)
+        try:
+            problems = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+        if problems != [('ok',)]:
+            raise BackupError(f"restored database fails integrity_check: {problems[:5]}")
+    except BaseException:
+        os.remove(work)
+        raise
+    for leftover in (f"{target}-wal", f"{target}-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+    os.replace(work, target)
+    restored_to = segments[count - 1]['captured_at'] if count else generation['completed_at']
+    logger.info(f"♻️  Restored {target} from {generation['id']} + {count} segment(s), as of {restored_to}")
+    return {'generation': generation['id'], 'segments_applied': count, 'restored_to': restored_to,
+            'bytes': os.path.getsize(target)}
+
+
+_managers: Dict[str, BackupManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_backups(pool: SQLiteConnectionPool, **options) -> BackupManager:
+    """Return the shared (started) backup manager for a pool's database, creating it on first use"""
+    if pool.in_memory:
+        return BackupManager(pool, **options)
+
+    key = os.path.abspath(pool.db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = BackupManager(pool, name=f"backups:{os.path.basename(key)}", **options).start()
+            _managers[key] = manager
+        return manager
+
+
+def close_all_backups():
+    """Final sync and stop for every shared backup manager (used on shutdown and in tests)"""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Online backup, WAL archiving and point-in-time restore')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('--dir', help='Backup directory (default: <db_path>.backups)')
+    parser.add_argument('--watch', action='store_true', help='Keep archiving the WAL until interrupted')
+    parser.add_argument('--interval', type=float, default=10.0, help='Seconds between WAL syncs with --watch')
+    parser.add_argument('--verify', action='store_true', help='Check every base copy and segment')
+    parser.add_argument('--restore', metavar='TARGET', help='Restore into TARGET instead of backing up')
+    parser.add_argument('--at', type=datetime.fromisoformat, help='Point in time for --restore (ISO 8601)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    backup_dir = args.dir or f"{args.db_path}.backups"
+    if args.verify:
+        print(verify(backup_dir))
+    elif args.restore:
+        print(restore(backup_dir, args.restore, args.at))
+    else:
+        manager = BackupManager(SQLiteConnectionPool(args.db_path), backup_dir, sync_interval=args.interval)
+        manager.new_generation()
+        if args.watch:
+            try:
+                while True:
+                    time.sleep(args.interval)
+                    manager.sync()
+            except KeyboardInterrupt:
+                pass
+        manager.close()
+        print(manager.get_metrics())
@@ -25,6 +25,10 @@ class DatabaseConfig:
     connection_pool_size: int = 10
     backup_enabled: bool = True
     backup_interval_hours: int = 24
+    backup_dir: str = 'backups'
+    backup_sync_seconds: float = 10.0
+    retention_interval_minutes: int = 60
+    retention_time_budget_seconds: float = 5.0
 
 @dataclass
 class APIConfig:
@@ -155,6 +159,10 @@ class ConfigurationManager:
             self.database.connection_pool_size = section.getint('connection_pool_size', self.database.connection_pool_size)
             self.database.backup_enabled = section.getboolean('backup_enabled', self.database.backup_enabled)
             self.database.backup_interval_hours = section.getint('backup_interval_hours', self.database.backup_interval_hours)
+            self.database.backup_dir = section.get('backup_dir', self.database.backup_dir)
+            self.database.backup_sync_seconds = section.getfloat('backup_sync_seconds', self.database.backup_sync_seconds)
+            self.database.retention_interval_minutes = section.getint('retention_interval_minutes', self.database.retention_interval_minutes)
+            self.database.retention_time_budget_seconds = section.getfloat('retention_time_budget_seconds', self.database.retention_time_budget_seconds)
     
     def _load_api_config(self, config):
         """Load API configuration"""
@@ -319,7 +327,11 @@ class ConfigurationManager:
             'password': self.database.password,
             'connection_pool_size': str(self.database.connection_pool_size),
             'backup_enabled': str(self.database.backup_enabled),
-            'backup_interval_hours': str(self.database.backup_interval_hours)
+            'backup_interval_hours': str(self.database.backup_interval_hours),
+            'backup_dir': self.database.backup_dir,
+            'backup_sync_seconds': str(self.database.backup_sync_seconds),
+            'retention_interval_minutes': str(self.database.retention_interval_minutes),
+            'retention_time_budget_seconds': str(self.database.retention_time_budget_seconds)
         }
         
         # API section
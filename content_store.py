@@ -0,0 +1,353 @@
+"""
+Content-Addressed Text Store
+Texts stored once under a 128-bit hash (optionally compressed with a dictionary
+trained on the corpus), and a memo of model scores keyed by (hash, model, version)
+so text that was already scored is looked up instead of re-analysed
+
+Usage:
+    python content_store.py sentiment_analytics.db --stats
+    python content_store.py sentiment_analytics.db --train          # train a compression dictionary
+"""
+
+import json
+import zlib
+import hashlib
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Texts shorter than this are stored as plain TEXT (readable from SQL)
+COMPRESS_MIN_CHARS = 64
+# Dictionary size; zlib can use at most 32 KB of preset dictionary
+DICTIONARY_SIZE = 32 * 1024
+# Hashes bound per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+CONTENT_STORE_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS text_contents (
+        hash BLOB PRIMARY KEY,
+        body BLOB NOT NULL,
+        dictionary_id INTEGER NOT NULL DEFAULT 0,
+        size INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS text_dictionaries (
+        id INTEGER PRIMARY KEY,
+        codec TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at DATETIME NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS text_scores (
+        hash BLOB NOT NULL,
+        model TEXT NOT NULL,
+        model_version TEXT NOT NULL,
+        sentiment TEXT,
+        confidence REAL,
+        result TEXT,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (hash, model, model_version)
+    ) WITHOUT ROWID
+    """,
+]
+
+
+def text_hash(text: str) -> bytes:
+    """
+    128-bit content address of a text
+
+    BLAKE2b from hashlib: stored hashes must not depend on which optional hash
+    packages happen to be installed.
+    """
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def install_content_store(conn):
+    """Create the store's tables (also used as a migration step)"""
+    for sql in CONTENT_STORE_SQL:
+        conn.execute(sql)
+
+
+class _Dictionary:
+    """A trained dictionary with its (de)compressors"""
+
+    def __init__(self, dictionary_id: int, codec: str, data: bytes):
+        self.id = dictionary_id
+        self.codec = codec
+        self.data = data
+        if codec == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise RuntimeError(f"dictionary {dictionary_id} is a zstd dictionary, which requires zstandard")
+            shared = zstandard.ZstdCompressionDict(data)
+            self._compressor = zstandard.ZstdCompressor(level=9, dict_data=shared)
+            self._decompressor = zstandard.ZstdDecompressor(dict_data=shared)
+
+    def compress(self, raw: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return self._compressor.compress(raw)
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=self.data)
+        return compressor.compress(raw) + compressor.flush()
+
+    def decompress(self, packed: bytes) -> bytes:
+        if self.codec == 'zstd':
+            return self._decompressor.decompress(packed)
+        return zlib.decompressobj(-15, zdict=self.data).decompress(packed)
+
+
+def build_zlib_dictionary(samples: Sequence[str], size: int = DICTIONARY_SIZE) -> bytes:
+    """
+    Preset deflate dictionary from a text sample
+
+    Common words and bigrams, least frequent first: deflate prefers the closest
+    match, so the most useful strings go at the end of the dictionary.
+    """
+    counts = Counter()
+    for sample in samples:
+        words = sample.split()
+        counts.update(words)
+        counts.update(' '.join(pair) for pair in zip(words, words[1:]))
+    chosen, total = [], 0
+    for phrase, count in counts.most_common():
+        if count < 2 or total + len(phrase) + 1 > size:
+            continue
+        chosen.append(phrase)
+        total += len(phrase.encode('utf-8')) + 1
+    return ' '.join(reversed(chosen)).encode('utf-8')[-size:]
+
+
+def _load_dictionaries(conn, ids: Iterable[int]) -> Dict[int, _Dictionary]:
+    ids = sorted({i for i in ids if i})
+    if not ids:
+        return {}
+    rows = conn.execute(f"SELECT id, codec, data FROM text_dictionaries WHERE id IN ({', '.join('?' * len(ids))})",
+                        ids).fetchall()
+    return {row[0]: _Dictionary(row[0], row[1], bytes(row[2])) for row in rows}
+
+
+def load_texts(conn, hashes: Iterable[bytes], dictionaries: Optional[Dict[int, _Dictionary]] = None) -> Dict[bytes, str]:
+    """Texts for content hashes, read on any connection to the database"""
+    hashes = list(dict.fromkeys(bytes(h) for h in hashes if h is not None))
+    dictionaries = {} if dictionaries is None else dictionaries
+    texts = {}
+    for start in range(0, len(hashes), LOOKUP_CHUNK):
+        chunk = hashes[start:start + LOOKUP_CHUNK]
+        rows = conn.execute(f"SELECT hash, body, dictionary_id FROM text_contents "
+                            f"WHERE hash IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+        missing = {row[2] for row in rows if row[2] and row[2] not in dictionaries}
+        if missing:
+            dictionaries.update(_load_dictionaries(conn, missing))
+        for digest, body, dictionary_id in rows:
+            if dictionary_id:
+                body = dictionaries[dictionary_id].decompress(bytes(body)).decode('utf-8')
+            texts[bytes(digest)] = body
+    return texts
+
+
+class ContentStore:
+    """
+    Deduplicated text storage on a pooled SQLite database
+
+    put() returns the text's hash and writes the text only if it is new; rows that
+    reference texts keep the 16-byte hash instead. Texts are compressed with the
+    newest trained dictionary (zstd when installed, else a preset deflate
+    dictionary); rows keep the dictionary they were written with.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._dictionaries: Dict[int, _Dictionary] = {}
+        self._active: Optional[_Dictionary] = None
+        self._lock = threading.Lock()
+        with self.pool.write() as conn:
+            install_content_store(conn)
+            row = conn.execute("SELECT id, codec, data FROM text_dictionaries ORDER BY id DESC LIMIT 1").fetchone()
+        if row is not None:
+            self._activate(_Dictionary(row[0], row[1], bytes(row[2])))
+
+    def _activate(self, dictionary: _Dictionary):
+        with self._lock:
+            self._dictionaries[dictionary.id] = dictionary
+            self._active = dictionary
+
+    def _row(self, digest: bytes, text: str) -> tuple:
+        active = self._active
+        if active is not None and len(text) >= COMPRESS_MIN_CHARS:
+            raw = text.encode('utf-8')
+            packed = active.compress(raw)
+            if len(packed) < len(raw):
+                return digest, packed, active.id, len(text)
+        return digest, text, 0, len(text)
+
+    def put(self, text: str) -> bytes:
+        return self.put_many([text])[0]
+
+    def put_many(self, texts: Sequence[str]) -> List[bytes]:
+        """Hashes of texts, storing the ones not seen before (joins an open pool.write())"""
+        hashes = [text_hash(text) for text in texts]
+        unique = dict(zip(hashes, texts))
+        with self.pool.write() as conn:
+            new = set(unique) - set(self._existing(conn, list(unique)))
+            if new:
+                conn.executemany("INSERT OR IGNORE INTO text_contents (hash, body, dictionary_id, size) "
+                                 "VALUES (?, ?, ?, ?)", [self._row(h, unique[h]) for h in new])
+        return hashes
+
+    @staticmethod
+    def _existing(conn, hashes: List[bytes]) -> List[bytes]:
+        found = []
+        for start in range(0, len(hashes), LOOKUP_CHUNK):
+            chunk = hashes[start:start + LOOKUP_CHUNK]
+            found += [row[0] for row in conn.execute(
+                f"SELECT hash FROM text_contents WHERE hash IN ({', '.join('?' * len(chunk))})", chunk)]
+        return found
+
+    def get(self, digest: bytes) -> Optional[str]:
+        return self.get_many([digest]).get(bytes(digest))
+
+    def get_many(self, hashes: Iterable[bytes], conn=None) -> Dict[bytes, str]:
+        """Texts for hashes, read on conn when given (e.g. a read snapshot of the database)"""
+        if conn is not None:
+            return load_texts(conn, hashes, self._dictionaries)
+        with self.pool.read() as conn:
+            return load_texts(conn, hashes, self._dictionaries)
+
+    # -- dictionaries ---------------------------------------------------------
+
+    def train_dictionary(self, samples: Optional[Sequence[str]] = None, sample_rows: int = 5000,
+                         size: int = DICTIONARY_SIZE) -> int:
+        """Train a dictionary on samples (default: stored texts) and use it for new texts"""
+        if samples is None:
+            with self.pool.read() as conn:
+                hashes = [row[0] for row in conn.execute(
+                    "SELECT hash FROM text_contents ORDER BY RANDOM() LIMIT ?", (sample_rows,))]
+                samples = list(load_texts(conn, hashes, self._dictionaries).values())
+        if ZSTD_AVAILABLE:
+            codec = 'zstd'
+            data = zstandard.train_dictionary(size, [s.encode('utf-8') for s in samples]).as_bytes()
+        else:
+            codec, data = 'zlib', build_zlib_dictionary(samples, size)
+        with self.pool.write() as conn:
+            dictionary_id = conn.execute("INSERT INTO text_dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+                                         (codec, data, datetime.now())).lastrowid
+        self._activate(_Dictionary(dictionary_id, codec, data))
+        logger.info(f"📚 Trained {codec} dictionary {dictionary_id} ({len(data)} bytes) on {len(samples)} texts")
+        return dictionary_id
+
+    # -- housekeeping ---------------------------------------------------------
+
+    def purge_unreferenced(self, references: Sequence[Tuple[str, str]], batch_size: int = 5000) -> int:
+        """
+        Delete texts no (table, hash column) in references or score memo points to
+
+        Walks the hash key space one batch per transaction, so the writer is held
+        only for short primary-key range deletes (reference columns need an index).
+        """
+        keep = ' AND '.join(f"NOT EXISTS (SELECT 1 FROM {table} r WHERE r.{column} = t.hash)"
+                            for table, column in [*references, ('text_scores', 'hash')])
+        deleted, lower = 0, b''
+        while True:
+            with self.pool.write() as conn:
+                batch = conn.execute("SELECT hash FROM text_contents WHERE hash > ? ORDER BY hash LIMIT ?",
+                                     (lower, batch_size)).fetchall()
+                if not batch:
+                    return deleted
+                upper = batch[-1][0]
+                deleted += conn.execute(f"DELETE FROM text_contents AS t WHERE t.hash > ? AND t.hash <= ? "
+                                        f"AND {keep}", (lower, upper)).rowcount
+            lower = upper
+
+    def stats(self) -> Dict[str, Any]:
+        with self.pool.read() as conn:
+            texts, chars, stored = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(CAST(body AS BLOB))), 0) "
+                "FROM text_contents").fetchone()
+            scores = conn.execute("SELECT COUNT(*) FROM text_scores").fetchone()[0]
+        return {'texts': texts, 'characters': chars, 'stored_bytes': stored, 'scores': scores,
+                'dictionary': self._active.codec if self._active else None}
+
+
+class ScoreMemo:
+    """
+    Model results keyed by (text hash, model, model version)
+
+    score_many() makes one indexed lookup for a batch of texts, runs analyze only
+    on the texts that model version has not scored, and records those results in
+    one transaction. Results are JSON-compatible dicts with 'sentiment' and
+    'confidence' keys; ones marked 'transient' (e.g. error fallbacks) are returned
+    but not recorded.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        with self.pool.write() as conn:
+            install_content_store(conn)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def lookup(self, hashes: Sequence[bytes], model: str, version: str) -> Dict[bytes, Dict]:
+        found = {}
+        with self.pool.read() as conn:
+            for start in range(0, len(hashes), LOOKUP_CHUNK):
+                chunk = list(hashes[start:start + LOOKUP_CHUNK])
+                for digest, result in conn.execute(
+                        f"SELECT hash, result FROM text_scores WHERE model = ? AND model_version = ? "
+                        f"AND hash IN ({', '.join('?' * len(chunk))})", [model, version, *chunk]):
+                    found[bytes(digest)] = json.loads(result)
+        return found
+
+    def record(self, results: Iterable[Tuple[bytes, Dict]], model: str, version: str):
+        now = datetime.now()
+        with self.pool.write() as conn:
+            conn.executemany("INSERT OR REPLACE INTO text_scores "
+                             "(hash, model, model_version, sentiment, confidence, result, created_at) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             [(digest, model, version, result.get('sentiment'), result.get('confidence'),
+                               json.dumps(result, default=str), now) for digest, result in results])
+
+    def score_many(self, texts: Sequence[str], model: str, version: str,
+                   analyze: Callable[[str], Dict]) -> List[Dict]:
+        """Results for texts in order, running analyze only for unscored texts"""
+        hashes = [text_hash(text) for text in texts]
+        results = self.lookup(list(dict.fromkeys(hashes)), model, version)
+        fresh = {}
+        for digest, text in zip(hashes, texts):
+            if digest not in results:
+                results[digest] = fresh[digest] = analyze(text)
+        self.stats['hits'] += len(texts) - len(fresh)
+        self.stats['misses'] += len(fresh)
+        durable = [(digest, result) for digest, result in fresh.items() if not result.get('transient')]
+        if durable:
+            self.record(durable, model, version)
+        return [results[digest] for digest in hashes]
+
+    def score(self, text: str, model: str, version: str, analyze: Callable[[str], Dict]) -> Dict:
+        return self.score_many([text], model, version, analyze)[0]
+
+
+if __name__ == '__main__':
+    import argparse
+    from sqlite_pool import get_pool
+
+    parser = argparse.ArgumentParser(description='Inspect or tune the content-addressed text store')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('--train', action='store_true', help='Train a compression dictionary on stored texts')
+    parser.add_argument('--stats', action='store_true', help='Print store statistics')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ContentStore(get_pool(args.db_path))
+    if args.train:
+        store.train_dictionary()
+    print(store.stats())
@@ -20,6 +20,10 @@ from typing import Dict, List, Optional
 from flask import Flask, render_template_string, request, jsonify, send_file
 from flask_cors import CORS
 
+from write_behind import WriteBehindQueue, DURABILITY_MODES
+from sentiment_result import SentimentResult
+from content_store import ScoreMemo
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -159,7 +163,10 @@ if not REAL_COMPONENTS_AVAILABLE:
         def save_sentiment_analysis(self, result, **kwargs):
             return 1
         
-        def get_recent_analyses(self, limit=50, offset=0):
+        def save_sentiment_analyses(self, results, **kwargs):
+            return sum(1 for _ in results)
+        
+        def get_recent_analyses(self, limit=50, offset=0, fresh=True, view=None):
             return []
         
         def get_analytics_summary(self, days=7):
@@ -558,6 +565,15 @@ class Config:
     # AI/ML API Keys
     HUGGINGFACE_API_KEY = os.getenv('HUGGINGFACE_API_KEY')
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    
+    # Write-behind persistence for request-path analysis saves
+    WRITE_BEHIND_MAX_QUEUE = int(os.getenv('WRITE_BEHIND_MAX_QUEUE', 10000))
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', 0.5))
+    WRITE_BEHIND_OVERFLOW = os.getenv('WRITE_BEHIND_OVERFLOW', 'spill')  # block, drop_oldest, spill
+    # Private (0700) directory of per-process spill files, never a shared temp directory
+    WRITE_BEHIND_SPILL_DIR = os.getenv('WRITE_BEHIND_SPILL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'write_behind.spill'))
+    ANALYZE_DURABILITY = os.getenv('ANALYZE_DURABILITY', 'async')  # async or sync
 
 # Logging configuration - early setup
 logging.basicConfig(
@@ -600,6 +616,40 @@ else:
     # Initialize fallback database
     db.init_app(app)
 
+def _save_analysis_batch(batch):
+    """Write one coalesced batch of analyses; runs on the write-behind thread"""
+    with app.app_context():
+        return real_db_manager.save_sentiment_analyses(batch, source='dashboard')
+
+_SPILLED_RESULT_FIELDS = ('text', 'sentiment', 'confidence', 'scores', 'model_used', 'processing_time',
+                          'emotion_scores', 'toxicity_score')
+
+def _spill_record(result):
+    """JSON form of a queued analysis (result object or legacy dict) for the spill file"""
+    if isinstance(result, dict):
+        return {'legacy': result}
+    if isinstance(result, SentimentResult):
+        return {'result': result.to_dict()}
+    return {'result': {field: getattr(result, field, None) for field in _SPILLED_RESULT_FIELDS}}
+
+def _restore_spilled(record):
+    if 'result' in record:
+        return SentimentResult(**record['result'])
+    return record['legacy']
+
+# Request-path analysis saves are queued and committed in batches off the request thread
+analysis_writer = WriteBehindQueue(
+    _save_analysis_batch,
+    max_size=Config.WRITE_BEHIND_MAX_QUEUE,
+    batch_size=Config.WRITE_BEHIND_BATCH_SIZE,
+    flush_interval=Config.WRITE_BEHIND_FLUSH_INTERVAL,
+    overflow=Config.WRITE_BEHIND_OVERFLOW,
+    spill_dir=Config.WRITE_BEHIND_SPILL_DIR,
+    name='analysis-writer',
+    encode=_spill_record,
+    decode=_restore_spilled
+).start()
+
 # Logging configuration
 logging.basicConfig(
     level=logging.INFO,
@@ -5463,23 +5513,15 @@ def api_advanced_trends():
             return jsonify({'error': 'Advanced Analytics Engine not available'}), 503
 
         # Build analysis history from recent analyses
-        recent = real_db_manager.get_recent_analyses(limit=500, offset=0) if hasattr(real_db_manager, 'get_recent_analyses') else []
+        recent = real_db_manager.get_recent_analyses(limit=500, offset=0, fresh=False, view='history') if hasattr(real_db_manager, 'get_recent_analyses') else []
         analysis_history = []
         for r in recent:
-            # Normalize timestamp to ISO 8601 string
-            ts = r.get('timestamp')
-            try:
-                # Attempt to parse if not already ISO string
-                if isinstance(ts, datetime):
-                    ts_iso = ts.isoformat()
-                else:
-                    ts_iso = str(ts)
-            except Exception:
-                ts_iso = datetime.now().isoformat()
+            # Projected 'history' rows: created_at is a datetime
+            ts_iso = r.created_at.isoformat() if r.created_at else datetime.now().isoformat()
             analysis_history.append({
                 'timestamp': ts_iso,
-                'sentiment': r.get('sentiment', 'neutral'),
-                'confidence': r.get('confidence', 0.0)
+                'sentiment': r.sentiment or 'neutral',
+                'confidence': r.confidence or 0.0
             })
 
         result = advanced_analytics_engine.analyze_sentiment_trends(analysis_history)
@@ -5497,21 +5539,16 @@ def api_advanced_user_behavior():
             return jsonify({'error': 'Advanced Analytics Engine not available'}), 503
 
         # Derive a simple user activity stream from recent analyses
-        recent = real_db_manager.get_recent_analyses(limit=500, offset=0) if hasattr(real_db_manager, 'get_recent_analyses') else []
+        recent = real_db_manager.get_recent_analyses(limit=500, offset=0, fresh=False, view='history') if hasattr(real_db_manager, 'get_recent_analyses') else []
         user_activity = []
         for r in recent:
-            ts = r.get('timestamp')
-            try:
-                ts_dt = ts if isinstance(ts, datetime) else datetime.fromisoformat(str(ts)) if isinstance(ts, str) and len(ts) >= 10 else datetime.now()
-            except Exception:
-                ts_dt = datetime.now()
             user_activity.append({
-                'timestamp': ts_dt,
-                'feature': r.get('feature', 'sentiment_analysis'),
+                'timestamp': r.created_at or datetime.now(),
+                'feature': 'sentiment_analysis',
                 'action': 'analyze',
                 'metadata': {
-                    'model': r.get('model_used', 'unknown'),
-                    'confidence': r.get('confidence', 0.0)
+                    'model': r.model_used or 'unknown',
+                    'confidence': r.confidence or 0.0
                 }
             })
 
@@ -5531,32 +5568,23 @@ def api_advanced_report():
 
         # Fetch both data sources
         # Trends
-        recent = real_db_manager.get_recent_analyses(limit=500, offset=0) if hasattr(real_db_manager, 'get_recent_analyses') else []
+        recent = real_db_manager.get_recent_analyses(limit=500, offset=0, fresh=False, view='history') if hasattr(real_db_manager, 'get_recent_analyses') else []
         analysis_history = []
         for r in recent:
-            ts = r.get('timestamp')
-            try:
-                ts_iso = ts.isoformat() if isinstance(ts, datetime) else str(ts)
-            except Exception:
-                ts_iso = datetime.now().isoformat()
+            ts_iso = r.created_at.isoformat() if r.created_at else datetime.now().isoformat()
             analysis_history.append({
                 'timestamp': ts_iso,
-                'sentiment': r.get('sentiment', 'neutral'),
-                'confidence': r.get('confidence', 0.0)
+                'sentiment': r.sentiment or 'neutral',
+                'confidence': r.confidence or 0.0
             })
         sentiment_trends = advanced_analytics_engine.analyze_sentiment_trends(analysis_history)
 
         # User behavior
         user_activity = []
         for r in recent:
-            ts = r.get('timestamp')
-            try:
-                ts_dt = ts if isinstance(ts, datetime) else datetime.fromisoformat(str(ts)) if isinstance(ts, str) else datetime.now()
-            except Exception:
-                ts_dt = datetime.now()
             user_activity.append({
-                'timestamp': ts_dt,
-                'feature': r.get('feature', 'sentiment_analysis'),
+                'timestamp': r.created_at or datetime.now(),
+                'feature': 'sentiment_analysis',
                 'action': 'analyze'
             })
         user_behavior = advanced_analytics_engine.analyze_user_behavior(user_activity)
@@ -5570,6 +5598,17 @@ def api_advanced_report():
         logger.error(f"Advanced report error: {e}")
         return jsonify({'error': 'Failed to generate intelligent report'}), 500
 
+_score_memo = None
+
+def _news_score_memo():
+    """Score memo on the dashboard database (None with the mock database manager)"""
+    global _score_memo
+    if _score_memo is None:
+        pool = getattr(real_db_manager, 'pool', None) or getattr(getattr(real_db_manager, 'storage', None), 'pool', None)
+        if pool is not None:
+            _score_memo = ScoreMemo(pool)
+    return _score_memo
+
 @app.route('/api/news')
 def get_news():
     """Get paginated news with sentiment analysis from enhanced Kenyan sources"""
@@ -5612,36 +5651,49 @@ def get_news():
             logger.error(f"News ingestion error: {e}")
             articles = get_sample_news_data()[:limit]
         
-        # Analyze sentiment for each article using enhanced analyzer
-        for article in articles:
-            if article.get('title') and article.get('summary'):
-                # Combine title and summary for sentiment analysis
-                text_to_analyze = f"{article['title']} {article['summary']}"
-                
-                try:
-                    if REAL_COMPONENTS_AVAILABLE and hasattr(enhanced_sentiment_analyzer, 'analyze_sentiment'):
-                        # Use enhanced sentiment analyzer
-                        sentiment_result = enhanced_sentiment_analyzer.analyze_sentiment(text_to_analyze)
-                        
-                        # Update article with sentiment data
-                        article['sentiment'] = sentiment_result.sentiment
-                        article['confidence'] = round(sentiment_result.confidence, 3)
-                        article['sentiment_scores'] = sentiment_result.scores
-                        article['analysis_method'] = sentiment_result.method
-                    else:
-                        # Fallback to original analyzer
-                        sentiment_result = real_sentiment_analyzer.analyze_sentiment(text_to_analyze, 'roberta')
-                        article['sentiment'] = sentiment_result.sentiment
-                        article['confidence'] = round(sentiment_result.confidence, 3)
-                        article['sentiment_scores'] = sentiment_result.scores
-                    
-                except Exception as e:
-                    logger.error(f"Sentiment analysis error for article: {e}")
-                    # Fallback to basic sentiment
-                    article['sentiment'] = 'neutral'
-                    article['confidence'] = 0.5
-                    article['sentiment_scores'] = {'positive': 0.3, 'negative': 0.3, 'neutral': 0.4}
-                    article['analysis_method'] = 'fallback'
+        # Analyze sentiment for each article using enhanced analyzer; headlines seen
+        # on earlier refreshes are looked up in the score memo instead of re-scored
+        scored = [article for article in articles if article.get('title') and article.get('summary')]
+        texts = [f"{article['title']} {article['summary']}" for article in scored]
+        if REAL_COMPONENTS_AVAILABLE and hasattr(enhanced_sentiment_analyzer, 'analyze_sentiment'):
+            analyzer, requested = enhanced_sentiment_analyzer, 'auto'
+        else:
+            analyzer, requested = real_sentiment_analyzer, 'roberta'
+        # Scores are memoized under the method and model version that produced them
+        scoring_key = getattr(analyzer, 'scoring_key', None)
+        method, version = scoring_key(requested) if scoring_key else (requested, None)
+        
+        def score_text(text):
+            try:
+                sentiment_result = analyzer.analyze_sentiment(text, requested)
+                used = getattr(sentiment_result, 'method', method)
+                result = {
+                    'sentiment': sentiment_result.sentiment,
+                    'confidence': round(sentiment_result.confidence, 3),
+                    'sentiment_scores': sentiment_result.scores,
+                    'analysis_method': used,
+                }
+                if used != method:
+                    result['transient'] = True  # a fallback answered: not memoized under method
+                return result
+            except Exception as e:
+                logger.error(f"Sentiment analysis error for article: {e}")
+                # Fallback to basic sentiment
+                return {'sentiment': 'neutral', 'confidence': 0.5, 'transient': True,
+                        'sentiment_scores': {'positive': 0.3, 'negative': 0.3, 'neutral': 0.4},
+                        'analysis_method': 'fallback'}
+        
+        memo = _news_score_memo() if version is not None else None
+        if memo is not None:
+            try:
+                results = memo.score_many(texts, method, version, score_text)
+            except Exception as e:
+                logger.warning(f"Score memo unavailable: {e}")
+                results = [score_text(text) for text in texts]
+        else:
+            results = [score_text(text) for text in texts]
+        for article, result in zip(scored, results):
+            article.update({key: value for key, value in result.items() if key != 'transient'})
         
         # Calculate pagination info
         total_items = len(articles) * 2  # More realistic estimate
@@ -5898,11 +5950,12 @@ def analyze_text_route():
                 'real_ai_analysis': False
             }
         
-        # Save to database
-        try:
-            real_db_manager.save_sentiment_analysis(result)
-        except Exception as e:
-            logger.warning(f"Could not save to database: {e}")
+        # Queue for the write-behind writer; durability can be overridden per request
+        durability = data.get('durability', Config.ANALYZE_DURABILITY)
+        if durability not in DURABILITY_MODES:
+            durability = Config.ANALYZE_DURABILITY
+        if not analysis_writer.submit(result, durability=durability):
+            logger.warning("Could not save to database: write-behind queue rejected the analysis")
         
         return jsonify(response_data)
         
@@ -6054,6 +6107,48 @@ def get_statistics():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/search')
+def api_search():
+    """Full-text search over stored analyses (?type=analyses) or news (?type=news)"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Missing search query (q)'}), 400
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+        sentiment = request.args.get('sentiment') or None
+        if request.args.get('type', 'analyses') == 'news':
+            search = getattr(real_db_manager, 'search_news', None)
+            results = search(query, sentiment, request.args.get('source') or None, limit) if search else []
+        else:
+            search = getattr(real_db_manager, 'search_analyses', None)
+            results = search(query, sentiment, request.args.get('model') or None, limit) if search else []
+        return jsonify({'query': query, 'results': results, 'count': len(results)})
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({'error': 'Search failed'}), 500
+
+@app.route('/api/export')
+def api_export():
+    """Stream stored analyses as NDJSON, CSV or Parquet (?format=&days=&compression=gzip|zstd)"""
+    from streaming_export import FORMATS, COMPRESSIONS, PARQUET_AVAILABLE, ZSTD_AVAILABLE, filename_for, stream_response
+
+    fmt = request.args.get('format', 'ndjson')
+    compression = request.args.get('compression') or None
+    if fmt not in FORMATS or compression not in COMPRESSIONS:
+        return jsonify({'error': f"format must be one of {sorted(FORMATS)}, compression gzip or zstd"}), 400
+    if (fmt == 'parquet' and not PARQUET_AVAILABLE) or (compression == 'zstd' and fmt != 'parquet' and not ZSTD_AVAILABLE):
+        return jsonify({'error': f"{fmt}/{compression} export needs pyarrow/zstandard"}), 501
+    if not hasattr(real_db_manager, 'export_stream'):
+        return jsonify({'error': 'Export not available'}), 503
+    try:
+        days = min(max(request.args.get('days', 30, type=int), 1), 3650)
+        chunks = real_db_manager.export_stream(fmt, days, compression)
+        filename = filename_for(f"sentiment_analyses_{datetime.now():%Y%m%d}", fmt, compression)
+        return stream_response(chunks, fmt, filename, compression)
+    except Exception as e:
+        logger.error(f"Export error: {e}")
+        return jsonify({'error': 'Export failed'}), 500
+
 # ===== Analytics API Endpoints =====
 
 @app.route('/api/analytics/trends')
@@ -6062,14 +6157,14 @@ def api_analytics_trends():
     try:
         if advanced_analytics_engine is not None:
             # Use advanced analytics if available
-            recent = real_db_manager.get_recent_analyses(limit=100, offset=0) if hasattr(real_db_manager, 'get_recent_analyses') else []
+            recent = real_db_manager.get_recent_analyses(limit=100, offset=0, fresh=False, view='history') if hasattr(real_db_manager, 'get_recent_analyses') else []
             analysis_history = []
             for r in recent:
                 analysis_history.append({
-                    'timestamp': r.get('timestamp', datetime.now().isoformat()),
-                    'sentiment': r.get('sentiment', 'neutral'),
-                    'confidence': r.get('confidence', 0.8),
-                    'toxicity': r.get('toxicity_score', 0.1)
+                    'timestamp': r.created_at.isoformat() if r.created_at else datetime.now().isoformat(),
+                    'sentiment': r.sentiment or 'neutral',
+                    'confidence': r.confidence if r.confidence is not None else 0.8,
+                    'toxicity': r.toxicity_score if r.toxicity_score is not None else 0.1
                 })
             
             trends_data = advanced_analytics_engine.analyze_sentiment_trends(analysis_history)
@@ -6263,6 +6358,33 @@ def health_check():
         'environment': Config.ENVIRONMENT
     })
 
+@app.route('/api/health/write-behind')
+def write_behind_metrics():
+    """Queue depth, drop/spill counters and flush latency of the analysis writer"""
+    return jsonify({
+        'analysis_writer': analysis_writer.get_metrics(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/health/snapshots')
+def snapshot_metrics():
+    """Age and counters of the read snapshots that analytics endpoints query"""
+    storage = getattr(real_db_manager, 'storage', None)
+    snapshots = storage.snapshots if storage is not None else None
+    return jsonify({
+        'snapshots': snapshots.get_metrics() if snapshots is not None else None,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/health/cache')
+def cache_metrics():
+    """Per-level hit rates and counters of the analytics key/value cache"""
+    cache = getattr(real_db_manager, 'cache', None)
+    return jsonify({
+        'analytics_cache': cache.get_metrics() if cache is not None else None,
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/word-cloud')
 def get_word_cloud_data():
     """Get data for word cloud visualization"""
@@ -6544,10 +6666,12 @@ def analyze_batch_sentiment():
         
         texts = data['texts'][:50]  # Limit batch size
         results = []
+        analyzed = []
         
         for text in texts:
             try:
                 sentiment_result = enhanced_sentiment_analyzer.analyze_sentiment(text)
+                analyzed.append(sentiment_result)
                 results.append({
                     'text': text[:100] + '...' if len(text) > 100 else text,
                     'sentiment': sentiment_result.sentiment,
@@ -6565,6 +6689,10 @@ def analyze_batch_sentiment():
                     'error': str(e)
                 })
         
+        # Persist the whole batch in one transaction
+        if analyzed and hasattr(real_db_manager, 'save_sentiment_analyses'):
+            real_db_manager.save_sentiment_analyses(analyzed, source='batch')
+        
         return jsonify({
             'results': results,
             'total_analyzed': len(results),
@@ -3,15 +3,23 @@ Data models and database integration for sentiment analysis system
 Supports SQLite, PostgreSQL, and MongoDB backends
 """
 
-import sqlite3
 import json
 import os
-from datetime import datetime
-from typing import Dict, List, Any, Optional, Union
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Union, Iterable
 from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 
+import emoji
+
+from sqlite_pool import iter_chunks, BULK_CHUNK_SIZE
+from storage_engine import get_storage
+from migrations import apply_migrations
+from streaming_export import fetch_chunks, json_document, write_file
+from json_codec import COMMENT_EMOTIONS, VIDEO_EMOTIONS, decode, encode, to_json_text
+from retention import RetentionEngine, RetentionRule
+
 class SentimentType(Enum):
     POSITIVE = "positive"
     NEGATIVE = "negative"
@@ -66,6 +74,33 @@ class CommentAnalysis:
         data['toxicity_level'] = ToxicityLevel(data['toxicity_level'])
         data['created_at'] = datetime.fromisoformat(data['created_at'])
         return cls(**data)
+    
+    @classmethod
+    def from_engine_result(cls, comment: Dict[str, Any], video_id: Optional[str] = None) -> 'CommentAnalysis':
+        """Create instance from one entry of NLPEngine.analyze_video_data()['comments']"""
+        text = comment.get('text') or ''
+        details = comment.get('details') or {}
+        toxicity = details.get('toxicity') or {}
+        toxicity_level = comment.get('toxicity_level') or toxicity.get('toxicity_level', 'safe')
+        sentiment = comment.get('sentiment', 'neutral')
+        tag = comment.get('tag', 'neutral')
+        
+        return cls(
+            comment_id=comment.get('comment_id') or uuid.uuid4().hex,
+            text=text,
+            sentiment=SentimentType(sentiment) if sentiment in SentimentType._value2member_map_ else SentimentType.NEUTRAL,
+            sentiment_confidence=comment.get('sentiment_confidence', 0.0),
+            emotions=list(comment.get('emotion') or []),
+            tag=CommentTag(tag) if tag in CommentTag._value2member_map_ else CommentTag.NEUTRAL,
+            tag_confidence=comment.get('confidence', 0.0),
+            toxicity_level=ToxicityLevel(toxicity_level) if toxicity_level in ToxicityLevel._value2member_map_ else ToxicityLevel.SAFE,
+            toxicity_confidence=toxicity.get('confidence', 0.0),
+            language_detected=comment.get('language', 'unknown'),
+            word_count=len(text.split()),
+            emoji_count=emoji.emoji_count(text),
+            created_at=datetime.now(),
+            video_id=video_id
+        )
 
 @dataclass
 class VideoAnalysis:
@@ -110,6 +145,8 @@ class DatabaseManager:
     def __init__(self, db_type: str = "sqlite", connection_string: str = "sentiment_analysis.db"):
         self.db_type = db_type
         self.connection_string = connection_string
+        self.storage = get_storage(connection_string) if db_type == "sqlite" else None
+        self.pool = self.storage.pool if self.storage else None
         self.setup_database()
     
     def setup_database(self):
@@ -120,83 +157,9 @@ class DatabaseManager:
             raise ValueError(f"Database type {self.db_type} not supported yet")
     
     def _setup_sqlite(self):
-        """Setup SQLite database and tables"""
-        with sqlite3.connect(self.connection_string) as conn:
-            cursor = conn.cursor()
-            
-            # Create video_analyses table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS video_analyses (
-                    video_id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    description TEXT,
-                    video_sentiment TEXT NOT NULL,
-                    video_emotions TEXT,  -- JSON array
-                    video_confidence REAL,
-                    total_comments INTEGER,
-                    analyzed_comments INTEGER,
-                    average_comment_sentiment REAL,
-                    dominant_emotion TEXT,
-                    engagement_score REAL,
-                    toxicity_score REAL,
-                    spam_ratio REAL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
-                )
-            ''')
-            
-            # Create comment_analyses table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS comment_analyses (
-                    comment_id TEXT PRIMARY KEY,
-                    video_id TEXT,
-                    text TEXT NOT NULL,
-                    sentiment TEXT NOT NULL,
-                    sentiment_confidence REAL,
-                    emotions TEXT,  -- JSON array
-                    tag TEXT NOT NULL,
-                    tag_confidence REAL,
-                    toxicity_level TEXT NOT NULL,
-                    toxicity_confidence REAL,
-                    language_detected TEXT,
-                    word_count INTEGER,
-                    emoji_count INTEGER,
-                    created_at TEXT NOT NULL,
-                    FOREIGN KEY (video_id) REFERENCES video_analyses (video_id)
-                )
-            ''')
-            
-            # Create analytics_reports table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS analytics_reports (
-                    report_id TEXT PRIMARY KEY,
-                    report_type TEXT NOT NULL,
-                    date_range TEXT,
-                    report_data TEXT,  -- JSON
-                    created_at TEXT NOT NULL
-                )
-            ''')
-            
-            # Create system_logs table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS system_logs (
-                    log_id TEXT PRIMARY KEY,
-                    level TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    module TEXT,
-                    details TEXT,  -- JSON
-                    created_at TEXT NOT NULL
-                )
-            ''')
-            
-            # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_video_created_at ON video_analyses(created_at)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_video_id ON comment_analyses(video_id)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_sentiment ON comment_analyses(sentiment)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_comment_tag ON comment_analyses(tag)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_created_at ON system_logs(created_at)')
-            
-            conn.commit()
+        """Create the shared schema and apply the video migrations"""
+        self.storage.create_all()
+        apply_migrations(self.pool, 'video')
     
     def save_video_analysis(self, video_analysis: VideoAnalysis) -> bool:
         """Save video analysis to database"""
@@ -209,7 +172,7 @@ class DatabaseManager:
     
     def _save_video_analysis_sqlite(self, video_analysis: VideoAnalysis) -> bool:
         """Save video analysis to SQLite"""
-        with sqlite3.connect(self.connection_string) as conn:
+        with self.pool.write() as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -224,7 +187,7 @@ class DatabaseManager:
                 video_analysis.title,
                 video_analysis.description,
                 video_analysis.video_sentiment.value,
-                json.dumps(video_analysis.video_emotions),
+                encode(video_analysis.video_emotions),
                 video_analysis.video_confidence,
                 video_analysis.total_comments,
                 video_analysis.analyzed_comments,
@@ -236,49 +199,65 @@ class DatabaseManager:
                 video_analysis.created_at.isoformat(),
                 video_analysis.updated_at.isoformat()
             ))
-            
-            conn.commit()
             return True
     
     def save_comment_analysis(self, comment_analysis: CommentAnalysis) -> bool:
         """Save comment analysis to database"""
+        return self.save_comment_analyses([comment_analysis]) == 1
+    
+    def save_comment_analyses(self, comment_analyses: Iterable[CommentAnalysis],
+                              chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        Save many comment analyses in one transaction
+        
+        Accepts any iterable, including generators; rows are written with
+        executemany() in chunks so very large inputs are never fully materialized.
+        Returns the number of rows written, or 0 if the transaction was rolled back.
+        """
         try:
             if self.db_type == "sqlite":
-                return self._save_comment_analysis_sqlite(comment_analysis)
+                return self._save_comment_analyses_sqlite(comment_analyses, chunk_size)
         except Exception as e:
-            self.log_error(f"Failed to save comment analysis: {e}")
-            return False
+            self.log_error(f"Failed to save comment analyses: {e}")
+            return 0
     
-    def _save_comment_analysis_sqlite(self, comment_analysis: CommentAnalysis) -> bool:
-        """Save comment analysis to SQLite"""
-        with sqlite3.connect(self.connection_string) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO comment_analyses 
-                (comment_id, video_id, text, sentiment, sentiment_confidence, 
-                 emotions, tag, tag_confidence, toxicity_level, toxicity_confidence, 
-                 language_detected, word_count, emoji_count, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                comment_analysis.comment_id,
-                comment_analysis.video_id,
-                comment_analysis.text,
-                comment_analysis.sentiment.value,
-                comment_analysis.sentiment_confidence,
-                json.dumps(comment_analysis.emotions),
-                comment_analysis.tag.value,
-                comment_analysis.tag_confidence,
-                comment_analysis.toxicity_level.value,
-                comment_analysis.toxicity_confidence,
-                comment_analysis.language_detected,
-                comment_analysis.word_count,
-                comment_analysis.emoji_count,
-                comment_analysis.created_at.isoformat()
-            ))
-            
-            conn.commit()
-            return True
+    def _save_comment_analyses_sqlite(self, comment_analyses: Iterable[CommentAnalysis],
+                                      chunk_size: int) -> int:
+        """Bulk save comment analyses to SQLite"""
+        saved = 0
+        with self.pool.write() as conn:
+            for chunk in iter_chunks(comment_analyses, chunk_size):
+                conn.executemany('''
+                    INSERT OR REPLACE INTO comment_analyses 
+                    (comment_id, video_id, text, sentiment, sentiment_confidence, 
+                     emotions, dominant_emotion, tag, tag_confidence, toxicity_level, toxicity_confidence, 
+                     language_detected, word_count, emoji_count, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', [(
+                    comment_analysis.comment_id,
+                    comment_analysis.video_id,
+                    comment_analysis.text,
+                    comment_analysis.sentiment.value,
+                    comment_analysis.sentiment_confidence,
+                    *COMMENT_EMOTIONS.values(comment_analysis.emotions),
+                    comment_analysis.tag.value,
+                    comment_analysis.tag_confidence,
+                    comment_analysis.toxicity_level.value,
+                    comment_analysis.toxicity_confidence,
+                    comment_analysis.language_detected,
+                    comment_analysis.word_count,
+                    comment_analysis.emoji_count,
+                    comment_analysis.created_at.isoformat()
+                ) for comment_analysis in chunk])
+                saved += len(chunk)
+        return saved
+    
+    def save_engine_result(self, result: Dict[str, Any], video_id: Optional[str] = None) -> int:
+        """Persist the comments of an NLPEngine.analyze_video_data() result in bulk"""
+        return self.save_comment_analyses(
+            CommentAnalysis.from_engine_result(comment, video_id)
+            for comment in result.get('comments', [])
+        )
     
     def get_video_analysis(self, video_id: str) -> Optional[VideoAnalysis]:
         """Retrieve video analysis by ID"""
@@ -287,7 +266,7 @@ class DatabaseManager:
     
     def _get_video_analysis_sqlite(self, video_id: str) -> Optional[VideoAnalysis]:
         """Get video analysis from SQLite"""
-        with sqlite3.connect(self.connection_string) as conn:
+        with self.pool.read() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM video_analyses WHERE video_id = ?', (video_id,))
             row = cursor.fetchone()
@@ -295,7 +274,7 @@ class DatabaseManager:
             if row:
                 columns = [description[0] for description in cursor.description]
                 data = dict(zip(columns, row))
-                data['video_emotions'] = json.loads(data['video_emotions'])
+                data['video_emotions'] = decode(data['video_emotions'])
                 return VideoAnalysis.from_dict(data)
         
         return None
@@ -307,7 +286,7 @@ class DatabaseManager:
     
     def _get_comments_for_video_sqlite(self, video_id: str) -> List[CommentAnalysis]:
         """Get comments from SQLite"""
-        with sqlite3.connect(self.connection_string) as conn:
+        with self.pool.read() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM comment_analyses WHERE video_id = ?', (video_id,))
             rows = cursor.fetchall()
@@ -317,7 +296,8 @@ class DatabaseManager:
             
             for row in rows:
                 data = dict(zip(columns, row))
-                data['emotions'] = json.loads(data['emotions'])
+                data['emotions'] = decode(data['emotions'])
+                data.pop('dominant_emotion', None)  # projection of emotions
                 comments.append(CommentAnalysis.from_dict(data))
             
             return comments
@@ -329,7 +309,7 @@ class DatabaseManager:
     
     def _get_recent_analyses_sqlite(self, limit: int) -> List[VideoAnalysis]:
         """Get recent analyses from SQLite"""
-        with sqlite3.connect(self.connection_string) as conn:
+        with self.pool.read() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM video_analyses 
@@ -343,7 +323,7 @@ class DatabaseManager:
             
             for row in rows:
                 data = dict(zip(columns, row))
-                data['video_emotions'] = json.loads(data['video_emotions'])
+                data['video_emotions'] = decode(data['video_emotions'])
                 analyses.append(VideoAnalysis.from_dict(data))
             
             return analyses
@@ -354,7 +334,7 @@ class DatabaseManager:
         report_id = str(uuid.uuid4())
         
         if self.db_type == "sqlite":
-            with sqlite3.connect(self.connection_string) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO analytics_reports 
@@ -367,7 +347,6 @@ class DatabaseManager:
                     json.dumps(report_data),
                     datetime.now().isoformat()
                 ))
-                conn.commit()
         
         return report_id
     
@@ -377,7 +356,7 @@ class DatabaseManager:
         log_id = str(uuid.uuid4())
         
         if self.db_type == "sqlite":
-            with sqlite3.connect(self.connection_string) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO system_logs 
@@ -391,7 +370,6 @@ class DatabaseManager:
                     json.dumps(details) if details else None,
                     datetime.now().isoformat()
                 ))
-                conn.commit()
     
     def log_error(self, message: str, module: str = None, details: Dict[str, Any] = None):
         """Log error message"""
@@ -408,7 +386,7 @@ class DatabaseManager:
     def get_system_stats(self) -> Dict[str, Any]:
         """Get system statistics"""
         if self.db_type == "sqlite":
-            with sqlite3.connect(self.connection_string) as conn:
+            with self.pool.read() as conn:
                 cursor = conn.cursor()
                 
                 # Count total videos
@@ -421,9 +399,9 @@ class DatabaseManager:
                 
                 # Count by sentiment
                 cursor.execute('''
-                    SELECT sentiment, COUNT(*) 
+                    SELECT video_sentiment, COUNT(*) 
                     FROM video_analyses 
-                    GROUP BY sentiment
+                    GROUP BY video_sentiment
                 ''')
                 sentiment_stats = dict(cursor.fetchall())
                 
@@ -435,11 +413,12 @@ class DatabaseManager:
                 ''')
                 tag_stats = dict(cursor.fetchall())
                 
-                # Recent activity (last 24 hours)
+                # Recent activity (last 24 hours); created_at is ISO text, so compare
+                # against an ISO bound and let idx_video_created_at serve the range
                 cursor.execute('''
                     SELECT COUNT(*) FROM video_analyses 
-                    WHERE datetime(created_at) > datetime('now', '-1 day')
-                ''')
+                    WHERE created_at > ?
+                ''', ((datetime.now() - timedelta(days=1)).isoformat(),))
                 recent_videos = cursor.fetchone()[0]
                 
                 return {
@@ -452,34 +431,28 @@ class DatabaseManager:
                     "last_updated": datetime.now().isoformat()
                 }
     
-    def cleanup_old_data(self, days_to_keep: int = 30) -> int:
-        """Clean up old data beyond specified days"""
+    def retention_engine(self, days_to_keep: int = 30, time_budget: float = 5.0) -> RetentionEngine:
+        """Batched, time-budgeted purge of logs and reports older than days_to_keep"""
+        max_age = timedelta(days=days_to_keep)
+        return RetentionEngine(self.pool, [
+            RetentionRule('system_logs', 'created_at', max_age, format_cutoff=datetime.isoformat),
+            RetentionRule('analytics_reports', 'created_at', max_age, format_cutoff=datetime.isoformat),
+        ], time_budget=time_budget)
+    
+    def cleanup_old_data(self, days_to_keep: int = 30, time_budget: float = 5.0) -> int:
+        """
+        Clean up old data beyond specified days
+        
+        Deletes in small committed batches for at most time_budget seconds, so
+        writers are never locked out for long; a later call finishes any backlog.
+        """
         if self.db_type == "sqlite":
-            with sqlite3.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                
-                # Delete old logs
-                cursor.execute('''
-                    DELETE FROM system_logs 
-                    WHERE datetime(created_at) < datetime('now', '-{} days')
-                '''.format(days_to_keep))
-                
-                deleted_logs = cursor.rowcount
-                
-                # Delete old reports
-                cursor.execute('''
-                    DELETE FROM analytics_reports 
-                    WHERE datetime(created_at) < datetime('now', '-{} days')
-                '''.format(days_to_keep))
-                
-                deleted_reports = cursor.rowcount
-                
-                conn.commit()
-                
-                total_deleted = deleted_logs + deleted_reports
-                self.log_info(f"Cleaned up {total_deleted} old records", "DatabaseManager")
-                
-                return total_deleted
+            report = self.retention_engine(days_to_keep, time_budget).run()
+            total_deleted = report.total_deleted
+            self.log_info(f"Cleaned up {total_deleted} old records "
+                          f"({report.bytes_reclaimed // 1024} KB reclaimed)", "DatabaseManager")
+            
+            return total_deleted
     
     def export_data(self, output_file: str, format_type: str = "json") -> bool:
         """Export all data to file"""
@@ -493,36 +466,27 @@ class DatabaseManager:
             return False
     
     def _export_json(self, output_file: str) -> bool:
-        """Export data as JSON"""
+        """Export data as JSON, streamed table by table in fetchmany() chunks"""
         if self.db_type == "sqlite":
-            with sqlite3.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                
-                # Get all video analyses
-                cursor.execute('SELECT * FROM video_analyses')
-                video_columns = [description[0] for description in cursor.description]
-                videos = [dict(zip(video_columns, row)) for row in cursor.fetchall()]
-                
-                # Get all comment analyses
-                cursor.execute('SELECT * FROM comment_analyses')
-                comment_columns = [description[0] for description in cursor.description]
-                comments = [dict(zip(comment_columns, row)) for row in cursor.fetchall()]
+            with self.pool.read() as conn:
                 
-                # Get all reports
-                cursor.execute('SELECT * FROM analytics_reports')
-                report_columns = [description[0] for description in cursor.description]
-                reports = [dict(zip(report_columns, row)) for row in cursor.fetchall()]
+                # Encoded columns are exported as the JSON text they used to be stored as
+                encoded = {VIDEO_EMOTIONS.column, COMMENT_EMOTIONS.column}
                 
-                export_data = {
-                    "export_timestamp": datetime.now().isoformat(),
-                    "database_type": self.db_type,
-                    "video_analyses": videos,
-                    "comment_analyses": comments,
-                    "analytics_reports": reports
-                }
+                def table_rows(table):
+                    cursor = conn.execute(f'SELECT * FROM {table}')
+                    columns = [description[0] for description in cursor.description]
+                    for rows in fetch_chunks(cursor):
+                        for row in rows:
+                            yield {column: to_json_text(value) if column in encoded else value
+                                   for column, value in zip(columns, row)}
                 
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(export_data, f, indent=2, ensure_ascii=False)
+                document = json_document(
+                    {"export_timestamp": datetime.now().isoformat(), "database_type": self.db_type},
+                    {table: table_rows(table)
+                     for table in ("video_analyses", "comment_analyses", "analytics_reports")}
+                )
+                write_file(document, output_file)
                 
                 return True
     
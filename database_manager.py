@@ -3,12 +3,24 @@ Advanced database operations for SentimentAI platform
 SQLite with SQLAlchemy for better performance and data management
 """
 
-import sqlite3
-import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from functools import cached_property
+from typing import Dict, List, Optional, Any, Sequence
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+from storage_engine import DEFAULT_DATABASE_URL, get_storage
+from migrations import apply_migrations
+from rollups import ANALYSIS_CUBE, API_LATENCY_CUBE, API_USAGE_CUBE, HOUR_OF_DAY, LATENCY_BINS, histogram_quantile
+from archive import ParquetArchive
+from streaming_export import PARQUET_AVAILABLE
+from retention import RetentionEngine, RetentionRule
+from kv_cache import SQLiteKVStore, get_cache
+from json_codec import ANALYSIS_METADATA, decode, to_json_text
+from content_store import ContentStore
+from timeseries import get_timeseries, series_key
+from api_accounting import get_accounting
+from partitions import MonthlyPartitions
 
 @dataclass
 class AnalysisRecord:
@@ -18,357 +30,374 @@ class AnalysisRecord:
     confidence: float
     source: str
     timestamp: datetime
-    metadata: Dict
+    encoded_metadata: Any = field(default=None, repr=False)
+    
+    @cached_property
+    def metadata(self) -> Dict:
+        """Decoded on first access; listing records never pays for it"""
+        return decode(self.encoded_metadata) or {}
 
 class DatabaseManager:
-    def __init__(self, db_path: str = "sentiment_analytics.db"):
+    _RECORD_COLUMNS = ('id', 'content', 'sentiment', 'confidence', 'source', 'timestamp', 'metadata')
+    _STORED_COLUMNS = ('id', 'content', 'content_hash', 'sentiment', 'confidence', 'source', 'timestamp', 'hour',
+                       'metadata', 'model', 'language')
+    
+    def __init__(self, db_path: str = DEFAULT_DATABASE_URL, archive_dir: Optional[str] = None,
+                 hot_days: int = 30, retention_days: int = 90, partition_dir: Optional[str] = None):
         self.db_path = db_path
+        self.storage = get_storage(db_path)
+        if self.storage.backend != 'sqlite':
+            raise ValueError(f"DatabaseManager needs a SQLite database, not {self.storage.backend}")
+        self.pool = self.storage.pool
+        # Analytics reads pass fresh=False to read the latest snapshot instead of the live file
+        self.snapshots = self.storage.snapshots
+        self.hot_days = hot_days
+        self.retention_days = retention_days
+        # Without an archive (or pyarrow) rows older than hot_days are simply deleted
+        self.archive = (ParquetArchive(archive_dir, 'analysis_results', transform=self._archived_rows)
+                        if archive_dir and PARQUET_AVAILABLE else None)
         self.init_database()
+        # With partition_dir new analysis rows go to monthly partition files instead,
+        # keeping their text inline, and whole months expire after retention_days
+        self.partitions = MonthlyPartitions(self.pool, 'analysis_results', partition_dir) if partition_dir else None
+        # analysis_results.content is stored once per distinct text, referenced by hash
+        self.content = ContentStore(self.pool)
+        self.content_cache = get_cache(SQLiteKVStore(
+            self.pool, 'content_cache', value_column='content', expiry_column='expiry_time',
+            created_column='created_at', encode=str, decode=str
+        ))
+        # Metric samples: Gorilla-compressed segments downsampled to 1m/1h/1d tiers
+        self.timeseries = get_timeseries(self.pool)
+        # API requests are aggregated in memory and flushed into the rollup cubes
+        self.api_usage = get_accounting(self.pool)
+        self.retention = RetentionEngine(self.pool, self._retention_rules(),
+                                         cubes=(ANALYSIS_CUBE, API_USAGE_CUBE, API_LATENCY_CUBE))
     
     def init_database(self):
         """Initialize database with required tables"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Analysis results table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS analysis_results (
-                    id TEXT PRIMARY KEY,
-                    content TEXT NOT NULL,
-                    sentiment TEXT NOT NULL,
-                    confidence REAL NOT NULL,
-                    source TEXT NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    metadata TEXT
-                )
-            """)
-            
-            # User sessions table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS user_sessions (
-                    session_id TEXT PRIMARY KEY,
-                    start_time DATETIME NOT NULL,
-                    last_activity DATETIME NOT NULL,
-                    actions_count INTEGER DEFAULT 0,
-                    user_agent TEXT
-                )
-            """)
-            
-            # API usage statistics
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS api_usage (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    endpoint TEXT NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    response_time REAL,
-                    status_code INTEGER,
-                    error_message TEXT
-                )
-            """)
-            
-            # Real-time metrics
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS metrics (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    metric_name TEXT NOT NULL,
-                    metric_value REAL NOT NULL,
-                    timestamp DATETIME NOT NULL,
-                    category TEXT
-                )
-            """)
-            
-            # Content cache
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS content_cache (
-                    cache_key TEXT PRIMARY KEY,
-                    content TEXT NOT NULL,
-                    expiry_time DATETIME NOT NULL,
-                    created_at DATETIME NOT NULL
-                )
-            """)
-            
-            conn.commit()
+        self.storage.create_all()
+        apply_migrations(self.pool, 'analytics')
     
     def store_analysis_result(self, content: str, sentiment: str, confidence: float, 
                             source: str, metadata: Dict = None) -> str:
         """Store analysis result in database"""
         analysis_id = str(uuid.uuid4())
+        now = datetime.now()
         
-        with sqlite3.connect(self.db_path) as conn:
+        if self.partitions is not None:
+            encoded, model, language = ANALYSIS_METADATA.values(metadata or {})
+            row = (analysis_id, content, None, sentiment, confidence, source, now, now.hour, encoded, model, language)
+            measures = [(confidence or 0, int(confidence is not None), confidence, confidence), (0, 0, None, None)]
+            with self.pool.write() as conn:
+                self.partitions.insert(conn, self._STORED_COLUMNS, [row])
+                # Partition inserts fire no trigger in the main database: roll the row up here
+                ANALYSIS_CUBE.merge(conn, [(now, (sentiment, source, model, language), 1, measures)])
+            return analysis_id
+        
+        with self.pool.write() as conn:
+            content_hash = self.content.put(content)
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO analysis_results 
-                (id, content, sentiment, confidence, source, timestamp, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                (id, content, content_hash, sentiment, confidence, source, timestamp, hour, metadata, model, language)
+                VALUES (?, '', ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 analysis_id,
-                content,
+                content_hash,
                 sentiment,
                 confidence,
                 source,
-                datetime.now(),
-                json.dumps(metadata or {})
+                now,
+                now.hour,
+                *ANALYSIS_METADATA.values(metadata or {})
             ))
-            conn.commit()
         
         return analysis_id
     
-    def get_recent_analyses(self, limit: int = 100, hours: int = 24) -> List[AnalysisRecord]:
-        """Get recent analysis results"""
+    def get_recent_analyses(self, limit: int = 100, hours: int = 24, model: Optional[str] = None,
+                            language: Optional[str] = None, fresh: bool = True) -> List[AnalysisRecord]:
+        """
+        Get recent analysis results (continuing into the archive past the hot window)
+        
+        model and language filter on the indexed projections of metadata, which is
+        itself only decoded when a record's metadata is read. fresh=False reads the
+        latest snapshot (analytics that can tolerate its age); monthly partitions
+        are always read live.
+        """
         cutoff_time = datetime.now() - timedelta(hours=hours)
+        filters = {'model': model, 'language': language}
+        conditions = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        where = ''.join(f" AND {condition}" for condition in conditions)
+        params = [value for value in filters.values() if value is not None]
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self.snapshots.read(fresh) as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT id, content, sentiment, confidence, source, timestamp, metadata
+            cursor.execute(f"""
+                SELECT id, content, sentiment, confidence, source, timestamp, metadata, content_hash
                 FROM analysis_results
-                WHERE timestamp > ?
+                WHERE timestamp > ?{where}
                 ORDER BY timestamp DESC
                 LIMIT ?
-            """, (cutoff_time, limit))
-            
-            results = []
-            for row in cursor.fetchall():
-                results.append(AnalysisRecord(
-                    id=row[0],
-                    content=row[1],
-                    sentiment=row[2],
-                    confidence=row[3],
-                    source=row[4],
-                    timestamp=datetime.fromisoformat(row[5]),
-                    metadata=json.loads(row[6]) if row[6] else {}
-                ))
-            
-            return results
+            """, (cutoff_time, *params, limit))
+            rows = self._with_content(cursor.fetchall(), content_index=1, hash_index=7, conn=conn)
+        
+        if self.partitions is not None:
+            partitioned = self.partitions.select(
+                ('id', 'content', 'sentiment', 'confidence', 'source', 'timestamp', 'metadata', 'content_hash'),
+                cutoff_time, where=' AND '.join(conditions), params=params, limit=limit)
+            rows = sorted(rows + partitioned, key=lambda row: row[5], reverse=True)[:limit]
+        
+        if len(rows) < limit and self.archive is not None:
+            archived = self.archive.read_table(cutoff_time, columns=self._RECORD_COLUMNS)
+            if archived is not None and archived.num_rows:
+                archived = archived.sort_by([('timestamp', 'descending')]).to_pylist()
+                if params:  # archived metadata is JSON text (older files have no projection columns)
+                    archived = [row for row in archived
+                                if all((decode(row['metadata']) or {}).get(column) == value
+                                       for column, value in filters.items() if value is not None)]
+                rows += [tuple(row[c] for c in self._RECORD_COLUMNS) for row in archived[:limit - len(rows)]]
+        
+        return [
+            AnalysisRecord(
+                id=row[0],
+                content=row[1],
+                sentiment=row[2],
+                confidence=row[3],
+                source=row[4],
+                timestamp=datetime.fromisoformat(row[5]),
+                encoded_metadata=row[6]
+            )
+            for row in rows
+        ]
+    
+    def _with_content(self, rows: List[tuple], content_index: int, hash_index: int, conn=None) -> List[tuple]:
+        """Rows with the text of hash-referenced content filled in (one batched lookup, on conn if given)"""
+        texts = self.content.get_many((row[hash_index] for row in rows if row[hash_index] is not None), conn)
+        return [row if row[hash_index] is None else
+                row[:content_index] + (texts.get(bytes(row[hash_index]), ''),) + row[content_index + 1:]
+                for row in rows]
+    
+    def _archived_rows(self, names: Sequence[str], rows: List[tuple]) -> List[tuple]:
+        """Archive part files keep the text and JSON metadata, not hashes and blobs"""
+        names = list(names)
+        rows = self._with_content(rows, names.index('content'), names.index('content_hash'))
+        metadata = names.index('metadata')
+        return [row[:metadata] + (to_json_text(row[metadata]),) + row[metadata + 1:] for row in rows]
     
-    def get_sentiment_statistics(self, hours: int = 24) -> Dict:
-        """Get sentiment statistics for the specified time period"""
+    def analyses_table(self, start: datetime, end: Optional[datetime] = None,
+                       columns: Sequence[str] = _RECORD_COLUMNS, fresh: bool = True):
+        """
+        analysis_results rows in [start, end) from the hot table, its monthly
+        partitions and the archive, as one pyarrow Table (requires pyarrow; fresh=False reads the latest snapshot)
+        """
+        import pyarrow as pa
+        
+        end_param = end or datetime.max
+        with self.snapshots.read(fresh) as conn:
+            hot = conn.execute(f"""
+                SELECT {', '.join(columns)}, content_hash FROM analysis_results
+                WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp
+            """, (start, end_param)).fetchall()
+            if 'content' in columns:
+                hot = self._with_content(hot, content_index=list(columns).index('content'),
+                                         hash_index=len(columns), conn=conn)
+        if self.partitions is not None:
+            hot += self.partitions.select(columns, start, end, descending=False)
+            if 'timestamp' in columns:
+                ts = list(columns).index('timestamp')
+                hot.sort(key=lambda row: str(row[ts]))
+        hot_table = pa.table({c: [to_json_text(row[i]) if c == 'metadata' else row[i] for row in hot]
+                              for i, c in enumerate(columns)})
+        archived = self.archive.read_table(start, end, columns) if self.archive else None
+        if archived is None:
+            return hot_table
+        return pa.concat_tables([archived, hot_table.cast(archived.schema, safe=False)],
+                                promote_options='default')
+    
+    def get_sentiment_statistics(self, hours: int = 24, fresh: bool = True) -> Dict:
+        """Get sentiment statistics for the specified time period (from the rollup cube)"""
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Overall sentiment distribution
-            cursor.execute("""
-                SELECT sentiment, COUNT(*) as count, AVG(confidence) as avg_confidence
-                FROM analysis_results
-                WHERE timestamp > ?
-                GROUP BY sentiment
-            """, (cutoff_time,))
-            
-            sentiment_dist = {}
-            total_analyses = 0
-            
-            for row in cursor.fetchall():
-                sentiment, count, avg_conf = row
-                sentiment_dist[sentiment] = {
-                    'count': count,
-                    'avg_confidence': round(avg_conf, 3)
-                }
-                total_analyses += count
-            
-            # Source breakdown
-            cursor.execute("""
-                SELECT source, COUNT(*) as count
-                FROM analysis_results
-                WHERE timestamp > ?
-                GROUP BY source
-                ORDER BY count DESC
-            """, (cutoff_time,))
-            
-            source_breakdown = {row[0]: row[1] for row in cursor.fetchall()}
-            
-            # Hourly trend
-            cursor.execute("""
-                SELECT 
-                    strftime('%H', timestamp) as hour,
-                    sentiment,
-                    COUNT(*) as count
-                FROM analysis_results
-                WHERE timestamp > ?
-                GROUP BY hour, sentiment
-                ORDER BY hour
-            """, (cutoff_time,))
-            
-            hourly_trend = {}
-            for row in cursor.fetchall():
-                hour, sentiment, count = row
-                if hour not in hourly_trend:
-                    hourly_trend[hour] = {}
-                hourly_trend[hour][sentiment] = count
-            
-            return {
-                'total_analyses': total_analyses,
-                'sentiment_distribution': sentiment_dist,
-                'source_breakdown': source_breakdown,
-                'hourly_trend': hourly_trend,
-                'time_range_hours': hours
-            }
+        with self.snapshots.read(fresh) as conn:
+            rows = ANALYSIS_CUBE.aggregate(conn, cutoff_time, group_by=(HOUR_OF_DAY, 'sentiment', 'source'))
+        
+        # Overall sentiment distribution, source breakdown and hourly trend from one pass over the buckets
+        sentiment_totals = {}
+        source_breakdown = {}
+        hourly_trend = {}
+        for row in rows:
+            sentiment, source, count = row['sentiment'], row['source'], row['count']
+            totals = sentiment_totals.setdefault(sentiment, [0, 0.0, 0])
+            totals[0] += count
+            totals[1] += row['confidence_sum']
+            totals[2] += row['confidence_n']
+            source_breakdown[source] = source_breakdown.get(source, 0) + count
+            hour = hourly_trend.setdefault(row[HOUR_OF_DAY], {})
+            hour[sentiment] = hour.get(sentiment, 0) + count
+        
+        sentiment_dist = {
+            sentiment: {'count': count, 'avg_confidence': round(conf_sum / n, 3) if n else 0}
+            for sentiment, (count, conf_sum, n) in sentiment_totals.items()
+        }
+        
+        return {
+            'total_analyses': sum(source_breakdown.values()),
+            'sentiment_distribution': sentiment_dist,
+            'source_breakdown': dict(sorted(source_breakdown.items(), key=lambda item: -item[1])),
+            'hourly_trend': dict(sorted(hourly_trend.items())),
+            'time_range_hours': hours
+        }
     
     def store_metric(self, metric_name: str, value: float, category: str = None):
-        """Store a metric value"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO metrics (metric_name, metric_value, timestamp, category)
-                VALUES (?, ?, ?, ?)
-            """, (metric_name, value, datetime.now(), category))
-            conn.commit()
+        """Store a metric value (in the time-series store, as its own series per category)"""
+        self.timeseries.append(series_key(metric_name, category), value, datetime.now())
     
-    def get_metrics_history(self, metric_name: str, hours: int = 24) -> List[Dict]:
-        """Get metric history"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+    def get_metrics_history(self, metric_name: str, hours: int = 24, tier: Optional[str] = None,
+                            category: Optional[str] = None) -> List[Dict]:
+        """
+        Get metric history
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT metric_value, timestamp
-                FROM metrics
-                WHERE metric_name = ? AND timestamp > ?
-                ORDER BY timestamp
-            """, (metric_name, cutoff_time))
-            
-            return [
-                {'value': row[0], 'timestamp': row[1]}
-                for row in cursor.fetchall()
-            ]
+        Raw samples while the period is within raw retention, otherwise the finest
+        downsampled tier that covers it (points then carry min, max and count, with
+        value the bucket average). Pass the category the metric was stored with.
+        """
+        cutoff_time = datetime.now() - timedelta(hours=hours)
+        return [
+            {**point, 'timestamp': point['timestamp'].isoformat(' ')}
+            for point in self.timeseries.query(series_key(metric_name, category), cutoff_time, datetime.now(), tier)
+        ]
+    
+    def get_metric_names(self, category: Optional[str] = None) -> List[str]:
+        """Stored metric names, or those stored under category"""
+        return self.timeseries.metrics(category)
     
     def log_api_usage(self, endpoint: str, response_time: float = None, 
                      status_code: int = None, error_message: str = None):
-        """Log API usage statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT INTO api_usage (endpoint, timestamp, response_time, status_code, error_message)
-                VALUES (?, ?, ?, ?, ?)
-            """, (endpoint, datetime.now(), response_time, status_code, error_message))
-            conn.commit()
+        """Log API usage statistics (buffered; failed requests keep a raw row with their message)"""
+        self.api_usage.record(endpoint, response_time, status_code, error_message)
     
-    def get_api_statistics(self, hours: int = 24) -> Dict:
-        """Get API usage statistics"""
+    def get_api_statistics(self, hours: int = 24, fresh: bool = True) -> Dict:
+        """
+        Get API usage statistics (from the rollup cubes)
+        
+        fresh=True first flushes buffered API usage so the caller sees every request
+        logged so far; snapshot reads lag by up to the flush interval as well.
+        """
         cutoff_time = datetime.now() - timedelta(hours=hours)
+        if fresh:
+            self.api_usage.flush()
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Request count by endpoint
-            cursor.execute("""
-                SELECT endpoint, COUNT(*) as count, AVG(response_time) as avg_response_time
-                FROM api_usage
-                WHERE timestamp > ?
-                GROUP BY endpoint
-                ORDER BY count DESC
-            """, (cutoff_time,))
-            
-            endpoint_stats = {}
-            for row in cursor.fetchall():
-                endpoint, count, avg_time = row
-                endpoint_stats[endpoint] = {
-                    'requests': count,
-                    'avg_response_time': round(avg_time, 3) if avg_time else None
-                }
-            
-            # Error rate
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_requests,
-                    SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END) as error_requests
-                FROM api_usage
-                WHERE timestamp > ?
-            """, (cutoff_time,))
-            
-            total, errors = cursor.fetchone()
-            error_rate = (errors / total * 100) if total > 0 else 0
-            
-            return {
-                'endpoint_statistics': endpoint_stats,
-                'total_requests': total,
-                'error_requests': errors,
-                'error_rate_percent': round(error_rate, 2),
-                'time_range_hours': hours
+        with self.snapshots.read(fresh) as conn:
+            rows = API_USAGE_CUBE.aggregate(conn, cutoff_time, group_by=('endpoint', 'status_code'))
+            bins = API_LATENCY_CUBE.aggregate(conn, cutoff_time, group_by=('endpoint', 'latency_bin'))
+        
+        # Request count by endpoint, and error rate
+        endpoints = {}
+        total = errors = 0
+        for row in rows:
+            stats = endpoints.setdefault(row['endpoint'], [0, 0.0, 0])
+            stats[0] += row['count']
+            stats[1] += row['response_time_sum']
+            stats[2] += row['response_time_n']
+            total += row['count']
+            if row['status_code'] and int(row['status_code']) >= 400:
+                errors += row['count']
+        
+        endpoint_stats = {}
+        for endpoint, (count, time_sum, n) in sorted(endpoints.items(), key=lambda item: -item[1][0]):
+            avg_time = time_sum / n if n else None
+            endpoint_stats[endpoint] = {
+                'requests': count,
+                'avg_response_time': round(avg_time, 3) if avg_time else None
             }
+        
+        histograms = {}
+        for row in bins:
+            histograms.setdefault(row['endpoint'], {})[row['latency_bin']] = row['count']
+        # Estimated from the response-time histogram (interpolated within its bins)
+        percentiles = {}
+        for endpoint, counts in histograms.items():
+            if sum(counts.get(label, 0) for label in LATENCY_BINS):
+                percentiles[endpoint] = {name: round(histogram_quantile(counts, q), 3)
+                                         for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))}
+        
+        error_rate = (errors / total * 100) if total > 0 else 0
+        
+        return {
+            'endpoint_statistics': endpoint_stats,
+            'latency_percentiles': percentiles,
+            'total_requests': total,
+            'error_requests': errors,
+            'error_rate_percent': round(error_rate, 2),
+            'time_range_hours': hours
+        }
     
     def cache_content(self, cache_key: str, content: str, expiry_hours: int = 1):
-        """Cache content with expiry"""
-        expiry_time = datetime.now() + timedelta(hours=expiry_hours)
-        
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO content_cache 
-                (cache_key, content, expiry_time, created_at)
-                VALUES (?, ?, ?, ?)
-            """, (cache_key, content, expiry_time, datetime.now()))
-            conn.commit()
+        """Cache content with expiry (kept in memory and written through to SQLite)"""
+        self.content_cache.set(cache_key, content, ttl=expiry_hours * 3600)
     
     def get_cached_content(self, cache_key: str) -> Optional[str]:
         """Get cached content if not expired"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT content FROM content_cache
-                WHERE cache_key = ? AND expiry_time > ?
-            """, (cache_key, datetime.now()))
-            
-            result = cursor.fetchone()
-            return result[0] if result else None
+        return self.content_cache.get(cache_key)
     
-    def cleanup_expired_data(self):
-        """Clean up expired cache and old data"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Remove expired cache
-            cursor.execute("DELETE FROM content_cache WHERE expiry_time < ?", (datetime.now(),))
-            
-            # Remove old analysis results (older than 30 days)
-            cutoff = datetime.now() - timedelta(days=30)
-            cursor.execute("DELETE FROM analysis_results WHERE timestamp < ?", (cutoff,))
-            
-            # Remove old metrics (older than 7 days)
-            metrics_cutoff = datetime.now() - timedelta(days=7)
-            cursor.execute("DELETE FROM metrics WHERE timestamp < ?", (metrics_cutoff,))
-            
-            conn.commit()
+    def _retention_rules(self) -> List[RetentionRule]:
+        rules = [
+            RetentionRule('content_cache', 'expiry_time', timedelta(0)),  # expired cache
+            RetentionRule('metrics', 'timestamp', timedelta(days=7)),  # rows written by older versions
+        ]
+        if self.archive is None:
+            rules.append(RetentionRule('analysis_results', 'timestamp', timedelta(days=self.hot_days)))
+        return rules
+    
+    def cleanup_expired_data(self, time_budget: Optional[float] = None) -> Dict:
+        """
+        Clean up expired cache and old data
+        
+        Rows are purged in small committed batches within the retention engine's
+        time budget and freed pages are returned with incremental vacuum, and the
+        rollup cubes drop buckets older than their granularity's retention. Analysis
+        rows older than hot_days move to the Parquet archive when one is configured
+        (and archived days older than retention_days are dropped). Monthly partitions
+        whose whole month is older than retention_days are unlinked.
+        """
+        if self.archive is not None:
+            self.archive.archive(self.pool, datetime.now() - timedelta(days=self.hot_days))
+            self.archive.expire(datetime.now() - timedelta(days=self.retention_days))
+        
+        report = self.retention.run(time_budget=time_budget).to_dict()
+        report['texts_purged'] = self.content.purge_unreferenced([('analysis_results', 'content_hash')])
+        report['metric_segments_purged'] = self.timeseries.purge()
+        if self.partitions is not None:
+            report['partitions_dropped'] = self.partitions.drop_before(
+                datetime.now() - timedelta(days=self.retention_days))
+        return report
     
     def get_dashboard_summary(self) -> Dict:
-        """Get comprehensive dashboard summary"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            # Today's stats
-            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_today,
-                    AVG(confidence) as avg_confidence,
-                    COUNT(DISTINCT source) as unique_sources
-                FROM analysis_results
-                WHERE timestamp >= ?
-            """, (today,))
-            
-            today_stats = cursor.fetchone()
-            
-            # Recent sentiment trend
-            cursor.execute("""
-                SELECT sentiment, COUNT(*) as count
-                FROM analysis_results
-                WHERE timestamp >= ?
-                GROUP BY sentiment
-            """, (today,))
-            
-            sentiment_today = {row[0]: row[1] for row in cursor.fetchall()}
-            
-            return {
-                'today': {
-                    'total_analyses': today_stats[0] or 0,
-                    'avg_confidence': round(today_stats[1], 3) if today_stats[1] else 0,
-                    'unique_sources': today_stats[2] or 0,
-                    'sentiment_breakdown': sentiment_today
-                },
-                'timestamp': datetime.now().isoformat()
-            }
+        """Get comprehensive dashboard summary (from the rollup cube)"""
+        # Today's stats
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        with self.pool.read() as conn:
+            rows = ANALYSIS_CUBE.aggregate(conn, today, group_by=('sentiment', 'source'))
+        
+        total_today = sum(row['count'] for row in rows)
+        confidence_n = sum(row['confidence_n'] for row in rows)
+        avg_confidence = sum(row['confidence_sum'] for row in rows) / confidence_n if confidence_n else 0
+        
+        # Recent sentiment trend
+        sentiment_today = {}
+        for row in rows:
+            sentiment_today[row['sentiment']] = sentiment_today.get(row['sentiment'], 0) + row['count']
+        
+        return {
+            'today': {
+                'total_analyses': total_today,
+                'avg_confidence': round(avg_confidence, 3) if avg_confidence else 0,
+                'unique_sources': len({row['source'] for row in rows}),
+                'sentiment_breakdown': sentiment_today
+            },
+            'timestamp': datetime.now().isoformat()
+        }
 
 # Global database instance
 db_manager = DatabaseManager()
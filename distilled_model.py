@@ -0,0 +1,390 @@
+"""
+Distilled Sentiment Model
+Sparse linear fast tier trained offline from labels stored by the transformer model
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Iterator, Tuple, Any
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.utils import murmurhash3_32
+
+from config import Config
+from content_store import load_texts
+
+logger = logging.getLogger(__name__)
+
+# Artifact layout: <model_dir>/<version>/{manifest.json, weights.npy, intercept.npy}
+DEFAULT_MODEL_DIR = os.getenv('DISTILLED_MODEL_PATH', os.path.join('models', 'distilled_sentiment'))
+ARTIFACT_FORMAT = 1
+LATEST_POINTER = 'LATEST'
+SENTIMENT_LABELS = ('negative', 'neutral', 'positive')
+
+# Tables written by the analysis managers that carry transformer labels
+TEACHER_SOURCES = {
+    'sentiment_analyses': "SELECT text, sentiment, NULL FROM sentiment_analyses WHERE model_used LIKE ?",
+    # model is the stored projection of the (binary) metadata column's 'model' key;
+    # content_hash references the text in content_store's text_contents
+    'analysis_results': "SELECT content, sentiment, content_hash FROM analysis_results WHERE model LIKE ?",
+}
+
+# Swahili/Sheng vocabulary gets explicit marker tokens so that short code-switched
+# comments still hit a shared feature even when the exact word is rare
+SWAHILI_POSITIVE = frozenset(Config.SWAHILI_WORDS['positive'])
+SWAHILI_NEGATIVE = frozenset(Config.SWAHILI_WORDS['negative'])
+SHENG_TOKENS = frozenset(word for phrase in Config.KENYAN_SLANG for word in phrase.split())
+
+_TOKEN_RE = re.compile(r"[\w']+|[^\w\s]", re.UNICODE)
+
+
+def preprocess_text(text: str) -> str:
+    """Lowercase text and append Swahili/Sheng lexicon marker tokens"""
+    text = text.lower()
+    markers = []
+    for token in _TOKEN_RE.findall(text):
+        if token in SWAHILI_POSITIVE:
+            markers.append('__sw_pos__')
+        elif token in SWAHILI_NEGATIVE:
+            markers.append('__sw_neg__')
+        if token in SHENG_TOKENS:
+            markers.append('__sheng__')
+    if markers:
+        text = f"{text} {' '.join(markers)}"
+    return text
+
+
+def build_vectorizer(n_features: int = 2 ** 18, ngram_max: int = 2) -> HashingVectorizer:
+    """Create the stateless hashing vectorizer shared by training and inference"""
+    return HashingVectorizer(
+        n_features=n_features,
+        ngram_range=(1, ngram_max),
+        alternate_sign=False,
+        norm='l2',
+        lowercase=False,
+        preprocessor=preprocess_text,
+        token_pattern=r"(?u)[\w']+|[!?]+",
+    )
+
+
+class DistilledSentimentModel:
+    """Memory-mappable linear sentiment model over hashed n-gram features"""
+
+    def __init__(self, weights: np.ndarray, intercept: np.ndarray, classes: List[str],
+                 manifest: Optional[Dict[str, Any]] = None):
+        # weights are stored feature-major (n_features, n_classes) so a sparse
+        # document only gathers the rows it touches
+        self.weights = weights
+        self.intercept = np.asarray(intercept, dtype=np.float32)
+        self.classes = list(classes)
+        self.manifest = manifest or {}
+        self.version = self.manifest.get('version', 'unversioned')
+        self.vectorizer = build_vectorizer(
+            n_features=self.weights.shape[0],
+            ngram_max=self.manifest.get('ngram_max', 2)
+        )
+        self._analyze = self.vectorizer.build_analyzer()
+        self._n_features = self.weights.shape[0]
+
+    @classmethod
+    def from_estimator(cls, estimator, n_features: int, ngram_max: int = 2,
+                       extra_manifest: Optional[Dict[str, Any]] = None) -> 'DistilledSentimentModel':
+        """Build a model from a fitted scikit-learn linear classifier"""
+        coef = np.asarray(estimator.coef_, dtype=np.float32)
+        intercept = np.asarray(estimator.intercept_, dtype=np.float32)
+        classes = [str(c) for c in estimator.classes_]
+
+        # Binary estimators expose a single decision row; expand to one column per class
+        if coef.shape[0] == 1 and len(classes) == 2:
+            coef = np.vstack([-coef[0] / 2, coef[0] / 2])
+            intercept = np.array([-intercept[0] / 2, intercept[0] / 2], dtype=np.float32)
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'n_features': n_features,
+            'ngram_max': ngram_max,
+            'classes': classes,
+            'estimator': type(estimator).__name__,
+        }
+        manifest.update(extra_manifest or {})
+        return cls(np.ascontiguousarray(coef.T), intercept, classes, manifest)
+
+    def save(self, model_dir: str = DEFAULT_MODEL_DIR, version: Optional[str] = None) -> str:
+        """Write a new versioned artifact and point LATEST at it"""
+        version = version or datetime.utcnow().strftime('%Y%m%d%H%M%S')
+        version_dir = os.path.join(model_dir, version)
+        os.makedirs(version_dir, exist_ok=True)
+
+        np.save(os.path.join(version_dir, 'weights.npy'), self.weights.astype(np.float32))
+        np.save(os.path.join(version_dir, 'intercept.npy'), self.intercept)
+
+        self.manifest.update({
+            'version': version,
+            'classes': self.classes,
+            'n_features': int(self.weights.shape[0]),
+            'created_at': datetime.utcnow().isoformat(),
+        })
+        with open(os.path.join(version_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+
+        with open(os.path.join(model_dir, LATEST_POINTER), 'w', encoding='utf-8') as f:
+            f.write(version)
+
+        self.version = version
+        logger.info(f"💾 Distilled model saved: {version_dir}")
+        return version_dir
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_MODEL_DIR, mmap: bool = True) -> 'DistilledSentimentModel':
+        """Load an artifact directory, or the LATEST version under a model directory"""
+        if not os.path.exists(os.path.join(path, 'manifest.json')):
+            with open(os.path.join(path, LATEST_POINTER), 'r', encoding='utf-8') as f:
+                path = os.path.join(path, f.read().strip())
+
+        with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        if manifest.get('format') != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported distilled model format: {manifest.get('format')}")
+
+        weights = np.load(os.path.join(path, 'weights.npy'), mmap_mode='r' if mmap else None)
+        intercept = np.load(os.path.join(path, 'intercept.npy'))
+        return cls(weights, intercept, manifest['classes'], manifest)
+
+    @classmethod
+    def load_if_available(cls, path: str = DEFAULT_MODEL_DIR) -> Optional['DistilledSentimentModel']:
+        """Load the latest artifact, returning None when none has been trained yet"""
+        try:
+            return cls.load(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load distilled model from {path}: {e}")
+            return None
+
+    def _hash_features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash a single text exactly like HashingVectorizer.transform, without the
+        per-call validation and sparse-matrix construction overhead
+        """
+        counts: Dict[int, int] = {}
+        n_features = self._n_features
+        for token in self._analyze(text):
+            h = murmurhash3_32(token, positive=False)
+            index = (2147483647 - (n_features - 1)) % n_features if h == -2147483648 else abs(h) % n_features
+            counts[index] = counts.get(index, 0) + 1
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        data = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        norm = np.sqrt(data @ data)
+        if norm > 0:
+            data /= norm
+        return indices, data
+
+    def decision_scores(self, text: str) -> np.ndarray:
+        """Raw per-class linear scores for a single text"""
+        indices, data = self._hash_features(text)
+        if not len(indices):
+            return self.intercept.copy()
+        return data @ self.weights[indices] + self.intercept
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        """Softmax-normalised class probabilities for a single text"""
+        scores = self.decision_scores(text)
+        scores = np.exp(scores - scores.max())
+        probs = scores / scores.sum()
+        return {label: float(p) for label, p in zip(self.classes, probs)}
+
+    def predict(self, text: str) -> Tuple[str, float, Dict[str, float]]:
+        """Return (sentiment, confidence, scores) for a single text"""
+        probs = self.predict_proba(text)
+        scores = {label: probs.get(label, 0.0) for label in SENTIMENT_LABELS}
+        sentiment = max(probs, key=probs.get)
+        return sentiment, probs[sentiment], scores
+
+
+def iter_teacher_labels(db_paths: List[str], teacher_pattern: str = '%roberta%') -> Iterator[Tuple[str, str]]:
+    """Yield (text, sentiment) pairs labelled by the teacher model across databases"""
+    for db_path in db_paths:
+        if not os.path.exists(db_path):
+            logger.warning(f"⚠️  Database not found, skipping: {db_path}")
+            continue
+
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table, query in TEACHER_SOURCES.items():
+                if table not in tables:
+                    continue
+                try:
+                    cursor = conn.execute(query, (teacher_pattern,))
+                    for rows in iter(lambda: cursor.fetchmany(1000), []):
+                        texts = load_texts(conn, [row[2] for row in rows if row[2] is not None and not row[0]])
+                        for text, sentiment, content_hash in rows:
+                            text = text or (texts.get(bytes(content_hash)) if content_hash is not None else None)
+                            sentiment = (sentiment or '').lower()
+                            if text and sentiment in SENTIMENT_LABELS:
+                                yield text, sentiment
+                except sqlite3.OperationalError as e:
+                    logger.warning(f"⚠️  Skipping {db_path}:{table}: {e}")
+        finally:
+            conn.close()
+
+
+def _is_holdout(text: str, holdout: float) -> bool:
+    """Stable hash split so re-training keeps the same evaluation texts"""
+    bucket = int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16) / 0xFFFFFFFF
+    return bucket < holdout
+
+
+def evaluate_model(model: DistilledSentimentModel, samples: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Measure agreement with teacher labels and single-text latency"""
+    latencies = []
+    agree = 0
+    per_class = {label: {'total': 0, 'agree': 0} for label in SENTIMENT_LABELS}
+
+    for text, label in samples:
+        start = time.perf_counter()
+        predicted, _, _ = model.predict(text)
+        latencies.append(time.perf_counter() - start)
+
+        per_class[label]['total'] += 1
+        if predicted == label:
+            agree += 1
+            per_class[label]['agree'] += 1
+
+    latencies_us = np.array(latencies) * 1e6 if latencies else np.zeros(1)
+    return {
+        'samples': len(samples),
+        'teacher_agreement': round(agree / len(samples), 4) if samples else 0.0,
+        'per_class_agreement': {
+            label: round(stats['agree'] / stats['total'], 4) if stats['total'] else None
+            for label, stats in per_class.items()
+        },
+        'latency_us': {
+            'mean': round(float(latencies_us.mean()), 1),
+            'p50': round(float(np.percentile(latencies_us, 50)), 1),
+            'p95': round(float(np.percentile(latencies_us, 95)), 1),
+            'p99': round(float(np.percentile(latencies_us, 99)), 1),
+        },
+    }
+
+
+def train_distilled_model(db_paths: List[str], model_dir: str = DEFAULT_MODEL_DIR,
+                          classifier: str = 'logreg', holdout: float = 0.1,
+                          n_features: int = 2 ** 18, teacher_pattern: str = '%roberta%',
+                          min_samples: int = 50) -> Dict[str, Any]:
+    """
+    Train the distilled tier from stored teacher labels and write a new artifact
+
+    Args:
+        db_paths: SQLite databases holding sentiment_analyses / analysis_results tables
+        model_dir: Directory receiving the versioned artifact
+        classifier: 'logreg' (logistic regression) or 'linear_svm'
+        holdout: Fraction of texts held out to measure teacher agreement; when no
+            text falls in it, agreement is measured on (up to 1000) training texts
+            and the report's evaluation_set says 'training'
+        n_features: Hashing space size
+        teacher_pattern: SQL LIKE pattern selecting teacher-labelled rows
+        min_samples: Minimum number of training texts required
+
+    Returns:
+        Training report with artifact path, agreement and latency figures
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.svm import LinearSVC
+
+    # Deduplicate texts; the latest stored label wins
+    labelled = dict(iter_teacher_labels(db_paths, teacher_pattern))
+    train = [(t, s) for t, s in labelled.items() if not _is_holdout(t, holdout)]
+    test = [(t, s) for t, s in labelled.items() if _is_holdout(t, holdout)]
+
+    if len(train) < min_samples:
+        raise ValueError(f"Not enough teacher-labelled texts to train ({len(train)} < {min_samples})")
+    if len({s for _, s in train}) < 2:
+        raise ValueError("Teacher labels contain a single class; cannot train")
+
+    vectorizer = build_vectorizer(n_features=n_features)
+    X = vectorizer.transform([t for t, _ in train])
+    y = [s for _, s in train]
+
+    start = time.time()
+    if classifier == 'linear_svm':
+        estimator = LinearSVC(C=0.5)
+    elif classifier == 'logreg':
+        estimator = LogisticRegression(C=4.0, max_iter=1000)
+    else:
+        raise ValueError(f"Unknown classifier: {classifier}")
+    estimator.fit(X, y)
+    train_seconds = time.time() - start
+
+    model = DistilledSentimentModel.from_estimator(
+        estimator, n_features,
+        extra_manifest={
+            'teacher_pattern': teacher_pattern,
+            'train_samples': len(train),
+            'holdout_samples': len(test),
+        }
+    )
+    artifact_path = model.save(model_dir)
+
+    # Evaluate the memory-mapped artifact exactly as it will be served
+    served = DistilledSentimentModel.load(artifact_path)
+    if test:
+        report = evaluate_model(served, test)
+        report['evaluation_set'] = 'holdout'
+    else:
+        logger.warning("⚠️  No held-out texts: teacher agreement is measured on training texts")
+        report = evaluate_model(served, train[:1000])
+        report['evaluation_set'] = 'training'
+    report.update({
+        'artifact': artifact_path,
+        'version': served.version,
+        'classifier': classifier,
+        'train_samples': len(train),
+        'train_seconds': round(train_seconds, 2),
+    })
+
+    served.manifest['evaluation'] = {k: report[k] for k in ('teacher_agreement', 'latency_us', 'samples',
+                                                            'evaluation_set')}
+    with open(os.path.join(artifact_path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(served.manifest, f, indent=2)
+
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description='Train the distilled sentiment fast tier from stored transformer labels')
+    parser.add_argument('--db', action='append', dest='db_paths',
+                        help='SQLite database with teacher labels (repeatable)')
+    parser.add_argument('--output', default=DEFAULT_MODEL_DIR, help='Model artifact directory')
+    parser.add_argument('--classifier', default='logreg', choices=['logreg', 'linear_svm'])
+    parser.add_argument('--holdout', type=float, default=0.1, help='Held-out fraction for agreement')
+    parser.add_argument('--features', type=int, default=18, help='log2 of the hashing space')
+    parser.add_argument('--teacher', default='%roberta%', help='SQL LIKE pattern for teacher rows')
+
+    args = parser.parse_args()
+    db_paths = args.db_paths or ['sentiment_analysis.db', 'sentiment_analytics.db']
+
+    report = train_distilled_model(
+        db_paths, args.output, classifier=args.classifier, holdout=args.holdout,
+        n_features=2 ** args.features, teacher_pattern=args.teacher
+    )
+
+    print(f"✅ Distilled model {report['version']} written to {report['artifact']}")
+    print(f"   Trained on {report['train_samples']} texts in {report['train_seconds']}s")
+    evaluated_on = 'held-out' if report['evaluation_set'] == 'holdout' else 'training (no held-out texts)'
+    print(f"   Teacher agreement: {report['teacher_agreement']:.2%} over {report['samples']} {evaluated_on} texts")
+    print(f"   Per-class agreement: {report['per_class_agreement']}")
+    print(f"   Latency per text (µs): {report['latency_us']}")
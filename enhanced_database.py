@@ -3,110 +3,68 @@ Enhanced Database Manager for Sentiment Analysis Dashboard
 Integrates with the existing dashboard while providing enhanced functionality
 """
 
-import sqlite3
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Iterable
 import logging
 
+from sqlite_pool import iter_chunks, BULK_CHUNK_SIZE
+from storage_engine import DEFAULT_DATABASE_URL, get_storage
+from migrations import apply_migrations
+from rollups import SENTIMENT_CUBE, HOUR_OF_DAY
+from summary_query import AnalyticsSummary, SummaryQuery, SENTIMENTS
+from pagination import decode_datetime_cursor
+from projections import ANALYSES
+from search_index import ANALYSIS_SEARCH, NEWS_SEARCH
+from streaming_export import export_cursor
+from kv_cache import SQLiteKVStore, get_cache
+
 logger = logging.getLogger(__name__)
 
 class EnhancedDatabaseManager:
     """Enhanced database manager compatible with existing dashboard"""
     
-    def __init__(self, db_path: str = "sentiment_analysis.db"):
+    # created_at repeats the timestamp (?8): the rollup cube and real_database's
+    # keyset pages read it, and tables upgraded in place have no default for it
+    _INSERT_ANALYSIS = """
+        INSERT INTO sentiment_analyses 
+        (text, sentiment, confidence, scores, model_used, processing_time, metadata, timestamp, hour, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?8)
+    """
+    
+    _ANALYSIS_COLUMNS = ('id', 'text', 'sentiment', 'confidence', 'scores', 'model_used',
+                         'processing_time', 'timestamp', 'metadata')
+    _NEWS_COLUMNS = ('id', 'title', 'content', 'url', 'source', 'published_date',
+                     'sentiment', 'confidence', 'timestamp')
+    
+    # Only columns of idx_sentiment_analyses_ts_cover, so the scan never touches the table
+    _SUMMARY_QUERY = SummaryQuery('sentiment_analyses', 'timestamp', {
+        'sentiment': 'sentiment', 'confidence': 'confidence', HOUR_OF_DAY: 'hour',
+    })
+    
+    def __init__(self, db_path: str = DEFAULT_DATABASE_URL):
         self.db_path = db_path
+        self.storage = get_storage(db_path)
+        if self.storage.backend != 'sqlite':
+            raise ValueError(f"EnhancedDatabaseManager needs a SQLite database, not {self.storage.backend}")
+        self.pool = self.storage.pool
+        # Analytics reads pass fresh=False to read the latest snapshot instead of the live file
+        self.snapshots = self.storage.snapshots
+        self.rollups_enabled = False
+        self.search_enabled = False
         self.init_database()
+        # Habit state and other analytics_cache reads are served from memory
+        self.cache = get_cache(SQLiteKVStore(self.pool, 'analytics_cache'))
     
     def init_database(self):
         """Initialize database tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Sentiment analysis results table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS sentiment_analyses (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        text TEXT NOT NULL,
-                        sentiment TEXT NOT NULL,
-                        confidence REAL NOT NULL,
-                        scores TEXT,  -- JSON string
-                        model_used TEXT,
-                        processing_time REAL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        metadata TEXT  -- JSON string for additional data
-                    )
-                """)
-                
-                # News articles table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS news_articles (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        title TEXT NOT NULL,
-                        content TEXT,
-                        url TEXT,
-                        source TEXT,
-                        published_date DATETIME,
-                        sentiment TEXT,
-                        confidence REAL,
-                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Analytics cache table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS analytics_cache (
-                        cache_key TEXT PRIMARY KEY,
-                        cache_data TEXT,  -- JSON string
-                        expires_at DATETIME
-                    )
-                """)
-                
-                # Habits tracking table
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS habits (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        goal_id TEXT NOT NULL UNIQUE,
-                        title TEXT NOT NULL,
-                        description TEXT,
-                        target INTEGER DEFAULT 1,
-                        icon TEXT DEFAULT 'fa-check',
-                        category TEXT DEFAULT 'general',
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        active BOOLEAN DEFAULT 1
-                    )
-                """)
-                
-                # Habit completions table for detailed tracking
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS habit_completions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        goal_id TEXT NOT NULL,
-                        completed_date DATE NOT NULL,
-                        progress INTEGER DEFAULT 1,
-                        notes TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(goal_id, completed_date)
-                    )
-                """)
-                
-                # Habit streaks table for performance tracking
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS habit_streaks (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        goal_id TEXT NOT NULL UNIQUE,
-                        current_streak INTEGER DEFAULT 0,
-                        longest_streak INTEGER DEFAULT 0,
-                        last_completed DATE,
-                        streak_start_date DATE,
-                        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                conn.commit()
-                logger.info("✅ Database initialized successfully")
+            self.storage.create_all()
+            apply_migrations(self.pool, 'enhanced')
+            with self.pool.read() as conn:
+                self.rollups_enabled = SENTIMENT_CUBE.is_installed(conn)
+                self.search_enabled = all(index.is_installed(conn) for index in (ANALYSIS_SEARCH, NEWS_SEARCH))
+            logger.info("✅ Database initialized successfully")
                 
         except Exception as e:
             logger.error(f"Database initialization failed: {e}")
@@ -115,147 +73,229 @@ class EnhancedDatabaseManager:
         """Flask app initialization compatibility"""
         pass
     
+    @staticmethod
+    def _analysis_row(result, extra: Dict[str, Any]) -> tuple:
+        """Build a sentiment_analyses row from a result object or legacy dictionary"""
+        # Same UTC format as the column's CURRENT_TIMESTAMP default, plus its stored hour bucket
+        now = datetime.utcnow()
+        stamp = (now.strftime('%Y-%m-%d %H:%M:%S'), now.hour)
+        
+        # Handle both enhanced and legacy result formats
+        if hasattr(result, 'sentiment'):
+            return (
+                result.text,
+                result.sentiment,
+                getattr(result, 'confidence', getattr(result, 'score', 0.0)),
+                json.dumps(getattr(result, 'scores', {})),
+                getattr(result, 'model_used', getattr(result, 'method', 'unknown')),
+                getattr(result, 'processing_time', 0.0),
+                json.dumps({
+                    'emotion_scores': getattr(result, 'emotion_scores', {}),
+                    'toxicity_score': getattr(result, 'toxicity_score', 0.0),
+                    **extra
+                })
+            ) + stamp
+        # Legacy dictionary format
+        return (
+            result.get('text', ''),
+            result.get('sentiment', 'neutral'),
+            result.get('confidence', 0.0),
+            json.dumps(result.get('scores', {})),
+            result.get('model_used', 'unknown'),
+            result.get('processing_time', 0.0),
+            json.dumps(extra)
+        ) + stamp
+    
     def save_sentiment_analysis(self, result, **kwargs):
         """Save sentiment analysis result"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
-                
-                # Handle both enhanced and legacy result formats
-                if hasattr(result, 'sentiment'):
-                    text = result.text
-                    sentiment = result.sentiment
-                    confidence = getattr(result, 'confidence', getattr(result, 'score', 0.0))
-                    scores = json.dumps(getattr(result, 'scores', {}))
-                    model_used = getattr(result, 'model_used', getattr(result, 'method', 'unknown'))
-                    processing_time = getattr(result, 'processing_time', 0.0)
-                    metadata = json.dumps({
-                        'emotion_scores': getattr(result, 'emotion_scores', {}),
-                        'toxicity_score': getattr(result, 'toxicity_score', 0.0),
-                        **kwargs
-                    })
-                else:
-                    # Legacy dictionary format
-                    text = result.get('text', '')
-                    sentiment = result.get('sentiment', 'neutral')
-                    confidence = result.get('confidence', 0.0)
-                    scores = json.dumps(result.get('scores', {}))
-                    model_used = result.get('model_used', 'unknown')
-                    processing_time = result.get('processing_time', 0.0)
-                    metadata = json.dumps(kwargs)
-                
-                cursor.execute("""
-                    INSERT INTO sentiment_analyses 
-                    (text, sentiment, confidence, scores, model_used, processing_time, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (text, sentiment, confidence, scores, model_used, processing_time, metadata))
-                
-                conn.commit()
+                cursor.execute(self._INSERT_ANALYSIS, self._analysis_row(result, kwargs))
                 return cursor.lastrowid
                 
         except Exception as e:
             logger.error(f"Failed to save sentiment analysis: {e}")
             return None
     
-    def get_recent_analyses(self, limit=50, offset=0):
-        """Get recent sentiment analyses"""
+    def save_sentiment_analyses(self, results: Iterable, chunk_size: int = BULK_CHUNK_SIZE, **kwargs) -> int:
+        """
+        Save many sentiment analysis results in one transaction
+        
+        Accepts any iterable (including generators) of result objects or legacy
+        dictionaries; keyword arguments are stored in every row's metadata.
+        Returns the number of rows written, or 0 if the batch was rolled back.
+        """
+        try:
+            saved = 0
+            with self.pool.write() as conn:
+                for chunk in iter_chunks(results, chunk_size):
+                    conn.executemany(self._INSERT_ANALYSIS,
+                                     [self._analysis_row(result, kwargs) for result in chunk])
+                    saved += len(chunk)
+            return saved
+                
+        except Exception as e:
+            logger.error(f"Failed to save sentiment analyses: {e}")
+            return 0
+    
+    def get_recent_analyses(self, limit=50, offset=0, cursor=None, fresh=True, view=None):
+        """
+        Get recent sentiment analyses
+        
+        With a cursor (pagination.next_cursor(page, limit, 'timestamp')) the next page
+        is found by seeking the (timestamp, id) index rather than skipping offset rows.
+        A view ('list', 'history'; see projections.ANALYSES) reads only its columns,
+        as namedtuple rows, leaving text and JSON columns to load_analysis_details().
+        fresh=False reads the latest read snapshot instead of the live database, for
+        analytics and reports that scan many rows.
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            if cursor:
+                # Back to the stored text form: view rows carry the timestamp as a datetime
+                moment, item_id = decode_datetime_cursor(cursor)
+                where, params = "WHERE (timestamp, id) < (?, ?)", (moment.strftime('%Y-%m-%d %H:%M:%S'), item_id, limit)
+            else:
+                where, params = "", (limit, offset)
+            with self.snapshots.read(fresh) as conn:
+                if view:
+                    return ANALYSES.fetch(conn, view, f"{where} ORDER BY timestamp DESC, id DESC "
+                                                      f"LIMIT ? {'' if where else 'OFFSET ?'}", params)
                 cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, text, sentiment, confidence, scores, model_used, 
-                           processing_time, timestamp, metadata
+                cursor.execute(f"""
+                    SELECT {', '.join(self._ANALYSIS_COLUMNS)}
                     FROM sentiment_analyses 
-                    ORDER BY timestamp DESC 
-                    LIMIT ? OFFSET ?
-                """, (limit, offset))
-                
-                results = []
-                for row in cursor.fetchall():
-                    try:
-                        scores = json.loads(row[4]) if row[4] else {}
-                        metadata = json.loads(row[8]) if row[8] else {}
-                    except:
-                        scores = {}
-                        metadata = {}
-                    
-                    results.append({
-                        'id': row[0],
-                        'text': row[1],
-                        'sentiment': row[2],
-                        'confidence': row[3],
-                        'scores': scores,
-                        'model_used': row[5],
-                        'processing_time': row[6],
-                        'timestamp': row[7],
-                        'metadata': metadata
-                    })
+                    {where}
+                    ORDER BY timestamp DESC, id DESC 
+                    LIMIT ? {'' if where else 'OFFSET ?'}
+                """, params)
                 
-                return results
+                return [self._analysis_dict(row) for row in cursor.fetchall()]
                 
         except Exception as e:
             logger.error(f"Failed to get recent analyses: {e}")
             return []
     
-    def get_analytics_summary(self, days=7):
-        """Get analytics summary for dashboard"""
+    def load_analysis_details(self, ids, columns=None) -> Dict[int, Any]:
+        """Deferred columns (text, scores, metadata, ...) of listed analyses, {id: row}, in batched queries"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get date range
-                end_date = datetime.now()
-                start_date = end_date - timedelta(days=days)
-                
-                # Total analyses
-                cursor.execute("""
-                    SELECT COUNT(*) FROM sentiment_analyses 
-                    WHERE timestamp >= ?
-                """, (start_date,))
-                total_analyses = cursor.fetchone()[0]
-                
-                # Sentiment distribution
-                cursor.execute("""
-                    SELECT sentiment, COUNT(*) FROM sentiment_analyses 
-                    WHERE timestamp >= ?
-                    GROUP BY sentiment
-                """, (start_date,))
-                
-                sentiment_dist = {'positive': 0, 'negative': 0, 'neutral': 0}
-                for sentiment, count in cursor.fetchall():
-                    sentiment_dist[sentiment] = count
-                
-                # Average confidence
-                cursor.execute("""
-                    SELECT AVG(confidence) FROM sentiment_analyses 
-                    WHERE timestamp >= ?
-                """, (start_date,))
-                avg_confidence = cursor.fetchone()[0] or 0.0
-                
-                # Hourly analysis for trends
-                cursor.execute("""
-                    SELECT strftime('%H', timestamp) as hour, COUNT(*) 
-                    FROM sentiment_analyses 
-                    WHERE timestamp >= ?
-                    GROUP BY hour
-                    ORDER BY hour
-                """, (start_date,))
-                
-                hourly_data = {}
-                for hour, count in cursor.fetchall():
-                    hourly_data[int(hour)] = count
-                
-                return {
-                    'total_analyses': total_analyses,
-                    'sentiment_distribution': sentiment_dist,
-                    'average_confidence': round(avg_confidence, 3),
-                    'hourly_data': hourly_data,
-                    'date_range': {
-                        'start': start_date.isoformat(),
-                        'end': end_date.isoformat()
-                    }
+            with self.pool.read() as conn:
+                return ANALYSES.load_deferred(conn, ids, columns)
+        except Exception as e:
+            logger.error(f"Failed to load analysis details: {e}")
+            return {}
+    
+    @staticmethod
+    def _analysis_dict(row) -> Dict[str, Any]:
+        """sentiment_analyses row (in _ANALYSIS_COLUMNS order) with its JSON columns decoded"""
+        try:
+            scores = json.loads(row[4]) if row[4] else {}
+            metadata = json.loads(row[8]) if row[8] else {}
+        except:
+            scores = {}
+            metadata = {}
+        
+        return {
+            'id': row[0],
+            'text': row[1],
+            'sentiment': row[2],
+            'confidence': row[3],
+            'scores': scores,
+            'model_used': row[5],
+            'processing_time': row[6],
+            'timestamp': row[7],
+            'metadata': metadata
+        }
+    
+    def search_analyses(self, query, sentiment_filter=None, model_filter=None, limit=50, prefix=True):
+        """
+        Full-text search over analysed texts, best BM25 match first
+        
+        Each result carries 'rank' and a 'snippet' with <mark> highlights; the last
+        word also matches as a prefix unless prefix=False.
+        """
+        try:
+            with self.pool.read() as conn:
+                if self.search_enabled:
+                    hits = ANALYSIS_SEARCH.search(conn, query, limit, prefix, select=self._ANALYSIS_COLUMNS[1:],
+                                                  sentiment=sentiment_filter, model_used=model_filter)
+                    return [dict(self._analysis_dict([hit[c] for c in self._ANALYSIS_COLUMNS]),
+                                 rank=hit['rank'], snippet=hit['snippet']) for hit in hits]
+                
+                where, params = ["text LIKE ?"], [f"%{query}%"]
+                for column, value in (('sentiment', sentiment_filter), ('model_used', model_filter)):
+                    if value is not None:
+                        where.append(f"{column} = ?")
+                        params.append(value)
+                rows = conn.execute(f"""
+                    SELECT {', '.join(self._ANALYSIS_COLUMNS)} FROM sentiment_analyses
+                    WHERE {' AND '.join(where)} ORDER BY timestamp DESC, id DESC LIMIT ?
+                """, (*params, limit)).fetchall()
+                return [self._analysis_dict(row) for row in rows]
+        
+        except Exception as e:
+            logger.error(f"Failed to search analyses: {e}")
+            return []
+    
+    def search_news(self, query, sentiment_filter=None, source_filter=None, limit=20, prefix=True):
+        """Full-text search over news titles and content (titles weigh more in the ranking)"""
+        try:
+            with self.pool.read() as conn:
+                if self.search_enabled:
+                    return NEWS_SEARCH.search(conn, query, limit, prefix, select=self._NEWS_COLUMNS[1:],
+                                              sentiment=sentiment_filter, source=source_filter)
+                
+                where, params = ["(title LIKE ? OR content LIKE ?)"], [f"%{query}%", f"%{query}%"]
+                for column, value in (('sentiment', sentiment_filter), ('source', source_filter)):
+                    if value is not None:
+                        where.append(f"{column} = ?")
+                        params.append(value)
+                rows = conn.execute(f"""
+                    SELECT {', '.join(self._NEWS_COLUMNS)} FROM news_articles
+                    WHERE {' AND '.join(where)} ORDER BY timestamp DESC, id DESC LIMIT ?
+                """, (*params, limit)).fetchall()
+                return [dict(zip(self._NEWS_COLUMNS, row)) for row in rows]
+        
+        except Exception as e:
+            logger.error(f"Failed to search news articles: {e}")
+            return []
+    
+    def analytics_summary(self, start: datetime, end: Optional[datetime] = None,
+                          group_by=(HOUR_OF_DAY,), pivot=None) -> AnalyticsSummary:
+        """
+        Typed summary from the rollup cube for open-ended windows, otherwise one scan
+        of the raw table with sentiment counted by conditional aggregation
+        """
+        pivot = {'sentiment': SENTIMENTS} if pivot is None else pivot
+        with self.pool.read() as conn:
+            if end is None and self.rollups_enabled:
+                rows = SENTIMENT_CUBE.aggregate(conn, start, group_by=tuple(group_by) + tuple(pivot))
+                return AnalyticsSummary.from_rows(rows, start, from_rollups=True)
+            return self._SUMMARY_QUERY.run(conn.execute, start, end, group_by, pivot=pivot)
+    
+    def get_analytics_summary(self, days=7, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """Get analytics summary for dashboard (last `days` days, or an explicit [start, end) range)"""
+        try:
+            # Get date range
+            end_date = end or datetime.now()
+            start_date = start or end_date - timedelta(days=days)
+            
+            summary = self.analytics_summary(start_date, end)
+            
+            sentiment_dist = {'positive': 0, 'negative': 0, 'neutral': 0}
+            sentiment_dist.update(summary.by_sentiment)
+            
+            return {
+                'total_analyses': summary.total,
+                'sentiment_distribution': sentiment_dist,
+                'average_confidence': round(summary.average_confidence, 3),
+                'hourly_data': summary.by_hour,
+                'date_range': {
+                    'start': start_date.isoformat(),
+                    'end': end_date.isoformat()
                 }
-                
+            }
+            
         except Exception as e:
             logger.error(f"Failed to get analytics summary: {e}")
             return {
@@ -269,20 +309,19 @@ class EnhancedDatabaseManager:
     def get_dashboard_summary(self):
         """Get dashboard summary statistics"""
         try:
-            analytics = self.get_analytics_summary(days=30)
+            summary = self.analytics_summary(datetime.now() - timedelta(days=30), group_by=())
             
             # Calculate additional metrics
-            total = analytics['total_analyses']
-            sentiment_dist = analytics['sentiment_distribution']
+            total = summary.total
             
-            positive_ratio = sentiment_dist['positive'] / max(total, 1)
-            negative_ratio = sentiment_dist['negative'] / max(total, 1)
+            positive_ratio = summary.by_sentiment.get('positive', 0) / max(total, 1)
+            negative_ratio = summary.by_sentiment.get('negative', 0) / max(total, 1)
             
             return {
                 'total_processed': total,
                 'positive_ratio': round(positive_ratio, 3),
                 'negative_ratio': round(negative_ratio, 3),
-                'average_confidence': analytics['average_confidence'],
+                'average_confidence': round(summary.average_confidence, 3),
                 'trending_sentiment': 'positive' if positive_ratio > 0.5 else 'negative' if negative_ratio > 0.3 else 'neutral',
                 'daily_volume': round(total / 30, 1),
                 'last_updated': datetime.now().isoformat()
@@ -303,13 +342,13 @@ class EnhancedDatabaseManager:
     def save_news_article(self, article_data):
         """Save news article with sentiment analysis"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
                     INSERT INTO news_articles 
-                    (title, content, url, source, published_date, sentiment, confidence)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    (title, content, url, source, published_date, sentiment, confidence, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
                 """, (
                     article_data.get('title', ''),
                     article_data.get('content', ''),
@@ -319,28 +358,31 @@ class EnhancedDatabaseManager:
                     article_data.get('sentiment', 'neutral'),
                     article_data.get('confidence', 0.0)
                 ))
-                
-                conn.commit()
                 return cursor.lastrowid
                 
         except Exception as e:
             logger.error(f"Failed to save news article: {e}")
             return None
     
+    def export_stream(self, format='ndjson', days=30, compression=None, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Stream analyses of the last `days` days as byte chunks (ndjson, csv or parquet)
+        
+        Rows are read with fetchmany() while the consumer writes them out, so memory
+        stays flat; the pooled reader is held until the iterator is exhausted or closed.
+        """
+        since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+        with self.pool.read() as conn:
+            cursor = conn.execute(f"""
+                SELECT {', '.join(self._ANALYSIS_COLUMNS)} FROM sentiment_analyses
+                WHERE timestamp >= ? ORDER BY timestamp, id
+            """, (since,))
+            yield from export_cursor(cursor, format, compression, chunk_size)
+    
     def get_cached_data(self, cache_key):
         """Get cached analytics data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT cache_data FROM analytics_cache 
-                    WHERE cache_key = ? AND expires_at > ?
-                """, (cache_key, datetime.now()))
-                
-                result = cursor.fetchone()
-                if result:
-                    return json.loads(result[0])
-                return None
+            return self.cache.get(cache_key)
                 
         except Exception as e:
             logger.error(f"Failed to get cached data: {e}")
@@ -349,17 +391,7 @@ class EnhancedDatabaseManager:
     def set_cached_data(self, cache_key, data, ttl_minutes=60):
         """Set cached analytics data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                expires_at = datetime.now() + timedelta(minutes=ttl_minutes)
-                
-                cursor.execute("""
-                    INSERT OR REPLACE INTO analytics_cache 
-                    (cache_key, cache_data, expires_at)
-                    VALUES (?, ?, ?)
-                """, (cache_key, json.dumps(data), expires_at))
-                
-                conn.commit()
+            self.cache.set(cache_key, data, ttl=ttl_minutes * 60)
                 
         except Exception as e:
             logger.error(f"Failed to set cached data: {e}")
@@ -368,7 +400,7 @@ class EnhancedDatabaseManager:
                     icon: str = "fa-check", category: str = "general") -> Optional[int]:
         """Create a new habit"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 cursor.execute("""
@@ -381,8 +413,6 @@ class EnhancedDatabaseManager:
                     INSERT INTO habit_streaks (goal_id, current_streak, longest_streak)
                     VALUES (?, 0, 0)
                 """, (goal_id,))
-                
-                conn.commit()
                 return cursor.lastrowid
                 
         except Exception as e:
@@ -392,7 +422,7 @@ class EnhancedDatabaseManager:
     def get_habits(self, active_only: bool = True) -> List[Dict]:
         """Get all habits"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.read() as conn:
                 cursor = conn.cursor()
                 
                 query = """
@@ -433,7 +463,7 @@ class EnhancedDatabaseManager:
             date = datetime.now().strftime('%Y-%m-%d')
             
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.write() as conn:
                 cursor = conn.cursor()
                 
                 # Insert completion record
@@ -445,8 +475,6 @@ class EnhancedDatabaseManager:
                 
                 # Update streak information
                 self._update_habit_streak(cursor, goal_id, date)
-                
-                conn.commit()
                 return True
                 
         except Exception as e:
@@ -502,7 +530,7 @@ class EnhancedDatabaseManager:
     def get_habit_completions(self, goal_id: str = None, days: int = 30) -> List[Dict]:
         """Get habit completion history"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.read() as conn:
                 cursor = conn.cursor()
                 
                 cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
@@ -545,7 +573,7 @@ class EnhancedDatabaseManager:
     def get_habits_summary(self) -> Dict:
         """Get habits summary statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.read() as conn:
                 cursor = conn.cursor()
                 
                 today = datetime.now().strftime('%Y-%m-%d')
@@ -584,7 +612,7 @@ class EnhancedDatabaseManager:
     def get_recent_sentiment_analyses(self, days: int = 7) -> List[Dict]:
         """Get recent sentiment analyses"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.read() as conn:
                 cursor = conn.cursor()
                 
                 cutoff_date = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,196 @@
+"""
+Binary JSON Column Codec
+Compact binary storage for JSON-valued columns (msgpack when installed, otherwise
+compact JSON; zstd or zlib for larger values), decoded only when a reader asks,
+with stored projections of the value that can be indexed and filtered in SQL
+
+Usage:
+    python json_codec.py sentiment_analytics.db analysis_results metadata    # size report
+"""
+
+import json
+import zlib
+import logging
+from typing import Any, Callable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Header byte: high nibble is the serialization, low nibble the compression.
+# Legacy rows hold JSON text, which sqlite3 returns as str rather than bytes.
+_JSON, _MSGPACK = 0x10, 0x20
+_RAW, _ZLIB, _ZSTD = 0x0, 0x1, 0x2
+
+# Smaller payloads are stored uncompressed (the frame overhead outweighs the gain)
+COMPRESS_MIN_BYTES = 128
+
+if ZSTD_AVAILABLE:
+    _zstd_compress = zstandard.ZstdCompressor(level=3).compress
+    _zstd_decompress = zstandard.ZstdDecompressor().decompress
+
+
+def _serialize(value: Any) -> bytes:
+    if MSGPACK_AVAILABLE:
+        try:
+            return bytes([_MSGPACK]) + msgpack.packb(value, use_bin_type=True)
+        except (TypeError, ValueError):
+            pass  # e.g. datetimes: fall back to JSON's default=str below
+    return bytes([_JSON]) + json.dumps(value, separators=(',', ':'), ensure_ascii=False,
+                                       default=str).encode('utf-8')
+
+
+def encode(value: Any) -> Optional[bytes]:
+    """Binary column value for a JSON-compatible value (None stays NULL)"""
+    if value is None:
+        return None
+    data = _serialize(value)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        if ZSTD_AVAILABLE:
+            packed, method = _zstd_compress(data[1:]), _ZSTD
+        else:
+            packed, method = zlib.compress(data[1:], 6), _ZLIB
+        if len(packed) + 1 < len(data):
+            return bytes([data[0] | method]) + packed
+    return data
+
+
+def decode(stored: Any) -> Any:
+    """Value of a column written by encode(), or by the older json.dumps() text path"""
+    if stored is None:
+        return None
+    if isinstance(stored, str):
+        return json.loads(stored) if stored else None
+    stored = bytes(stored)
+    header, payload = stored[0], stored[1:]
+    method = header & 0x0F
+    if method == _ZLIB:
+        payload = zlib.decompress(payload)
+    elif method == _ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("value was compressed with zstd, which requires the zstandard package")
+        payload = _zstd_decompress(payload)
+    if header & 0xF0 == _MSGPACK:
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("value was encoded with msgpack, which requires the msgpack package")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(payload)
+
+
+def to_json_text(stored: Any) -> Optional[str]:
+    """JSON text for a stored value, for consumers that expect text (archives, exports)"""
+    if stored is None or isinstance(stored, str):
+        return stored
+    return json.dumps(decode(stored), ensure_ascii=False)
+
+
+class Projection:
+    """
+    A scalar derived from a JSON column and stored beside it
+
+    extract computes it from the decoded value when a row is written; legacy_sql
+    computes it from the column's JSON text when existing rows are backfilled.
+    """
+
+    def __init__(self, column: str, extract: Callable[[Any], Any], legacy_sql: str, col_type: str = 'TEXT'):
+        self.column = column
+        self.extract = extract
+        self.legacy_sql = legacy_sql
+        self.col_type = col_type
+
+
+def key_projection(column: str, source: str, key: str) -> Projection:
+    """Projection of one top-level key of a JSON object"""
+    return Projection(
+        column,
+        lambda value: value.get(key) if isinstance(value, dict) else None,
+        f"CASE WHEN typeof({source}) = 'text' AND json_valid({source}) "
+        f"AND json_type({source}) = 'object' THEN json_extract({source}, '$.{key}') END",
+    )
+
+
+def dominant_projection(column: str, source: str) -> Projection:
+    """First label of a list, or highest-scoring key of a {label: score} object"""
+    def extract(value):
+        if isinstance(value, list):
+            return str(value[0]) if value else None
+        if isinstance(value, dict) and value:
+            return max(value, key=lambda label: value[label] if isinstance(value[label], (int, float)) else 0)
+        return None
+
+    return Projection(
+        column, extract,
+        f"CASE WHEN typeof({source}) = 'text' AND json_valid({source}) "
+        f"AND json_type({source}) = 'array' THEN json_extract({source}, '$[0]') END",
+    )
+
+
+class JSONColumn:
+    """A JSON-valued column of one table, stored with encode() plus its projections"""
+
+    def __init__(self, table: str, column: str, projections: Sequence[Projection] = ()):
+        self.table = table
+        self.column = column
+        self.projections = list(projections)
+
+    @property
+    def columns(self) -> List[str]:
+        """The stored column followed by its projection columns, in values() order"""
+        return [self.column] + [p.column for p in self.projections]
+
+    def values(self, value: Any) -> tuple:
+        """Encoded value and projections for one row"""
+        return (encode(value),) + tuple(p.extract(value) for p in self.projections)
+
+
+# ---------------------------------------------------------------------------
+# Encoded columns of the application's tables
+# ---------------------------------------------------------------------------
+
+# database_manager.analysis_results
+ANALYSIS_METADATA = JSONColumn('analysis_results', 'metadata', [
+    key_projection('model', 'metadata', 'model'),
+    key_projection('language', 'metadata', 'language'),
+])
+
+# database.comment_analyses / video_analyses (video_analyses.dominant_emotion is its own field)
+COMMENT_EMOTIONS = JSONColumn('comment_analyses', 'emotions', [dominant_projection('dominant_emotion', 'emotions')])
+VIDEO_EMOTIONS = JSONColumn('video_analyses', 'video_emotions')
+
+
+def size_report(conn, table: str, column: str) -> dict:
+    """Bytes the column takes as stored versus as JSON text and as encode() output"""
+    stored = text = encoded = rows = 0
+    for (value,) in conn.execute(f"SELECT {column} FROM {table} WHERE {column} IS NOT NULL"):
+        decoded = decode(value)
+        stored += len(value.encode('utf-8') if isinstance(value, str) else value)
+        text += len(json.dumps(decoded).encode('utf-8'))
+        encoded += len(encode(decoded))
+        rows += 1
+    return {'rows': rows, 'stored_bytes': stored, 'json_text_bytes': text, 'encoded_bytes': encoded,
+            'msgpack': MSGPACK_AVAILABLE, 'zstd': ZSTD_AVAILABLE}
+
+
+if __name__ == '__main__':
+    import argparse
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='Report the storage size of a JSON column')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('table')
+    parser.add_argument('column')
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db_path)
+    print(size_report(connection, args.table, args.column))
+    connection.close()
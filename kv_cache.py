@@ -0,0 +1,356 @@
+"""
+Two-Level Key/Value Cache
+In-process LRU (L1) in front of a SQLite cache table (L2), with a min-heap expiry
+index that reaps expired keys ahead of reads, single-flight loading of misses and
+write-through or write-back persistence
+"""
+
+import os
+import json
+import time
+import heapq
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How set() reaches L2: 'write-through' writes before returning, 'write-back'
+# buffers dirty keys and writes them in one transaction per flush
+CACHE_MODES = ('write-through', 'write-back')
+
+
+class SQLiteKVStore:
+    """
+    Second level: one key/value/expiry table of a pooled SQLite database
+
+    Expiry times are bound as datetimes (the format the managers always used), so
+    rows written before the cache existed are read back unchanged.
+    """
+
+    def __init__(self, pool, table: str, key_column: str = 'cache_key', value_column: str = 'cache_data',
+                 expiry_column: str = 'expires_at', created_column: Optional[str] = None,
+                 encode: Callable[[Any], str] = json.dumps, decode: Callable[[str], Any] = json.loads):
+        self.pool = pool
+        self.table = table
+        self.encode = encode
+        self.decode = decode
+        columns = [key_column, value_column, expiry_column] + ([created_column] if created_column else [])
+        self._select = (f"SELECT {value_column}, {expiry_column} FROM {table} "
+                        f"WHERE {key_column} = ? AND {expiry_column} > ?")
+        self._upsert = (f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                        f"VALUES ({', '.join('?' * len(columns))})")
+        self._delete = f"DELETE FROM {table} WHERE {key_column} = ?"
+        self._purge = f"DELETE FROM {table} WHERE {expiry_column} <= ?"
+        self._with_created = created_column is not None
+
+    def load(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, expiry epoch seconds) of an unexpired row, or None"""
+        with self.pool.read() as conn:
+            row = conn.execute(self._select, (key, datetime.now())).fetchone()
+        if row is None:
+            return None
+        expires_at = row[1] if isinstance(row[1], datetime) else datetime.fromisoformat(row[1])
+        return self.decode(row[0]), expires_at.timestamp()
+
+    def store_many(self, items: Sequence[Tuple[str, Any, float]]):
+        """Upsert (key, value, expiry epoch seconds) items in one transaction"""
+        now = datetime.now()
+        rows = []
+        for key, value, expires_at in items:
+            row = (key, self.encode(value), datetime.fromtimestamp(expires_at))
+            rows.append(row + (now,) if self._with_created else row)
+        with self.pool.write() as conn:
+            conn.executemany(self._upsert, rows)
+
+    def delete(self, key: str):
+        with self.pool.write() as conn:
+            conn.execute(self._delete, (key,))
+
+    def purge_expired(self) -> int:
+        with self.pool.write() as conn:
+            return conn.execute(self._purge, (datetime.now(),)).rowcount
+
+
+class _Flight:
+    """One in-progress L2 load that concurrent misses for the same key wait on"""
+
+    __slots__ = ('event', 'value', 'error', 'stale')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error: Optional[BaseException] = None
+        self.stale = False  # set()/delete() ran while loading: don't install the result
+
+
+class TieredCache:
+    """
+    LRU cache in front of a SQLiteKVStore
+
+    Every L1 entry has a record in a min-heap ordered by expiry; each call pops the
+    expired head records (and a background thread does so every reap_interval), so
+    expired keys leave memory without waiting for a read. Re-set keys leave stale
+    heap records behind, which are skipped on pop and compacted away. Values are
+    returned as stored; callers that mutate one should set() it again.
+    """
+
+    def __init__(self, store: SQLiteKVStore, max_entries: int = 1024, default_ttl: float = 3600.0,
+                 mode: str = 'write-through', max_dirty: int = 1000, reap_interval: float = 1.0,
+                 purge_interval: float = 300.0, name: str = 'kv-cache', clock: Callable[[], float] = time.time):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"mode must be one of {CACHE_MODES}")
+        self.store = store
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.mode = mode
+        self.max_dirty = max_dirty
+        self.reap_interval = reap_interval
+        self.purge_interval = purge_interval
+        self.name = name
+        self.clock = clock
+
+        self._entries: 'OrderedDict[str, Tuple[Any, float]]' = OrderedDict()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._dirty: Dict[str, Tuple[Any, float]] = {}
+        self._flushing: Dict[str, Tuple[Any, float]] = {}
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._next_purge = 0.0
+
+        self.stats = {
+            'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'loads': 0, 'coalesced': 0,
+            'sets': 0, 'evictions': 0, 'expired': 0, 'flushes': 0, 'l2_writes': 0, 'l2_purged': 0,
+        }
+
+    # Reads
+
+    def get(self, key: str, loader: Optional[Callable[[], Any]] = None, ttl: Optional[float] = None) -> Any:
+        """
+        Value of key from L1, else L2, else loader() (which is then set with ttl)
+
+        Concurrent misses for one key share a single L2 lookup and loader call.
+        """
+        with self._lock:
+            now = self.clock()
+            self._reap_locked(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                # Evicted but not yet written back
+                entry = self._dirty.get(key) or self._flushing.get(key)
+                if entry is not None and entry[1] > now:
+                    self._install_locked(key, entry[0], entry[1])
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.stats['l1_hits'] += 1
+                return entry[0]
+
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats['coalesced'] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = self._load(key, flight, loader, ttl)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.value
+
+    def _load(self, key: str, flight: _Flight, loader: Optional[Callable[[], Any]], ttl: Optional[float]) -> Any:
+        found = self.store.load(key)
+        with self._lock:
+            if found is not None:
+                self.stats['l2_hits'] += 1
+                if flight.stale:
+                    entry = self._entries.get(key)
+                    return entry[0] if entry is not None else found[0]
+                self._install_locked(key, *found)
+                return found[0]
+            self.stats['misses'] += 1
+        if loader is None:
+            return None
+        value = loader()
+        with self._lock:
+            self.stats['loads'] += 1
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    # Writes
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value for ttl seconds (default_ttl) in L1 and, per mode, in L2"""
+        expires_at = self.clock() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self.stats['sets'] += 1
+            self._install_locked(key, value, expires_at)
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.stale = True
+            if self.mode == 'write-back':
+                self._dirty[key] = (value, expires_at)
+                if len(self._dirty) < self.max_dirty:
+                    return
+        if self.mode == 'write-back':
+            self.flush()
+        else:
+            self.store.store_many([(key, value, expires_at)])
+            self.stats['l2_writes'] += 1
+
+    def delete(self, key: str):
+        """Remove key from both levels (including any unflushed write)"""
+        with self._flush_lock:
+            with self._lock:
+                self._entries.pop(key, None)
+                self._dirty.pop(key, None)
+                flight = self._flights.get(key)
+                if flight is not None:
+                    flight.stale = True
+            self.store.delete(key)
+
+    def flush(self) -> int:
+        """Write every dirty key to L2 in one transaction; returns how many"""
+        with self._flush_lock:
+            with self._lock:
+                dirty = self._flushing = self._dirty
+                self._dirty = {}
+            if not dirty:
+                return 0
+            try:
+                self.store.store_many([(key, value, expires_at) for key, (value, expires_at) in dirty.items()])
+            except Exception:
+                with self._lock:
+                    # Keep the failed writes unless a newer set() superseded them
+                    for key, entry in dirty.items():
+                        self._dirty.setdefault(key, entry)
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+            self.stats['flushes'] += 1
+            self.stats['l2_writes'] += len(dirty)
+            return len(dirty)
+
+    # L1 bookkeeping (called with _lock held)
+
+    def _install_locked(self, key: str, value: Any, expires_at: float):
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        self._seq += 1
+        heapq.heappush(self._heap, (expires_at, self._seq, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # dirty values stay in _dirty until flushed
+            self.stats['evictions'] += 1
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(expires, 0, k) for k, (_, expires) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _reap_locked(self, now: float) -> int:
+        reaped = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._heap)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[key]
+                reaped += 1
+        self.stats['expired'] += reaped
+        return reaped
+
+    def reap(self) -> int:
+        """Drop expired L1 entries; returns how many"""
+        with self._lock:
+            return self._reap_locked(self.clock())
+
+    # Background maintenance
+
+    def start(self) -> 'TieredCache':
+        """Start the reaper thread (flushes write-back keys too) and flush on exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.reap_interval):
+            try:
+                self.reap()
+                self.flush()
+                if time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + self.purge_interval
+                    self.stats['l2_purged'] += self.store.purge_expired()
+            except Exception as e:
+                logger.error(f"❌ {self.name} maintenance failed: {e}")
+
+    def close(self):
+        """Stop the reaper and write any buffered keys"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"❌ {self.name} final flush failed: {e}")
+
+    def hit_rates(self) -> Dict[str, float]:
+        """Fraction of lookups served by L1, of L1 misses served by L2, and overall"""
+        l1, l2 = self.stats['l1_hits'], self.stats['l2_hits']
+        lookups = l1 + l2 + self.stats['misses'] + self.stats['coalesced']
+        l2_lookups = l2 + self.stats['misses']
+        return {
+            'l1': round(l1 / lookups, 4) if lookups else 0.0,
+            'l2': round(l2 / l2_lookups, 4) if l2_lookups else 0.0,
+            'overall': round((l1 + l2) / lookups, 4) if lookups else 0.0,
+        }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'dirty': len(self._dirty),
+                    'mode': self.mode, 'hit_rates': self.hit_rates()}
+
+
+_caches: Dict[Tuple[str, str], TieredCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(store: SQLiteKVStore, **options) -> TieredCache:
+    """Return the shared (started) cache for a store's table, creating it on first use"""
+    if store.pool.in_memory:
+        # Like its pool, an in-memory database's cache is private to the caller
+        return TieredCache(store, **options).start()
+
+    key = (os.path.abspath(store.pool.db_path), store.table)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = TieredCache(store, name=f"kv-cache:{store.table}", **options).start()
+            _caches[key] = cache
+        return cache
+
+
+def close_all_caches():
+    """Flush and stop every shared cache (used on shutdown and in tests)"""
+    with _caches_lock:
+        for cache in _caches.values():
+            cache.close()
+        _caches.clear()
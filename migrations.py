@@ -0,0 +1,326 @@
+"""
+Schema Migrations
+Versioned per-schema migrations for every SQLite database, and an EXPLAIN QUERY PLAN
+based index advisor used to keep hot queries off full-table scans
+
+Usage:
+    python migrations.py sentiment_analytics.db analytics            # apply pending migrations
+    python migrations.py sentiment_analytics.db analytics --status
+    python migrations.py sentiment_analytics.db analytics --explain "SELECT ... WHERE timestamp > '2024-01-01'"
+"""
+
+import re
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Union
+
+from rollups import (ANALYSIS_CUBE, API_LATENCY_CUBE, API_USAGE_CUBE, SENTIMENT_CUBE, install_cube,
+                     refresh_cube_trigger)
+from search_index import ANALYSIS_SEARCH, NEWS_SEARCH, install_search_index
+from json_codec import ANALYSIS_METADATA, COMMENT_EMOTIONS, JSONColumn
+from content_store import install_content_store
+from timeseries import import_metrics_table, install_timeseries
+
+logger = logging.getLogger(__name__)
+
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+class Migration:
+    """One schema version: a list of SQL statements or callables run in a single transaction"""
+
+    def __init__(self, version: int, description: str, steps: Sequence[Step]):
+        self.version = version
+        self.description = description
+        self.steps = list(steps)
+
+    def apply(self, conn: sqlite3.Connection):
+        for step in self.steps:
+            if callable(step):
+                step(conn)
+            else:
+                conn.execute(step)
+
+
+# ---------------------------------------------------------------------------
+# Step helpers (each one skips cleanly if the table it targets has another shape)
+# ---------------------------------------------------------------------------
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def create_index(name: str, table: str, *columns: str) -> Step:
+    """CREATE INDEX IF NOT EXISTS, skipped when the table lacks any of the columns"""
+    def step(conn: sqlite3.Connection):
+        existing = table_columns(conn, table)
+        missing = [c for c in columns if c not in existing]
+        if missing:
+            logger.warning(f"⚠️  Skipping index {name}: {table} has no column(s) {missing}")
+            return
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({', '.join(columns)})")
+    return step
+
+
+def add_derived_column(table: str, column: str, col_type: str, source: str, expression: str) -> Step:
+    """
+    Add a stored column derived from another column and backfill existing rows
+
+    Writers populate the column on insert; the stored value lets covering indexes
+    answer GROUP BY queries that would otherwise evaluate expression per row.
+    """
+    def step(conn: sqlite3.Connection):
+        existing = table_columns(conn, table)
+        if source not in existing:
+            logger.warning(f"⚠️  Skipping column {table}.{column}: no {source} column")
+            return
+        if column not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+        conn.execute(f"UPDATE {table} SET {column} = {expression} WHERE {column} IS NULL")
+    return step
+
+
+def add_projections(json_column: JSONColumn) -> List[Step]:
+    """Projection columns of an encoded JSON column, backfilled from older JSON text rows"""
+    return [add_derived_column(json_column.table, p.column, p.col_type, json_column.column, p.legacy_sql)
+            for p in json_column.projections]
+
+
+# ---------------------------------------------------------------------------
+# Migrations per schema
+# ---------------------------------------------------------------------------
+
+HOUR_EXPRESSION = "CAST(strftime('%H', timestamp) AS INTEGER)"
+
+MIGRATIONS: Dict[str, List[Migration]] = {
+    # database_manager.DatabaseManager (sentiment_analytics.db)
+    'analytics': [
+        Migration(1, "timestamp indexes and stored hour bucket", [
+            add_derived_column('analysis_results', 'hour', 'INTEGER', 'timestamp', HOUR_EXPRESSION),
+            create_index('idx_analysis_results_ts_cover', 'analysis_results',
+                         'timestamp', 'sentiment', 'source', 'confidence', 'hour'),
+            create_index('idx_api_usage_ts_cover', 'api_usage',
+                         'timestamp', 'endpoint', 'status_code', 'response_time'),
+            create_index('idx_metrics_name_ts', 'metrics', 'metric_name', 'timestamp', 'metric_value'),
+            create_index('idx_metrics_ts', 'metrics', 'timestamp'),
+            create_index('idx_content_cache_expiry', 'content_cache', 'expiry_time'),
+        ]),
+        Migration(2, "minute/hour/day rollup cubes for analyses and API usage", [
+            install_cube(ANALYSIS_CUBE),
+            install_cube(API_USAGE_CUBE),
+        ]),
+        Migration(3, "indexed projections of the binary metadata column", [
+            *add_projections(ANALYSIS_METADATA),
+            create_index('idx_analysis_results_model', 'analysis_results', 'model', 'timestamp'),
+            create_index('idx_analysis_results_language', 'analysis_results', 'language', 'timestamp'),
+        ]),
+        Migration(4, "content-addressed text store for analysis content", [
+            install_content_store,
+            create_index('idx_analysis_results_content_hash', 'analysis_results', 'content_hash'),
+        ]),
+        Migration(5, "compressed metric segments replace one row per metric sample", [
+            install_timeseries,
+            import_metrics_table,
+            "DELETE FROM metrics",
+        ]),
+        Migration(6, "response-time histogram cube for buffered API usage accounting", [
+            install_cube(API_LATENCY_CUBE),
+        ]),
+        Migration(7, "model and language dimensions of the analysis cube (buckets from now on)", [
+            refresh_cube_trigger(ANALYSIS_CUBE),
+        ]),
+    ],
+    # enhanced_database.EnhancedDatabaseManager (sentiment_analysis.db)
+    'enhanced': [
+        Migration(1, "timestamp indexes and stored hour bucket", [
+            add_derived_column('sentiment_analyses', 'hour', 'INTEGER', 'timestamp', HOUR_EXPRESSION),
+            create_index('idx_sentiment_analyses_ts_cover', 'sentiment_analyses',
+                         'timestamp', 'sentiment', 'confidence', 'hour'),
+            create_index('idx_news_articles_ts', 'news_articles', 'timestamp'),
+            create_index('idx_analytics_cache_expiry', 'analytics_cache', 'expires_at'),
+            create_index('idx_habit_completions_date', 'habit_completions', 'completed_date'),
+        ]),
+        Migration(2, "minute/hour/day rollup cube for analyses", [
+            install_cube(SENTIMENT_CUBE),
+        ]),
+        Migration(3, "(timestamp, id) index for keyset pagination", [
+            create_index('idx_sentiment_analyses_ts_id', 'sentiment_analyses', 'timestamp', 'id'),
+        ]),
+        Migration(4, "FTS5 full-text search over analyses and news", [
+            install_search_index(ANALYSIS_SEARCH),
+            install_search_index(NEWS_SEARCH),
+        ]),
+        Migration(5, "text store and score memo for already-scored texts", [
+            install_content_store,
+        ]),
+        Migration(6, "one created_at rollup cube replaces the per-manager sentiment cubes", [
+            install_cube(SENTIMENT_CUBE),
+        ]),
+    ],
+    # database.DatabaseManager (video / comment analyses)
+    'video': [
+        Migration(1, "created_at indexes for retention and activity queries", [
+            create_index('idx_reports_created_at', 'analytics_reports', 'created_at'),
+            create_index('idx_comment_created_at', 'comment_analyses', 'created_at'),
+        ]),
+        Migration(2, "indexed dominant emotion of the binary emotions column", [
+            *add_projections(COMMENT_EMOTIONS),
+            create_index('idx_comment_video_emotion', 'comment_analyses', 'video_id', 'dominant_emotion'),
+        ]),
+    ],
+    # awesome_dashboard.AwesomeDatabase
+    'awesome': [
+        Migration(1, "created_at index for recent-analysis listing", [
+            create_index('idx_awesome_analyses_created_at', 'sentiment_analyses', 'created_at'),
+        ]),
+        Migration(2, "(created_at, id) index for keyset pagination", [
+            create_index('idx_awesome_analyses_created_id', 'sentiment_analyses', 'created_at', 'id'),
+        ]),
+    ],
+}
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            schema TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            description TEXT,
+            applied_at TEXT NOT NULL,
+            PRIMARY KEY (schema, version)
+        )
+    """)
+
+
+def current_version(conn: sqlite3.Connection, schema: str) -> int:
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT MAX(version) FROM schema_migrations WHERE schema = ?", (schema,)).fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(pool, schema: str, migrations: Optional[List[Migration]] = None) -> int:
+    """
+    Apply every pending migration of a schema through the pool's writer
+
+    Each migration runs in its own transaction together with its version record,
+    so a failed step leaves the schema at the previous version. Returns the number
+    of migrations applied.
+    """
+    migrations = MIGRATIONS[schema] if migrations is None else migrations
+    applied = 0
+    with pool.write() as conn:
+        version = current_version(conn, schema)
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= version:
+            continue
+        try:
+            with pool.write() as conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN")  # keep DDL steps inside the migration's transaction
+                migration.apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (schema, version, description, applied_at) VALUES (?, ?, ?, ?)",
+                    (schema, migration.version, migration.description, datetime.now().isoformat())
+                )
+            applied += 1
+            logger.info(f"✅ Migrated {schema} schema to v{migration.version}: {migration.description}")
+        except sqlite3.Error as e:
+            logger.error(f"❌ Migration {schema} v{migration.version} failed: {e}")
+            break
+    return applied
+
+
+# ---------------------------------------------------------------------------
+# Index advisor
+# ---------------------------------------------------------------------------
+
+_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+_PREDICATE = re.compile(r'(\w+)\s*(=|>=|<=|>|<|\bIN\b|\bLIKE\b|\bBETWEEN\b)', re.IGNORECASE)
+_CLAUSE = re.compile(r'\b(WHERE|GROUP BY|ORDER BY)\b(.*?)(?=\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|\bHAVING\b|$)',
+                     re.IGNORECASE | re.DOTALL)
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Sequence = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN detail lines for a statement"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def full_scans(plan: List[str]) -> List[str]:
+    """Tables a plan reads in full without any index"""
+    tables = []
+    for detail in plan:
+        match = _SCAN.match(detail)
+        if match and 'INDEX' not in match.group(2):
+            tables.append(match.group(1))
+    return tables
+
+
+class IndexAdvisor:
+    """Checks queries against their query plans and proposes indexes for full scans"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def analyze(self, sql: str, params: Sequence = ()) -> Dict:
+        plan = explain(self.conn, sql, params)
+        scans = full_scans(plan)
+        suggestions = [self.suggest(table, sql) for table in scans]
+        return {
+            'plan': plan,
+            'full_scans': scans,
+            'temp_btree': [d for d in plan if d.startswith('USE TEMP B-TREE')],
+            'suggestions': [s for s in suggestions if s],
+        }
+
+    def suggest(self, table: str, sql: str) -> Optional[str]:
+        """
+        Propose an index for a scanned table: equality columns first, then range
+        columns, then grouping/ordering columns, keeping only columns of that table
+        """
+        columns = set(table_columns(self.conn, table))
+        equality, ranged, trailing = [], [], []
+        for clause, body in _CLAUSE.findall(sql):
+            if clause.upper() == 'WHERE':
+                for column, op in _PREDICATE.findall(body):
+                    if column in columns:
+                        (equality if op == '=' or op.upper() == 'IN' else ranged).append(column)
+            else:
+                trailing += [c.strip().split()[0] for c in body.split(',') if c.strip().split()[0] in columns]
+
+        ordered = []
+        for column in equality + ranged + trailing:
+            if column not in ordered:
+                ordered.append(column)
+        if not ordered:
+            return None
+        return f"CREATE INDEX idx_{table}_{'_'.join(ordered)} ON {table}({', '.join(ordered)})"
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Apply schema migrations or explain a query')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('schema', choices=sorted(MIGRATIONS), help='Schema the database holds')
+    parser.add_argument('--status', action='store_true', help='Show the current schema version')
+    parser.add_argument('--explain', metavar='SQL', help='Show the query plan and index advice')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    from sqlite_pool import get_pool
+
+    pool = get_pool(args.db_path)
+    if args.explain:
+        with pool.read() as conn:
+            report = IndexAdvisor(conn).analyze(args.explain)
+        for detail in report['plan']:
+            print(f"  {detail}")
+        for suggestion in report['suggestions']:
+            print(f"💡 {suggestion}")
+    elif args.status:
+        with pool.write() as conn:
+            latest = max(m.version for m in MIGRATIONS[args.schema])
+            print(f"{args.schema}: v{current_version(conn, args.schema)} (latest v{latest})")
+    else:
+        print(f"Applied {apply_migrations(pool, args.schema)} migration(s)")
@@ -11,12 +11,15 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Callable, Optional
 from collections import deque, defaultdict
 import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
 import logging
 from dataclasses import dataclass
 import statistics
 
+from streaming_export import json_document, write_file
+from timeseries import TimeSeriesStore
+
 @dataclass
 class Alert:
     """Alert data structure"""
@@ -32,10 +35,15 @@ class Alert:
 class SystemMonitor:
     """
     Real-time system monitoring for sentiment analysis API
+    
+    The last 100 samples per metric stay in deques for threshold checks; every
+    sample also goes to a time-series store (in memory unless one on a database is
+    passed in), which keeps the downsampled history reports and exports read.
     """
     
-    def __init__(self):
+    def __init__(self, timeseries: Optional[TimeSeriesStore] = None):
         self.metrics = defaultdict(deque)
+        self.timeseries = timeseries or TimeSeriesStore()
         self.alerts = []
         self.thresholds = {
             'cpu_usage': 80.0,
@@ -108,12 +116,12 @@ class SystemMonitor:
         network = psutil.net_io_counters()
         
         # Store metrics
-        self.metrics['cpu_usage'].append((timestamp, cpu_percent))
-        self.metrics['memory_usage'].append((timestamp, memory.percent))
-        self.metrics['memory_available_gb'].append((timestamp, memory.available / (1024**3)))
-        self.metrics['disk_usage'].append((timestamp, disk.percent))
-        self.metrics['network_bytes_sent'].append((timestamp, network.bytes_sent))
-        self.metrics['network_bytes_recv'].append((timestamp, network.bytes_recv))
+        self._record('cpu_usage', timestamp, cpu_percent)
+        self._record('memory_usage', timestamp, memory.percent)
+        self._record('memory_available_gb', timestamp, memory.available / (1024**3))
+        self._record('disk_usage', timestamp, disk.percent)
+        self._record('network_bytes_sent', timestamp, network.bytes_sent)
+        self._record('network_bytes_recv', timestamp, network.bytes_recv)
         
         # Process-specific metrics
         try:
@@ -121,36 +129,41 @@ class SystemMonitor:
             process_memory = process.memory_info()
             process_cpu = process.cpu_percent()
             
-            self.metrics['process_memory_mb'].append((timestamp, process_memory.rss / (1024**2)))
-            self.metrics['process_cpu'].append((timestamp, process_cpu))
+            self._record('process_memory_mb', timestamp, process_memory.rss / (1024**2))
+            self._record('process_cpu', timestamp, process_cpu)
             
         except psutil.NoSuchProcess:
             pass
     
+    def _record(self, metric: str, timestamp: datetime, value: float):
+        """Keep a sample for threshold checks and in the time-series history"""
+        self.metrics[metric].append((timestamp, value))
+        self.timeseries.append(metric, value, timestamp)
+    
     def record_api_request(self, endpoint: str, response_time: float, status_code: int):
         """Record API request metrics"""
         timestamp = datetime.now()
         
-        self.metrics['response_times'].append((timestamp, response_time))
-        self.metrics['request_count'].append((timestamp, 1))
+        self._record('response_times', timestamp, response_time)
+        self._record('request_count', timestamp, 1)
         
         # Track errors (status codes >= 400)
         if status_code >= 400:
-            self.metrics['error_count'].append((timestamp, 1))
+            self._record('error_count', timestamp, 1)
         
         # Track by endpoint
         endpoint_key = f'endpoint_{endpoint.replace("/", "_")}'
-        self.metrics[endpoint_key].append((timestamp, response_time))
+        self._record(endpoint_key, timestamp, response_time)
     
     def record_analysis_metrics(self, analysis_time: float, comment_count: int, success: bool):
         """Record sentiment analysis performance metrics"""
         timestamp = datetime.now()
         
-        self.metrics['analysis_time'].append((timestamp, analysis_time))
-        self.metrics['comments_processed'].append((timestamp, comment_count))
+        self._record('analysis_time', timestamp, analysis_time)
+        self._record('comments_processed', timestamp, comment_count)
         
         if not success:
-            self.metrics['analysis_failures'].append((timestamp, 1))
+            self._record('analysis_failures', timestamp, 1)
     
     def _check_thresholds(self):
         """Check metrics against thresholds and generate alerts"""
@@ -375,40 +388,32 @@ class SystemMonitor:
             "generated_at": datetime.now().isoformat()
         }
         
-        # Analyze CPU usage
-        cpu_data = [(ts, val) for ts, val in self.metrics['cpu_usage'] if ts >= cutoff_time]
-        if cpu_data:
-            cpu_values = [val for _, val in cpu_data]
-            report['cpu_stats'] = {
-                "average": statistics.mean(cpu_values),
-                "maximum": max(cpu_values),
-                "minimum": min(cpu_values),
-                "data_points": len(cpu_values)
-            }
-        
-        # Analyze memory usage
-        memory_data = [(ts, val) for ts, val in self.metrics['memory_usage'] if ts >= cutoff_time]
-        if memory_data:
-            memory_values = [val for _, val in memory_data]
-            report['memory_stats'] = {
-                "average": statistics.mean(memory_values),
-                "maximum": max(memory_values),
-                "minimum": min(memory_values),
-                "data_points": len(memory_values)
-            }
+        # CPU, memory and response-time statistics over the whole period, from the
+        # finest time-series tier that still covers it
+        for key, metric in (('cpu_stats', 'cpu_usage'), ('memory_stats', 'memory_usage')):
+            summary = self.timeseries.summary(metric, cutoff_time)
+            if summary:
+                report[key] = {
+                    "average": summary['average'],
+                    "maximum": summary['maximum'],
+                    "minimum": summary['minimum'],
+                    "data_points": summary['count']
+                }
         
-        # Analyze response times
-        response_data = [(ts, val) for ts, val in self.metrics['response_times'] if ts >= cutoff_time]
-        if response_data:
-            response_values = [val for _, val in response_data]
+        summary = self.timeseries.summary('response_times', cutoff_time)
+        if summary:
             report['response_time_stats'] = {
-                "average": statistics.mean(response_values),
-                "maximum": max(response_values),
-                "minimum": min(response_values),
-                "median": statistics.median(response_values),
-                "p95": sorted(response_values)[int(len(response_values) * 0.95)] if len(response_values) > 20 else max(response_values),
-                "total_requests": len(response_values)
+                "average": summary['average'],
+                "maximum": summary['maximum'],
+                "minimum": summary['minimum'],
+                "total_requests": summary['count']
             }
+            # Percentiles need raw samples, which are kept for the raw tier's retention
+            if self.timeseries.pick_tier(cutoff_time).resolution == 0:
+                response_values = sorted(p['value'] for p in self.timeseries.query('response_times', cutoff_time))
+                report['response_time_stats']["median"] = statistics.median(response_values)
+                report['response_time_stats']["p95"] = (response_values[int(len(response_values) * 0.95)]
+                                                        if len(response_values) > 20 else max(response_values))
         
         # Count alerts in period
         period_alerts = [a for a in self.alerts if a.timestamp >= cutoff_time]
@@ -422,24 +427,19 @@ class SystemMonitor:
         return report
     
     def export_metrics(self, filename: str, hours_back: int = 24) -> bool:
-        """Export metrics to file"""
+        """Export metrics to file, streaming each series instead of building one document"""
         try:
             cutoff_time = datetime.now() - timedelta(hours=hours_back)
             
-            export_data = {
-                "export_timestamp": datetime.now().isoformat(),
-                "period_hours": hours_back,
-                "metrics": {}
+            # Export all metrics within time period (raw or downsampled, by period length)
+            metrics = {
+                metric_name: ((point['timestamp'].isoformat(), point['value'])
+                              for point in self.timeseries.query(metric_name, cutoff_time))
+                for metric_name in self.timeseries.metrics()
             }
             
-            # Export all metrics within time period
-            for metric_name, metric_data in self.metrics.items():
-                period_data = [(ts.isoformat(), val) for ts, val in metric_data if ts >= cutoff_time]
-                export_data["metrics"][metric_name] = period_data
-            
             # Export alerts
-            period_alerts = [a for a in self.alerts if a.timestamp >= cutoff_time]
-            export_data["alerts"] = [
+            alerts = (
                 {
                     "alert_id": alert.alert_id,
                     "severity": alert.severity,
@@ -449,11 +449,13 @@ class SystemMonitor:
                     "timestamp": alert.timestamp.isoformat(),
                     "resolved": alert.resolved
                 }
-                for alert in period_alerts
-            ]
+                for alert in list(self.alerts) if alert.timestamp >= cutoff_time
+            )
             
-            with open(filename, 'w') as f:
-                json.dump(export_data, f, indent=2)
+            write_file(json_document(
+                {"export_timestamp": datetime.now().isoformat(), "period_hours": hours_back},
+                {"metrics": metrics, "alerts": alerts}
+            ), filename)
             
             return True
             
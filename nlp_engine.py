@@ -6,6 +6,7 @@ from sentiment_engine import SentimentAnalyzer
 from emotion_detector import EmotionDetector
 from comment_classifier import CommentClassifier
 from link_analyzer import LinkAnalyzer
+from sentiment_result import dumps, packb
 
 class NLPEngine:
     """
@@ -21,9 +22,12 @@ class NLPEngine:
         self.comment_classifier = CommentClassifier()
     
     def analyze_video_data(self, video_title: str, video_description: str, 
-                          comments: List[str]) -> Dict[str, any]:
+                          comments: List[str], include_details: bool = True) -> Dict[str, any]:
         """
         Complete analysis of video data including title, description, and comments
+        
+        Set include_details=False to drop the per-comment "details" sub-tree
+        (score breakdowns, spam and toxicity reports) from the result.
         """
         # Analyze video content (title + description)
         video_text = f"{video_title} {video_description}".strip()
@@ -33,7 +37,7 @@ class NLPEngine:
         comment_analyses = []
         for comment_text in comments:
             if comment_text and comment_text.strip():
-                comment_analysis = self._analyze_single_comment(comment_text)
+                comment_analysis = self._analyze_single_comment(comment_text, include_details)
                 comment_analyses.append(comment_analysis)
         
         return {
@@ -67,7 +71,7 @@ class NLPEngine:
             "sentiment_scores": sentiment_result["scores"]
         }
     
-    def _analyze_single_comment(self, comment_text: str) -> Dict[str, any]:
+    def _analyze_single_comment(self, comment_text: str, include_details: bool = True) -> Dict[str, any]:
         """Comprehensive analysis of a single comment"""
         if not comment_text or comment_text.strip() == "":
             return {
@@ -75,7 +79,8 @@ class NLPEngine:
                 "sentiment": "neutral",
                 "emotion": [],
                 "tag": "neutral",
-                "confidence": 0.0
+                "confidence": 0.0,
+                "sentiment_confidence": 0.0
             }
         
         # Get sentiment analysis
@@ -96,12 +101,24 @@ class NLPEngine:
         # Determine final tag (prioritize spam detection)
         final_tag = "spam" if spam_result["is_spam"] else classification_result["tag"]
         
+        if not include_details:
+            return {
+                "text": comment_text,
+                "sentiment": sentiment_result["sentiment"],
+                "emotion": emotions,
+                "tag": final_tag,
+                "confidence": classification_result["confidence"],
+                "sentiment_confidence": sentiment_result["confidence"],
+                "toxicity_level": toxicity_result["toxicity_level"]
+            }
+        
         return {
             "text": comment_text,
             "sentiment": sentiment_result["sentiment"],
             "emotion": emotions,
             "tag": final_tag,
             "confidence": classification_result["confidence"],
+            "sentiment_confidence": sentiment_result["confidence"],
             "details": {
                 "sentiment_scores": sentiment_result["scores"],
                 "classification_scores": classification_result["scores"],
@@ -154,6 +171,8 @@ class NLPEngine:
         for comment in comment_analyses:
             if "details" in comment and "toxicity" in comment["details"]:
                 toxicity_levels.append(comment["details"]["toxicity"]["toxicity_level"])
+            elif "toxicity_level" in comment:
+                toxicity_levels.append(comment["toxicity_level"])
         
         toxicity_summary = {
             "safe": toxicity_levels.count("safe"),
@@ -192,18 +211,36 @@ class NLPEngine:
             "sentiment_scores": sentiment_result["scores"]
         }
     
-    def batch_analyze_comments(self, comments: List[str]) -> List[Dict[str, any]]:
+    def batch_analyze_comments(self, comments: List[str], include_details: bool = True) -> List[Dict[str, any]]:
         """Batch analysis for multiple comments"""
         results = []
         for comment in comments:
-            analysis = self._analyze_single_comment(comment)
+            analysis = self._analyze_single_comment(comment, include_details)
             results.append(analysis)
         return results
     
-    def export_analysis(self, analysis_result: Dict, format_type: str = "json") -> str:
-        """Export analysis results in specified format"""
+    def export_analysis(self, analysis_result: Dict, format_type: str = "json",
+                        include_details: bool = True, indent: Optional[int] = 2) -> Union[str, bytes]:
+        """
+        Export analysis results in specified format
+        
+        Args:
+            analysis_result: Result of analyze_video_data / batch analysis
+            format_type: 'json' or 'msgpack'
+            include_details: Keep the per-comment "details" sub-tree
+            indent: JSON indentation; None produces compact output
+        """
+        if not include_details and isinstance(analysis_result, dict) and "comments" in analysis_result:
+            analysis_result = dict(analysis_result)
+            analysis_result["comments"] = [
+                {k: v for k, v in comment.items() if k != "details"}
+                for comment in analysis_result["comments"]
+            ]
+        
         if format_type.lower() == "json":
-            return json.dumps(analysis_result, indent=2, ensure_ascii=False)
+            return dumps(analysis_result, indent=indent)
+        elif format_type.lower() == "msgpack":
+            return packb(analysis_result)
         else:
             raise ValueError(f"Unsupported format: {format_type}")
 
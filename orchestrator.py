@@ -3,6 +3,7 @@ Master orchestrator for the entire sentiment analysis system
 Coordinates all components and provides unified management interface
 """
 
+import os
 import asyncio
 import threading
 import time
@@ -21,6 +22,9 @@ from comment_classifier import CommentClassifier
 from analytics import SentimentAnalytics
 from database import DatabaseManager
 from monitoring import SystemMonitor, PerformanceTracker
+from retention import RetentionScheduler
+from backup import BackupManager
+from sqlite_pool import get_pool
 from config_manager import ConfigurationManager, get_config
 from dashboard import app as dashboard_app
 from streaming_server import SentimentStreamingServer
@@ -29,6 +33,9 @@ from streaming_server import SentimentStreamingServer
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# SQLite files backed up online (WAL archiving) when backups are enabled
+BACKUP_DATABASES = ('sentiment_analysis.db', 'sentiment_analytics.db')
+
 class SentimentAnalysisOrchestrator:
     """Master orchestrator for the entire sentiment analysis system"""
     
@@ -43,6 +50,17 @@ class SentimentAnalysisOrchestrator:
         self.database = DatabaseManager()
         self.monitor = SystemMonitor()
         self.performance_tracker = PerformanceTracker(self.monitor)
+        self.retention = RetentionScheduler(
+            [self.database.retention_engine(self.config.analytics.retention_days,
+                                            self.config.database.retention_time_budget_seconds)],
+            interval=self.config.database.retention_interval_minutes * 60
+        )
+        self.backups = [
+            BackupManager(get_pool(path), os.path.join(self.config.database.backup_dir, os.path.basename(path)),
+                          sync_interval=self.config.database.backup_sync_seconds,
+                          base_interval=self.config.database.backup_interval_hours * 3600)
+            for path in BACKUP_DATABASES if os.path.exists(path)
+        ] if self.config.database.backup_enabled else []
         
         # Services
         self.dashboard_thread = None
@@ -78,6 +96,13 @@ class SentimentAnalysisOrchestrator:
             # Initialize database
             self._initialize_database()
             
+            # Schedule the batched retention purge
+            self.retention.start()
+            
+            # Start online backups and WAL archiving
+            for backup in self.backups:
+                backup.start()
+            
             # Start monitoring
             self._start_monitoring()
             
@@ -297,6 +322,9 @@ class SentimentAnalysisOrchestrator:
                 # Perform analysis
                 result = self.nlp_engine.analyze_video_data(video_title, video_description, comments)
                 
+                # Persist comment analyses in one bulk transaction
+                self.database.save_engine_result(result)
+                
                 # Update statistics
                 self.stats['total_analyses'] += 1
                 self.stats['total_comments_processed'] += len(comments)
@@ -442,6 +470,13 @@ class SentimentAnalysisOrchestrator:
             if hasattr(self.monitor, 'stop_monitoring'):
                 self.monitor.stop_monitoring()
             
+            # Stop the retention purge before closing its database
+            self.retention.stop()
+            
+            # Archive the last WAL frames before closing the databases
+            for backup in self.backups:
+                backup.close()
+            
             # Close database connections
             if hasattr(self.database, 'close'):
                 self.database.close()
@@ -0,0 +1,85 @@
+"""
+Keyset Pagination
+Opaque (created_at, id) cursors so deep pages cost the same as the first one,
+for SQL listings and for in-memory feeds
+"""
+
+import json
+import heapq
+import base64
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that were not produced by encode_cursor"""
+
+
+def encode_cursor(created_at: Any, item_id: Any) -> str:
+    """Opaque, URL-safe cursor pointing just past (created_at, item_id)"""
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps([created_at, item_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, Any]:
+    """(created_at, id) of a cursor; raises InvalidCursor on tampered or malformed input"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"invalid cursor: {cursor!r}") from e
+    return created_at, item_id
+
+
+def decode_datetime_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """decode_cursor for timestamp columns bound as datetime (e.g. SQLAlchemy DateTime)"""
+    created_at, item_id = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(created_at), item_id
+    except (TypeError, ValueError) as e:
+        raise InvalidCursor(f"invalid cursor timestamp: {created_at!r}") from e
+
+
+def next_cursor(items: Sequence[Dict[str, Any]], limit: int, time_key: str = 'created_at',
+                id_key: str = 'id') -> Optional[str]:
+    """Cursor for the page after items (dicts or projected namedtuple rows), or None when this was the last page"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    if hasattr(last, '_fields'):
+        return encode_cursor(getattr(last, time_key), getattr(last, id_key))
+    return encode_cursor(last[time_key], last[id_key])
+
+
+def paginate_sequence(items: Sequence[Any], limit: int, cursor: Optional[str] = None,
+                      key: Callable[[Any], Tuple[Any, Any]] = lambda item: (item['created_at'], item['id'])
+                      ) -> Tuple[List[Any], Optional[str]]:
+    """
+    Keyset page over an in-memory feed, newest first
+
+    Only the page itself is returned (callers convert just those items), and the
+    cursor stays valid while new items are prepended, unlike page numbers.
+    """
+    if cursor:
+        bound = tuple(decode_cursor(cursor))
+        items = (item for item in items if key(item) < bound)
+    page = heapq.nlargest(limit + 1, items, key=key)
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(*key(page[-1]))
+
+
+def page_size(value: Any, default: int = 20) -> int:
+    """Clamp a ?limit= value to 1..MAX_PAGE_SIZE"""
+    try:
+        return min(MAX_PAGE_SIZE, max(1, int(value)))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,331 @@
+"""
+Monthly Table Partitions
+Rows of one table split into per-month SQLite files that are attached to pooled
+connections on demand; range queries touch only the months they overlap, and
+dropping a month is a file unlink instead of a bulk DELETE
+
+Usage:
+    python partitions.py sentiment_analytics.db analysis_results                 # list partitions
+    python partitions.py sentiment_analytics.db analysis_results --drop-before 2024-01-01
+"""
+
+import os
+import re
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+from weakref import WeakKeyDictionary
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit is 10 attached databases per connection; leave room for others
+MAX_ATTACHED = 8
+
+_KEY = re.compile(r'^\d{4}_\d{2}$')
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def partition_key(moment: datetime) -> str:
+    return f"{moment:%Y_%m}"
+
+
+def _merge(func, a, b):
+    """min()/max() of two partial aggregates, either of which may be NULL"""
+    return b if a is None else a if b is None else func(a, b)
+
+
+class MonthlyPartitions:
+    """
+    Per-month partition files of one table of a pooled database
+
+    A partition <directory>/<table>_YYYY_MM.db holds the rows whose time column
+    falls in that month, under the same table definition and indexes as the
+    parent table (copied from its schema when the file is created, so it stays
+    self-contained). Writes go through the pool's writer, inside the caller's
+    transaction; reads fan out over the months a range overlaps, newest first.
+    Each connection keeps at most max_attached partitions attached, detaching the
+    least recently used.
+    """
+
+    def __init__(self, pool, table: str, directory: Optional[str] = None, time_column: str = 'timestamp',
+                 max_attached: int = MAX_ATTACHED):
+        if directory is None and pool.in_memory:
+            raise ValueError("partitions of an in-memory database need a directory")
+        self.pool = pool
+        self.table = table
+        self.time_column = time_column
+        self.max_attached = max_attached
+        self.directory = directory or f"{pool.db_path}.partitions"
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._keys = self._scan()
+        self._attached: 'WeakKeyDictionary[sqlite3.Connection, OrderedDict]' = WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.stats = {'created': 0, 'dropped': 0, 'attaches': 0, 'detaches': 0, 'rows_written': 0,
+                      'queries': 0, 'partitions_scanned': 0}
+
+    # -- files ----------------------------------------------------------------
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{self.table}_{key}.db")
+
+    def _scan(self) -> Set[str]:
+        """Keys of the partition files in the directory"""
+        prefix = f"{self.table}_"
+        return {name[len(prefix):-3] for name in os.listdir(self.directory)
+                if name.startswith(prefix) and name.endswith('.db') and _KEY.match(name[len(prefix):-3])}
+
+    def partitions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """
+        Keys (YYYY_MM) of existing partitions overlapping [start, end), oldest first
+
+        The directory is rescanned on every call: other processes sharing it create
+        and drop months too.
+        """
+        keys = self._scan()
+        with self._lock:
+            self._keys = keys
+        keys = sorted(keys)
+        first = None if start is None else partition_key(start)
+        # end is exclusive: a range ending on the first of a month stops at the month before
+        last = None if end is None else partition_key(end if end > month_start(end) else end - timedelta(days=1))
+        return [key for key in keys if (first is None or key >= first) and (last is None or key <= last)]
+
+    def _create(self, conn, key: str):
+        """Create a partition file with the parent table's definition and indexes"""
+        ddl = [row[0] for row in conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+            "AND sql IS NOT NULL ORDER BY type DESC", (self.table,))]
+        if not ddl:
+            raise sqlite3.OperationalError(f"no such table: {self.table}")
+        path = self.path(key)
+        if os.path.exists(path):  # created by another process
+            with self._lock:
+                self._keys.add(key)
+            return
+        target = sqlite3.connect(f"{path}.tmp")
+        try:
+            target.execute("PRAGMA journal_mode = WAL")
+            for sql in ddl:
+                target.execute(sql)
+            target.commit()
+        finally:
+            target.close()
+        os.replace(f"{path}.tmp", path)
+        with self._lock:
+            self._keys.add(key)
+        self.stats['created'] += 1
+        logger.info(f"🗂️  Created partition {path}")
+
+    # -- attaching ------------------------------------------------------------
+
+    def attach(self, conn, key: str, create: bool = False) -> Optional[str]:
+        """
+        Schema name of a partition on conn, attaching it first (and creating the
+        file when create=True); None when the partition does not exist
+        """
+        with self._lock:
+            attached = self._attached.setdefault(conn, OrderedDict())
+            stale = [k for k in attached if k not in self._keys]
+            exists = key in self._keys
+        for old in stale:  # dropped since this connection attached it
+            self._detach(conn, attached, old)
+        if key in attached:
+            attached.move_to_end(key)
+            return attached[key]
+        if not exists:
+            if not create:
+                return None
+            self._create(conn, key)
+
+        while len(attached) >= self.max_attached:
+            if not self._detach(conn, attached, next(iter(attached))):
+                break
+        alias = f"{self.table}_{key}"
+        schemas = {row[1] for row in conn.execute("PRAGMA database_list")}
+        if alias not in schemas:  # otherwise attached through another instance on this connection
+            conn.execute("ATTACH DATABASE ? AS " + alias, (self.path(key),))
+        attached[key] = alias
+        self.stats['attaches'] += 1
+        return alias
+
+    def _detach(self, conn, attached: OrderedDict, key: str) -> bool:
+        try:
+            conn.execute(f"DETACH DATABASE {attached[key]}")
+        except sqlite3.OperationalError as e:  # in use by the connection's open transaction
+            logger.debug(f"Keeping {attached[key]} attached: {e}")
+            attached.move_to_end(key)
+            return False
+        del attached[key]
+        self.stats['detaches'] += 1
+        return True
+
+    # -- writing --------------------------------------------------------------
+
+    def insert(self, conn, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+        """Insert rows into their months' partitions on conn (the caller's write transaction)"""
+        index = list(columns).index(self.time_column)
+        by_month: Dict[str, List[Sequence[Any]]] = {}
+        for row in rows:
+            moment = row[index]
+            if isinstance(moment, str):
+                moment = datetime.fromisoformat(moment)
+            by_month.setdefault(partition_key(moment), []).append(row)
+        for key, month_rows in by_month.items():
+            alias = self.attach(conn, key, create=True)
+            conn.executemany(f"INSERT INTO {alias}.{self.table} ({', '.join(columns)}) "
+                             f"VALUES ({', '.join('?' * len(columns))})", month_rows)
+        self.stats['rows_written'] += len(rows)
+        return len(rows)
+
+    # -- reading --------------------------------------------------------------
+
+    def _range(self, start: Optional[datetime], end: Optional[datetime], where: str) -> Tuple[str, list]:
+        t = self.time_column
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{t} >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{t} < ?")
+            params.append(end)
+        if where:
+            conditions.append(f"({where})")
+        return (f" WHERE {' AND '.join(conditions)}" if conditions else ''), params
+
+    def select(self, columns: Sequence[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+               where: str = '', params: Sequence[Any] = (), descending: bool = True,
+               limit: Optional[int] = None, conn=None) -> List[tuple]:
+        """
+        Rows in [start, end) ordered by time, read partition by partition (newest
+        first when descending) and stopping once limit rows are found
+        """
+        keys = self.partitions(start, end)
+        if descending:
+            keys.reverse()
+        clause, range_params = self._range(start, end, where)
+        order = f" ORDER BY {self.time_column}{' DESC' if descending else ''}"
+        rows: List[tuple] = []
+        self.stats['queries'] += 1
+        with self._connection(conn) as conn:
+            for key in keys:
+                alias = self.attach(conn, key)
+                if alias is None:
+                    continue
+                self.stats['partitions_scanned'] += 1
+                sql = f"SELECT {', '.join(columns)} FROM {alias}.{self.table}{clause}{order}"
+                if limit is not None:
+                    sql += f" LIMIT {int(limit) - len(rows)}"
+                rows += conn.execute(sql, (*range_params, *params)).fetchall()
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+    def aggregate(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  group_by: Sequence[str] = (), measures: Optional[Dict[str, str]] = None,
+                  where: str = '', params: Sequence[Any] = (), conn=None) -> List[Dict[str, Any]]:
+        """
+        Grouped aggregates over [start, end) across partitions: per group the row
+        count and, per measure expression, sum / n (non-null count) / min / max and
+        the exact average, merged from each partition's partial aggregates
+        """
+        measures = measures or {}
+        selects = list(group_by) + ['COUNT(*)']
+        for expr in measures.values():
+            selects += [f"SUM({expr})", f"COUNT({expr})", f"MIN({expr})", f"MAX({expr})"]
+        clause, range_params = self._range(start, end, where)
+        group = f" GROUP BY {', '.join(group_by)}" if group_by else ''
+
+        merged: Dict[tuple, list] = {}
+        self.stats['queries'] += 1
+        with self._connection(conn) as conn:
+            for key in self.partitions(start, end):
+                alias = self.attach(conn, key)
+                if alias is None:
+                    continue
+                self.stats['partitions_scanned'] += 1
+                for row in conn.execute(f"SELECT {', '.join(selects)} FROM {alias}.{self.table}{clause}{group}",
+                                        (*range_params, *params)):
+                    groups, values = tuple(row[:len(group_by)]), row[len(group_by):]
+                    if not values[0]:
+                        continue
+                    current = merged.get(groups)
+                    if current is None:
+                        merged[groups] = list(values)
+                        continue
+                    current[0] += values[0]
+                    for i in range(1, len(values), 4):
+                        current[i] = (current[i] or 0) + (values[i] or 0)
+                        current[i + 1] += values[i + 1]
+                        current[i + 2] = _merge(min, current[i + 2], values[i + 2])
+                        current[i + 3] = _merge(max, current[i + 3], values[i + 3])
+
+        results = []
+        for groups, values in merged.items():
+            row = dict(zip(group_by, groups))
+            row['count'] = values[0]
+            for i, name in enumerate(measures):
+                total, n, low, high = values[1 + 4 * i:5 + 4 * i]
+                row.update({f"{name}_sum": total or 0, f"{name}_n": n, f"{name}_min": low, f"{name}_max": high,
+                            f"{name}_avg": total / n if n else None})
+            results.append(row)
+        return results
+
+    def _connection(self, conn):
+        """The given connection, or the calling thread's pooled read connection"""
+        if conn is not None:
+            return nullcontext(conn)
+        return self.pool.read()
+
+    # -- retention ------------------------------------------------------------
+
+    def drop(self, key: str) -> bool:
+        """Delete one partition's files; connections detach it on their next use"""
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.discard(key)
+        path = self.path(key)
+        for leftover in (path, f"{path}-wal", f"{path}-shm"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+        self.stats['dropped'] += 1
+        logger.info(f"🗑️  Dropped partition {path}")
+        return True
+
+    def drop_before(self, cutoff: datetime) -> int:
+        """Drop every partition whose whole month lies before cutoff; returns partitions dropped"""
+        return sum(self.drop(key) for key in self.partitions() if key < partition_key(cutoff))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        keys = self.partitions()
+        return {**self.stats, 'partitions': len(keys), 'oldest': keys[0] if keys else None,
+                'newest': keys[-1] if keys else None,
+                'bytes': sum(os.path.getsize(self.path(key)) for key in keys if os.path.exists(self.path(key)))}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from sqlite_pool import SQLiteConnectionPool
+
+    parser = argparse.ArgumentParser(description='Inspect or expire monthly table partitions')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('table', help='Partitioned table')
+    parser.add_argument('--dir', help='Partition directory (default: <db_path>.partitions)')
+    parser.add_argument('--drop-before', help='Drop months that end before this date (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    partitions = MonthlyPartitions(SQLiteConnectionPool(args.db_path), args.table, args.dir)
+    if args.drop_before:
+        print(f"dropped {partitions.drop_before(datetime.fromisoformat(args.drop_before))} partition(s)")
+    for key in partitions.partitions():
+        print(key, os.path.getsize(partitions.path(key)), 'bytes')
@@ -0,0 +1,1444 @@
+"""
+Performance Benchmarks
+Before/after measurements for the result, storage and analytics hot paths
+
+Every benchmark builds its fixtures under one scratch directory per run and
+times with the shared helpers below, so each function only holds what it
+compares.
+
+Usage:
+    python performance_benchmarks.py                 # run every benchmark
+    python performance_benchmarks.py results         # run selected benchmarks
+    python performance_benchmarks.py --list
+"""
+
+import gc
+import os
+import json
+import time
+import atexit
+import random
+import shutil
+import tempfile
+import threading
+import tracemalloc
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function under a short name"""
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Harness
+# ---------------------------------------------------------------------------
+
+_scratch_root: Optional[str] = None
+
+
+def scratch_path(*parts: str) -> str:
+    """Path under this run's scratch directory (created on first use, removed at exit)"""
+    global _scratch_root
+    if _scratch_root is None:
+        _scratch_root = tempfile.mkdtemp(prefix='bench_')
+        atexit.register(shutil.rmtree, _scratch_root, True)
+    path = os.path.join(_scratch_root, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def timed(func: Callable[[], Any], repeat: int = 1) -> Tuple[float, Any]:
+    """Best-of-N wall time of func() in seconds, and its last result"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def measure_rate(func: Callable[[], Any], items: int, repeat: int = 3) -> Dict[str, float]:
+    """Best-of-N throughput of func, which processes `items` units per call"""
+    seconds, _ = timed(func, repeat)
+    return {'seconds': round(seconds, 4), 'per_second': rate(items, seconds)}
+
+
+def measure_memory(factory: Callable[[], Any]) -> Dict[str, Any]:
+    """Return (object, bytes allocated) for whatever the factory builds"""
+    gc.collect()
+    tracemalloc.start()
+    obj = factory()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'object': obj, 'bytes': current}
+
+
+def peak_memory(func: Callable[[], Any]) -> Tuple[float, int]:
+    """Wall time and peak traced allocation of one func() call"""
+    gc.collect()
+    tracemalloc.start()
+    seconds, _ = timed(func)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def call_latencies(func: Callable[[Any], Any], items: Iterable) -> List[float]:
+    """Sorted wall times of func(item) for each item"""
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def quantile(values: List[float], q: float) -> float:
+    """q-quantile of already sorted values"""
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def run_threads(worker: Callable[[int], None], threads: int) -> float:
+    """Run worker(thread_index) on N threads, as concurrent Flask request threads would"""
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def ms(seconds: float, digits: int = 2) -> float:
+    return round(seconds * 1000, digits)
+
+
+def rate(items: int, seconds: float, digits: Optional[int] = 1) -> float:
+    """items per second, rounded (to an int with digits=None)"""
+    return round(items / seconds, digits) if seconds else float('inf')
+
+
+def real_database(path: str):
+    """(Flask app, RealDatabaseManager) on a SQLite file"""
+    from flask import Flask
+    from real_database import RealDatabaseManager
+
+    app = Flask(__name__)
+    manager = RealDatabaseManager(database_url=f"sqlite:///{path}")
+    manager.init_app(app)
+    return app, manager
+
+
+INSERT_ANALYSIS_RESULT = """
+    INSERT INTO analysis_results (id, content, sentiment, confidence, source, timestamp, metadata, hour)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def analysis_rows(count: int, rng: random.Random, now: datetime, days: int = 30,
+                  sources: Tuple[str, ...] = ('api', 'dashboard', 'batch'), offset: int = 0) -> Iterator[tuple]:
+    """INSERT_ANALYSIS_RESULT rows spread at random over the last `days` days"""
+    for i in range(offset, offset + count):
+        ts = now - timedelta(seconds=rng.randint(0, days * 86400))
+        yield (str(i), 'text', rng.choice(['positive', 'negative', 'neutral']), rng.random(),
+               rng.choice(sources), ts, '{}', ts.hour)
+
+
+def print_report(name: str, report: Dict[str, Any]):
+    print(f"\n📊 {name}")
+    print("-" * 60)
+    for key, value in report.items():
+        print(f"  {key:<38} {value}")
+
+
+# ---------------------------------------------------------------------------
+# Result objects (compact __slots__ type vs previous dataclass)
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _LegacySentimentResult:
+    """Replica of the dataclass result used before sentiment_result.SentimentResult"""
+    text: str
+    sentiment: str
+    confidence: float
+    scores: Dict[str, float]
+    model_used: str
+    processing_time: float
+    emotion_scores: Optional[Dict[str, float]] = None
+    toxicity_score: float = 0.0
+    method: str = 'unknown'
+    timestamp: Optional[str] = None
+    text_length: int = 0
+    word_count: int = 0
+    error_details: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.timestamp:
+            self.timestamp = datetime.utcnow().isoformat()
+        if not self.text_length:
+            self.text_length = len(self.text)
+        if not self.word_count:
+            self.word_count = len(self.text.split())
+
+
+@benchmark('results')
+def benchmark_result_objects(rows: int = 100_000) -> Dict[str, Any]:
+    """Memory per 100k results and serialization throughput before/after"""
+    from sentiment_result import SentimentResult, ResultBatch, ORJSON_AVAILABLE
+
+    texts = [f"Sample comment number {i} about matatu traffic in Nairobi" for i in range(rows)]
+
+    def make(cls):
+        return [cls(text=t, sentiment='positive', confidence=0.91,
+                    scores={'positive': 0.91, 'negative': 0.04, 'neutral': 0.05},
+                    model_used='vader', processing_time=0.001, method='vader')
+                for t in texts]
+
+    legacy = measure_memory(lambda: make(_LegacySentimentResult))
+    compact = measure_memory(lambda: make(SentimentResult))
+    batch = measure_memory(lambda: ResultBatch(compact['object']))
+
+    sample = 10_000
+    legacy_objs = legacy['object'][:sample]
+    compact_objs = compact['object'][:sample]
+    batch_sample = ResultBatch(compact_objs)
+
+    before = measure_rate(lambda: [json.dumps(asdict(r), indent=2) for r in legacy_objs], sample)
+    after = measure_rate(lambda: [r.to_json() for r in compact_objs], sample)
+    columnar = measure_rate(lambda: list(batch_sample.to_json_lines()), sample)
+
+    return {
+        'rows': rows,
+        'orjson_available': ORJSON_AVAILABLE,
+        'dataclass_bytes_per_100k': int(legacy['bytes'] * 100_000 / rows),
+        'slots_bytes_per_100k (incl. texts)': int(compact['bytes'] * 100_000 / rows),
+        'batch_bytes_per_100k (columns only)': int(batch['bytes'] * 100_000 / rows),
+        'json.dumps(asdict, indent=2) /s': before['per_second'],
+        'SentimentResult.to_json() /s': after['per_second'],
+        'ResultBatch.to_json_lines() /s': columnar['per_second'],
+    }
+
+
+# ---------------------------------------------------------------------------
+# SQLite connection layer (pooled WAL connections vs connect-per-call)
+# ---------------------------------------------------------------------------
+
+@benchmark('sqlite_pool')
+def benchmark_sqlite_pool(rows: int = 4_000, threads: int = 8) -> Dict[str, Any]:
+    """Concurrent insert/query throughput: pooled WAL connections vs connect-per-call"""
+    import sqlite3
+    from database_manager import DatabaseManager
+
+    per_thread = rows // threads
+    legacy_path = scratch_path('sqlite_pool', 'legacy.db')
+    manager = DatabaseManager(scratch_path('sqlite_pool', 'pooled.db'))
+
+    # Legacy path: the pre-pool pattern of a new rollback-journal connection per call
+    with sqlite3.connect(legacy_path) as conn:
+        conn.execute("""CREATE TABLE analysis_results (id TEXT PRIMARY KEY, content TEXT, sentiment TEXT,
+                        confidence REAL, source TEXT, timestamp DATETIME, metadata TEXT)""")
+
+    def legacy_insert(n):
+        for i in range(per_thread):
+            with sqlite3.connect(legacy_path, timeout=30) as conn:
+                conn.execute("INSERT INTO analysis_results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (f"{n}-{i}", "text", "positive", 0.9, "api", datetime.now(), "{}"))
+                conn.commit()
+
+    def legacy_query(n):
+        for _ in range(per_thread // 10):
+            with sqlite3.connect(legacy_path, timeout=30) as conn:
+                conn.execute("SELECT sentiment, COUNT(*) FROM analysis_results WHERE timestamp > ? GROUP BY sentiment",
+                             (datetime.now() - timedelta(hours=24),)).fetchall()
+
+    def pooled_insert(n):
+        for _ in range(per_thread):
+            manager.store_analysis_result("text", "positive", 0.9, "api")
+
+    def pooled_query(n):
+        for _ in range(per_thread // 10):
+            manager.get_sentiment_statistics()
+
+    inserts, queries = per_thread * threads, (per_thread // 10) * threads
+    return {
+        'threads': threads,
+        'inserts': inserts,
+        'connect-per-call inserts /s': rate(inserts, run_threads(legacy_insert, threads)),
+        'pooled WAL inserts /s': rate(inserts, run_threads(pooled_insert, threads)),
+        'connect-per-call queries /s': rate(queries, run_threads(legacy_query, threads)),
+        'pooled WAL statistics calls /s (3 queries each)': rate(queries, run_threads(pooled_query, threads)),
+        'journal_mode': manager.pool.get_status()['journal_mode'],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Bulk persistence (executemany / bulk_insert_mappings vs one row per call)
+# ---------------------------------------------------------------------------
+
+@benchmark('bulk_insert')
+def benchmark_bulk_insert(rows: int = 100_000) -> Dict[str, Any]:
+    """Rows/sec for per-row saves vs the bulk transactional save APIs"""
+    from database import DatabaseManager, CommentAnalysis, SentimentType, CommentTag, ToxicityLevel
+    from enhanced_database import EnhancedDatabaseManager
+    from sentiment_result import SentimentResult
+
+    # The per-row paths are timed on a sample; at 100k rows they would take minutes
+    sample = min(rows, 5_000)
+    now = datetime.now()
+
+    def comments(n, prefix):
+        return (CommentAnalysis(
+            comment_id=f"{prefix}{i}", text=f"comment {i}", sentiment=SentimentType.POSITIVE,
+            sentiment_confidence=0.9, emotions=['joy'], tag=CommentTag.SUPPORTIVE, tag_confidence=0.8,
+            toxicity_level=ToxicityLevel.SAFE, toxicity_confidence=0.1, language_detected='en',
+            word_count=2, emoji_count=0, created_at=now, video_id='bench') for i in range(n))
+
+    def results(n, prefix):
+        return (SentimentResult(f"text {prefix}{i}", 'positive', 0.9, {'positive': 0.9}, 'vader', 0.001)
+                for i in range(n))
+
+    def compare(label, save_one, save_many, make):
+        """Per-row saves of a sample vs one bulk save of every row"""
+        single, _ = timed(lambda: [save_one(item) for item in make(sample, 's')])
+        bulk, _ = timed(lambda: save_many(make(rows, 'b')))
+        report[f"{label} rows/s"] = rate(sample, single)
+        report[f"{label.replace('analysis', 'analyses')} rows/s"] = rate(rows, bulk)
+
+    report = {'rows': rows, 'per-row sample': sample}
+
+    comment_db = DatabaseManager(connection_string=scratch_path('bulk_insert', 'comments.db'))
+    compare('save_comment_analysis', comment_db.save_comment_analysis, comment_db.save_comment_analyses, comments)
+
+    enhanced_db = EnhancedDatabaseManager(scratch_path('bulk_insert', 'enhanced.db'))
+    compare('enhanced save_sentiment_analysis', enhanced_db.save_sentiment_analysis,
+            enhanced_db.save_sentiment_analyses, results)
+
+    app, real_db = real_database(scratch_path('bulk_insert', 'real.db'))
+    with app.app_context():
+        compare('SQLAlchemy save_sentiment_analysis', real_db.save_sentiment_analysis,
+                real_db.save_sentiment_analyses, results)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Write-behind persistence (request-path save latency)
+# ---------------------------------------------------------------------------
+
+@benchmark('write_behind')
+def benchmark_write_behind(rows: int = 20_000) -> Dict[str, Any]:
+    """Request-path cost of a synchronous commit vs queueing for the write-behind writer"""
+    from enhanced_database import EnhancedDatabaseManager
+    from sentiment_result import SentimentResult
+    from write_behind import WriteBehindQueue
+
+    manager = EnhancedDatabaseManager(scratch_path('write_behind', 'wb.db'))
+    results = [SentimentResult(f"text {i}", 'positive', 0.9, {'positive': 0.9}, 'vader', 0.001)
+               for i in range(rows)]
+
+    sync = call_latencies(manager.save_sentiment_analysis, results)
+
+    queue = WriteBehindQueue(manager.save_sentiment_analyses, max_size=rows).start()
+    queued = []
+    drained, _ = timed(lambda: (queued.extend(call_latencies(queue.submit, results)), queue.flush()))
+    metrics = queue.get_metrics()
+    queue.close()
+
+    def us(values, q):
+        return round(quantile(values, q) * 1e6, 1)
+
+    return {
+        'rows': rows,
+        'sync save p50 / p99 (us)': f"{us(sync, 0.5)} / {us(sync, 0.99)}",
+        'write-behind submit p50 / p99 (us)': f"{us(queued, 0.5)} / {us(queued, 0.99)}",
+        'sync save rows/s': rate(rows, sum(sync)),
+        'write-behind end-to-end rows/s': rate(rows, drained),
+        'batches flushed': metrics['flushes'],
+        'flush latency avg (ms)': metrics['flush_latency_ms']['avg'],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Indexes and stored hour buckets (schema migrations)
+# ---------------------------------------------------------------------------
+
+_RAW_STATISTICS_SQL = """
+    SELECT hour, sentiment, source, COUNT(*), SUM(confidence)
+    FROM analysis_results
+    WHERE timestamp > ?
+    GROUP BY hour, sentiment, source
+"""
+
+
+@benchmark('indexes')
+def benchmark_indexes(rows: int = 300_000) -> Dict[str, Any]:
+    """Dashboard statistics latency on a 30-day table with and without the migration indexes"""
+    from database_manager import DatabaseManager
+
+    manager = DatabaseManager(scratch_path('indexes', 'idx.db'))
+    now = datetime.now()
+    with manager.pool.write() as conn:
+        conn.executemany(INSERT_ANALYSIS_RESULT, analysis_rows(rows, random.Random(7), now))
+        conn.execute("ANALYZE")
+
+    # Summaries now read the rollup cube, so time the raw windowed query directly
+    def statistics():
+        with manager.pool.read() as conn:
+            return conn.execute(_RAW_STATISTICS_SQL, (now - timedelta(hours=24),)).fetchall()
+
+    indexed = measure_rate(statistics, 1, repeat=5)
+    with manager.pool.write() as conn:
+        conn.execute("DROP INDEX idx_analysis_results_ts_cover")
+    scanned = measure_rate(statistics, 1, repeat=5)
+
+    return {
+        'rows': rows,
+        '24h statistics query full scan (ms)': ms(scanned['seconds']),
+        '24h statistics query covering index (ms)': ms(indexed['seconds']),
+        'speedup': round(scanned['seconds'] / indexed['seconds'], 1),
+    }
+
+
+@benchmark('rollups')
+def benchmark_rollups(rows: int = 10_000_000) -> Dict[str, Any]:
+    """Summary latency from raw rows vs the rollup cube, plus rebuild and insert-trigger cost"""
+    from database_manager import DatabaseManager
+    from rollups import ANALYSIS_CUBE
+
+    manager = DatabaseManager(scratch_path('rollups', 'rollup.db'))
+    now = datetime.now()
+    rng = random.Random(11)
+    sources = ('api', 'dashboard', 'batch', 'stream')
+
+    def generate(count, offset=0):
+        return analysis_rows(count, rng, now, sources=sources, offset=offset)
+
+    sample = 20_000
+    with manager.pool.write() as conn:
+        with_trigger = measure_rate(lambda: conn.executemany(INSERT_ANALYSIS_RESULT, generate(sample, rows)),
+                                    sample, repeat=1)
+        conn.execute(f"DROP TRIGGER trg_{ANALYSIS_CUBE.name}_insert")
+        without_trigger = measure_rate(lambda: conn.executemany(INSERT_ANALYSIS_RESULT,
+                                                                generate(sample, rows + sample)),
+                                       sample, repeat=1)
+        # Bulk load without the trigger, then build the cube in one pass
+        for chunk_start in range(0, rows, 500_000):
+            conn.executemany(INSERT_ANALYSIS_RESULT, generate(min(500_000, rows - chunk_start), chunk_start))
+    with manager.pool.write() as conn:
+        rebuild, _ = timed(lambda: ANALYSIS_CUBE.rebuild(conn))
+        conn.execute(ANALYSIS_CUBE.trigger_sql())
+        cube_rows = conn.execute(f"SELECT COUNT(*) FROM {ANALYSIS_CUBE.name}").fetchone()[0]
+        conn.execute("ANALYZE")
+
+    results = {'rows': rows, 'cube rows': cube_rows,
+               'cube rebuild (s)': round(rebuild, 2),
+               'insert with trigger (rows/s)': round(with_trigger['per_second']),
+               'insert without trigger (rows/s)': round(without_trigger['per_second'])}
+    for label, hours in (('24h', 24), ('7d', 24 * 7), ('30d', 24 * 30)):
+        def raw():
+            with manager.pool.read() as conn:
+                return conn.execute(_RAW_STATISTICS_SQL, (now - timedelta(hours=hours),)).fetchall()
+
+        from_raw, _ = timed(raw, repeat=3)
+        from_cube, _ = timed(lambda: manager.get_sentiment_statistics(hours=hours), repeat=3)
+        results[f"{label} statistics raw (ms)"] = ms(from_raw)
+        results[f"{label} statistics cube (ms)"] = ms(from_cube)
+        results[f"{label} speedup"] = round(from_raw / max(from_cube, 1e-4), 1)
+    return results
+
+
+@benchmark('summary_query')
+def benchmark_summary_query(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Analytics summary latency: four legacy scans vs one consolidated scan vs the rollup cube"""
+    from enhanced_database import EnhancedDatabaseManager
+    from rollups import SENTIMENT_CUBE
+
+    manager = EnhancedDatabaseManager(scratch_path('summary_query', 'summary.db'))
+    now = datetime.now()
+    rng = random.Random(5)
+    with manager.pool.write() as conn:
+        conn.execute(f"DROP TRIGGER trg_{SENTIMENT_CUBE.name}_insert")
+        data = []
+        for i in range(rows):
+            ts = now - timedelta(seconds=rng.randint(0, 30 * 86400))
+            data.append(('text', rng.choice(['positive', 'negative', 'neutral']), rng.random(), None,
+                         rng.choice(['vader', 'textblob', 'distilled']), rng.random() / 100, '{}',
+                         ts.strftime('%Y-%m-%d %H:%M:%S'), ts.hour))
+        conn.executemany(manager._INSERT_ANALYSIS, data)
+        SENTIMENT_CUBE.rebuild(conn)
+        conn.execute(SENTIMENT_CUBE.trigger_sql())
+        conn.execute("ANALYZE")
+    del data
+
+    start = now - timedelta(days=7)
+    legacy = [
+        "SELECT COUNT(*) FROM sentiment_analyses WHERE timestamp >= ?",
+        "SELECT sentiment, COUNT(*) FROM sentiment_analyses WHERE timestamp >= ? GROUP BY sentiment",
+        "SELECT AVG(confidence) FROM sentiment_analyses WHERE timestamp >= ?",
+        "SELECT hour, COUNT(*) FROM sentiment_analyses WHERE timestamp >= ? AND hour IS NOT NULL GROUP BY hour",
+    ]
+
+    def four_scans():
+        with manager.pool.read() as conn:
+            return [conn.execute(sql, (start,)).fetchall() for sql in legacy]
+
+    four, _ = timed(four_scans, repeat=3)
+    single, _ = timed(lambda: manager.analytics_summary(start, now + timedelta(days=1)), repeat=3)
+    cube, _ = timed(lambda: manager.analytics_summary(start), repeat=3)
+
+    return {
+        'rows': rows,
+        '7d summary, 4 scans (ms)': ms(four),
+        '7d summary, 1 scan (ms)': ms(single),
+        '7d summary, rollup cube (ms)': ms(cube),
+        'single-scan speedup': round(four / max(single, 1e-4), 1),
+    }
+
+
+@benchmark('pagination')
+def benchmark_pagination(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Page fetch latency at increasing depth: LIMIT/OFFSET vs (timestamp, id) keyset cursor"""
+    from enhanced_database import EnhancedDatabaseManager
+    from pagination import encode_cursor
+    from rollups import SENTIMENT_CUBE
+
+    manager = EnhancedDatabaseManager(scratch_path('pagination', 'page.db'))
+    base = datetime(2024, 1, 1)
+    with manager.pool.write() as conn:
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{SENTIMENT_CUBE.name}_insert")
+        conn.executemany(manager._INSERT_ANALYSIS, (
+            ('text', 'neutral', 0.5, None, 'vader', 0.0, '{}',
+             (base + timedelta(seconds=i // 2)).strftime('%Y-%m-%d %H:%M:%S'), 0)
+            for i in range(rows)
+        ))
+        conn.execute("ANALYZE")
+
+    limit = 50
+    results = {'rows': rows}
+    for depth in (0, rows // 100, rows // 10, rows - limit):
+        # Cursor of the row just before the page, as a client would hold it
+        with manager.pool.read() as conn:
+            row = conn.execute("SELECT timestamp, id FROM sentiment_analyses ORDER BY timestamp DESC, id DESC "
+                               "LIMIT 1 OFFSET ?", (max(depth - 1, 0),)).fetchone()
+        cursor = encode_cursor(*row) if depth else None
+        offset, _ = timed(lambda: manager.get_recent_analyses(limit, depth), repeat=3)
+        keyset, _ = timed(lambda: manager.get_recent_analyses(limit, cursor=cursor), repeat=3)
+        results[f"depth {depth}: offset (ms)"] = ms(offset)
+        results[f"depth {depth}: cursor (ms)"] = ms(keyset)
+    return results
+
+
+@benchmark('fulltext')
+def benchmark_fulltext(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Search latency over stored analyses: FTS5 (BM25, snippets) vs the LIKE '%q%' scan"""
+    from enhanced_database import EnhancedDatabaseManager
+    from rollups import SENTIMENT_CUBE
+    from search_index import ANALYSIS_SEARCH
+
+    rng = random.Random(7)
+    vocabulary = [f"w{i:05d}" for i in range(20_000)]
+    manager = EnhancedDatabaseManager(scratch_path('fulltext', 'fts.db'))
+    with manager.pool.write() as conn:
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{SENTIMENT_CUBE.name}_insert")
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{ANALYSIS_SEARCH.name}_insert")  # bulk load, then rebuild
+        conn.executemany(manager._INSERT_ANALYSIS, (
+            (' '.join(rng.choices(vocabulary, k=12)), ('positive', 'negative', 'neutral')[i % 3], 0.5,
+             None, 'vader', 0.0, '{}', '2024-01-01 00:00:00', 0)
+            for i in range(rows)
+        ))
+    with manager.pool.write() as conn:
+        rebuild_seconds, _ = timed(lambda: ANALYSIS_SEARCH.rebuild(conn))
+
+    results = {'documents': rows, 'rebuild (s)': round(rebuild_seconds, 2)}
+    queries = {'one term': 'w19999', 'two terms': 'w00001 w00002', 'prefix (10 terms)': 'w1234',
+               'term + sentiment filter': 'w04242'}
+    for label, query in queries.items():
+        sentiment = 'negative' if 'filter' in label else None
+        for mode, enabled in (('fts', True), ('like', False)):
+            manager.search_enabled = enabled
+            seconds, _ = timed(lambda: manager.search_analyses(query, sentiment, limit=20), repeat=3)
+            results[f"{label}: {mode} (ms)"] = ms(seconds)
+    return results
+
+
+@benchmark('export')
+def benchmark_export(rows: int = 200_000) -> Dict[str, Any]:
+    """Peak memory and time of a full export: ORM load + json.dumps vs streamed writers"""
+    from real_database import SentimentAnalysis
+    from streaming_export import PARQUET_AVAILABLE, write_file
+
+    app, manager = real_database(scratch_path('export', 'export.db'))
+
+    def legacy():
+        analyses = SentimentAnalysis.query.all()
+        return len(json.dumps([a.to_dict() for a in analyses], indent=2, default=str))
+
+    def stream(name, *args, **kwargs):
+        return lambda: write_file(manager.export_stream(*args, **kwargs), scratch_path('export', name))
+
+    report = {}
+    with app.app_context():
+        loaded = 0
+        for size in (rows // 10, rows):
+            manager.save_sentiment_analyses({
+                'text': f"exported analysis number {i}", 'sentiment': 'positive', 'confidence': 0.9,
+                'model_used': 'vader', 'scores': {'positive': 0.9, 'negative': 0.05, 'neutral': 0.05},
+            } for i in range(size - loaded))
+            loaded = size
+            targets = {'legacy json (ORM + dumps)': legacy,
+                       'stream ndjson': stream('e.ndjson', 'ndjson'),
+                       'stream csv.gz': stream('e.csv.gz', 'csv', compression='gzip')}
+            if PARQUET_AVAILABLE:
+                targets['stream parquet'] = stream('e.parquet', 'parquet')
+            for label, func in targets.items():
+                seconds, peak = peak_memory(func)
+                report[f"{size} rows {label}: peak MB"] = round(peak / 1e6, 1)
+                report[f"{size} rows {label}: s"] = round(seconds, 2)
+    return report
+
+
+@benchmark('archive')
+def benchmark_archive(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Tiering 120 days of analyses into Parquet: throughput, size and hot/archive reads"""
+    from database_manager import DatabaseManager
+
+    db_path = scratch_path('archive', 'analytics.db')
+    manager = DatabaseManager(db_path, archive_dir=scratch_path('archive', 'parquet'), hot_days=30)
+    now = datetime.now()
+    step = timedelta(days=120) / rows
+    with manager.pool.write() as conn:
+        conn.executemany(INSERT_ANALYSIS_RESULT, ((
+            f"id{i}", f"analysed text number {i}", ('positive', 'negative', 'neutral')[i % 3],
+            (i % 100) / 100, 'api', now - step * i, '{}', 0) for i in range(rows)))
+
+    def sizes():
+        with manager.pool.write() as conn:
+            conn.execute("VACUUM")
+        return os.path.getsize(db_path)
+
+    def recent():
+        return manager.get_recent_analyses(limit=100, hours=24)
+
+    report = {'rows': rows, 'sqlite before (MB)': round(sizes() / 1e6, 1)}
+    recent_before, _ = timed(recent, repeat=3)
+    seconds, moved = timed(lambda: manager.archive.archive(manager.pool, now - timedelta(days=30)))
+    report['archived rows'] = moved
+    report['archive rows/s'] = rate(moved, seconds)
+    report['sqlite after (MB)'] = round(sizes() / 1e6, 1)
+    report['parquet (MB)'] = round(sum(p['bytes'] for p in manager.archive.partitions()) / 1e6, 1)
+    report['recent 24h before (ms)'] = ms(recent_before)
+    report['recent 24h after (ms)'] = ms(timed(recent, repeat=3)[0])
+    report['hot+archive 60 days (ms)'] = ms(timed(
+        lambda: manager.analyses_table(now - timedelta(days=60), columns=('sentiment', 'confidence')), repeat=3)[0])
+    return report
+
+
+@benchmark('retention')
+def benchmark_retention(rows: int = 1_000_000) -> Dict[str, Any]:
+    """Purging 90% of a table: one DELETE vs batched retention, seen by a concurrent writer"""
+    from retention import RetentionEngine, RetentionRule
+    from sqlite_pool import SQLiteConnectionPool
+
+    now = datetime.now()
+    rule = RetentionRule('events', 'created_at', timedelta(days=7))
+
+    def build(name):
+        pool = SQLiteConnectionPool(scratch_path('retention', name))
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, payload TEXT, created_at TEXT)")
+            conn.execute("CREATE INDEX idx_events_created_at ON events(created_at)")
+            conn.executemany("INSERT INTO events (payload, created_at) VALUES (?, ?)", (
+                (f"payload {i} " * 8, (now - timedelta(days=30 if i < rows * 0.9 else 0)).isoformat(' '))
+                for i in range(rows)))
+        pool.writer.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return pool
+
+    def with_writer(pool, purge):
+        """Run purge while another thread inserts a row every millisecond; returns the insert waits"""
+        waits, done = [], threading.Event()
+
+        def writer():
+            while not done.is_set():
+                start = time.perf_counter()
+                with pool.write() as conn:
+                    conn.execute("INSERT INTO events (payload, created_at) VALUES ('live', ?)",
+                                 (datetime.now().isoformat(' '),))
+                waits.append(time.perf_counter() - start)
+                time.sleep(0.001)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        seconds, _ = timed(purge)
+        done.set()
+        thread.join()
+        waits.sort()
+        return seconds, waits
+
+    def file_mb(pool, size):
+        return f"{size / 1e6:.0f}/{os.path.getsize(pool.db_path) / 1e6:.0f}"
+
+    report = {'rows': rows, 'expired': int(rows * 0.9)}
+
+    legacy = build('legacy.db')
+    size = os.path.getsize(legacy.db_path)
+
+    def single_delete():
+        with legacy.write() as conn:
+            conn.execute("DELETE FROM events WHERE created_at < ?", (rule.format_cutoff(now - rule.max_age),))
+
+    seconds, waits = with_writer(legacy, single_delete)
+    legacy.close_all()
+    report.update({'single DELETE (s)': round(seconds, 2), 'single DELETE max insert wait (ms)': ms(waits[-1], 1),
+                   'single DELETE inserts served': len(waits),
+                   'single DELETE file MB before/after': file_mb(legacy, size)})
+
+    batched = build('batched.db')
+    engine = RetentionEngine(batched, [rule], time_budget=float('inf'))
+    result = {}
+    seconds, waits = with_writer(batched, lambda: result.update(engine.run().to_dict()))
+    report.update({'retention engine (s)': round(seconds, 2), 'engine max insert wait (ms)': ms(waits[-1], 1),
+                   'engine p99 insert wait (ms)': ms(quantile(waits, 0.99)), 'engine inserts served': len(waits),
+                   'engine batches': result['batches'],
+                   'engine MB reclaimed': round(result['bytes_reclaimed'] / 1e6, 1),
+                   'engine file MB before/after': file_mb(batched, size)})
+    batched.close_all()
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Shared storage engine (combined write path of the four managers)
+# ---------------------------------------------------------------------------
+
+@benchmark('storage')
+def benchmark_storage(requests: int = 5_000) -> Dict[str, Any]:
+    """Requests/s and commits for one analysis persisted by all four managers"""
+    from database import DatabaseManager as VideoDatabase
+    from database_manager import DatabaseManager
+    from enhanced_database import EnhancedDatabaseManager
+    from real_database import SentimentAnalysis, ApiUsage, db
+
+    result = {'text': 'great service', 'sentiment': 'positive', 'confidence': 0.9,
+              'scores': {'positive': 0.9}, 'model_used': 'vader', 'processing_time': 0.001}
+    report = {'requests': requests, 'writes per request': 6}
+
+    # Before: analytics and video/enhanced on separate files, the Flask manager on a third
+    # through its own ORM engine, every write its own transaction
+    legacy_analytics = DatabaseManager(scratch_path('storage', 'sentiment_analytics.db'))
+    legacy_video = VideoDatabase(connection_string=scratch_path('storage', 'sentiment_analysis.db'))
+    legacy_enhanced = EnhancedDatabaseManager(scratch_path('storage', 'sentiment_analysis.db'))
+    app, _ = real_database(scratch_path('storage', 'real.db'))
+
+    def legacy_request():
+        legacy_analytics.store_analysis_result(result['text'], 'positive', 0.9, 'api')
+        legacy_analytics.log_api_usage('/api/analyze', 0.01, 200)
+        legacy_enhanced.save_sentiment_analysis(result)
+        db.session.add(SentimentAnalysis(**{**result, 'source': 'api'}))
+        db.session.commit()
+        db.session.add(ApiUsage(endpoint='/api/analyze', method='POST', response_code=200))
+        db.session.commit()
+        legacy_video.log_info('analysis saved', 'api')
+
+    commits = legacy_analytics.pool.stats['writes'] + legacy_video.pool.stats['writes']
+    with app.app_context():
+        seconds, _ = timed(lambda: [legacy_request() for _ in range(requests)])
+    commits = legacy_analytics.pool.stats['writes'] + legacy_video.pool.stats['writes'] - commits
+    report['separate managers requests/s'] = rate(requests, seconds)
+    report['separate managers commits/request'] = round((commits + 2 * requests) / requests, 1)
+    report['separate managers database files'] = 3
+
+    # After: one database, one writer, the request's writes in one transaction
+    path = scratch_path('storage', 'shared.db')
+    analytics, video = DatabaseManager(path), VideoDatabase(connection_string=path)
+    enhanced = EnhancedDatabaseManager(path)
+    _, real = real_database(path)
+    storage = real.storage
+
+    def shared_request():
+        with storage.begin():
+            analytics.store_analysis_result(result['text'], 'positive', 0.9, 'api')
+            analytics.log_api_usage('/api/analyze', 0.01, 200)
+            enhanced.save_sentiment_analysis(result)
+            real.save_sentiment_analysis(result, source='api')
+            real.log_api_usage('/api/analyze', 'POST', response_code=200)
+            video.log_info('analysis saved', 'api')
+
+    commits = storage.pool.stats['writes']
+    seconds, _ = timed(lambda: [shared_request() for _ in range(requests)])
+    report['storage engine requests/s'] = rate(requests, seconds)
+    report['storage engine commits/request'] = round((storage.pool.stats['writes'] - commits) / requests, 1)
+    report['storage engine database files'] = 1
+    return report
+
+
+@benchmark('kv_cache')
+def benchmark_kv_cache(requests: int = 20_000) -> Dict[str, Any]:
+    """Requests/s for the /api/habits/list read-modify-write and a read-heavy key mix"""
+    from kv_cache import SQLiteKVStore, TieredCache
+    from sqlite_pool import SQLiteConnectionPool
+
+    pool = SQLiteConnectionPool(scratch_path('kv_cache', 'cache.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE analytics_cache (cache_key TEXT PRIMARY KEY, cache_data TEXT, expires_at DATETIME)")
+    store = SQLiteKVStore(pool, 'analytics_cache')
+    state = {'goals': [{'id': f"g{i}", 'title': 'Goal', 'target': 3} for i in range(3)],
+             'state': {f"g{i}": {'progress': 1, 'streak': 4} for i in range(3)}}
+    keys = [f"report:{i}" for i in range(200)]
+    rng = random.Random(7)
+    reads = [rng.choice(keys[:20]) if rng.random() < 0.8 else rng.choice(keys) for _ in range(requests)]
+    report = {'requests': requests}
+
+    def run(label, get, set_):
+        def habits():  # habits list: read the state, persist it back
+            for _ in range(requests):
+                set_('habits_state', get('habits_state') or state)
+
+        report[f"{label} habits requests/s"] = rate(requests, timed(habits)[0])
+        for key in keys:
+            set_(key, {'total': 1})
+        report[f"{label} reads/s"] = rate(requests, timed(lambda: [get(key) for key in reads])[0])
+
+    # Before: every lookup and write is a SQLite round trip
+    def sqlite_get(key):
+        found = store.load(key)
+        return found[0] if found else None
+
+    run('sqlite', sqlite_get, lambda key, value: store.store_many([(key, value, time.time() + 86400)]))
+
+    for mode in ('write-through', 'write-back'):
+        cache = TieredCache(store, max_entries=100, mode=mode)
+        run(mode, cache.get, lambda key, value: cache.set(key, value, ttl=86400))
+        cache.flush()
+        report[f"{mode} hit rates"] = cache.hit_rates()
+        report[f"{mode} L2 writes"] = cache.stats['l2_writes']
+    pool.close_all()
+    return report
+
+
+@benchmark('json_codec')
+def benchmark_json_codec(rows: int = 100_000) -> Dict[str, Any]:
+    """Column size, listing/decoding throughput and model filtering: JSON text vs binary codec"""
+    import sqlite3
+    from json_codec import ANALYSIS_METADATA, MSGPACK_AVAILABLE, ZSTD_AVAILABLE, decode
+
+    rng = random.Random(3)
+    models = ['cardiffnlp/twitter-roberta-base-sentiment', 'vader', 'textblob', 'distilled-v1']
+    words = ['price', 'service', 'delivery', 'network', 'bei', 'poa', 'safaricom', 'mpesa', 'traffic', 'rain']
+    start = datetime.now() - timedelta(hours=12)
+    metadata = [{
+        'model': rng.choice(models), 'language': rng.choice(['en', 'sw', 'sheng']),
+        'scores': {'positive': round(rng.random(), 4), 'negative': round(rng.random(), 4),
+                   'neutral': round(rng.random(), 4)},
+        'keywords': rng.sample(words, 4), 'emotions': {'joy': round(rng.random(), 3), 'anger': round(rng.random(), 3)},
+        'client': {'ip_hash': f"{rng.getrandbits(64):016x}", 'user_agent': 'Mozilla/5.0 (Linux; Android 13)'},
+    } for _ in range(rows)]
+    report = {'rows': rows, 'msgpack': MSGPACK_AVAILABLE, 'zstd': ZSTD_AVAILABLE}
+    create = """CREATE TABLE analysis_results (id TEXT PRIMARY KEY, content TEXT, sentiment TEXT, confidence REAL,
+                source TEXT, timestamp DATETIME, metadata TEXT, model TEXT, language TEXT)"""
+
+    def build(label, encode_row):
+        conn = sqlite3.connect(':memory:')
+        conn.execute(create)
+        conn.executemany("INSERT INTO analysis_results VALUES (?, ?, 'positive', 0.9, 'api', ?, ?, ?, ?)",
+                         [(str(i), f"text {i}", start + timedelta(seconds=i * 0.4), *encode_row(meta))
+                          for i, meta in enumerate(metadata)])
+        conn.execute("CREATE INDEX idx_ts ON analysis_results(timestamp)")
+        conn.execute("CREATE INDEX idx_model ON analysis_results(model, timestamp)")
+        report[f"{label} metadata MB"] = round(
+            conn.execute("SELECT SUM(LENGTH(CAST(metadata AS BLOB))) FROM analysis_results").fetchone()[0] / 1e6, 2)
+        return conn
+
+    text_conn = build('json text', lambda meta: (json.dumps(meta), None, None))
+    codec_conn = build('codec', ANALYSIS_METADATA.values)
+    listing = "SELECT id, content, timestamp, metadata FROM analysis_results WHERE timestamp > ? ORDER BY timestamp DESC"
+
+    # Before: every listed row is parsed; after: only rows whose metadata is read
+    for label, read in (('json text list', lambda: [json.loads(r[3]) for r in text_conn.execute(listing, (start,))]),
+                        ('codec lazy list', lambda: list(codec_conn.execute(listing, (start,)))),
+                        ('codec decoded list', lambda: [decode(r[3]) for r in codec_conn.execute(listing, (start,))])):
+        report[f"{label} rows/s"] = rate(rows, timed(read, repeat=3)[0], None)
+
+    pattern = '%distilled%'
+    report['json text filter by model ms'] = ms(timed(lambda: text_conn.execute(
+        "SELECT COUNT(*) FROM analysis_results WHERE json_extract(metadata, '$.model') LIKE ?",
+        (pattern,)).fetchone(), repeat=3)[0])
+    report['codec indexed filter by model ms'] = ms(timed(lambda: codec_conn.execute(
+        "SELECT COUNT(*) FROM analysis_results WHERE model = ? AND timestamp > ?",
+        ('distilled-v1', start)).fetchone(), repeat=3)[0])
+    return report
+
+
+@benchmark('content_store')
+def benchmark_content_store(rows: int = 50_000, unique: int = 5_000) -> Dict[str, Any]:
+    """Text storage and re-scoring on a duplicate-heavy corpus: inline vs content-addressed with memoized scores"""
+    import sqlite3
+    from content_store import ContentStore, ScoreMemo, ZSTD_AVAILABLE
+    from sqlite_pool import SQLiteConnectionPool
+
+    rng = random.Random(5)
+    words = ['Safaricom', 'M-Pesa', 'tariffs', 'Nairobi', 'fuel', 'prices', 'rise', 'customers', 'network', 'bei',
+             'ya', 'unga', 'imepanda', 'traffic', 'Thika', 'road', 'matatu', 'strike', 'KPLC', 'outage', 'sana']
+    corpus = [' '.join(rng.choice(words) for _ in range(rng.randint(12, 40))) for _ in range(unique)]
+    texts = [rng.choice(corpus) for _ in range(rows)]  # retweets, syndicated headlines
+    report = {'rows': rows, 'unique texts': unique, 'zstd': ZSTD_AVAILABLE}
+
+    inline = sqlite3.connect(':memory:')
+    inline.execute("CREATE TABLE analysis_results (id INTEGER PRIMARY KEY, content TEXT)")
+    inline.executemany("INSERT INTO analysis_results (content) VALUES (?)", [(t,) for t in texts])
+    report['inline text MB'] = round(
+        inline.execute("SELECT SUM(LENGTH(CAST(content AS BLOB))) FROM analysis_results").fetchone()[0] / 1e6, 2)
+
+    def stored_mb(store):
+        stats = store.stats()
+        return round((stats['stored_bytes'] + rows * 16) / 1e6, 2)  # bodies plus one hash per row
+
+    plain = ContentStore(SQLiteConnectionPool(':memory:'))
+    plain.put_many(texts)
+    report['deduplicated MB'] = stored_mb(plain)
+    packed = ContentStore(SQLiteConnectionPool(':memory:'))
+    packed.train_dictionary(corpus[:1000])
+    packed.put_many(texts)
+    report['deduplicated + dictionary MB'] = stored_mb(packed)
+
+    def analyze(text):  # stands in for a model call
+        time.sleep(0.00002)
+        return {'sentiment': 'positive' if len(text.split()) % 2 else 'negative', 'confidence': 0.8}
+
+    report['always analyse texts/s'] = rate(rows, timed(lambda: [analyze(text) for text in texts])[0], None)
+
+    memo = ScoreMemo(SQLiteConnectionPool(':memory:'))
+
+    def score_all():
+        for start in range(0, rows, 500):
+            memo.score_many(texts[start:start + 500], 'vader', '1', analyze)
+
+    report['memoized first pass texts/s'] = rate(rows, timed(score_all)[0], None)
+    report['memoized re-score texts/s'] = rate(rows, timed(score_all)[0], None)
+    report['memo hit rate'] = round(memo.stats['hits'] / (memo.stats['hits'] + memo.stats['misses']), 3)
+    return report
+
+
+@benchmark('snapshots')
+def benchmark_snapshots(rows: int = 100_000, seconds: float = 3.0) -> Dict[str, Any]:
+    """Writer throughput and torn reports while analytics scan: live database vs read snapshots"""
+    from snapshot import SnapshotManager
+    from sqlite_pool import SQLiteConnectionPool
+
+    report = {'rows': rows}
+    start = datetime.now() - timedelta(days=7)
+
+    def run(label, use_snapshots):
+        pool = SQLiteConnectionPool(scratch_path('snapshots', f"{label}.db"))
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE analysis_results (id INTEGER PRIMARY KEY, sentiment TEXT, "
+                         "confidence REAL, batch INTEGER, timestamp DATETIME)")
+            conn.executemany("INSERT INTO analysis_results (sentiment, confidence, batch, timestamp) "
+                             "VALUES (?, ?, 0, ?)",
+                             [(('positive', 'negative', 'neutral')[i % 3], (i % 100) / 100,
+                               start + timedelta(seconds=i * 3)) for i in range(rows)])
+            conn.execute("CREATE INDEX idx_results_ts ON analysis_results(timestamp)")
+            conn.execute("CREATE INDEX idx_results_batch ON analysis_results(batch)")
+        snapshots = SnapshotManager(pool, max_age=1.0) if use_snapshots else None
+        stop = threading.Event()
+        latencies, reports, torn = [], [0], [0]
+
+        def write_batch(batch):
+            with pool.write() as conn:  # a batch is two statements, committed together
+                conn.executemany("INSERT INTO analysis_results (sentiment, confidence, batch, timestamp) "
+                                 "VALUES ('positive', 0.9, ?, ?)", [(batch, datetime.now())] * 50)
+                conn.execute("UPDATE analysis_results SET confidence = 0.5 WHERE batch = ?", (batch,))
+
+        def writer():
+            batch = 0
+            while not stop.is_set():
+                batch += 1
+                latencies.append(timed(lambda: write_batch(batch))[0])
+
+        def analyst():
+            while not stop.is_set():
+                context = snapshots.read() if snapshots else pool.read()
+                with context as conn:
+                    window = conn.execute("""
+                        SELECT sentiment, COUNT(*), AVG(confidence) FROM (
+                            SELECT sentiment, AVG(confidence) OVER (ORDER BY timestamp ROWS 50 PRECEDING)
+                            AS confidence FROM analysis_results WHERE timestamp > ?)
+                        GROUP BY sentiment""", (start,)).fetchall()
+                    total = conn.execute("SELECT COUNT(*) FROM analysis_results WHERE timestamp > ?",
+                                         (start,)).fetchone()[0]
+                    unsettled = conn.execute("SELECT COUNT(*) FROM analysis_results WHERE batch > 0 "
+                                             "AND confidence = 0.9").fetchone()[0]
+                reports[0] += 1
+                torn[0] += sum(row[1] for row in window) != total or unsettled > 0
+
+        threads = [threading.Thread(target=writer), threading.Thread(target=analyst)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        latencies.sort()
+        report[f"{label} writer batches/s"] = rate(len(latencies), seconds, None)
+        report[f"{label} writer p99 ms"] = ms(quantile(latencies, 0.99))
+        report[f"{label} reports"] = reports[0]
+        report[f"{label} torn reports"] = torn[0]
+        if snapshots:
+            report['snapshots taken'] = snapshots.stats['snapshots']
+            report['snapshot copy ms'] = snapshots.stats['last_copy_ms']
+            snapshots.close()
+        pool.close_all()
+
+    run('live', False)
+    run('snapshot', True)
+    return report
+
+
+@benchmark('timeseries')
+def benchmark_timeseries(metrics: int = 20, days: int = 2, interval: int = 10) -> Dict[str, Any]:
+    """Metric storage size, ingest rate and history queries: one row per sample vs compressed segments"""
+    import math
+    from sqlite_pool import SQLiteConnectionPool
+    from timeseries import TimeSeriesStore, install_timeseries
+
+    rng = random.Random(11)
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    steps = days * 86400 // interval
+    samples = [(f"metric_{m}", round(40 + 20 * math.sin(i / 300 + m) + rng.gauss(0, 2), 1),
+                start + timedelta(seconds=i * interval)) for i in range(steps) for m in range(metrics)]
+    report = {'samples': len(samples)}
+
+    def db_bytes(pool):
+        with pool.read() as conn:
+            return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+    legacy = SQLiteConnectionPool(scratch_path('timeseries', 'rows.db'))
+    with legacy.write() as conn:
+        conn.execute("CREATE TABLE metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, metric_name TEXT NOT NULL, "
+                     "metric_value REAL NOT NULL, timestamp DATETIME NOT NULL, category TEXT)")
+        conn.execute("CREATE INDEX idx_metrics_name_ts ON metrics(metric_name, timestamp, metric_value)")
+        conn.execute("CREATE INDEX idx_metrics_ts ON metrics(timestamp)")
+    seconds, _ = timed(lambda: [legacy.execute_write(
+        "INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES (?, ?, ?)", sample)
+        for sample in samples[:20000]])
+    report['rows: store_metric samples/s'] = rate(min(20000, len(samples)), seconds, None)
+    with legacy.write() as conn:
+        conn.executemany("INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES (?, ?, ?)",
+                         samples[20000:])
+    report['rows: MB'] = round(db_bytes(legacy) / 1e6, 2)
+
+    def rows_history():
+        with legacy.read() as conn:
+            return conn.execute("SELECT metric_value, timestamp FROM metrics WHERE metric_name = ? "
+                                "AND timestamp > ? ORDER BY timestamp",
+                                ('metric_3', end - timedelta(hours=24))).fetchall()
+
+    def rows_summary():
+        with legacy.read() as conn:
+            return conn.execute("SELECT MIN(metric_value), MAX(metric_value), AVG(metric_value), COUNT(*) "
+                                "FROM metrics WHERE metric_name = ? AND timestamp > ?",
+                                ('metric_3', start)).fetchone()
+
+    report['rows: 24h history ms'] = ms(timed(rows_history)[0])
+    report['rows: full-period summary ms'] = ms(timed(rows_summary)[0])
+
+    pool = SQLiteConnectionPool(scratch_path('timeseries', 'segments.db'))
+    with pool.write() as conn:
+        install_timeseries(conn)
+    store = TimeSeriesStore(pool, clock=lambda: end.timestamp())
+    seconds, _ = timed(lambda: (store.append_many(samples), store.flush(final=True)))
+    report['segments: samples/s'] = rate(len(samples), seconds, None)
+    report['segments: MB'] = round(db_bytes(pool) / 1e6, 2)
+    with pool.read() as conn:
+        payload = conn.execute("SELECT SUM(LENGTH(data)) FROM metric_segments WHERE resolution = 0").fetchone()[0]
+    report['segments: raw bytes/sample'] = round(payload / len(samples), 2)
+    reader = TimeSeriesStore(pool, clock=lambda: end.timestamp())  # reads what was persisted
+    report['segments: 24h history ms'] = ms(timed(lambda: reader.query('metric_3', end - timedelta(hours=24), end))[0])
+    report['segments: full-period summary ms'] = ms(timed(lambda: reader.summary('metric_3', start, end, tier='1h'))[0])
+    report['segments: memory KB per series'] = round(store.get_metrics()['memory_bytes'] / metrics / 1e3, 2)
+    return report
+
+
+@benchmark('api_accounting')
+def benchmark_api_accounting(requests: int = 20_000) -> Dict[str, Any]:
+    """Request-path cost of API usage accounting: INSERT + commit per request vs in-memory aggregates"""
+    from database_manager import DatabaseManager
+
+    endpoints = ['/api/analyze', '/api/batch', '/api/news', '/api/health']
+    rng = random.Random(3)
+    calls = [(rng.choice(endpoints), rng.expovariate(20), 500 if rng.random() < 0.01 else 200)
+             for _ in range(requests)]
+    report = {'requests': requests}
+
+    # Before: every request inserts an api_usage row (firing the rollup trigger) and commits
+    legacy = DatabaseManager(scratch_path('api_accounting', 'legacy.db'))
+
+    def insert_each():
+        for endpoint, response_time, status_code in calls:
+            with legacy.pool.write() as conn:
+                conn.execute("INSERT INTO api_usage (endpoint, timestamp, response_time, status_code, error_message) "
+                             "VALUES (?, ?, ?, ?, ?)", (endpoint, datetime.now(), response_time, status_code, None))
+
+    seconds, _ = timed(insert_each)
+    report['per-request insert us/request'] = round(seconds / requests * 1e6, 1)
+    report['per-request insert commits'] = requests
+
+    # After: log_api_usage updates a dict; flushes write compacted rollup rows
+    manager = DatabaseManager(scratch_path('api_accounting', 'buffered.db'))
+    writes = manager.pool.stats['writes']
+    seconds, _ = timed(lambda: [manager.log_api_usage(*call) for call in calls])
+    flush_seconds, rows = timed(manager.api_usage.flush)
+    report['buffered us/request'] = round(seconds / requests * 1e6, 1)
+    report['buffered flush ms'] = ms(flush_seconds)
+    report['buffered rows written'] = rows
+    report['buffered commits'] = manager.pool.stats['writes'] - writes
+    report['speedup (incl. flush)'] = round(report['per-request insert us/request'] * requests
+                                            / ((seconds + flush_seconds) * 1e6), 1)
+
+    # Both paths answer the same statistics
+    legacy_stats, stats = legacy.get_api_statistics(), manager.get_api_statistics()
+    report['same totals'] = (legacy_stats['total_requests'], legacy_stats['error_requests']) == \
+        (stats['total_requests'], stats['error_requests'])
+    report['get_api_statistics ms'] = ms(timed(manager.get_api_statistics)[0])
+    return report
+
+
+@benchmark('partitions')
+def benchmark_partitions(months: int = 12, rows_per_month: int = 25_000) -> Dict[str, Any]:
+    """Retention and range-query cost: one analysis table vs monthly partition files"""
+    from partitions import MonthlyPartitions
+    from sqlite_pool import SQLiteConnectionPool
+
+    schema = ["CREATE TABLE analyses (id INTEGER PRIMARY KEY, timestamp DATETIME, sentiment TEXT, "
+              "source TEXT, confidence REAL, content TEXT)",
+              "CREATE INDEX idx_analyses_ts ON analyses(timestamp, sentiment, confidence)"]
+    rng = random.Random(11)
+    first = datetime(2024, 1, 1)
+    span = (datetime(2024 + months // 12, months % 12 + 1, 1) - first).total_seconds()
+    rows = sorted(((i, first + timedelta(seconds=rng.random() * span), rng.choice(['positive', 'negative', 'neutral']),
+                    rng.choice(['api', 'news', 'social']), rng.random(), f"headline number {i} " * 4)
+                   for i in range(months * rows_per_month)), key=lambda row: row[1])
+    columns = ('id', 'timestamp', 'sentiment', 'source', 'confidence', 'content')
+    report = {'rows': len(rows), 'months': months}
+
+    monolithic = SQLiteConnectionPool(scratch_path('partitions', 'monolithic.db'))
+    partitioned = SQLiteConnectionPool(scratch_path('partitions', 'partitioned.db'))
+    for pool in (monolithic, partitioned):
+        with pool.write() as conn:
+            for sql in schema:
+                conn.execute(sql)
+    partitions = MonthlyPartitions(partitioned, 'analyses')
+
+    def load(pool, insert):
+        for chunk in range(0, len(rows), 5000):
+            with pool.write() as conn:
+                insert(conn, rows[chunk:chunk + 5000])
+
+    report['monolithic insert rows/s'] = rate(len(rows), timed(lambda: load(monolithic, lambda conn, chunk: (
+        conn.executemany("INSERT INTO analyses VALUES (?, ?, ?, ?, ?, ?)", chunk))))[0], None)
+    report['partitioned insert rows/s'] = rate(len(rows), timed(lambda: load(partitioned, lambda conn, chunk: (
+        partitions.insert(conn, columns, chunk))))[0], None)
+
+    # Range queries: one recent week aggregated, the newest 100 rows, the whole year aggregated
+    week = (datetime(2024, 1, 1) + timedelta(days=30 * months - 10), datetime(2024, 1, 1) + timedelta(days=30 * months - 3))
+    aggregate_sql = ("SELECT sentiment, COUNT(*), AVG(confidence) FROM analyses "
+                     "WHERE timestamp >= ? AND timestamp < ? GROUP BY sentiment")
+    with monolithic.read() as conn:
+        report['monolithic week aggregate ms'] = ms(timed(lambda: conn.execute(aggregate_sql, week).fetchall(), 20)[0])
+        report['monolithic newest 100 ms'] = ms(timed(lambda: conn.execute(
+            "SELECT id, timestamp FROM analyses ORDER BY timestamp DESC LIMIT 100").fetchall(), 20)[0])
+        report['monolithic full-range aggregate ms'] = ms(timed(lambda: conn.execute(
+            aggregate_sql, (first, datetime.max)).fetchall(), 3)[0])
+    report['partitioned week aggregate ms'] = ms(timed(lambda: partitions.aggregate(
+        *week, group_by=('sentiment',), measures={'confidence': 'confidence'}), 20)[0])
+    report['partitioned newest 100 ms'] = ms(timed(lambda: partitions.select(('id', 'timestamp'), limit=100), 20)[0])
+    report['partitioned full-range aggregate ms'] = ms(timed(lambda: partitions.aggregate(
+        group_by=('sentiment',), measures={'confidence': 'confidence'}), 3)[0])
+
+    # Retention: drop the oldest quarter
+    cutoff = datetime(2024, 4, 1)
+    seconds, cursor = timed(lambda: monolithic.execute_write("DELETE FROM analyses WHERE timestamp < ?", (cutoff,)))
+    report['monolithic drop 3 months ms'] = ms(seconds, 1)
+    report['monolithic rows deleted'] = cursor.rowcount
+    seconds, report['partitioned files unlinked'] = timed(lambda: partitions.drop_before(cutoff))
+    report['partitioned drop 3 months ms'] = ms(seconds)
+    report['monolithic file MB after drop'] = round(os.path.getsize(monolithic.db_path) / 1e6, 1)
+    report['partitioned files MB after drop'] = round(partitions.get_metrics()['bytes'] / 1e6, 1)
+    return report
+
+
+@benchmark('projections')
+def benchmark_projections(rows: int = 20_000, page: int = 500) -> Dict[str, Any]:
+    """Dashboard list reads: full rows (ORM instances / SELECT-all dicts) vs declared projections"""
+    import sys
+    from enhanced_database import EnhancedDatabaseManager
+    from real_database import db
+
+    first = datetime(2024, 5, 1)
+    text = "Serikali imetangaza mpango mpya wa elimu kwa shule za msingi na sekondari. " * 6
+    scores = {'positive': 0.71, 'negative': 0.09, 'neutral': 0.2}
+    report = {'rows': rows, 'page': page}
+
+    def payload_bytes(items):
+        total = 0
+        for item in items:
+            values = item.values() if isinstance(item, dict) else item
+            total += sum(sys.getsizeof(json.dumps(v, default=str)) if isinstance(v, (dict, list))
+                         else sys.getsizeof(v) for v in values)
+        return total
+
+    def measure(label, read, repeat=10):
+        read()  # warm caches and statement compilation
+        report[f"{label} ms/page"] = ms(timed(read, repeat)[0])
+        tracemalloc.start()
+        items = read()
+        snapshot_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+        report[f"{label} peak KB"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+        report[f"{label} live blocks"] = snapshot_blocks
+        report[f"{label} payload KB"] = round(payload_bytes(items) / 1024, 1)
+
+    enhanced = EnhancedDatabaseManager(scratch_path('projections', 'enhanced.db'))
+    with enhanced.pool.write() as conn:
+        conn.executemany(enhanced._INSERT_ANALYSIS, [
+            (f"{text} #{i}", 'positive', 0.7, json.dumps(scores), 'vader', 0.01, json.dumps({'source': 'api', 'i': i}),
+             (first + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S'), 10) for i in range(rows)])
+    measure('enhanced full', lambda: enhanced.get_recent_analyses(page))
+    measure('enhanced list view', lambda: enhanced.get_recent_analyses(page, view='list'))
+
+    app, real = real_database(scratch_path('projections', 'real.db'))
+    with app.app_context():
+        real.save_sentiment_analyses([{'text': f"{text} #{i}", 'sentiment': 'positive', 'confidence': 0.7,
+                                       'scores': scores, 'model_used': 'vader', 'toxicity_score': 0.1}
+                                      for i in range(rows)])
+        measure('real ORM to_dict', lambda: real.get_recent_analyses(page))
+        measure('real history view', lambda: real.get_recent_analyses(page, view='history'))
+        db.session.remove()
+    return report
+
+
+@benchmark('backup')
+def benchmark_backup(rows: int = 20_000) -> Dict[str, Any]:
+    """Writer commit latency with and without online backup + WAL archiving; checksum and restore cost"""
+    import sqlite3
+    from backup import BackupManager, FRAME_HEADER_SIZE, WAL_HEADER_SIZE, read_wal_header, restore, scan_frames, \
+        wal_checksum
+    from sqlite_pool import SQLiteConnectionPool
+
+    report = {'rows': rows}
+
+    def commit_latencies(pool, count):
+        def commit(i):
+            with pool.write() as conn:
+                conn.execute("INSERT INTO analyses (text, sentiment) VALUES (?, ?)", (f"habari {i} " * 20, 'neutral'))
+        return call_latencies(commit, range(count))
+
+    pools = {}
+    for label in ('no backup', 'archiving'):
+        pool = pools[label] = SQLiteConnectionPool(scratch_path('backup', f"{label.replace(' ', '_')}.db"))
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE analyses (id INTEGER PRIMARY KEY, text TEXT, sentiment TEXT)")
+            conn.executemany("INSERT INTO analyses (text, sentiment) VALUES (?, ?)",
+                             [(f"seed {i} " * 20, 'neutral') for i in range(rows)])
+
+    latencies = commit_latencies(pools['no backup'], rows // 4)
+    report['no backup commit p50 ms'] = ms(quantile(latencies, 0.5), 3)
+    report['no backup commit p99 ms'] = ms(quantile(latencies, 0.99), 3)
+
+    manager = BackupManager(pools['archiving'], scratch_path('backup', 'backups'), sync_interval=0.05,
+                            checkpoint_bytes=4 * 1024 * 1024)
+    report['base copy ms (paged, throttled)'] = ms(timed(manager.new_generation)[0], 1)
+    manager.start()
+    latencies = commit_latencies(pools['archiving'], rows // 4)
+    manager.close()
+    report['archiving commit p50 ms'] = ms(quantile(latencies, 0.5), 3)
+    report['archiving commit p99 ms'] = ms(quantile(latencies, 0.99), 3)
+    metrics = manager.get_metrics()
+    report['segments'] = metrics['segments']
+    report['frames archived'] = metrics['frames']
+    report['archived KB (gzip)'] = round(metrics['bytes_archived'] / 1024, 1)
+    report['writer hold ms (last sync)'] = metrics['last_writer_hold_ms']
+    report['restore ms'] = ms(timed(lambda: restore(manager.directory, scratch_path('backup', 'restored.db')))[0], 1)
+
+    # Frame validation: vectorized scan vs the frame-at-a-time reference checksum
+    sample_path = scratch_path('backup', 'wal_sample.db')
+    conn = sqlite3.connect(sample_path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    conn.execute("CREATE TABLE t (x TEXT)")
+    for i in range(500):
+        conn.execute("INSERT INTO t VALUES (?)", (str(i) * 2000,))
+        conn.commit()
+    with open(f"{sample_path}-wal", 'rb') as f:
+        data = f.read()
+    conn.close()
+    header = read_wal_header(data)
+    frames, frame_size = data[WAL_HEADER_SIZE:], FRAME_HEADER_SIZE + header.page_size
+
+    def reference():
+        checksum = header.checksum
+        for pos in range(0, len(frames), frame_size):
+            checksum = wal_checksum(frames[pos:pos + 8], *checksum, header.big_endian)
+            checksum = wal_checksum(frames[pos + FRAME_HEADER_SIZE:pos + frame_size], *checksum, header.big_endian)
+
+    count = len(frames) // frame_size
+    report['checksum frames/s (pure Python)'] = rate(count, timed(reference)[0], None)
+    report['checksum frames/s (vectorized)'] = rate(count, timed(
+        lambda: scan_frames(frames, header, header.checksum))[0], None)
+    return report
+
+
+@benchmark('analytics_aggregator')
+def benchmark_analytics_aggregator(rows: int = 10_000, reports: int = 20) -> Dict[str, Any]:
+    """Analytics reports: a pass over every retained analysis vs merged hour-bucket counters"""
+    from unittest import mock
+    import analytics
+    from analytics import SentimentAnalytics
+
+    rng = random.Random(7)
+    sentiments = ['positive', 'negative', 'neutral', 'mixed']
+    emotions = ['joy', 'anger', 'sadness', 'fear', 'surprise']
+    tags = ['supportive', 'hateful', 'spam', 'question', 'neutral']
+
+    def analysis():
+        return {'video_sentiment': rng.choice(sentiments), 'video_emotion': rng.sample(emotions, 2),
+                'comments': [{'text': 'asante sana for the video', 'sentiment': rng.choice(sentiments),
+                              'tag': rng.choice(tags), 'emotion': rng.sample(emotions, 2)} for _ in range(4)]}
+
+    class Clock:
+        moment = datetime(2024, 5, 1)
+
+        @classmethod
+        def now(cls):
+            return cls.moment
+
+        @staticmethod
+        def fromisoformat(value):
+            return datetime.fromisoformat(value)
+
+    def fill(engine, items):
+        for item in items:
+            engine.add_analysis(item)
+            Clock.moment += timedelta(minutes=1)
+        return engine
+
+    report = {'rows': rows, 'reports': reports}
+    with mock.patch.object(analytics, 'datetime', Clock):
+        batch = [analysis() for _ in range(rows * 2)]
+        engine = SentimentAnalytics(capacity=rows)
+        seconds, _ = timed(lambda: fill(engine, batch))  # half of them evicted again
+        report['add us/analysis'] = round(seconds / len(batch) * 1e6, 2)
+        sized = measure_memory(lambda: fill(SentimentAnalytics(capacity=rows), batch[:rows]))
+        report['ring + counters MB'] = round(sized['bytes'] / 1e6, 1)
+        history = engine.analysis_history
+
+        for label, build in (('list pass', lambda: engine.generate_report_for(history, 3)),
+                             ('counters', lambda: engine.generate_comprehensive_report(3))):
+            build()
+            seconds, result = timed(build, reports)
+            report[f"{label} ms/report"] = ms(seconds)
+        report['analyses in window'] = result['total_analyses']
+    report['speedup'] = round(report['list pass ms/report'] / max(report['counters ms/report'], 1e-6), 1)
+    return report
+
+
+@benchmark('analytics_engine')
+def benchmark_analytics_engine(rows: int = 1_000_000, legacy_rows: int = 100_000) -> Dict[str, Any]:
+    """AdvancedAnalytics at a million rows: row-wise apply and per-section reloads vs one vectorized, cached frame"""
+    from unittest import mock
+    import numpy as np
+    import pandas as pd
+    import analytics_engine
+    from analytics_engine import AdvancedAnalytics, frame_from_columns, sentiment_scores
+    from database_manager import AnalysisRecord
+
+    rng = np.random.default_rng(11)
+    newest = datetime(2024, 5, 1, 23, 59)
+    timestamps = [(newest - timedelta(seconds=int(s))).isoformat(sep=' ') for s in range(rows)]
+    sentiments = rng.choice(['positive', 'negative', 'neutral', 'mixed'], rows).tolist()
+    confidences = rng.uniform(0.2, 1.0, rows).round(3)
+    sources = rng.choice(['api', 'web', 'news', 'batch'], rows).tolist()
+    lengths = rng.integers(5, 400, rows)
+    report = {'rows': rows}
+
+    def throughput(label, func, count):
+        seconds, result = timed(func)
+        report[f"{label} s"] = round(seconds, 3)
+        report[f"{label} rows/s"] = int(count / seconds)
+        return result
+
+    # Scoring: the old row-wise apply on an object frame (on legacy_rows) vs np.select over category codes
+    scores = {'positive': 1.0, 'neutral': 0.0, 'negative': -1.0}
+    legacy_rows = min(legacy_rows, rows)
+    legacy = pd.DataFrame({'sentiment': sentiments[:legacy_rows], 'confidence': confidences[:legacy_rows]})
+    throughput('legacy apply score', lambda: legacy.apply(
+        lambda row: scores.get(row['sentiment'], 0.0) * row['confidence'], axis=1), legacy_rows)
+    df = throughput('frame build (parse + categorical + score)',
+                    lambda: frame_from_columns(timestamps, sentiments, confidences, sources, lengths), rows)
+    report['frame MB'] = round(df.memory_usage(deep=True).sum() / 1e6, 1)
+    throughput('np.select score', lambda: sentiment_scores(df['sentiment'], df['confidence'].to_numpy()), rows)
+
+    # All report sections from the one frame
+    engine = AdvancedAnalytics()
+    engine._frames[(24, rows)] = (time.monotonic(), df)
+    throughput('all sections', lambda: engine.generate_window_report(24, rows), rows)
+
+    # Window loads: each section used to fetch and rebuild its own frame
+    records = [AnalysisRecord(id=str(i), content='x' * 120, sentiment=sentiments[i], confidence=float(confidences[i]),
+                              source=sources[i], timestamp=newest - timedelta(seconds=i)) for i in range(min(rows, 1000))]
+
+    class Database:
+        loads = 0
+
+        def get_recent_analyses(self, limit=100, hours=24, fresh=True):
+            Database.loads += 1
+            return records[:limit]
+
+        def get_sentiment_statistics(self, hours=24, fresh=True):
+            return {'hourly_trend': {}}
+
+    def refresh():
+        cached.analyze_sentiment_trends()
+        cached.generate_predictive_insights()
+        cached.calculate_engagement_metrics()
+
+    with mock.patch.object(analytics_engine, 'db_manager', Database()):
+        cached = AdvancedAnalytics()
+        seconds, _ = timed(lambda: [refresh() for _ in range(20)])
+        report['dashboard refresh ms (3 sections, cached frame)'] = ms(seconds / 20)
+        report['window loads for 20 refreshes'] = Database.loads
+    return report
+
+
+def main():
+    import argparse
+    import inspect
+
+    parser = argparse.ArgumentParser(description='Run performance benchmarks')
+    parser.add_argument('names', nargs='*', help='Benchmarks to run (default: all)')
+    parser.add_argument('--rows', type=int, default=None,
+                        help='Override the row count (of the benchmarks that take one)')
+    parser.add_argument('--list', action='store_true', help='List available benchmarks')
+    args = parser.parse_args()
+
+    if args.list:
+        for name, func in BENCHMARKS.items():
+            print(f"{name:<16} {func.__doc__}")
+        return
+
+    for name in args.names or list(BENCHMARKS):
+        func = BENCHMARKS[name]
+        takes_rows = 'rows' in inspect.signature(func).parameters
+        kwargs = {'rows': args.rows} if args.rows and takes_rows else {}
+        print_report(f"{name}: {func.__doc__}", func(**kwargs))
+
+
+if __name__ == '__main__':
+    main()
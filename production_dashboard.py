@@ -22,6 +22,7 @@ from flask_limiter.util import get_remote_address
 # Configuration and utilities
 from config_manager import get_production_settings
 from news_ingest import kenyan_news_ingestor
+from pagination import InvalidCursor, paginate_sequence
 
 # Import enhanced components
 try:
@@ -170,9 +171,10 @@ def analyze_sentiment():
 def get_news():
     """Get news with pagination and country filtering"""
     try:
-        # Parse query parameters
+        # Parse query parameters (?cursor= from a previous next_cursor, or the legacy ?page=)
         page = max(1, int(request.args.get('page', 1)))
         limit = min(50, max(1, int(request.args.get('limit', 10))))
+        cursor = request.args.get('cursor')
         country = request.args.get('country', settings.DEFAULT_NEWS_COUNTRY)
         
         # Get news from Kenyan sources
@@ -182,10 +184,20 @@ def get_news():
             # Try fresh ingestion
             news_items = kenyan_news_ingestor.ingest_all_sources()
         
+        # Pagination, newest first: pick the page items before converting anything
+        total_items = len(news_items)
+        total_pages = math.ceil(total_items / limit)
+        news_key = lambda item: (item.published, item.content_hash)
+        if cursor:
+            page_items, next_page = paginate_sequence(news_items, limit, cursor, key=news_key)
+        else:
+            page_items, next_page = paginate_sequence(news_items, page * limit, key=news_key)
+            page_items = page_items[(page - 1) * limit:]
+        
         # Convert to API format
-        articles = []
-        for item in news_items:
-            articles.append({
+        paginated_articles = []
+        for item in page_items:
+            paginated_articles.append({
                 "title": item.title,
                 "summary": item.summary,
                 "url": item.url,
@@ -197,13 +209,6 @@ def get_news():
                 "confidence": 0.5
             })
         
-        # Pagination
-        total_items = len(articles)
-        total_pages = math.ceil(total_items / limit)
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_articles = articles[start_idx:end_idx]
-        
         # Add sentiment analysis to articles
         if REAL_COMPONENTS_AVAILABLE:
             for article in paginated_articles:
@@ -225,11 +230,14 @@ def get_news():
             "limit": limit,
             "total_items": total_items,
             "total_pages": total_pages,
+            "next_cursor": next_page,
             "sources_used": sources_used,
             "country": country,
             "api_sources": ["Standard", "CapitalFM", "AllAfrica-Kenya", "BusinessDaily", "KBC", "Citizen", "NTV"]
         })
         
+    except InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.error(f"News API error: {e}")
         return jsonify({"error": "Failed to fetch news"}), 500
@@ -0,0 +1,162 @@
+"""
+Projected Repository Reads
+Declared column projections per view over the shared tables: list views read
+only the columns they show, as namedtuple rows instead of ORM instances or
+SELECT * dicts, and heavy columns (text, content, JSON blobs) are deferred and
+loaded for the rows that need them in one batched query
+"""
+
+import sqlite3
+import logging
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import DateTime, Table, and_, desc, or_, select
+
+from storage_engine import NEWS_ARTICLES, SENTIMENT_ANALYSES
+
+logger = logging.getLogger(__name__)
+
+# Keys per deferred-column query (well under SQLite's bound-parameter limit)
+DEFERRED_BATCH_SIZE = 500
+
+
+def _camel(name: str) -> str:
+    return ''.join(part.capitalize() for part in name.split('_'))
+
+
+class Projection:
+    """
+    The columns one view reads from a table, and the namedtuple type its rows become
+
+    datetime_columns are parsed by row_factory: sqlite3 returns DATETIME columns
+    as the text SQLite stores, where SQLAlchemy results already hold datetimes.
+    """
+
+    def __init__(self, table: str, view: str, columns: Sequence[str], datetime_columns: Sequence[str] = ()):
+        self.table = table
+        self.view = view
+        self.columns = tuple(columns)
+        self.row_type = namedtuple(f"{_camel(table)}{_camel(view)}Row", self.columns)
+        self.select_list = ', '.join(self.columns)
+        self._datetime_indexes = tuple(i for i, c in enumerate(self.columns) if c in datetime_columns)
+
+    def row_factory(self, cursor, row) -> tuple:
+        """sqlite3 row factory (cursor.row_factory = projection.row_factory)"""
+        if self._datetime_indexes:
+            row = list(row)
+            for i in self._datetime_indexes:
+                if isinstance(row[i], str):
+                    row[i] = datetime.fromisoformat(row[i])
+        return self.row_type._make(row)
+
+    def make(self, rows: Iterable[Sequence[Any]]) -> List[tuple]:
+        """Rows of a SQLAlchemy result (or any tuples in column order) as namedtuples"""
+        make = self.row_type._make
+        return [make(row) for row in rows]
+
+
+class Repository:
+    """
+    Declared views of one table and batched loading of its deferred columns
+
+    views maps a view name to the columns it reads; deferred lists the heavy
+    columns list views leave out, fetched later by key with load_deferred().
+    page() serves SQLAlchemy Core connections and sessions (any backend), fetch()
+    plain sqlite3 connections; both return DateTime columns as datetimes.
+    """
+
+    def __init__(self, table: Table, views: Dict[str, Sequence[str]], deferred: Sequence[str] = (),
+                 key: str = 'id'):
+        unknown = {c for columns in views.values() for c in columns} | set(deferred) | {key}
+        unknown -= set(table.c.keys())
+        if unknown:
+            raise ValueError(f"{table.name} has no column(s) {sorted(unknown)}")
+        self.table = table
+        self.key = key
+        self.deferred = tuple(deferred)
+        self.datetime_columns = tuple(c.name for c in table.c if isinstance(c.type, DateTime))
+        self.projections = {view: Projection(table.name, view, columns, self.datetime_columns)
+                            for view, columns in views.items()}
+
+    def projection(self, view: str) -> Projection:
+        try:
+            return self.projections[view]
+        except KeyError:
+            raise ValueError(f"unknown {self.table.name} view {view!r}; "
+                             f"declared: {sorted(self.projections)}") from None
+
+    # -- SQLAlchemy Core ------------------------------------------------------
+
+    def page(self, conn, view: str, limit: int, offset: int = 0, after: Optional[Tuple[Any, Any]] = None,
+             time_column: str = 'created_at', where: Sequence[Any] = ()) -> List[tuple]:
+        """
+        Newest-first page of a view; after=(time, key) of the previous page's last
+        row seeks past it on the (time_column, key) index instead of skipping offset rows
+        """
+        projection = self.projection(view)
+        table, t, k = self.table, self.table.c[time_column], self.table.c[self.key]
+        stmt = select(*(table.c[c] for c in projection.columns)).order_by(desc(t), desc(k))
+        conditions = list(where)
+        if after is not None:
+            conditions.append(or_(t < after[0], and_(t == after[0], k < after[1])))
+        elif offset:
+            stmt = stmt.offset(offset)
+        if conditions:
+            stmt = stmt.where(*conditions)
+        return projection.make(conn.execute(stmt.limit(limit)))
+
+    # -- sqlite3 --------------------------------------------------------------
+
+    def fetch(self, conn: sqlite3.Connection, view: str, tail: str = '', params: Sequence[Any] = ()) -> List[tuple]:
+        """SELECT a view's columns with a raw SQL tail (WHERE / ORDER BY / LIMIT) on a sqlite3 connection"""
+        projection = self.projection(view)
+        cursor = conn.cursor()
+        cursor.row_factory = projection.row_factory
+        cursor.execute(f"SELECT {projection.select_list} FROM {self.table.name} {tail}", params)
+        return cursor.fetchall()
+
+    # -- deferred columns -----------------------------------------------------
+
+    def load_deferred(self, conn, keys: Iterable[Any], columns: Optional[Sequence[str]] = None) -> Dict[Any, tuple]:
+        """
+        Deferred columns (default: all of them) of the given keys, batched, as
+        {key: namedtuple}; works on sqlite3 and SQLAlchemy connections alike
+        """
+        columns = tuple(columns or self.deferred)
+        projection = Projection(self.table.name, 'deferred', (self.key, *columns), self.datetime_columns)
+        keys = list(dict.fromkeys(keys))
+        loaded: Dict[Any, tuple] = {}
+        for i in range(0, len(keys), DEFERRED_BATCH_SIZE):
+            batch = keys[i:i + DEFERRED_BATCH_SIZE]
+            if isinstance(conn, sqlite3.Connection):
+                cursor = conn.cursor()
+                cursor.row_factory = projection.row_factory
+                rows = cursor.execute(f"SELECT {projection.select_list} FROM {self.table.name} "
+                                      f"WHERE {self.key} IN ({', '.join('?' * len(batch))})", batch).fetchall()
+            else:
+                rows = projection.make(conn.execute(
+                    select(*(self.table.c[c] for c in projection.columns)).where(self.table.c[self.key].in_(batch))))
+            loaded.update((row[0], row) for row in rows)
+        return loaded
+
+
+# ---------------------------------------------------------------------------
+# Views of the shared tables
+# ---------------------------------------------------------------------------
+
+# Columns no list view reads: analysed text, JSON blobs and request details
+ANALYSIS_DEFERRED = ('text', 'scores', 'metadata', 'emotion_scores', 'ip_address', 'user_agent')
+
+ANALYSES = Repository(SENTIMENT_ANALYSES, {
+    # dashboard tables: one line per analysis
+    'list': ('id', 'sentiment', 'confidence', 'model_used', 'source', 'timestamp', 'created_at'),
+    # trend and behaviour analytics over recent history
+    'history': ('id', 'sentiment', 'confidence', 'model_used', 'toxicity_score', 'timestamp', 'created_at'),
+}, deferred=ANALYSIS_DEFERRED)
+
+NEWS = Repository(NEWS_ARTICLES, {
+    'list': ('id', 'title', 'url', 'source', 'published_date', 'sentiment', 'confidence', 'category',
+             'created_at'),
+}, deferred=('content',))
@@ -13,6 +13,8 @@ import random
 import time
 from urllib.parse import urljoin
 
+from sentiment_result import SentimentResult
+
 logger = logging.getLogger(__name__)
 
 class RealNewsAggregator:
@@ -381,23 +383,20 @@ class RealSentimentAnalyzer:
                     best_score = max(scores, key=lambda x: x['score'])
                     mapped_sentiment = sentiment_map.get(best_score['label'].upper(), 'neutral')
                     
-                    # Create result object
-                    class SentimentResult:
-                        def __init__(self):
-                            self.text = text[:200]
-                            self.sentiment = mapped_sentiment
-                            self.confidence = best_score['score']
-                            self.scores = {
-                                'positive': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'positive'), 0.0),
-                                'negative': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'negative'), 0.0),
-                                'neutral': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'neutral'), 0.0)
-                            }
-                            self.model_used = f'huggingface-{model}'
-                            self.processing_time = 0.5
-                            self.emotion_scores = {}
-                            self.toxicity_score = 0.0
-                    
-                    return SentimentResult()
+                    return SentimentResult(
+                        text=text[:200],
+                        sentiment=mapped_sentiment,
+                        confidence=best_score['score'],
+                        scores={
+                            'positive': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'positive'), 0.0),
+                            'negative': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'negative'), 0.0),
+                            'neutral': next((s['score'] for s in scores if sentiment_map.get(s['label'].upper()) == 'neutral'), 0.0)
+                        },
+                        model_used=f'huggingface-{model}',
+                        processing_time=0.5,
+                        emotion_scores={},
+                        toxicity_score=0.0
+                    )
                     
             else:
                 logger.warning(f"HF API returned {response.status_code}, using fallback")
@@ -459,23 +458,20 @@ class RealSentimentAnalyzer:
             sentiment = 'neutral'
             confidence = 0.5 + random.uniform(0, 0.2)
         
-        # Create result object
-        class SentimentResult:
-            def __init__(self):
-                self.text = text[:200]
-                self.sentiment = sentiment
-                self.confidence = confidence
-                self.scores = {
-                    'positive': confidence if sentiment == 'positive' else (1-confidence) * 0.3,
-                    'negative': confidence if sentiment == 'negative' else (1-confidence) * 0.3,
-                    'neutral': confidence if sentiment == 'neutral' else (1-confidence) * 0.4
-                }
-                self.model_used = 'enhanced-fallback'
-                self.processing_time = 0.1
-                self.emotion_scores = {}
-                self.toxicity_score = 0.0
-        
-        return SentimentResult()
+        return SentimentResult(
+            text=text[:200],
+            sentiment=sentiment,
+            confidence=confidence,
+            scores={
+                'positive': confidence if sentiment == 'positive' else (1-confidence) * 0.3,
+                'negative': confidence if sentiment == 'negative' else (1-confidence) * 0.3,
+                'neutral': confidence if sentiment == 'neutral' else (1-confidence) * 0.4
+            },
+            model_used='enhanced-fallback',
+            processing_time=0.1,
+            emotion_scores={},
+            toxicity_score=0.0
+        )
 
 # Initialize real components
 real_news_aggregator = RealNewsAggregator()
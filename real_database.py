@@ -6,43 +6,36 @@ Handles sentiment analysis data, user interactions, and analytics
 import os
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Iterable
 from dataclasses import asdict
 import logging
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine, text, func, desc, and_, or_
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, text, desc, and_, or_, select
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
-import pandas as pd
+
+from sqlite_pool import BULK_CHUNK_SIZE
+from storage_engine import API_USAGE, NEWS_ARTICLES, SENTIMENT_ANALYSES, VIDEO_METADATA, get_storage
+from rollups import SENTIMENT_CUBE, BUCKET_DATE
+from summary_query import AnalyticsSummary, SummaryQuery
+from pagination import decode_datetime_cursor
+from projections import ANALYSES, NEWS
+from search_index import ANALYSIS_SEARCH, NEWS_SEARCH, match_query
+from streaming_export import export_rows
 
 # Initialize SQLAlchemy
 db = SQLAlchemy()
 
+# The models map the shared schema's tables (storage_engine.SCHEMA); writes go
+# through the storage engine's Core path, the ORM is used for reads.
+
 class SentimentAnalysis(db.Model):
     """Model for storing sentiment analysis results"""
-    __tablename__ = 'sentiment_analyses'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    text = db.Column(db.Text, nullable=False)
-    sentiment = db.Column(db.String(20), nullable=False)
-    confidence = db.Column(db.Float, nullable=False)
-    scores = db.Column(db.JSON)  # Stores positive, negative, neutral scores
-    model_used = db.Column(db.String(50), nullable=False)
-    processing_time = db.Column(db.Float)
-    language = db.Column(db.String(10))
-    emotion_scores = db.Column(db.JSON)
-    toxicity_score = db.Column(db.Float)
-    bias_score = db.Column(db.Float)
-    analysis_metadata = db.Column(db.JSON)  # Renamed from 'metadata' to avoid SQLAlchemy conflict
-    
-    # Analytics fields
-    ip_address = db.Column(db.String(45))
-    user_agent = db.Column(db.String(500))
-    source = db.Column(db.String(50), default='dashboard')  # dashboard, api, batch
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table__ = SENTIMENT_ANALYSES
+    __mapper_args__ = {'exclude_properties': ['metadata']}
+    
+    analysis_metadata = SENTIMENT_ANALYSES.c['metadata']  # 'metadata' is reserved by declarative models
     
     def to_dict(self):
         """Convert to dictionary"""
@@ -65,19 +58,7 @@ class SentimentAnalysis(db.Model):
 
 class NewsArticle(db.Model):
     """Model for storing news articles for analysis"""
-    __tablename__ = 'news_articles'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(500), nullable=False)
-    url = db.Column(db.String(1000), unique=True, nullable=False)
-    content = db.Column(db.Text)
-    source = db.Column(db.String(100))
-    published_date = db.Column(db.DateTime)
-    sentiment = db.Column(db.String(20))
-    confidence = db.Column(db.Float)
-    category = db.Column(db.String(50))
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table__ = NEWS_ARTICLES
     
     def to_dict(self):
         return {
@@ -95,19 +76,7 @@ class NewsArticle(db.Model):
 
 class VideoMetadata(db.Model):
     """Model for storing video metadata and sentiment analysis"""
-    __tablename__ = 'video_metadata'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String(500))
-    url = db.Column(db.String(1000))
-    duration = db.Column(db.Float)
-    file_path = db.Column(db.String(1000))
-    transcript = db.Column(db.Text)
-    sentiment = db.Column(db.String(20))
-    confidence = db.Column(db.Float)
-    video_metadata = db.Column(db.JSON)  # Renamed from 'metadata' to avoid SQLAlchemy conflict
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table__ = VIDEO_METADATA
     
     def to_dict(self):
         return {
@@ -124,19 +93,12 @@ class VideoMetadata(db.Model):
         }
 
 class ApiUsage(db.Model):
-    """Model for tracking API usage and analytics"""
-    __tablename__ = 'api_usage'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    endpoint = db.Column(db.String(100), nullable=False)
-    method = db.Column(db.String(10), nullable=False)
-    ip_address = db.Column(db.String(45))
-    user_agent = db.Column(db.String(500))
-    response_code = db.Column(db.Integer)
-    processing_time = db.Column(db.Float)
-    error_message = db.Column(db.Text)
-    
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    """Model for tracking API usage and analytics (shares api_usage with database_manager)"""
+    __table__ = API_USAGE
+    
+    response_code = API_USAGE.c.status_code
+    processing_time = API_USAGE.c.response_time
+    created_at = API_USAGE.c.timestamp
 
 class RealDatabaseManager:
     """
@@ -145,8 +107,11 @@ class RealDatabaseManager:
     
     def __init__(self, app=None, database_url=None):
         self.app = app
-        self.database_url = database_url or 'sqlite:///sentiment_analysis.db'
+        self.storage = get_storage(database_url)
+        self.database_url = self.storage.url
         self.logger = logging.getLogger(__name__)
+        self.rollups_enabled = False
+        self.search_enabled = False
         
         if app:
             self.init_app(app)
@@ -158,135 +123,197 @@ class RealDatabaseManager:
         
         db.init_app(app)
         
-        with app.app_context():
-            db.create_all()
-            self.logger.info("Database tables created successfully")
+        self.storage.create_all()
+        self.logger.info("Database tables created successfully")
+        self._install_rollups()
+        self._install_search()
+    
+    def _install_rollups(self):
+        """Maintain the per-bucket rollup cube with insert triggers (SQLite only)"""
+        if self.storage.backend != 'sqlite':
+            return
+        try:
+            with self.storage.pool.write() as conn:
+                if not SENTIMENT_CUBE.is_installed(conn):
+                    SENTIMENT_CUBE.install(conn)
+                self.rollups_enabled = SENTIMENT_CUBE.is_installed(conn)
+        except Exception as e:
+            self.logger.error(f"Error installing rollups: {str(e)}")
+    
+    def _install_search(self):
+        """Maintain FTS5 indexes over analyses and news with triggers (SQLite only)"""
+        if self.storage.backend != 'sqlite':
+            return
+        try:
+            with self.storage.pool.write() as conn:
+                self.search_enabled = all([index.install(conn) for index in (ANALYSIS_SEARCH, NEWS_SEARCH)])
+        except Exception as e:
+            self.logger.error(f"Error installing search indexes: {str(e)}")
+    
+    def _full_text_search(self, index, model, query, limit, prefix=True, **filters):
+        """Model dicts of BM25-ranked matches, each with its rank and highlighted snippet"""
+        filters = {k: v for k, v in filters.items() if v is not None}
+        match = match_query(query, prefix)
+        if match is None:
+            return []
+        hits = db.session.execute(text(index.search_sql(list(filters))),
+                                  {'match': match, 'limit': limit, **filters}).fetchall()
+        rows = {row.id: row for row in model.query.filter(model.id.in_([hit.id for hit in hits])).all()}
+        results = []
+        for hit in hits:
+            if hit.id in rows:
+                item = rows[hit.id].to_dict()
+                item.update(rank=hit.rank, snippet=hit.snippet)
+                results.append(item)
+        return results
+    
+    def _rollup(self, start, group_by):
+        """Merged rollup rows since start, or None when the cube is unavailable"""
+        if not self.rollups_enabled:
+            return None
+        with self.storage.pool.read() as conn:
+            return SENTIMENT_CUBE.aggregate(conn, start, group_by=group_by)
+    
+    @staticmethod
+    def _analysis_mapping(result, ip_address=None, user_agent=None, source='dashboard'):
+        """Core row for sentiment_analyses from a result object or dictionary"""
+        if isinstance(result, dict):
+            get = result.get
+        else:
+            get = lambda name, default=None: getattr(result, name, default)
+        return {
+            'text': get('text'),
+            'sentiment': get('sentiment'),
+            'confidence': get('confidence', 0.0),
+            'scores': get('scores'),
+            'model_used': get('model_used', 'unknown'),
+            'processing_time': get('processing_time'),
+            'language': get('language'),
+            'emotion_scores': get('emotion_scores'),
+            'toxicity_score': get('toxicity_score'),
+            'bias_score': get('bias_score'),
+            'metadata': get('analysis_metadata'),
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'source': source
+        }
     
     def save_sentiment_analysis(self, result, ip_address=None, user_agent=None, source='dashboard'):
         """Save sentiment analysis result to database"""
         try:
-            analysis = SentimentAnalysis(
-                text=result.text,
-                sentiment=result.sentiment,
-                confidence=result.confidence,
-                scores=result.scores,
-                model_used=result.model_used,
-                processing_time=result.processing_time,
-                language=result.language,
-                emotion_scores=result.emotion_scores,
-                toxicity_score=result.toxicity_score,
-                bias_score=result.bias_score,
-                analysis_metadata=result.analysis_metadata,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                source=source
-            )
+            analysis_id = self.storage.insert(SENTIMENT_ANALYSES,
+                                              self._analysis_mapping(result, ip_address, user_agent, source))
             
-            db.session.add(analysis)
-            db.session.commit()
-            
-            self.logger.info(f"Saved sentiment analysis: {analysis.id}")
-            return analysis.id
+            self.logger.info(f"Saved sentiment analysis: {analysis_id}")
+            return analysis_id
             
         except Exception as e:
-            db.session.rollback()
             self.logger.error(f"Error saving sentiment analysis: {str(e)}")
             return None
     
-    def get_recent_analyses(self, limit=50, offset=0):
-        """Get recent sentiment analyses"""
+    def save_sentiment_analyses(self, results: Iterable, ip_address=None, user_agent=None,
+                                source='batch', chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        Save many sentiment analysis results in one transaction
+        
+        Core executemany in chunks on the shared writer, so no ORM object is built per
+        row and generators are consumed without materializing the whole input.
+        Returns the number of rows written, or 0 if the batch was rolled back.
+        """
         try:
-            analyses = SentimentAnalysis.query.order_by(
-                desc(SentimentAnalysis.created_at)
-            ).offset(offset).limit(limit).all()
+            saved = self.storage.insert_many(SENTIMENT_ANALYSES, (
+                self._analysis_mapping(result, ip_address, user_agent, source) for result in results
+            ), chunk_size)
             
-            return [analysis.to_dict() for analysis in analyses]
+            self.logger.info(f"Saved {saved} sentiment analyses")
+            return saved
             
         except Exception as e:
-            self.logger.error(f"Error fetching analyses: {str(e)}")
-            return []
+            self.logger.error(f"Error saving sentiment analyses: {str(e)}")
+            return 0
+    
+    @staticmethod
+    def _keyset_query(model, limit, offset=0, cursor=None, session=None):
+        """Newest-first listing; a cursor seeks on (created_at, id) instead of counting past offset rows"""
+        query = (model.query if session is None else session.query(model))
+        query = query.order_by(desc(model.created_at), desc(model.id))
+        if cursor:
+            created_at, item_id = decode_datetime_cursor(cursor)
+            query = query.filter(or_(model.created_at < created_at,
+                                     and_(model.created_at == created_at, model.id < item_id)))
+        elif offset:
+            query = query.offset(offset)
+        return query.limit(limit)
     
-    def get_analytics_summary(self, days=7):
-        """Get comprehensive analytics summary"""
+    def get_recent_analyses(self, limit=50, offset=0, cursor=None, fresh=True, view=None):
+        """
+        Get recent sentiment analyses (pass next_cursor(items, limit) of a page as cursor for the next)
+        
+        fresh=False reads the latest read snapshot instead of the live database, for
+        analytics and reports that scan many rows. A view ('list', 'history'; see
+        projections.ANALYSES) reads only that view's columns as namedtuple rows;
+        load_analysis_details() fetches the deferred text and JSON columns.
+        """
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            # Basic stats
-            total_analyses = SentimentAnalysis.query.filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).count()
-            
-            # Sentiment distribution
-            sentiment_dist = db.session.query(
-                SentimentAnalysis.sentiment,
-                func.count(SentimentAnalysis.id).label('count')
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).group_by(SentimentAnalysis.sentiment).all()
-            
-            sentiment_distribution = {item.sentiment: item.count for item in sentiment_dist}
-            
-            # Average confidence
-            avg_confidence = db.session.query(
-                func.avg(SentimentAnalysis.confidence)
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).scalar() or 0
+            if view:
+                after = decode_datetime_cursor(cursor) if cursor else None
+                if fresh:
+                    return ANALYSES.page(db.session, view, limit, offset, after)
+                with self.storage.snapshot() as conn:
+                    return ANALYSES.page(conn, view, limit, offset, after)
             
-            # Model usage
-            model_usage = db.session.query(
-                SentimentAnalysis.model_used,
-                func.count(SentimentAnalysis.id).label('count')
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).group_by(SentimentAnalysis.model_used).all()
+            if fresh:
+                analyses = self._keyset_query(SentimentAnalysis, limit, offset, cursor).all()
+                return [analysis.to_dict() for analysis in analyses]
             
-            model_distribution = {item.model_used: item.count for item in model_usage}
+            with self.storage.snapshot() as conn, Session(bind=conn) as session:
+                analyses = self._keyset_query(SentimentAnalysis, limit, offset, cursor, session).all()
+                return [analysis.to_dict() for analysis in analyses]
             
-            # Language distribution
-            language_dist = db.session.query(
-                SentimentAnalysis.language,
-                func.count(SentimentAnalysis.id).label('count')
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).group_by(SentimentAnalysis.language).all()
-            
-            language_distribution = {item.language: item.count for item in language_dist}
-            
-            # Processing time stats
-            avg_processing_time = db.session.query(
-                func.avg(SentimentAnalysis.processing_time)
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).scalar() or 0
-            
-            # Daily trends
-            daily_trends = db.session.query(
-                func.date(SentimentAnalysis.created_at).label('date'),
-                func.count(SentimentAnalysis.id).label('count'),
-                func.avg(SentimentAnalysis.confidence).label('avg_confidence')
-            ).filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).group_by(func.date(SentimentAnalysis.created_at)).all()
-            
-            trends = [
-                {
-                    'date': item.date.isoformat() if item.date else None,
-                    'count': item.count,
-                    'avg_confidence': round(item.avg_confidence, 3) if item.avg_confidence else 0
-                }
-                for item in daily_trends
-            ]
+        except Exception as e:
+            self.logger.error(f"Error fetching analyses: {str(e)}")
+            return []
+    
+    def load_analysis_details(self, ids, columns=None):
+        """Deferred columns (text, scores, metadata, ...) of listed analyses, {id: row}, in batched queries"""
+        try:
+            return ANALYSES.load_deferred(db.session, ids, columns)
+        except Exception as e:
+            self.logger.error(f"Error loading analysis details: {str(e)}")
+            return {}
+    
+    _SUMMARY_COLUMNS = {
+        'sentiment': 'sentiment', 'source': 'source', 'model': 'model_used', 'language': 'language',
+        'confidence': 'confidence', 'processing_time': 'processing_time',
+    }
+    
+    def analytics_summary(self, start, end=None, group_by=('sentiment', 'model', 'language', BUCKET_DATE),
+                          flags=None, **flag_params) -> AnalyticsSummary:
+        """Typed summary from the rollup cube for open-ended windows, otherwise one aggregate statement"""
+        if end is None and not flags:
+            rows = self._rollup(start, group_by)
+            if rows is not None:
+                return AnalyticsSummary.from_rows(rows, start, from_rollups=True)
+        query = SummaryQuery('sentiment_analyses', 'created_at', self._SUMMARY_COLUMNS,
+                             dialect=db.engine.dialect.name)
+        return query.run(lambda sql, params: db.session.execute(text(sql), params),
+                         start, end, group_by, flags, **flag_params)
+    
+    def get_analytics_summary(self, days=7, start=None, end=None):
+        """Get comprehensive analytics summary (last `days` days, or an explicit [start, end) range)"""
+        try:
+            cutoff_date = start or (end or datetime.utcnow()) - timedelta(days=days)
+            summary = self.analytics_summary(cutoff_date, end)
             
             return {
                 'period_days': days,
-                'total_analyses': total_analyses,
-                'sentiment_distribution': sentiment_distribution,
-                'average_confidence': round(avg_confidence, 3),
-                'model_distribution': model_distribution,
-                'language_distribution': language_distribution,
-                'average_processing_time': round(avg_processing_time, 4),
-                'daily_trends': trends,
+                'total_analyses': summary.total,
+                'sentiment_distribution': summary.by_sentiment,
+                'average_confidence': round(summary.average_confidence, 3),
+                'model_distribution': summary.by_model,
+                'language_distribution': summary.by_language,
+                'average_processing_time': round(summary.average_processing_time, 4),
+                'daily_trends': summary.daily_trends,
                 'generated_at': datetime.utcnow().isoformat()
             }
             
@@ -297,30 +324,26 @@ class RealDatabaseManager:
     def save_news_article(self, title, url, content=None, source=None, published_date=None):
         """Save news article for analysis"""
         try:
-            article = NewsArticle(
-                title=title,
-                url=url,
-                content=content,
-                source=source,
-                published_date=published_date
-            )
-            
-            db.session.add(article)
-            db.session.commit()
-            
-            return article.id
+            return self.storage.insert(NEWS_ARTICLES, {
+                'title': title,
+                'url': url,
+                'content': content,
+                'source': source,
+                'published_date': published_date
+            })
             
         except Exception as e:
-            db.session.rollback()
             self.logger.error(f"Error saving news article: {str(e)}")
             return None
     
-    def get_news_articles(self, limit=20, offset=0):
-        """Get news articles with pagination"""
+    def get_news_articles(self, limit=20, offset=0, cursor=None, view=None):
+        """Get news articles with offset or keyset (cursor) pagination; view='list' leaves out the content"""
         try:
-            articles = NewsArticle.query.order_by(
-                desc(NewsArticle.created_at)
-            ).offset(offset).limit(limit).all()
+            if view:
+                after = decode_datetime_cursor(cursor) if cursor else None
+                return NEWS.page(db.session, view, limit, offset, after)
+            
+            articles = self._keyset_query(NewsArticle, limit, offset, cursor).all()
             
             return [article.to_dict() for article in articles]
             
@@ -331,22 +354,16 @@ class RealDatabaseManager:
     def save_video_metadata(self, title=None, url=None, duration=None, file_path=None, transcript=None, video_metadata=None):
         """Save video metadata"""
         try:
-            video = VideoMetadata(
-                title=title,
-                url=url,
-                duration=duration,
-                file_path=file_path,
-                transcript=transcript,
-                video_metadata=video_metadata
-            )
-            
-            db.session.add(video)
-            db.session.commit()
-            
-            return video.id
+            return self.storage.insert(VIDEO_METADATA, {
+                'title': title,
+                'url': url,
+                'duration': duration,
+                'file_path': file_path,
+                'transcript': transcript,
+                'video_metadata': video_metadata
+            })
             
         except Exception as e:
-            db.session.rollback()
             self.logger.error(f"Error saving video metadata: {str(e)}")
             return None
     
@@ -354,26 +371,31 @@ class RealDatabaseManager:
                      response_code=200, processing_time=None, error_message=None):
         """Log API usage for analytics"""
         try:
-            usage = ApiUsage(
-                endpoint=endpoint,
-                method=method,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                response_code=response_code,
-                processing_time=processing_time,
-                error_message=error_message
-            )
-            
-            db.session.add(usage)
-            db.session.commit()
+            self.storage.insert(API_USAGE, {
+                'endpoint': endpoint,
+                'method': method,
+                'ip_address': ip_address,
+                'user_agent': user_agent,
+                'status_code': response_code,
+                'response_time': processing_time,
+                'error_message': error_message
+            })
             
         except Exception as e:
-            db.session.rollback()
             self.logger.error(f"Error logging API usage: {str(e)}")
     
-    def search_analyses(self, query, sentiment_filter=None, model_filter=None, limit=50):
-        """Search sentiment analyses"""
+    def search_analyses(self, query, sentiment_filter=None, model_filter=None, limit=50, prefix=True):
+        """
+        Search sentiment analyses
+        
+        With the FTS5 index, matches are ranked by BM25 and carry a highlighted
+        snippet; the last word also matches as a prefix unless prefix=False.
+        """
         try:
+            if query and self.search_enabled:
+                return self._full_text_search(ANALYSIS_SEARCH, SentimentAnalysis, query, limit, prefix,
+                                              sentiment=sentiment_filter, model_used=model_filter)
+            
             filters = []
             
             if query:
@@ -395,73 +417,105 @@ class RealDatabaseManager:
             self.logger.error(f"Error searching analyses: {str(e)}")
             return []
     
+    def search_news(self, query, sentiment_filter=None, source_filter=None, limit=20, prefix=True):
+        """Search news article titles and content (titles weigh more in the ranking)"""
+        try:
+            if not query:
+                return []
+            if self.search_enabled:
+                return self._full_text_search(NEWS_SEARCH, NewsArticle, query, limit, prefix,
+                                              sentiment=sentiment_filter, source=source_filter)
+            
+            filters = [or_(NewsArticle.title.contains(query), NewsArticle.content.contains(query))]
+            if sentiment_filter:
+                filters.append(NewsArticle.sentiment == sentiment_filter)
+            if source_filter:
+                filters.append(NewsArticle.source == source_filter)
+            
+            articles = NewsArticle.query.filter(and_(*filters)).order_by(
+                desc(NewsArticle.created_at)).limit(limit).all()
+            
+            return [article.to_dict() for article in articles]
+            
+        except Exception as e:
+            self.logger.error(f"Error searching news articles: {str(e)}")
+            return []
+    
     def get_dashboard_summary(self):
         """Get summary data for dashboard"""
         try:
             today = datetime.utcnow().date()
             week_ago = datetime.utcnow() - timedelta(days=7)
             
-            # Today's stats
-            today_analyses = SentimentAnalysis.query.filter(
-                func.date(SentimentAnalysis.created_at) == today
-            ).count()
-            
-            # Week's stats
-            week_analyses = SentimentAnalysis.query.filter(
-                SentimentAnalysis.created_at >= week_ago
-            ).count()
-            
-            # Average confidence this week
-            avg_confidence = db.session.query(
-                func.avg(SentimentAnalysis.confidence)
-            ).filter(
-                SentimentAnalysis.created_at >= week_ago
-            ).scalar() or 0
-            
-            # Most used model this week
-            top_model = db.session.query(
-                SentimentAnalysis.model_used,
-                func.count(SentimentAnalysis.id).label('count')
-            ).filter(
-                SentimentAnalysis.created_at >= week_ago
-            ).group_by(
-                SentimentAnalysis.model_used
-            ).order_by(desc('count')).first()
+            # Today's count is a bucket of the week's rollup, or a conditional count in the same scan
+            if self.rollups_enabled:
+                summary = self.analytics_summary(week_ago, group_by=('model', BUCKET_DATE))
+                today_analyses = int(summary.by_date.get(today.isoformat(), [0])[0])
+            else:
+                summary = self.analytics_summary(week_ago, group_by=('model',), flags={'today': "{t} >= :today"},
+                                                 today=datetime.combine(today, datetime.min.time()))
+                today_analyses = summary.flags['today']
             
-            return {
-                'today': {
-                    'total_analyses': today_analyses,
-                    'avg_confidence': round(avg_confidence, 3),
-                    'top_model': top_model.model_used if top_model else 'N/A',
-                    'date': today.isoformat()
-                },
-                'week': {
-                    'total_analyses': week_analyses,
-                    'avg_confidence': round(avg_confidence, 3),
-                    'top_model': top_model.model_used if top_model else 'N/A',
-                }
-            }
+            top_model = max(summary.by_model, key=summary.by_model.get) if summary.by_model else 'N/A'
+            return self._dashboard_summary(today, today_analyses, summary.total,
+                                           summary.average_confidence, top_model)
             
         except Exception as e:
             self.logger.error(f"Error getting dashboard summary: {str(e)}")
             return self._get_fallback_summary()
     
+    @staticmethod
+    def _dashboard_summary(today, today_analyses, week_analyses, avg_confidence, top_model):
+        return {
+            'today': {
+                'total_analyses': today_analyses,
+                'avg_confidence': round(avg_confidence, 3),
+                'top_model': top_model,
+                'date': today.isoformat()
+            },
+            'week': {
+                'total_analyses': week_analyses,
+                'avg_confidence': round(avg_confidence, 3),
+                'top_model': top_model,
+            }
+        }
+    
+    # SentimentAnalysis.to_dict() fields
+    _EXPORT_COLUMNS = ('id', 'text', 'sentiment', 'confidence', 'scores', 'model_used', 'processing_time',
+                       'language', 'emotion_scores', 'toxicity_score', 'bias_score', 'analysis_metadata',
+                       'source', 'created_at')
+    
+    def _export_chunks(self, days, chunk_size=BULK_CHUNK_SIZE):
+        """Row tuples of the export window in chunks, read through a server-side cursor"""
+        columns = SentimentAnalysis.__mapper__.columns
+        query = select(*[columns[name] for name in self._EXPORT_COLUMNS]).where(
+            columns['created_at'] >= datetime.utcnow() - timedelta(days=days)
+        ).order_by(columns['id'])
+        with self.storage.read() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+            for rows in result.partitions(chunk_size):
+                yield [tuple(v.isoformat() if isinstance(v, datetime) else v for v in row) for row in rows]
+    
+    def export_stream(self, format='ndjson', days=30, compression=None, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Export as an iterator of byte chunks (ndjson, csv or parquet, optionally gzip/zstd)
+        
+        Memory stays flat however many rows the window holds; pass the iterator to
+        streaming_export.stream_response or write_file.
+        """
+        return export_rows(self._EXPORT_COLUMNS, self._export_chunks(days, chunk_size), format, compression)
+    
     def export_data(self, format='json', days=30):
-        """Export data in various formats"""
+        """Export data in various formats (the whole export in memory; see export_stream)"""
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days)
-            
-            analyses = SentimentAnalysis.query.filter(
-                SentimentAnalysis.created_at >= cutoff_date
-            ).all()
+            if format == 'csv':
+                return b''.join(self.export_stream('csv', days)).decode('utf-8')
             
-            data = [analysis.to_dict() for analysis in analyses]
+            data = [dict(zip(self._EXPORT_COLUMNS, row))
+                    for rows in self._export_chunks(days) for row in rows]
             
             if format == 'json':
                 return json.dumps(data, indent=2, default=str)
-            elif format == 'csv':
-                df = pd.DataFrame(data)
-                return df.to_csv(index=False)
             else:
                 return data
                 
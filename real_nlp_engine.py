@@ -10,7 +10,6 @@ import pandas as pd
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 import logging
-from dataclasses import dataclass
 
 # Core NLP Libraries
 import nltk
@@ -34,20 +33,7 @@ except:
 from langdetect import detect
 import emoji
 
-@dataclass
-class SentimentResult:
-    """Structured sentiment analysis result"""
-    text: str
-    sentiment: str
-    confidence: float
-    scores: Dict[str, float]
-    model_used: str
-    processing_time: float
-    language: str
-    emotion_scores: Optional[Dict[str, float]] = None
-    toxicity_score: Optional[float] = None
-    bias_score: Optional[float] = None
-    metadata: Optional[Dict] = None
+from sentiment_result import SentimentResult
 
 class RealNLPEngine:
     """
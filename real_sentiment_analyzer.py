@@ -5,14 +5,11 @@ Enterprise-grade sentiment analysis with comprehensive error handling, security,
 
 import os
 import sys
-import json
 import requests
 import logging
 import time
 import hashlib
-from typing import Dict, List, Optional, Union, Any
-from dataclasses import dataclass, asdict
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
 from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from functools import wraps, lru_cache
 import threading
@@ -37,6 +34,8 @@ try:
 except ImportError:
     VADER_AVAILABLE = False
 
+from sentiment_result import SentimentResult
+
 # Setup enhanced logging
 logging.basicConfig(
     level=logging.INFO,
@@ -44,41 +43,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
-class SentimentResult:
-    """Enhanced result object for sentiment analysis with comprehensive metadata"""
-    text: str
-    sentiment: str
-    confidence: float
-    scores: Dict[str, float]
-    model_used: str
-    processing_time: float
-    emotion_scores: Optional[Dict[str, float]] = None
-    toxicity_score: float = 0.0
-    method: str = 'unknown'
-    timestamp: Optional[str] = None
-    text_length: int = 0
-    word_count: int = 0
-    language_detected: Optional[str] = None
-    error_details: Optional[str] = None
-    
-    def __post_init__(self):
-        """Auto-populate metadata fields"""
-        if not self.timestamp:
-            self.timestamp = datetime.utcnow().isoformat()
-        if not self.text_length:
-            self.text_length = len(self.text)
-        if not self.word_count:
-            self.word_count = len(self.text.split())
-    
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        return asdict(self)
-    
-    def to_json(self) -> str:
-        """Convert to JSON string"""
-        return json.dumps(self.to_dict(), indent=2)
-
 class EnhancedSentimentAnalyzer:
     """
     Production-grade sentiment analyzer with comprehensive error handling,
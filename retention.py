@@ -0,0 +1,237 @@
+"""
+Retention Engine
+Purges expired rows in small, separately committed batches under a per-run time
+budget, yielding the writer between batches, then returns the freed pages to the
+filesystem with incremental vacuum
+
+Usage:
+    python retention.py sentiment_analytics.db analytics                # one budgeted run
+    python retention.py sentiment_analytics.db analytics --convert      # one-off switch to incremental vacuum
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Rows deleted per transaction; small enough that a batch holds the writer for ms
+PURGE_BATCH_SIZE = 2000
+# Pages released per PRAGMA incremental_vacuum step
+VACUUM_STEP_PAGES = 2048
+
+
+@dataclass
+class RetentionRule:
+    """Rows of table whose time_column is older than max_age are expired"""
+    table: str
+    time_column: str
+    max_age: timedelta
+    # Value bound against time_column: sqlite3's datetime adapter format by default
+    format_cutoff: Callable[[datetime], str] = lambda moment: moment.isoformat(' ')
+
+
+@dataclass
+class PurgeReport:
+    """Outcome of one RetentionEngine.run()"""
+    rows_deleted: Dict[str, int] = field(default_factory=dict)
+    buckets_pruned: Dict[str, int] = field(default_factory=dict)
+    batches: int = 0
+    bytes_reclaimed: int = 0
+    free_pages_left: int = 0
+    seconds: float = 0.0
+    complete: bool = True  # False when the time budget ran out with rows or free pages left
+
+    @property
+    def total_deleted(self) -> int:
+        return sum(self.rows_deleted.values())
+
+    def to_dict(self) -> Dict:
+        return {
+            'rows_deleted': dict(self.rows_deleted),
+            'total_deleted': self.total_deleted,
+            'buckets_pruned': dict(self.buckets_pruned),
+            'batches': self.batches,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'free_pages_left': self.free_pages_left,
+            'seconds': round(self.seconds, 3),
+            'complete': self.complete,
+        }
+
+
+class RetentionEngine:
+    """
+    Bounded purge for one pooled SQLite database
+
+    Each batch deletes at most batch_size rowids found through the time column
+    (indexed by the migrations) and commits on its own, then sleeps for pause
+    seconds so queued request writes get the writer. A run stops when its
+    time_budget is spent; the next run continues where it left off. Rollup cubes
+    passed as cubes are pruned to their per-granularity retention on every run.
+    """
+
+    def __init__(self, pool, rules: Sequence[RetentionRule], batch_size: int = PURGE_BATCH_SIZE,
+                 time_budget: float = 5.0, pause: float = 0.005, cubes: Sequence = ()):
+        self.pool = pool
+        self.rules = list(rules)
+        self.cubes = list(cubes)
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+        self.pause = pause
+        self._lock = threading.Lock()
+
+    def run(self, now: Optional[datetime] = None, time_budget: Optional[float] = None) -> PurgeReport:
+        """Purge every rule, then incrementally vacuum, within the time budget"""
+        with self._lock:  # one run per database at a time
+            now = now or datetime.now()
+            started = time.perf_counter()
+            deadline = started + (self.time_budget if time_budget is None else time_budget)
+            report = PurgeReport()
+
+            for rule in self.rules:
+                deleted = self._purge(rule, rule.format_cutoff(now - rule.max_age), deadline, report)
+                report.rows_deleted[rule.table] = deleted
+            report.buckets_pruned = self.prune_cubes(now)
+
+            report.bytes_reclaimed, report.free_pages_left = self.incremental_vacuum(deadline)
+            if report.free_pages_left and self.vacuum_mode() == 'incremental':
+                report.complete = False
+            report.seconds = time.perf_counter() - started
+            if report.total_deleted or report.bytes_reclaimed:
+                logger.info(f"🧹 Purged {report.total_deleted} rows in {report.batches} batches, "
+                            f"reclaimed {report.bytes_reclaimed / 1024:.0f} KB ({report.seconds:.2f}s)")
+            return report
+
+    def _purge(self, rule: RetentionRule, cutoff: str, deadline: float, report: PurgeReport) -> int:
+        deleted = 0
+        sql = (f"DELETE FROM {rule.table} WHERE rowid IN "
+               f"(SELECT rowid FROM {rule.table} WHERE {rule.time_column} < ? LIMIT ?)")
+        while True:
+            if time.perf_counter() >= deadline:
+                report.complete = False
+                return deleted
+            with self.pool.write() as conn:
+                count = conn.execute(sql, (cutoff, self.batch_size)).rowcount
+            report.batches += 1
+            deleted += count
+            if count < self.batch_size:
+                return deleted
+            time.sleep(self.pause)  # let request traffic take the writer
+
+    def prune_cubes(self, now: datetime) -> Dict[str, int]:
+        """Drop expired buckets of every installed cube (one short transaction per cube)"""
+        pruned = {}
+        for cube in self.cubes:
+            with self.pool.write() as conn:
+                if cube.is_installed(conn):
+                    pruned[cube.name] = cube.prune(conn, now=now)
+        return pruned
+
+    # -- space reclamation ---------------------------------------------------
+
+    def vacuum_mode(self) -> str:
+        """auto_vacuum of the file (asked on the writer: readers may cache an older header)"""
+        with self.pool.write() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        return {0: 'none', 1: 'full', 2: 'incremental'}.get(mode, str(mode))
+
+    def enable_incremental_vacuum(self):
+        """
+        Switch an existing database to auto_vacuum=INCREMENTAL
+
+        New databases get it from sqlite_pool.DEFAULT_PRAGMAS; older files need this
+        one full VACUUM (which rewrites the file and blocks writers while it runs).
+        """
+        if self.vacuum_mode() == 'incremental':
+            return
+        with self.pool.write() as conn:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.commit()
+            conn.execute("VACUUM")
+        logger.info(f"✅ {self.pool.db_path} now uses incremental vacuum")
+
+    def incremental_vacuum(self, deadline: float):
+        """Release free pages in steps until none are left or the deadline passes"""
+        with self.pool.read() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        if self.vacuum_mode() != 'incremental':
+            return 0, self._free_pages()
+
+        released = 0
+        while time.perf_counter() < deadline:
+            with self.pool.write() as conn:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not before:
+                    break
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+                released += before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(self.pause)
+        if released and not self.pool.in_memory:
+            with self.pool.write() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return released * page_size, self._free_pages()
+
+    def _free_pages(self) -> int:
+        with self.pool.write() as conn:
+            return conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+
+class RetentionScheduler:
+    """Runs retention engines every interval seconds on a daemon thread"""
+
+    def __init__(self, engines: Sequence[RetentionEngine], interval: float = 3600.0):
+        self.engines = list(engines)
+        self.interval = interval
+        self.last_reports: List[Dict] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> List[Dict]:
+        reports = []
+        for engine in self.engines:
+            try:
+                reports.append({'database': engine.pool.db_path, **engine.run().to_dict()})
+            except Exception as e:
+                logger.error(f"❌ Retention run failed for {engine.pool.db_path}: {e}")
+        self.last_reports = reports
+        return reports
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='retention', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a budgeted retention purge')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('schema', choices=['analytics', 'video'], help='Schema the database holds')
+    parser.add_argument('--budget', type=float, default=30.0, help='Seconds the run may take')
+    parser.add_argument('--convert', action='store_true', help='Enable incremental vacuum (one full VACUUM)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.schema == 'analytics':
+        from database_manager import DatabaseManager
+        engine = DatabaseManager(args.db_path).retention
+    else:
+        from database import DatabaseManager
+        engine = DatabaseManager(connection_string=args.db_path).retention_engine()
+    if args.convert:
+        engine.enable_incremental_vacuum()
+    print(engine.run(time_budget=args.budget).to_dict())
@@ -0,0 +1,405 @@
+"""
+Time-Bucket Rollup Cubes
+Pre-aggregated counts, sums and min/max per minute/hour/day bucket and dimension
+combination, kept current by insert triggers so summaries cost O(buckets) not O(rows)
+"""
+
+import logging
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    'minute': '%Y-%m-%d %H:%M',
+    'hour': '%Y-%m-%d %H',
+    'day': '%Y-%m-%d',
+}
+
+# Minute buckets are only kept for the recent past; older windows fall back to hours
+DEFAULT_RETENTION = {
+    'minute': timedelta(days=2),
+    'hour': timedelta(days=90),
+    'day': None,
+}
+
+# Pseudo-dimensions derived from bucket labels: hour of day (needs a query that
+# stops at hour granularity) and calendar date (available at every granularity)
+HOUR_OF_DAY = 'hour_of_day'
+BUCKET_DATE = 'bucket_date'
+_PSEUDO_DIMENSIONS = {
+    HOUR_OF_DAY: 'substr(bucket, 12, 2)',
+    BUCKET_DATE: 'substr(bucket, 1, 10)',
+}
+
+
+class RollupCube:
+    """
+    One rollup table over one raw table
+
+    dimensions and measures map cube column names to SQL expressions over the raw
+    row, written with a {row} placeholder (NEW inside triggers, the table itself
+    during rebuilds). For every measure the cube keeps its sum, non-null count,
+    min and max, so averages stay exact when buckets are merged. Cubes named in
+    replaces are dropped, with their triggers, when this one is installed.
+    """
+
+    def __init__(self, name: str, source_table: str, time_column: str,
+                 dimensions: Dict[str, str], measures: Dict[str, str],
+                 requires: Sequence[str] = (), replaces: Sequence[str] = ()):
+        self.name = name
+        self.source_table = source_table
+        self.time_column = time_column
+        self.dimensions = dimensions
+        self.measures = measures
+        self.requires = list(requires) + [time_column]
+        self.replaces = list(replaces)
+
+    # Schema
+
+    def _measure_columns(self) -> List[str]:
+        columns = []
+        for measure in self.measures:
+            columns += [f"{measure}_sum", f"{measure}_n", f"{measure}_min", f"{measure}_max"]
+        return columns
+
+    def create_sql(self) -> List[str]:
+        columns = ['granularity TEXT NOT NULL', 'bucket TEXT NOT NULL']
+        columns += [f"{d} TEXT NOT NULL DEFAULT ''" for d in self.dimensions]
+        columns.append('count INTEGER NOT NULL DEFAULT 0')
+        columns += [f"{c} REAL" for c in self._measure_columns()]
+        key = ', '.join(['granularity', 'bucket', *self.dimensions])
+        return [f"""
+            CREATE TABLE IF NOT EXISTS {self.name} (
+                {', '.join(columns)},
+                PRIMARY KEY ({key})
+            ) WITHOUT ROWID
+        """]
+
+    def _values(self, row: str, granularity: str) -> List[str]:
+        """SELECT-list expressions producing one cube row from one raw row"""
+        values = [f"'{granularity}'",
+                  f"strftime('{GRANULARITIES[granularity]}', {row}.{self.time_column})"]
+        values += [f"COALESCE(CAST(({expr.format(row=row)}) AS TEXT), '')" for expr in self.dimensions.values()]
+        values.append('1')
+        for expr in self.measures.values():
+            value = f"({expr.format(row=row)})"
+            values += [f"COALESCE({value}, 0)", f"({value} IS NOT NULL)", value, value]
+        return values
+
+    def _upsert_clause(self) -> str:
+        key = ', '.join(['granularity', 'bucket', *self.dimensions])
+        updates = ['count = count + excluded.count']
+        for measure in self.measures:
+            updates += [
+                f"{measure}_sum = {measure}_sum + excluded.{measure}_sum",
+                f"{measure}_n = {measure}_n + excluded.{measure}_n",
+                # min()/max() return NULL if either side is NULL, so fall back to the other
+                f"{measure}_min = COALESCE(MIN({measure}_min, excluded.{measure}_min), {measure}_min, excluded.{measure}_min)",
+                f"{measure}_max = COALESCE(MAX({measure}_max, excluded.{measure}_max), {measure}_max, excluded.{measure}_max)",
+            ]
+        return f"ON CONFLICT ({key}) DO UPDATE SET {', '.join(updates)}"
+
+    def _columns(self) -> str:
+        return ', '.join(['granularity', 'bucket', *self.dimensions, 'count', *self._measure_columns()])
+
+    def trigger_sql(self) -> str:
+        inserts = '\n'.join(
+            f"INSERT INTO {self.name} ({self._columns()}) "
+            f"SELECT {', '.join(self._values('NEW', g))} WHERE NEW.{self.time_column} IS NOT NULL "
+            f"{self._upsert_clause()};"
+            for g in GRANULARITIES
+        )
+        return f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{self.name}_insert
+            AFTER INSERT ON {self.source_table}
+            BEGIN
+                {inserts}
+            END
+        """
+
+    def install(self, conn) -> bool:
+        """Create the cube and its trigger, then build it from existing raw rows"""
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.source_table})")]
+        missing = [c for c in self.requires if c not in columns]
+        if missing:
+            logger.warning(f"⚠️  Skipping rollup {self.name}: {self.source_table} has no column(s) {missing}")
+            return False
+        for retired in self.replaces:
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{retired}_insert")
+            conn.execute(f"DROP TABLE IF EXISTS {retired}")
+        for sql in self.create_sql():
+            conn.execute(sql)
+        conn.execute(self.trigger_sql())
+        self.rebuild(conn)
+        return True
+
+    def refresh_trigger(self, conn):
+        """Re-create the insert trigger after the cube's expressions changed (existing buckets are kept)"""
+        conn.execute(f"DROP TRIGGER IF EXISTS trg_{self.name}_insert")
+        conn.execute(self.trigger_sql())
+
+    def is_installed(self, conn) -> bool:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = ?",
+                            (f"trg_{self.name}_insert",)).fetchone() is not None
+
+    # Maintenance
+
+    def rebuild(self, conn, start: Optional[datetime] = None) -> int:
+        """
+        Recompute the cube from raw rows, optionally only buckets from start onwards
+
+        Buckets older than the raw data's retention are kept unless start is None.
+        Returns the number of cube rows written.
+        """
+        written = 0
+        for granularity, fmt in GRANULARITIES.items():
+            params: Tuple = ()
+            where = f"{self.source_table}.{self.time_column} IS NOT NULL"
+            if start is not None:
+                lower = start.strftime(fmt)
+                conn.execute(f"DELETE FROM {self.name} WHERE granularity = ? AND bucket >= ?", (granularity, lower))
+                # Start of the first rebuilt bucket, as a raw timestamp so the time index applies
+                floor = datetime.strptime(lower, fmt).strftime('%Y-%m-%d %H:%M:%S')
+                where += f" AND {self.source_table}.{self.time_column} >= ?"
+                params = (floor,)
+            else:
+                conn.execute(f"DELETE FROM {self.name} WHERE granularity = ?", (granularity,))
+
+            values = self._values(self.source_table, granularity)
+            group = ', '.join(str(i) for i in range(1, 3 + len(self.dimensions)))
+            aggregated = values[:2 + len(self.dimensions)] + ['COUNT(*)']
+            for expr in self.measures.values():
+                value = f"({expr.format(row=self.source_table)})"
+                aggregated += [f"COALESCE(SUM({value}), 0)", f"COUNT({value})", f"MIN({value})", f"MAX({value})"]
+            cursor = conn.execute(
+                f"INSERT INTO {self.name} ({self._columns()}) "
+                f"SELECT {', '.join(aggregated)} FROM {self.source_table} WHERE {where} GROUP BY {group}",
+                params
+            )
+            written += cursor.rowcount
+        return written
+
+    def merge(self, conn, rows: Iterable[Tuple[datetime, Sequence[Any], int, Sequence[Tuple]]]) -> int:
+        """
+        Add rows aggregated outside the database, each (moment, dimension values,
+        count, one (sum, n, min, max) per measure), to the buckets of every
+        granularity, the same way the insert trigger adds one raw row
+        """
+        sql = (f"INSERT INTO {self.name} ({self._columns()}) "
+               f"VALUES ({', '.join('?' * (3 + len(self.dimensions) + 4 * len(self.measures)))}) "
+               f"{self._upsert_clause()}")
+        params = []
+        for moment, dims, count, measures in rows:
+            values = ['' if d is None else str(d) for d in dims] + [count]
+            for total, n, low, high in measures:
+                values += [total, n, low, high]
+            params += [(g, moment.strftime(fmt), *values) for g, fmt in GRANULARITIES.items()]
+        conn.executemany(sql, params)
+        return len(params)
+
+    def prune(self, conn, retention: Optional[Dict[str, Optional[timedelta]]] = None,
+              now: Optional[datetime] = None) -> int:
+        """Drop buckets older than each granularity's retention"""
+        retention = DEFAULT_RETENTION if retention is None else retention
+        now = now or datetime.now()
+        removed = 0
+        for granularity, keep in retention.items():
+            if keep is None:
+                continue
+            cutoff = (now - keep).strftime(GRANULARITIES[granularity])
+            removed += conn.execute(f"DELETE FROM {self.name} WHERE granularity = ? AND bucket < ?",
+                                    (granularity, cutoff)).rowcount
+        return removed
+
+    # Queries
+
+    @staticmethod
+    def bucket_ranges(start: datetime, end: datetime, coarsest: str = 'day',
+                      minute_cutoff: Optional[datetime] = None) -> List[Tuple[str, str, str]]:
+        """
+        Cover [start, end] with the fewest buckets: minutes at the ragged edges,
+        whole hours next to them and whole days in the middle. Bounds are inclusive
+        bucket labels. Precision is one minute, or one hour for a leading edge
+        older than minute_cutoff.
+        """
+        def label(granularity, moment):
+            return moment.strftime(GRANULARITIES[granularity])
+
+        start = start.replace(second=0, microsecond=0)
+        if coarsest == 'minute':
+            return [('minute', label('minute', start), label('minute', end))]
+
+        hour_lo = start.replace(minute=0) + (timedelta(hours=1) if start.minute else timedelta())
+        hour_hi = end.replace(minute=0, second=0, microsecond=0)
+        ranges = []
+        if hour_lo >= hour_hi:
+            return [('minute', label('minute', start), label('minute', end))]
+
+        if start < hour_lo:
+            if minute_cutoff is not None and start < minute_cutoff:
+                ranges.append(('hour', label('hour', start), label('hour', start)))
+            else:
+                ranges.append(('minute', label('minute', start), label('minute', hour_lo - timedelta(minutes=1))))
+        ranges.append(('minute', label('minute', hour_hi), label('minute', end)))
+
+        day_lo = hour_lo.replace(hour=0) + (timedelta(days=1) if hour_lo.hour else timedelta())
+        day_hi = hour_hi.replace(hour=0)
+        if coarsest == 'hour' or day_lo >= day_hi:
+            ranges.append(('hour', label('hour', hour_lo), label('hour', hour_hi - timedelta(hours=1))))
+            return ranges
+
+        if hour_lo < day_lo:
+            ranges.append(('hour', label('hour', hour_lo), label('hour', day_lo - timedelta(hours=1))))
+        ranges.append(('day', label('day', day_lo), label('day', day_hi - timedelta(days=1))))
+        if day_hi < hour_hi:
+            ranges.append(('hour', label('hour', day_hi), label('hour', hour_hi - timedelta(hours=1))))
+        return ranges
+
+    def query_sql(self, start: datetime, end: Optional[datetime] = None, group_by: Sequence[str] = (),
+                  coarsest: str = 'day', now: Optional[datetime] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        SQL (named parameters, usable from sqlite3 and SQLAlchemy text()) that merges
+        the buckets covering [start, end]. end=None means "everything from start on".
+        """
+        now = now or datetime.now()
+        if end is None:
+            # Open-ended: reach past now so rows stamped slightly ahead (e.g. UTC) are included
+            end = now + timedelta(days=1)
+        if HOUR_OF_DAY in group_by and coarsest == 'day':
+            coarsest = 'hour'
+        minute_keep = DEFAULT_RETENTION['minute']
+        ranges = self.bucket_ranges(start, end, coarsest, now - minute_keep if minute_keep else None)
+
+        params: Dict[str, Any] = {}
+        conditions = []
+        for i, (granularity, lo, hi) in enumerate(ranges):
+            conditions.append(f"(granularity = :g{i} AND bucket BETWEEN :lo{i} AND :hi{i})")
+            params.update({f"g{i}": granularity, f"lo{i}": lo, f"hi{i}": hi})
+
+        selects = [f"{_PSEUDO_DIMENSIONS[g]} AS {g}" if g in _PSEUDO_DIMENSIONS else g for g in group_by]
+        selects.append('SUM(count) AS count')
+        for measure in self.measures:
+            selects += [f"SUM({measure}_sum) AS {measure}_sum", f"SUM({measure}_n) AS {measure}_n",
+                        f"MIN({measure}_min) AS {measure}_min", f"MAX({measure}_max) AS {measure}_max"]
+        sql = f"SELECT {', '.join(selects)} FROM {self.name} WHERE {' OR '.join(conditions)}"
+        if group_by:
+            sql += f" GROUP BY {', '.join(group_by)}"
+        return sql, params
+
+    def aggregate(self, conn, start: datetime, end: Optional[datetime] = None,
+                  group_by: Sequence[str] = (), coarsest: str = 'day') -> List[Dict[str, Any]]:
+        """
+        Merged rollup rows for a window, one per group, each with count and, per
+        measure, sum/n/min/max plus the exact average (sum / n)
+        """
+        sql, params = self.query_sql(start, end, group_by, coarsest)
+        cursor = conn.execute(sql, params)
+        names = [d[0] for d in cursor.description]
+        rows = []
+        for values in cursor.fetchall():
+            row = dict(zip(names, values))
+            if not row['count']:
+                continue
+            for measure in self.measures:
+                n = row[f"{measure}_n"]
+                row[f"{measure}_avg"] = row[f"{measure}_sum"] / n if n else None
+            rows.append(row)
+        return rows
+
+
+# ---------------------------------------------------------------------------
+# Cubes over the application's raw tables
+# ---------------------------------------------------------------------------
+
+_JSON_SOURCE = "CASE WHEN json_valid({row}.metadata) THEN json_extract({row}.metadata, '$.source') END"
+
+# database_manager.analysis_results (model and language are the metadata projections).
+# Like every cube it follows inserts only: buckets outlive rows the retention engine
+# and the archive remove, which is their purpose, but other deletes or updates of
+# analysis_results are not reflected until the affected buckets are rebuilt.
+ANALYSIS_CUBE = RollupCube(
+    'analysis_rollups', 'analysis_results', 'timestamp',
+    dimensions={'sentiment': '{row}.sentiment', 'source': '{row}.source',
+                'model': '{row}.model', 'language': '{row}.language'},
+    measures={'confidence': '{row}.confidence', 'processing_time': 'NULL'},
+    requires=['sentiment', 'source', 'confidence', 'model', 'language'],
+)
+
+# database_manager.api_usage
+API_USAGE_CUBE = RollupCube(
+    'api_usage_rollups', 'api_usage', 'timestamp',
+    dimensions={'endpoint': '{row}.endpoint', 'status_code': '{row}.status_code'},
+    measures={'response_time': '{row}.response_time'},
+    requires=['endpoint', 'status_code', 'response_time'],
+)
+
+# Upper bounds (seconds) of the response-time histogram bins; the last bin is '+Inf'
+LATENCY_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LATENCY_BINS = tuple(f"{bound:g}" for bound in LATENCY_BOUNDS) + ('+Inf',)
+
+
+def latency_bin(seconds: Optional[float]) -> Optional[str]:
+    """Label of the histogram bin holding a response time (None when it is unknown)"""
+    return None if seconds is None else LATENCY_BINS[bisect_left(LATENCY_BOUNDS, seconds)]
+
+
+def histogram_quantile(counts: Dict[str, int], q: float) -> Optional[float]:
+    """
+    Estimate a quantile from bin counts, interpolating linearly inside the bin
+    (the +Inf bin answers with the largest finite bound)
+    """
+    total = sum(counts.get(label, 0) for label in LATENCY_BINS)
+    if not total:
+        return None
+    rank, seen, lower = q * total, 0, 0.0
+    for bound, label in zip(LATENCY_BOUNDS, LATENCY_BINS):
+        count = counts.get(label, 0)
+        if count and seen + count >= rank:
+            return lower + (bound - lower) * (rank - seen) / count
+        seen += count
+        lower = bound
+    return LATENCY_BOUNDS[-1]
+
+
+_LATENCY_BIN_SQL = ("CASE WHEN {row}.response_time IS NULL THEN NULL "
+                    + ' '.join(f"WHEN {{row}}.response_time <= {bound!r} THEN '{label}'"
+                               for bound, label in zip(LATENCY_BOUNDS, LATENCY_BINS))
+                    + " ELSE '+Inf' END")
+
+# database_manager.api_usage response-time histogram (count per bin)
+API_LATENCY_CUBE = RollupCube(
+    'api_latency_rollups', 'api_usage', 'timestamp',
+    dimensions={'endpoint': '{row}.endpoint', 'latency_bin': _LATENCY_BIN_SQL},
+    measures={},
+    requires=['endpoint', 'response_time'],
+)
+
+# sentiment_analyses, shared by enhanced_database (raw SQL, source kept in the
+# metadata JSON) and real_database (ORM). Both managers write created_at, so one
+# cube keyed on it counts every row once whichever manager inserted it.
+SENTIMENT_CUBE = RollupCube(
+    'sentiment_analyses_rollups', 'sentiment_analyses', 'created_at',
+    dimensions={'sentiment': '{row}.sentiment', 'source': f"COALESCE({{row}}.source, {_JSON_SOURCE})",
+                'model': '{row}.model_used', 'language': '{row}.language'},
+    measures={'confidence': '{row}.confidence', 'processing_time': '{row}.processing_time'},
+    requires=['sentiment', 'source', 'model_used', 'language', 'confidence', 'processing_time', 'metadata'],
+    replaces=['sentiment_rollups', 'sentiment_analysis_rollups'],  # the former per-manager cubes
+)
+
+def install_cube(cube: RollupCube):
+    """Migration step that installs a cube (see migrations.MIGRATIONS)"""
+    def step(conn):
+        cube.install(conn)
+    return step
+
+
+def refresh_cube_trigger(cube: RollupCube):
+    """Migration step that re-creates an installed cube's trigger, or installs the cube"""
+    def step(conn):
+        if cube.is_installed(conn):
+            cube.refresh_trigger(conn)
+        else:
+            cube.install(conn)
+    return step
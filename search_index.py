@@ -0,0 +1,176 @@
+"""
+Full-Text Search Index
+SQLite FTS5 indexes over stored analyses and news, kept in sync by triggers, with
+BM25 ranking, prefix matching, highlighted snippets and column filters
+
+Usage:
+    python search_index.py sentiment_analysis.db --rebuild            # (re)index existing rows
+    python search_index.py sentiment_analysis.db --query "safari*" --index news
+"""
+
+import re
+import sqlite3
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_TERM = re.compile(r'\w+\*?', re.UNICODE)
+
+
+def match_query(text: str, prefix: bool = True) -> Optional[str]:
+    """
+    FTS5 MATCH expression for free text typed by a user
+
+    Every word is quoted (so operators and punctuation can't produce syntax
+    errors) and all words must match. Words written with a trailing * are prefix
+    terms; with prefix=True the last word is one too, for search-as-you-type.
+    """
+    terms = _TERM.findall(text or '')
+    if not terms:
+        return None
+    parts = []
+    for i, term in enumerate(terms):
+        star = term.endswith('*') or (prefix and i == len(terms) - 1)
+        parts.append(f'"{term.rstrip("*")}"' + ('*' if star else ''))
+    return ' '.join(parts)
+
+
+class FullTextIndex:
+    """
+    External-content FTS5 table over a source table's text columns
+
+    The index stores only the token data; rows are read back from the source
+    table by rowid. Insert/update/delete triggers keep it current, rebuild()
+    re-indexes rows written before the index existed.
+    """
+
+    def __init__(self, name: str, source_table: str, columns: Sequence[str],
+                 weights: Optional[Sequence[float]] = None, id_column: str = 'id'):
+        self.name = name
+        self.source_table = source_table
+        self.columns = list(columns)
+        self.weights = list(weights) if weights else [1.0] * len(self.columns)
+        self.id_column = id_column
+
+    def create_sql(self) -> List[str]:
+        cols = ', '.join(self.columns)
+        new = ', '.join(f"new.{c}" for c in self.columns)
+        old = ', '.join(f"old.{c}" for c in self.columns)
+        delete = (f"INSERT INTO {self.name} ({self.name}, rowid, {cols}) "
+                  f"VALUES ('delete', old.{self.id_column}, {old});")
+        insert = f"INSERT INTO {self.name} (rowid, {cols}) VALUES (new.{self.id_column}, {new});"
+        return [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {self.name} USING fts5(
+                    {cols}, content='{self.source_table}', content_rowid='{self.id_column}',
+                    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+                )""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{self.name}_insert AFTER INSERT ON {self.source_table}
+                BEGIN {insert} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{self.name}_delete AFTER DELETE ON {self.source_table}
+                BEGIN {delete} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{self.name}_update AFTER UPDATE OF {cols} ON {self.source_table}
+                BEGIN {delete} {insert} END""",
+        ]
+
+    def install(self, conn) -> bool:
+        """Create the index and its triggers; index existing rows the first time"""
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({self.source_table})")]
+        missing = [c for c in self.columns + [self.id_column] if c not in columns]
+        if missing:
+            logger.warning(f"⚠️  Skipping search index {self.name}: {self.source_table} has no column(s) {missing}")
+            return False
+        existed = self.is_installed(conn)
+        for sql in self.create_sql():
+            conn.execute(sql)
+        if not existed:
+            self.rebuild(conn)
+        return True
+
+    def is_installed(self, conn) -> bool:
+        return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (self.name,)).fetchone() is not None
+
+    def rebuild(self, conn):
+        """Re-index every source row (for data written before the triggers existed)"""
+        conn.execute(f"INSERT INTO {self.name} ({self.name}) VALUES ('rebuild')")
+        conn.execute(f"INSERT INTO {self.name} ({self.name}) VALUES ('optimize')")
+
+    def search_sql(self, filters: Sequence[str] = (), select: Sequence[str] = (),
+                   snippet_tokens: int = 12) -> str:
+        """
+        Ranked search statement (named parameters :match and :limit, plus one per filter)
+
+        Returns the source row id, its BM25 rank (lower is better), a snippet with
+        <mark> highlights and any extra source columns in select. filters are
+        source-table columns compared for equality.
+        """
+        weights = ', '.join(str(w) for w in self.weights)
+        where = ''.join(f" AND s.{column} = :{column}" for column in filters)
+        extra = ''.join(f", s.{column}" for column in select)
+        return f"""
+            SELECT s.{self.id_column} AS id,
+                   bm25({self.name}, {weights}) AS rank,
+                   snippet({self.name}, -1, '<mark>', '</mark>', '…', {snippet_tokens}) AS snippet{extra}
+            FROM {self.name}
+            JOIN {self.source_table} s ON s.{self.id_column} = {self.name}.rowid
+            WHERE {self.name} MATCH :match{where}
+            ORDER BY rank
+            LIMIT :limit
+        """
+
+    def search(self, conn, text: str, limit: int = 50, prefix: bool = True,
+               select: Sequence[str] = (), **filters) -> List[Dict[str, Any]]:
+        """
+        [{'id', 'rank', 'snippet', *select}] best first
+
+        filters with a None value are ignored, so optional UI filters can be passed as-is.
+        """
+        match = match_query(text, prefix)
+        if match is None:
+            return []
+        filters = {k: v for k, v in filters.items() if v is not None}
+        keys = ['id', 'rank', 'snippet'] + list(select)
+        cursor = conn.execute(self.search_sql(list(filters), select), {'match': match, 'limit': limit, **filters})
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
+
+
+def install_search_index(index: FullTextIndex):
+    """Migration step that installs a search index (see migrations.MIGRATIONS)"""
+    def step(conn):
+        index.install(conn)
+    return step
+
+
+# real_database.SentimentAnalysis and NewsArticle (also matches enhanced_database's news_articles)
+ANALYSIS_SEARCH = FullTextIndex('sentiment_analyses_fts', 'sentiment_analyses', ['text'])
+NEWS_SEARCH = FullTextIndex('news_articles_fts', 'news_articles', ['title', 'content'], weights=[4.0, 1.0])
+
+INDEXES = {'analyses': ANALYSIS_SEARCH, 'news': NEWS_SEARCH}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build or query the full-text search indexes')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('--index', choices=sorted(INDEXES), nargs='*', help='Indexes to use (default: all)')
+    parser.add_argument('--rebuild', action='store_true', help='Install the indexes and re-index existing rows')
+    parser.add_argument('--query', help='Run a search and print the ranked matches')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    conn = sqlite3.connect(args.db_path)
+    for name in args.index or sorted(INDEXES):
+        index = INDEXES[name]
+        if args.rebuild:
+            with conn:
+                if index.install(conn):
+                    index.rebuild(conn)
+                    count = conn.execute(f"SELECT COUNT(*) FROM {index.source_table}").fetchone()[0]
+                    print(f"✅ {index.name}: indexed {count} rows")
+        if args.query:
+            for hit in index.search(conn, args.query, args.limit):
+                print(f"  [{name} #{hit['id']}] {hit['rank']:.3f}  {hit['snippet']}")
+    conn.close()
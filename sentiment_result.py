@@ -0,0 +1,310 @@
+"""
+Compact Sentiment Result Types
+Single __slots__ result object shared by every analyzer, a struct-of-arrays batch
+container, and fast JSON/msgpack serialization helpers
+"""
+
+import json
+import time
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+# Optional fast serializers
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(obj: Any, indent: Optional[int] = None) -> str:
+    """Serialize to JSON, using orjson when installed"""
+    if ORJSON_AVAILABLE:
+        options = _ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=str, option=options).decode('utf-8')
+    if indent:
+        return json.dumps(obj, indent=indent, ensure_ascii=False, default=str)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def packb(obj: Any) -> bytes:
+    """Serialize to msgpack, falling back to UTF-8 JSON bytes when msgpack is missing"""
+    if MSGPACK_AVAILABLE:
+        return msgpack.packb(obj, default=str, use_bin_type=True)
+    return dumps(obj).encode('utf-8')
+
+
+class SentimentResult:
+    """
+    Sentiment analysis result shared by all analyzers
+
+    Uses __slots__ so each instance carries no per-object __dict__. The timestamp,
+    text length and word count are derived lazily on first access, and to_dict()
+    only builds a dictionary when serialization is actually requested.
+    """
+
+    __slots__ = (
+        'text', 'sentiment', 'confidence', 'scores', 'model_used', 'processing_time',
+        'emotion_scores', 'toxicity_score', 'method', 'language', 'bias_score',
+        'metadata', 'error_details', 'details',
+        '_created', '_timestamp', '_text_length', '_word_count',
+    )
+
+    def __init__(self, text: str, sentiment: str, confidence: float, scores: Dict[str, float],
+                 model_used: str, processing_time: float, *,
+                 emotion_scores: Optional[Dict[str, float]] = None,
+                 toxicity_score: Optional[float] = 0.0,
+                 method: str = 'unknown',
+                 timestamp: Optional[str] = None,
+                 text_length: int = 0,
+                 word_count: int = 0,
+                 language: Optional[str] = None,
+                 language_detected: Optional[str] = None,
+                 bias_score: Optional[float] = None,
+                 metadata: Optional[Dict] = None,
+                 analysis_metadata: Optional[Dict] = None,
+                 error_details: Optional[str] = None,
+                 details: Optional[Dict] = None):
+        self.text = text
+        self.sentiment = sentiment
+        self.confidence = confidence
+        self.scores = scores
+        self.model_used = model_used
+        self.processing_time = processing_time
+        self.emotion_scores = emotion_scores
+        self.toxicity_score = toxicity_score
+        self.method = method
+        self.language = language or language_detected
+        self.bias_score = bias_score
+        self.metadata = metadata if metadata is not None else analysis_metadata
+        self.error_details = error_details
+        self.details = details
+        self._created = time.time()
+        self._timestamp = timestamp
+        self._text_length = text_length
+        self._word_count = word_count
+
+    # Lazily derived fields
+
+    @property
+    def timestamp(self) -> str:
+        if not self._timestamp:
+            self._timestamp = datetime.utcfromtimestamp(self._created).isoformat()
+        return self._timestamp
+
+    @timestamp.setter
+    def timestamp(self, value: Optional[str]):
+        self._timestamp = value
+
+    @property
+    def text_length(self) -> int:
+        if not self._text_length:
+            self._text_length = len(self.text)
+        return self._text_length
+
+    @text_length.setter
+    def text_length(self, value: int):
+        self._text_length = value
+
+    @property
+    def word_count(self) -> int:
+        if not self._word_count:
+            self._word_count = len(self.text.split())
+        return self._word_count
+
+    @word_count.setter
+    def word_count(self, value: int):
+        self._word_count = value
+
+    # Compatibility aliases for the previous per-module result classes
+
+    @property
+    def language_detected(self) -> Optional[str]:
+        return self.language
+
+    @property
+    def analysis_metadata(self) -> Optional[Dict]:
+        return self.metadata
+
+    # Serialization
+
+    def to_dict(self, include_details: bool = True) -> Dict[str, Any]:
+        """Convert to dictionary; optional fields are only emitted when set"""
+        data = {
+            'text': self.text,
+            'sentiment': self.sentiment,
+            'confidence': self.confidence,
+            'scores': self.scores,
+            'model_used': self.model_used,
+            'processing_time': self.processing_time,
+            'emotion_scores': self.emotion_scores,
+            'toxicity_score': self.toxicity_score,
+            'method': self.method,
+            'timestamp': self.timestamp,
+            'text_length': self.text_length,
+            'word_count': self.word_count,
+            'error_details': self.error_details,
+        }
+        if self.language is not None:
+            data['language'] = self.language
+        if self.bias_score is not None:
+            data['bias_score'] = self.bias_score
+        if self.metadata is not None:
+            data['metadata'] = self.metadata
+        if include_details and self.details is not None:
+            data['details'] = self.details
+        return data
+
+    def to_json(self, include_details: bool = True, indent: Optional[int] = None) -> str:
+        """Serialize to a JSON string (orjson fast path when available)"""
+        return dumps(self.to_dict(include_details), indent=indent)
+
+    def to_msgpack(self, include_details: bool = True) -> bytes:
+        """Serialize to msgpack bytes"""
+        return packb(self.to_dict(include_details))
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SentimentResult):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return (f"SentimentResult(sentiment={self.sentiment!r}, confidence={self.confidence!r}, "
+                f"model_used={self.model_used!r}, method={self.method!r})")
+
+
+class ResultBatch:
+    """
+    Struct-of-arrays container for large numbers of results
+
+    Numeric columns live in typed arrays (8 bytes per value) instead of one boxed
+    float per field per object; rarely populated fields are kept sparse.
+    """
+
+    __slots__ = (
+        'texts', 'sentiments', 'model_used', 'methods', 'timestamps',
+        'confidences', 'positive', 'negative', 'neutral', 'processing_times', 'toxicity_scores',
+        'extras',
+    )
+
+    _EXTRA_FIELDS = ('emotion_scores', 'language', 'bias_score', 'metadata', 'error_details', 'details')
+
+    def __init__(self, results: Optional[Iterable[SentimentResult]] = None):
+        self.texts: List[str] = []
+        self.sentiments: List[str] = []
+        self.model_used: List[str] = []
+        self.methods: List[str] = []
+        self.timestamps = array('d')
+        self.confidences = array('d')
+        self.positive = array('d')
+        self.negative = array('d')
+        self.neutral = array('d')
+        self.processing_times = array('d')
+        self.toxicity_scores = array('d')
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        if results is not None:
+            self.extend(results)
+
+    def append(self, result: SentimentResult):
+        """Add a result, decomposing it into columns"""
+        scores = result.scores or {}
+        self.texts.append(result.text)
+        self.sentiments.append(result.sentiment)
+        self.model_used.append(result.model_used)
+        self.methods.append(result.method)
+        self.timestamps.append(result._created)
+        self.confidences.append(result.confidence or 0.0)
+        self.positive.append(scores.get('positive', 0.0))
+        self.negative.append(scores.get('negative', 0.0))
+        self.neutral.append(scores.get('neutral', 0.0))
+        self.processing_times.append(result.processing_time or 0.0)
+        self.toxicity_scores.append(result.toxicity_score or 0.0)
+
+        extra = {name: getattr(result, name) for name in self._EXTRA_FIELDS
+                 if getattr(result, name) is not None}
+        if extra:
+            self.extras[len(self.texts) - 1] = extra
+
+    def extend(self, results: Iterable[SentimentResult]):
+        for result in results:
+            self.append(result)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> SentimentResult:
+        """Materialize a single result object"""
+        if index < 0:
+            index += len(self)
+        result = SentimentResult(
+            text=self.texts[index],
+            sentiment=self.sentiments[index],
+            confidence=self.confidences[index],
+            scores={
+                'positive': self.positive[index],
+                'negative': self.negative[index],
+                'neutral': self.neutral[index],
+            },
+            model_used=self.model_used[index],
+            processing_time=self.processing_times[index],
+            toxicity_score=self.toxicity_scores[index],
+            method=self.methods[index],
+            **self.extras.get(index, {})
+        )
+        result._created = self.timestamps[index]
+        return result
+
+    def __iter__(self) -> Iterator[SentimentResult]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def sentiment_counts(self) -> Dict[str, int]:
+        """Sentiment distribution without materializing result objects"""
+        counts: Dict[str, int] = {}
+        for sentiment in self.sentiments:
+            counts[sentiment] = counts.get(sentiment, 0) + 1
+        return counts
+
+    def iter_dicts(self, include_details: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield compact per-row dictionaries straight from the columns"""
+        for index in range(len(self)):
+            row = {
+                'text': self.texts[index],
+                'sentiment': self.sentiments[index],
+                'confidence': self.confidences[index],
+                'scores': {
+                    'positive': self.positive[index],
+                    'negative': self.negative[index],
+                    'neutral': self.neutral[index],
+                },
+                'model_used': self.model_used[index],
+                'processing_time': self.processing_times[index],
+                'method': self.methods[index],
+            }
+            extra = self.extras.get(index)
+            if extra:
+                row.update(extra if include_details else
+                           {k: v for k, v in extra.items() if k != 'details'})
+            yield row
+
+    def to_json(self, include_details: bool = False) -> str:
+        """Serialize the whole batch as one JSON array"""
+        return dumps(list(self.iter_dicts(include_details)))
+
+    def to_json_lines(self, include_details: bool = False) -> Iterator[str]:
+        """Yield one JSON document per result (NDJSON)"""
+        for row in self.iter_dicts(include_details):
+            yield dumps(row) + '\n'
+
+    def to_msgpack(self, include_details: bool = False) -> bytes:
+        return packb(list(self.iter_dicts(include_details)))
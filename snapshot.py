@@ -0,0 +1,324 @@
+"""
+Read Snapshots
+Periodic online copies of a SQLite database (backup API or VACUUM INTO) that heavy
+analytics and report queries read instead of the live file, so long scans neither
+contend with request writes nor see a half-applied batch
+
+Usage:
+    python snapshot.py sentiment_analytics.db               # take one snapshot and report it
+    python snapshot.py sentiment_analytics.db --vacuum      # compacting copy via VACUUM INTO
+"""
+
+import os
+import time
+import shutil
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from sqlite_pool import SQLiteConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# 'backup' copies pages as they are (fast); 'vacuum' rebuilds a compact file
+SNAPSHOT_METHODS = ('backup', 'vacuum')
+
+# Snapshots are never written: no journal, and writes rejected at the connection
+SNAPSHOT_PRAGMAS = {'journal_mode': 'DELETE', 'query_only': 1, 'auto_vacuum': 'NONE'}
+
+
+class Snapshot:
+    """One snapshot file with its own connection pool, closed once its last reader leaves"""
+
+    def __init__(self, path: str, taken_at: float, data_version: int):
+        self.path = path
+        self.taken_at = taken_at
+        self.data_version = data_version  # of the live database just before it was copied
+        self.pool = SQLiteConnectionPool(path, SNAPSHOT_PRAGMAS)
+        self.readers = 0
+        self.retired = False
+
+    def discard(self):
+        self.pool.close_all()
+        try:
+            os.remove(self.path)
+        except OSError as e:
+            logger.warning(f"⚠️  Could not remove snapshot {self.path}: {e}")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SnapshotManager:
+    """
+    Latest consistent copy of one pooled database, refreshed in the background
+
+    read() yields a connection on the newest snapshot, taking a new one first when
+    the newest is older than max_age; every query inside one read() block sees the
+    same committed state. read(fresh=True) goes to the live database instead, for
+    callers that must see their own writes. A refresh that finds no commit since
+    the last copy (PRAGMA data_version, from any connection or process) only
+    renews that copy's age.
+    """
+
+    def __init__(self, pool: SQLiteConnectionPool, snapshot_dir: Optional[str] = None, max_age: float = 60.0,
+                 refresh_interval: Optional[float] = None, method: str = 'backup', name: str = 'snapshots',
+                 clock: Callable[[], float] = time.time):
+        if method not in SNAPSHOT_METHODS:
+            raise ValueError(f"method must be one of {SNAPSHOT_METHODS}")
+        self.pool = pool
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval if refresh_interval is not None else max_age / 2
+        self.method = method
+        self.name = name
+        self.clock = clock
+        self.enabled = not pool.in_memory  # an in-memory database has no file to copy
+        # Snapshots of each process live in their own directory beside the database
+        self.root = snapshot_dir or f"{pool.db_path}.snapshots"
+        self.directory = os.path.join(self.root, str(os.getpid()))
+
+        self._current: Optional[Snapshot] = None
+        self._monitor: Optional[sqlite3.Connection] = None  # never writes, so data_version sees every commit
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._seq = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'snapshots': 0, 'unchanged': 0, 'failures': 0, 'snapshot_reads': 0, 'fresh_reads': 0,
+                      'fallback_reads': 0, 'last_copy_ms': 0.0, 'last_bytes': 0}
+
+        if self.enabled:
+            self._remove_orphans()
+
+    def _remove_orphans(self):
+        """Delete snapshot directories left behind by processes that are gone"""
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.listdir(self.root):
+            if entry.isdigit() and int(entry) != os.getpid() and not _process_alive(int(entry)):
+                shutil.rmtree(os.path.join(self.root, entry), ignore_errors=True)
+
+    def _data_version(self) -> int:
+        if self._monitor is None:
+            self._monitor = sqlite3.connect(self.pool.db_path, timeout=self.pool.timeout, check_same_thread=False)
+        return self._monitor.execute("PRAGMA data_version").fetchone()[0]
+
+    # -- taking snapshots -----------------------------------------------------
+
+    def _copy(self, target: str):
+        """Write a transactionally consistent copy of the database to target"""
+        source = sqlite3.connect(self.pool.db_path, timeout=self.pool.timeout)
+        try:
+            if self.method == 'vacuum':
+                source.execute("VACUUM INTO ?", (target,))
+            else:
+                destination = sqlite3.connect(target)
+                try:
+                    source.backup(destination)  # all pages in one step, under one read transaction
+                finally:
+                    destination.close()
+        finally:
+            source.close()
+        destination = sqlite3.connect(target)
+        try:
+            destination.execute("PRAGMA journal_mode = DELETE")  # the copy keeps WAL mode otherwise
+        finally:
+            destination.close()
+
+    def refresh(self, force: bool = False) -> Optional[Snapshot]:
+        """Take a new snapshot (unless the database is unchanged since the last); returns the newest"""
+        if not self.enabled:
+            return None
+        with self._refresh_lock:
+            started = self.clock()
+            try:
+                version = self._data_version()
+            except sqlite3.Error as e:
+                self.stats['failures'] += 1
+                logger.error(f"❌ Snapshot of {self.pool.db_path} failed: {e}")
+                return self._current
+            current = self._current
+            if current is not None and not force and version == current.data_version:
+                current.taken_at = started  # still an exact copy of the live database
+                self.stats['unchanged'] += 1
+                return current
+
+            os.makedirs(self.directory, exist_ok=True)
+            self._seq += 1
+            path = os.path.join(self.directory, f"{os.path.basename(self.pool.db_path)}.{self._seq}")
+            t0 = time.perf_counter()
+            try:
+                self._copy(f"{path}.tmp")
+                os.replace(f"{path}.tmp", path)
+            except (sqlite3.Error, OSError) as e:
+                self.stats['failures'] += 1
+                logger.error(f"❌ Snapshot of {self.pool.db_path} failed: {e}")
+                for leftover in (f"{path}.tmp", path):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+                return current
+            snapshot = Snapshot(path, started, version)
+            self.stats['snapshots'] += 1
+            self.stats['last_copy_ms'] = round((time.perf_counter() - t0) * 1000, 2)
+            self.stats['last_bytes'] = os.path.getsize(path)
+
+            with self._lock:
+                previous, self._current = self._current, snapshot
+                discard = previous is not None and self._retire(previous)
+            if discard:
+                previous.discard()
+            logger.debug(f"📸 Snapshot {path} ({self.stats['last_bytes']} bytes, {self.stats['last_copy_ms']} ms)")
+            return snapshot
+
+    @staticmethod
+    def _retire(snapshot: Snapshot) -> bool:
+        """Mark a replaced snapshot; True when no reader holds it (caller discards it)"""
+        snapshot.retired = True
+        return snapshot.readers == 0
+
+    # -- reading --------------------------------------------------------------
+
+    def age(self) -> Optional[float]:
+        """Seconds since the newest snapshot was taken (None before the first)"""
+        current = self._current
+        return None if current is None else max(0.0, self.clock() - current.taken_at)
+
+    def _acquire(self, max_age: float) -> Optional[Snapshot]:
+        with self._lock:
+            current = self._current
+            if current is not None and self.clock() - current.taken_at <= max_age:
+                current.readers += 1
+                return current
+        self.refresh()
+        with self._lock:
+            current = self._current
+            if current is not None and self.clock() - current.taken_at <= max_age:
+                current.readers += 1
+                return current
+        return None  # refresh failed: caller falls back to the live database
+
+    def _release(self, snapshot: Snapshot):
+        with self._lock:
+            snapshot.readers -= 1
+            discard = snapshot.retired and snapshot.readers == 0
+        if discard:
+            snapshot.discard()
+
+    @contextmanager
+    def read(self, fresh: bool = False, max_age: Optional[float] = None) -> Iterator[sqlite3.Connection]:
+        """
+        Read connection on a snapshot at most max_age seconds old (default self.max_age)
+
+        fresh=True, an in-memory database or a failed refresh read the live database.
+        """
+        snapshot = None
+        if not fresh and self.enabled:
+            snapshot = self._acquire(self.max_age if max_age is None else max_age)
+        if snapshot is None:
+            self.stats['fresh_reads' if fresh or not self.enabled else 'fallback_reads'] += 1
+            with self.pool.read() as conn:
+                yield conn
+            return
+        self.stats['snapshot_reads'] += 1
+        try:
+            with snapshot.pool.read() as conn:
+                yield conn
+        finally:
+            self._release(snapshot)
+
+    # -- background refresh ---------------------------------------------------
+
+    def start(self) -> 'SnapshotManager':
+        """Refresh every refresh_interval in a background thread; snapshots are removed on exit"""
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"❌ {self.name} refresh failed: {e}")
+
+    def close(self):
+        """Stop refreshing and delete this process's snapshots"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        with self._refresh_lock, self._lock:
+            current, self._current = self._current, None
+            discard = current is not None and self._retire(current)
+            if self._monitor is not None:
+                self._monitor.close()
+                self._monitor = None
+        if discard:
+            current.discard()
+        if current is None or discard:  # otherwise the last reader removes the file
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        age = self.age()
+        return {**self.stats, 'enabled': self.enabled, 'method': self.method, 'max_age': self.max_age,
+                'age_seconds': None if age is None else round(age, 3),
+                'path': self._current.path if self._current else None}
+
+
+_managers: Dict[str, SnapshotManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_snapshots(pool: SQLiteConnectionPool, **options) -> SnapshotManager:
+    """Return the shared (started) snapshot manager for a pool's database, creating it on first use"""
+    if pool.in_memory:
+        return SnapshotManager(pool, **options)
+
+    key = os.path.abspath(pool.db_path)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = SnapshotManager(pool, name=f"snapshots:{os.path.basename(key)}", **options).start()
+            _managers[key] = manager
+        return manager
+
+
+def close_all_snapshots():
+    """Stop every shared snapshot manager and delete its files (used on shutdown and in tests)"""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
+
+
+def all_metrics() -> List[Dict[str, Any]]:
+    with _managers_lock:
+        return [dict(manager.get_metrics(), database=path) for path, manager in _managers.items()]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Take a read snapshot of a SQLite database')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('--vacuum', action='store_true', help='Compact the copy with VACUUM INTO')
+    parser.add_argument('--dir', help='Snapshot directory (default: <db_path>.snapshots)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    manager = SnapshotManager(SQLiteConnectionPool(args.db_path), snapshot_dir=args.dir,
+                              method='vacuum' if args.vacuum else 'backup')
+    snapshot = manager.refresh()
+    print({**manager.get_metrics(), 'path': snapshot.path if snapshot else None})
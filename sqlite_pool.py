@@ -0,0 +1,227 @@
+"""
+SQLite Connection Pool
+Persistent per-thread reader connections and a single serialized writer per database
+file, configured for WAL mode and shared by every database manager
+"""
+
+import os
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from itertools import islice
+from typing import Dict, List, Optional, Any, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to every connection. WAL lets readers proceed while the writer
+# commits; NORMAL synchronous is durable across application crashes in WAL mode.
+# auto_vacuum only takes effect on a new file and must precede journal_mode there;
+# it lets retention.RetentionEngine return purged pages to the filesystem.
+DEFAULT_PRAGMAS = {
+    'auto_vacuum': 'INCREMENTAL',
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,        # 16 MB page cache per connection
+    'mmap_size': 268435456,      # 256 MB memory-mapped I/O
+    'busy_timeout': 5000,        # ms to wait on a locked database
+    'temp_store': 'MEMORY',
+}
+
+STATEMENT_CACHE_SIZE = 256
+
+# Rows handed to a single executemany() call by the bulk save APIs
+BULK_CHUNK_SIZE = 5000
+
+
+def iter_chunks(items: Iterable, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[List]:
+    """Yield lists of at most chunk_size items from any iterable, including generators"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose create_function() skips repeat registrations
+
+    Registering a function expires every prepared statement of the connection, and
+    SQLAlchemy registers its functions each time it borrows a pooled connection.
+    """
+
+    def create_function(self, name, narg, func, **kwargs):
+        registered = self.__dict__.setdefault('_functions', {})
+        if registered.get((name.lower(), narg)) is func:
+            return
+        super().create_function(name, narg, func, **kwargs)
+        registered[(name.lower(), narg)] = func
+
+
+class SQLiteConnectionPool:
+    """
+    Connection layer for one SQLite database file
+
+    Reads use a persistent connection per thread, so each thread keeps its own
+    prepared-statement cache. All writes go through one writer connection guarded
+    by a lock, so SQLite never has to arbitrate between competing writers.
+    """
+
+    def __init__(self, db_path: str, pragmas: Optional[Dict[str, Any]] = None, timeout: float = 30.0):
+        self.db_path = db_path
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        self.timeout = timeout
+        self.in_memory = db_path == ':memory:' or db_path.startswith('file::memory:')
+
+        self._local = threading.local()
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer: Optional[sqlite3.Connection] = None
+        self.stats = {'reader_connections': 0, 'writes': 0, 'reads': 0, 'rollbacks': 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            factory=PooledConnection,
+        )
+        for name, value in self.pragmas.items():
+            if self.in_memory and name in ('journal_mode', 'mmap_size'):
+                continue
+            try:
+                conn.execute(f"PRAGMA {name} = {value}")
+            except sqlite3.DatabaseError as e:
+                logger.warning(f"⚠️  PRAGMA {name} failed on {self.db_path}: {e}")
+        return conn
+
+    @property
+    def writer(self) -> sqlite3.Connection:
+        """The single connection used for every write to this database"""
+        if self._writer is None:
+            with self._write_lock:
+                if self._writer is None:
+                    self._writer = self._connect()
+        return self._writer
+
+    def reader(self) -> sqlite3.Connection:
+        """Persistent read connection for the calling thread"""
+        if self.in_memory:
+            # Separate connections to :memory: would see separate databases
+            return self.writer
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._readers_lock:
+                self._prune_dead_readers()
+                self._readers[threading.get_ident()] = conn
+                self.stats['reader_connections'] += 1
+        return conn
+
+    def _prune_dead_readers(self):
+        """Close connections left behind by threads that have exited"""
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._readers if i not in alive]:
+            try:
+                self._readers.pop(ident).close()
+            except sqlite3.Error:
+                pass
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        """Context manager yielding the thread's read connection"""
+        self.stats['reads'] += 1
+        if self.in_memory:
+            with self._write_lock:
+                yield self.writer
+        else:
+            yield self.reader()
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """
+        Context manager yielding the serialized writer connection
+
+        Commits when the outermost write block exits cleanly and rolls back on error.
+        Nested write blocks on the same thread join the outer transaction.
+        """
+        with self._write_lock:
+            conn = self.writer
+            depth = getattr(self._local, 'write_depth', 0)
+            self._local.write_depth = depth + 1
+            try:
+                yield conn
+                if depth == 0:
+                    conn.commit()
+                    self.stats['writes'] += 1
+            except BaseException:
+                if depth == 0:
+                    conn.rollback()
+                    self.stats['rollbacks'] += 1
+                raise
+            finally:
+                self._local.write_depth = depth
+
+    def execute_write(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        """Run a single write statement in its own transaction"""
+        with self.write() as conn:
+            return conn.execute(sql, params)
+
+    def close_all(self):
+        """Close every connection owned by the pool"""
+        with self._readers_lock:
+            for conn in self._readers.values():
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._readers.clear()
+        self._local = threading.local()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """Pool statistics and effective journal mode"""
+        with self.read() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        return {
+            'db_path': self.db_path,
+            'journal_mode': journal_mode,
+            'open_readers': len(self._readers),
+            **self.stats,
+        }
+
+
+_pools: Dict[str, SQLiteConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str, pragmas: Optional[Dict[str, Any]] = None) -> SQLiteConnectionPool:
+    """Return the shared pool for a database file, creating it on first use"""
+    if db_path == ':memory:':
+        # Every in-memory database is private to the caller
+        return SQLiteConnectionPool(db_path, pragmas)
+
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = SQLiteConnectionPool(db_path, pragmas)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """Close every shared pool (used on shutdown and in tests)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
@@ -0,0 +1,654 @@
+"""
+Shared Storage Engine
+One schema, one SQLAlchemy Core engine and one serialized writer per database URL,
+shared by every database manager. SQLite URLs run on the sqlite_pool connections
+(per-thread readers, the single writer); other URLs such as PostgreSQL use a regular
+SQLAlchemy connection pool
+
+Usage:
+    python storage_engine.py sqlite:///sentiment_analysis.db                       # create / reconcile the schema
+    python storage_engine.py sqlite:///sentiment_analysis.db --merge sentiment_analytics.db
+    python storage_engine.py postgresql://user@host/sentiment --status
+"""
+
+import os
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from sqlalchemy import (Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, MetaData,
+                        String, Table, Text, UniqueConstraint, create_engine, func, insert, inspect,
+                        select, text, true)
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.engine import Connection, make_url
+from sqlalchemy.pool import NullPool
+from sqlalchemy.types import TypeDecorator
+
+from sqlite_pool import BULK_CHUNK_SIZE, SQLiteConnectionPool, get_pool, iter_chunks
+from snapshot import SnapshotManager, get_snapshots
+from content_store import install_content_store
+from timeseries import import_metrics_table, install_timeseries
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///sentiment_analysis.db')
+
+
+class JSONText(TypeDecorator):
+    """JSON kept in a TEXT column (the format the raw-SQL managers write), decoded on read"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return value if value is None or isinstance(value, str) else json.dumps(value)
+
+    def process_result_value(self, value, dialect):
+        return json.loads(value) if value else None
+
+
+# CURRENT_TIMESTAMP's format, which enhanced_database also writes and compares against
+UTC_SECONDS = DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite')
+
+
+def _hour_of_timestamp(context) -> Optional[int]:
+    """Stored hour bucket for Core/ORM inserts (the raw-SQL writers pass it themselves)"""
+    moment = context.get_current_parameters().get('timestamp')
+    return moment.hour if isinstance(moment, datetime) else None
+
+
+# ---------------------------------------------------------------------------
+# Schema: every table of every manager. Tables two managers used to declare
+# differently (sentiment_analyses, news_articles, api_usage) carry the union of
+# their columns, so each manager keeps its own column names on the shared table.
+# ---------------------------------------------------------------------------
+
+SCHEMA = MetaData()
+
+# enhanced_database (raw SQL) and real_database (ORM)
+SENTIMENT_ANALYSES = Table(
+    'sentiment_analyses', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('text', Text, nullable=False),
+    Column('sentiment', String(20), nullable=False),
+    Column('confidence', Float, nullable=False),
+    Column('scores', JSONText),
+    Column('model_used', String(50)),
+    Column('processing_time', Float),
+    Column('timestamp', UTC_SECONDS, default=datetime.utcnow, server_default=func.current_timestamp(),
+           info={'backfill': 'created_at'}),
+    Column('metadata', JSONText),
+    Column('hour', Integer, default=_hour_of_timestamp),
+    Column('language', String(10)),
+    Column('emotion_scores', JSONText),
+    Column('toxicity_score', Float),
+    Column('bias_score', Float),
+    Column('ip_address', String(45)),
+    Column('user_agent', String(500)),
+    Column('source', String(50), default='dashboard'),
+    Column('created_at', DateTime, default=datetime.utcnow, server_default=func.current_timestamp(),
+           info={'backfill': 'timestamp'}),
+    Column('updated_at', DateTime, default=datetime.utcnow, onupdate=datetime.utcnow),
+    Index('idx_sentiment_analyses_created_id', 'created_at', 'id'),
+    sqlite_autoincrement=True,
+)
+
+NEWS_ARTICLES = Table(
+    'news_articles', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(500), nullable=False),
+    Column('content', Text),
+    Column('url', String(1000)),
+    Column('source', String(100)),
+    Column('published_date', DateTime),
+    Column('sentiment', String(20)),
+    Column('confidence', Float),
+    Column('category', String(50)),
+    Column('timestamp', DateTime, server_default=func.current_timestamp(), info={'backfill': 'created_at'}),
+    Column('created_at', DateTime, default=datetime.utcnow, server_default=func.current_timestamp(),
+           info={'backfill': 'timestamp'}),
+    Index('idx_news_articles_created_id', 'created_at', 'id'),
+    sqlite_autoincrement=True,
+)
+
+# database_manager (raw SQL) and real_database (ORM)
+API_USAGE = Table(
+    'api_usage', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('endpoint', String(100), nullable=False),
+    Column('method', String(10)),
+    Column('timestamp', DateTime, nullable=False, default=datetime.now),
+    Column('response_time', Float),
+    Column('status_code', Integer),
+    Column('error_message', Text),
+    Column('ip_address', String(45)),
+    Column('user_agent', String(500)),
+    sqlite_autoincrement=True,
+)
+
+# real_database
+VIDEO_METADATA = Table(
+    'video_metadata', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('title', String(500)),
+    Column('url', String(1000)),
+    Column('duration', Float),
+    Column('file_path', String(1000)),
+    Column('transcript', Text),
+    Column('sentiment', String(20)),
+    Column('confidence', Float),
+    Column('video_metadata', JSONText),
+    Column('created_at', DateTime, default=datetime.utcnow),
+)
+
+# enhanced_database
+Table(
+    'analytics_cache', SCHEMA,
+    Column('cache_key', Text, primary_key=True),
+    Column('cache_data', Text),
+    Column('expires_at', DateTime),
+)
+
+Table(
+    'habits', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('goal_id', Text, nullable=False, unique=True),
+    Column('title', Text, nullable=False),
+    Column('description', Text),
+    Column('target', Integer, server_default=text('1')),
+    Column('icon', Text, server_default='fa-check'),
+    Column('category', Text, server_default='general'),
+    Column('created_at', DateTime, server_default=func.current_timestamp()),
+    Column('updated_at', DateTime, server_default=func.current_timestamp()),
+    Column('active', Boolean, server_default=true()),
+    sqlite_autoincrement=True,
+)
+
+Table(
+    'habit_completions', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('goal_id', Text, nullable=False),
+    Column('completed_date', Date, nullable=False),
+    Column('progress', Integer, server_default=text('1')),
+    Column('notes', Text),
+    Column('created_at', DateTime, server_default=func.current_timestamp()),
+    UniqueConstraint('goal_id', 'completed_date'),
+    sqlite_autoincrement=True,
+)
+
+Table(
+    'habit_streaks', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('goal_id', Text, nullable=False, unique=True),
+    Column('current_streak', Integer, server_default=text('0')),
+    Column('longest_streak', Integer, server_default=text('0')),
+    Column('last_completed', Date),
+    Column('streak_start_date', Date),
+    Column('updated_at', DateTime, server_default=func.current_timestamp()),
+    sqlite_autoincrement=True,
+)
+
+# database_manager
+Table(
+    'analysis_results', SCHEMA,
+    Column('id', Text, primary_key=True),
+    Column('content', Text, nullable=False),
+    Column('sentiment', Text, nullable=False),
+    Column('confidence', Float, nullable=False),
+    Column('source', Text, nullable=False),
+    Column('timestamp', DateTime, nullable=False),
+    Column('metadata', Text),  # json_codec blob (JSON text in older rows)
+    Column('hour', Integer, default=_hour_of_timestamp),
+    Column('model', Text),     # projections of metadata (json_codec.ANALYSIS_METADATA)
+    Column('language', Text),
+    Column('content_hash', LargeBinary),  # content_store text (content is '' when set)
+)
+
+Table(
+    'user_sessions', SCHEMA,
+    Column('session_id', Text, primary_key=True),
+    Column('start_time', DateTime, nullable=False),
+    Column('last_activity', DateTime, nullable=False),
+    Column('actions_count', Integer, server_default=text('0')),
+    Column('user_agent', Text),
+)
+
+Table(
+    'metrics', SCHEMA,
+    Column('id', Integer, primary_key=True),
+    Column('metric_name', Text, nullable=False),
+    Column('metric_value', Float, nullable=False),
+    Column('timestamp', DateTime, nullable=False),
+    Column('category', Text),
+    sqlite_autoincrement=True,
+)
+
+Table(
+    'content_cache', SCHEMA,
+    Column('cache_key', Text, primary_key=True),
+    Column('content', Text, nullable=False),
+    Column('expiry_time', DateTime, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+# database (video / comment analyses; timestamps are ISO strings)
+Table(
+    'video_analyses', SCHEMA,
+    Column('video_id', Text, primary_key=True),
+    Column('title', Text, nullable=False),
+    Column('description', Text),
+    Column('video_sentiment', Text, nullable=False),
+    Column('video_emotions', Text),  # json_codec blob (JSON text in older rows)
+    Column('video_confidence', Float),
+    Column('total_comments', Integer),
+    Column('analyzed_comments', Integer),
+    Column('average_comment_sentiment', Float),
+    Column('dominant_emotion', Text),
+    Column('engagement_score', Float),
+    Column('toxicity_score', Float),
+    Column('spam_ratio', Float),
+    Column('created_at', Text, nullable=False),
+    Column('updated_at', Text, nullable=False),
+    Index('idx_video_created_at', 'created_at'),
+)
+
+Table(
+    'comment_analyses', SCHEMA,
+    Column('comment_id', Text, primary_key=True),
+    Column('video_id', Text, ForeignKey('video_analyses.video_id')),
+    Column('text', Text, nullable=False),
+    Column('sentiment', Text, nullable=False),
+    Column('sentiment_confidence', Float),
+    Column('emotions', Text),  # json_codec blob (JSON text in older rows)
+    Column('tag', Text, nullable=False),
+    Column('tag_confidence', Float),
+    Column('toxicity_level', Text, nullable=False),
+    Column('toxicity_confidence', Float),
+    Column('language_detected', Text),
+    Column('word_count', Integer),
+    Column('emoji_count', Integer),
+    Column('created_at', Text, nullable=False),
+    Column('dominant_emotion', Text),  # projection of emotions (json_codec.COMMENT_EMOTIONS)
+    Index('idx_comment_video_id', 'video_id'),
+    Index('idx_comment_sentiment', 'sentiment'),
+    Index('idx_comment_tag', 'tag'),
+)
+
+Table(
+    'analytics_reports', SCHEMA,
+    Column('report_id', Text, primary_key=True),
+    Column('report_type', Text, nullable=False),
+    Column('date_range', Text),
+    Column('report_data', Text),
+    Column('created_at', Text, nullable=False),
+)
+
+Table(
+    'system_logs', SCHEMA,
+    Column('log_id', Text, primary_key=True),
+    Column('level', Text, nullable=False),
+    Column('message', Text, nullable=False),
+    Column('module', Text),
+    Column('details', Text),
+    Column('created_at', Text, nullable=False),
+    Index('idx_logs_created_at', 'created_at'),
+)
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+def storage_url(target: Optional[str] = None) -> str:
+    """Database URL for a URL or a bare SQLite path, with SQLite paths made absolute"""
+    target = target or DEFAULT_DATABASE_URL
+    if '://' not in target:
+        return 'sqlite://' if target == ':memory:' else f"sqlite:///{os.path.abspath(target)}"
+    url = make_url(target)
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:':
+        return url.set(database=os.path.abspath(url.database)).render_as_string(hide_password=False)
+    return target
+
+
+class _BorrowedConnection:
+    """
+    DB-API connection lent to SQLAlchemy by the sqlite_pool
+
+    Closing it leaves the pooled connection open, and commit/rollback are left to
+    the enclosing pool.write() block, which owns the transaction.
+    """
+    __slots__ = ('_conn',)
+
+    def __init__(self, conn):
+        object.__setattr__(self, '_conn', conn)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class StorageEngine:
+    """
+    Storage for one database URL: the shared schema, a Core engine and one writer
+
+    For SQLite every Core connection is one of the shared pool's connections (the
+    thread's reader, or the single writer inside begin()), so Core statements and the
+    raw-SQL managers never compete for the file, and begin() blocks nest with
+    pool.write() blocks in either direction. Other backends use SQLAlchemy's pool.
+    """
+
+    def __init__(self, url: Optional[str] = None, pragmas: Optional[Dict[str, Any]] = None, **engine_options):
+        self.url = storage_url(url)
+        parsed = make_url(self.url)
+        self.backend = parsed.get_backend_name()
+        self._local = threading.local()
+        self._schema_ready = False
+
+        if self.backend == 'sqlite':
+            self.database = parsed.database or ':memory:'
+            self._pragmas = pragmas
+            # Every in-memory database is private, so the engine keeps its own pool
+            self._memory_pool = SQLiteConnectionPool(':memory:', pragmas) if self.database == ':memory:' else None
+            self.engine = create_engine('sqlite://', creator=self._borrow, poolclass=NullPool)
+        else:
+            self.database = parsed.database
+            self._memory_pool = None
+            self.engine = create_engine(self.url, pool_pre_ping=True, **engine_options)
+
+    @property
+    def pool(self) -> Optional[SQLiteConnectionPool]:
+        """The shared sqlite_pool of this database (None for other backends)"""
+        if self.backend != 'sqlite':
+            return None
+        return self._memory_pool or get_pool(self.database, self._pragmas)
+
+    def _borrow(self):
+        return _BorrowedConnection(self._local.raw)
+
+    @contextmanager
+    def _connect(self, raw) -> Iterator[Connection]:
+        self._local.raw = raw
+        try:
+            with self.engine.connect() as conn:
+                yield conn
+        finally:
+            self._local.raw = None
+
+    @contextmanager
+    def read(self) -> Iterator[Connection]:
+        """Core connection for reads (inside begin() it is the transaction's connection)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+        elif self.backend == 'sqlite':
+            with self.pool.read() as raw, self._connect(raw) as conn:
+                yield conn
+        else:
+            with self.engine.connect() as conn:
+                yield conn
+
+    @property
+    def snapshots(self) -> Optional[SnapshotManager]:
+        """The shared read-snapshot manager of this database (None for other backends)"""
+        return get_snapshots(self.pool) if self.backend == 'sqlite' else None
+
+    @contextmanager
+    def snapshot(self, fresh: bool = False, max_age: Optional[float] = None) -> Iterator[Connection]:
+        """
+        Core connection for analytics reads on the latest read snapshot
+
+        fresh=True reads the live database, as do other backends (their replicas,
+        if any, are configured outside the application).
+        """
+        if self.backend != 'sqlite' or getattr(self._local, 'conn', None) is not None:
+            with self.read() as conn:
+                yield conn
+            return
+        with self.snapshots.read(fresh, max_age) as raw, self._connect(raw) as conn:
+            yield conn
+
+    @contextmanager
+    def begin(self) -> Iterator[Connection]:
+        """
+        Core connection in a write transaction
+
+        Commits when the outermost block exits cleanly and rolls back on error; nested
+        begin() blocks on the same thread, and for SQLite the managers' pool.write()
+        blocks, join the outer transaction.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            yield conn
+            return
+        if self.backend == 'sqlite':
+            transaction = self._sqlite_transaction()
+        else:
+            transaction = self.engine.begin()
+        with transaction as conn:
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+
+    @contextmanager
+    def _sqlite_transaction(self) -> Iterator[Connection]:
+        with self.pool.write() as raw, self._connect(raw) as conn:
+            yield conn
+
+    # -- statements ---------------------------------------------------------
+
+    def execute(self, statement, params: Any = None):
+        """Run one statement in its own (or the enclosing) write transaction"""
+        with self.begin() as conn:
+            return conn.execute(statement, params)
+
+    def insert(self, table: Table, values: Dict[str, Any]):
+        """Insert one row; returns its primary key"""
+        return self.execute(insert(table), values).inserted_primary_key[0]
+
+    def insert_many(self, table: Table, rows: Iterable[Dict[str, Any]], chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        Insert any iterable of row mappings with one executemany() per chunk
+
+        All rows must have the same keys. Everything is one transaction; returns the
+        number of rows written.
+        """
+        written = 0
+        with self.begin() as conn:
+            for chunk in iter_chunks(rows, chunk_size):
+                conn.execute(insert(table), chunk)
+                written += len(chunk)
+        return written
+
+    # -- schema -------------------------------------------------------------
+
+    def create_all(self) -> List[str]:
+        """
+        Create missing tables and indexes, and add columns existing tables lack
+
+        Columns are added nullable and without defaults (SQLite cannot add a column
+        with a CURRENT_TIMESTAMP default), so existing rows are backfilled from the
+        column named in the column's info['backfill'], else with its server default.
+        Returns the added columns as table.column.
+        """
+        if self._schema_ready:
+            return []
+        added = []
+        with self.begin() as conn:
+            existing = set(inspect(conn).get_table_names())
+            SCHEMA.create_all(conn)
+            for table in SCHEMA.sorted_tables:
+                if table.name not in existing:
+                    continue
+                present = {column['name'] for column in inspect(conn).get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in present:
+                        conn.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" '
+                                             f'{column.type.compile(dialect=conn.dialect)}')
+                        self._backfill(conn, table, column)
+                        added.append(f"{table.name}.{column.name}")
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+        if added:
+            logger.info(f"🔧 Added columns to the shared schema: {', '.join(added)}")
+        self._schema_ready = True
+        return added
+
+    @staticmethod
+    def _backfill(conn, table: Table, column: Column):
+        values = [f'"{column.info["backfill"]}"'] if 'backfill' in column.info else []
+        if column.server_default is not None:
+            values.append(str(column.server_default.arg.compile(dialect=conn.dialect)))
+        if values:
+            value = f"COALESCE({', '.join(values)})" if len(values) > 1 else values[0]
+            conn.exec_driver_sql(f'UPDATE {table.name} SET "{column.name}" = {value}')
+
+    def merge(self, path: str) -> Dict[str, int]:
+        """
+        Copy every schema table of another SQLite file into this database
+
+        Used once to fold the separate per-manager files into the shared one. Integer
+        surrogate keys are reassigned; rows whose natural key already exists are skipped.
+        The text store and metric segments come along, since analysis_results.content
+        and the metrics table only hold what was not moved there. Returns the rows
+        copied per table.
+        """
+        if self.backend != 'sqlite':
+            raise ValueError("merge() copies between SQLite files")
+        self.create_all()
+        with self.pool.write() as conn:
+            conn.execute("ATTACH DATABASE ? AS legacy", (path,))
+        copied = {}
+        try:
+            with self.pool.write() as conn:
+                for table in SCHEMA.sorted_tables:
+                    theirs = {row[1] for row in conn.execute(f"PRAGMA legacy.table_info({table.name})")}
+                    columns = [column.name for column in table.columns if column.name in theirs
+                               and not (column.primary_key and isinstance(column.type, Integer))]
+                    if not columns:
+                        continue
+                    names = ', '.join(f'"{name}"' for name in columns)
+                    copied[table.name] = conn.execute(
+                        f"INSERT OR IGNORE INTO main.{table.name} ({names}) SELECT {names} FROM legacy.{table.name}"
+                    ).rowcount
+                tables = {row[0] for row in conn.execute("SELECT name FROM legacy.sqlite_master WHERE type = 'table'")}
+                if 'text_contents' in tables:
+                    copied.update(self._merge_content_store(conn))
+                if 'metric_segments' in tables or copied.get('metrics'):
+                    copied.update(self._merge_metrics(conn, 'metric_segments' in tables))
+        finally:
+            with self.pool.write() as conn:
+                conn.execute("DETACH DATABASE legacy")
+        logger.info(f"✅ Merged {sum(copied.values())} rows from {path}")
+        return copied
+
+    @staticmethod
+    def _merge_content_store(conn) -> Dict[str, int]:
+        """Texts, their dictionaries and memoized scores, keyed by text hash"""
+        install_content_store(conn)
+        # Dictionary ids are per file: reuse an identical dictionary, else renumber after ours
+        renumbered = {}
+        for old_id, codec, data, created_at in conn.execute(
+                "SELECT id, codec, data, created_at FROM legacy.text_dictionaries ORDER BY id").fetchall():
+            row = conn.execute("SELECT id FROM main.text_dictionaries WHERE codec = ? AND data = ?",
+                               (codec, data)).fetchone()
+            renumbered[old_id] = row[0] if row else conn.execute(
+                "INSERT INTO main.text_dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+                (codec, data, created_at)).lastrowid
+        dictionary = ' '.join(f"WHEN {old} THEN {new}" for old, new in renumbered.items())
+        dictionary = f"CASE dictionary_id {dictionary} ELSE dictionary_id END" if dictionary else 'dictionary_id'
+        return {
+            'text_dictionaries': sum(old != new for old, new in renumbered.items()),
+            'text_contents': conn.execute(
+                f"INSERT OR IGNORE INTO main.text_contents (hash, body, dictionary_id, size) "
+                f"SELECT hash, body, {dictionary}, size FROM legacy.text_contents").rowcount,
+            'text_scores': conn.execute(
+                "INSERT OR IGNORE INTO main.text_scores (hash, model, model_version, sentiment, confidence, "
+                "result, created_at) SELECT hash, model, model_version, sentiment, confidence, result, created_at "
+                "FROM legacy.text_scores").rowcount,
+        }
+
+    @staticmethod
+    def _merge_metrics(conn, segments: bool) -> Dict[str, int]:
+        """Metric segments, and metrics rows of files from before the segment store encoded"""
+        install_timeseries(conn)
+        copied = {}
+        if segments:
+            copied['metric_segments'] = conn.execute(
+                "INSERT OR IGNORE INTO main.metric_segments (metric, resolution, start_ms, end_ms, points, data) "
+                "SELECT metric, resolution, start_ms, end_ms, points, data FROM legacy.metric_segments").rowcount
+        if conn.execute("SELECT 1 FROM main.metrics LIMIT 1").fetchone():
+            import_metrics_table(conn)  # as analytics migration 5 does
+            conn.execute("DELETE FROM main.metrics")
+        return copied
+
+    def status(self) -> Dict[str, Any]:
+        """Backend, row count per schema table and, for SQLite, pool statistics"""
+        with self.read() as conn:
+            tables = set(inspect(conn).get_table_names())
+            counts = {table.name: conn.execute(select(func.count()).select_from(table)).scalar()
+                      for table in SCHEMA.sorted_tables if table.name in tables}
+        status = {
+            'url': make_url(self.url).render_as_string(hide_password=True),
+            'backend': self.backend,
+            'tables': counts,
+        }
+        if self.pool is not None:
+            status['pool'] = self.pool.get_status()
+        return status
+
+    def dispose(self):
+        self.engine.dispose()
+
+
+_storages: Dict[str, StorageEngine] = {}
+_storages_lock = threading.Lock()
+
+
+def get_storage(target: Optional[str] = None, **engine_options) -> StorageEngine:
+    """Return the shared storage engine for a database URL or SQLite path, creating it on first use"""
+    url = storage_url(target)
+    if url == 'sqlite://':
+        return StorageEngine(url)  # private, like get_pool(':memory:')
+    with _storages_lock:
+        storage = _storages.get(url)
+        if storage is None:
+            storage = StorageEngine(url, **engine_options)
+            _storages[url] = storage
+        return storage
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create the shared schema or fold legacy files into it')
+    parser.add_argument('url', nargs='?', default=DEFAULT_DATABASE_URL, help='Database URL or SQLite path')
+    parser.add_argument('--merge', nargs='+', metavar='DB', help='Legacy SQLite files to copy in')
+    parser.add_argument('--status', action='store_true', help='Show row counts per table')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    storage = get_storage(args.url)
+    added = storage.create_all()
+    print(f"✅ Schema ready ({len(added)} column(s) added)")
+    for path in args.merge or []:
+        for table, rows in storage.merge(path).items():
+            print(f"  {table:<20} {rows:>9} rows from {path}")
+    if args.status:
+        print(json.dumps(storage.status(), indent=2, default=str))
@@ -0,0 +1,251 @@
+"""
+Streaming Export
+Constant-memory exports: rows are fetched in fetchmany() chunks from a
+(server-side) cursor and encoded chunk by chunk as NDJSON, CSV, Parquet row
+groups or a streamed JSON document, optionally gzip/zstd compressed
+"""
+
+import io
+import csv
+import json
+import zlib
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlite_pool import BULK_CHUNK_SIZE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# format -> (content type, file extension)
+FORMATS = {
+    'ndjson': ('application/x-ndjson', '.ndjson'),
+    'csv': ('text/csv', '.csv'),
+    'parquet': ('application/vnd.apache.parquet', '.parquet'),
+}
+COMPRESSIONS = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+Rows = Iterable[Sequence[Any]]
+
+
+def fetch_chunks(cursor, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[List[Sequence[Any]]]:
+    """Lists of at most chunk_size rows from an executed DB-API cursor"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+# ---------------------------------------------------------------------------
+# Writers: (columns, row chunks) -> encoded byte chunks
+# ---------------------------------------------------------------------------
+
+def ndjson_writer(columns: Sequence[str], chunks: Iterable[Rows]) -> Iterator[bytes]:
+    """One JSON object per line"""
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + '\n'
+                      for row in rows).encode('utf-8')
+
+
+def csv_writer(columns: Sequence[str], chunks: Iterable[Rows]) -> Iterator[bytes]:
+    """Header line followed by the rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows([_json_value(v) if isinstance(v, (dict, list)) else v for v in row] for row in rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _DrainSink:
+    """Write-only file object whose contents are handed out after every row group"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def _arrow_column(values: List[Any], arrow_type=None):
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return pa.array([v if v is None or isinstance(v, str) else _json_value(v) if isinstance(v, (dict, list))
+                         else str(v) for v in values], type=pa.string())
+
+
+def parquet_writer(columns: Sequence[str], chunks: Iterable[Rows],
+                   compression: Optional[str] = 'zstd', schema=None) -> Iterator[bytes]:
+    """
+    One Parquet row group per chunk
+
+    Without a schema it is inferred from the first chunk (all-NULL and mixed columns
+    become strings). Parquet compresses column chunks itself, so compression is
+    passed to the writer rather than wrapped around the stream.
+    """
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow")
+    sink, writer = _DrainSink(), None
+    if schema is not None:
+        writer = pq.ParquetWriter(sink, schema, compression=compression or 'none')
+    for rows in chunks:
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        if writer is None:
+            arrays = [_arrow_column(list(v)) for v in values]
+            schema = pa.schema([(name, pa.string() if pa.types.is_null(a.type) else a.type)
+                                for name, a in zip(columns, arrays)])
+            writer = pq.ParquetWriter(sink, schema, compression=compression or 'none')
+        arrays = [_arrow_column(list(v), field.type) for v, field in zip(values, schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        yield sink.drain()
+    if writer is None:  # no rows: still a valid, empty file
+        writer = pq.ParquetWriter(sink, pa.schema([(name, pa.string()) for name in columns]),
+                                  compression=compression or 'none')
+    writer.close()
+    yield sink.drain()
+
+
+def _json_value(value: Any) -> str:
+    return json.dumps(value, default=str, ensure_ascii=False)
+
+
+def _json_array(items: Iterable[Any], indent: str) -> Iterator[bytes]:
+    empty = True
+    for item in items:
+        yield f"{'' if empty else ','}\n{indent}  {_json_value(item)}".encode('utf-8')
+        empty = False
+    yield b']' if empty else f"\n{indent}]".encode('utf-8')
+
+
+def json_document(header: Dict[str, Any], sections: Dict[str, Any]) -> Iterator[bytes]:
+    """
+    A single JSON object: header fields, then one array per section streamed item
+    by item (one item per line) so the document is never held in memory. A section
+    given as a dict of iterables becomes an object of streamed arrays.
+    """
+    yield b'{'
+    first = True
+    for key, value in header.items():
+        yield f"{'' if first else ','}\n  {json.dumps(key)}: {_json_value(value)}".encode('utf-8')
+        first = False
+    for key, items in sections.items():
+        yield f"{'' if first else ','}\n  {json.dumps(key)}: ".encode('utf-8')
+        first = False
+        if isinstance(items, dict):
+            yield b'{'
+            for i, (name, nested) in enumerate(items.items()):
+                yield f"{',' if i else ''}\n    {json.dumps(name)}: [".encode('utf-8')
+                yield from _json_array(nested, '    ')
+            yield b'\n  }' if items else b'}'
+        else:
+            yield b'['
+            yield from _json_array(items, '  ')
+    yield b'\n}\n'
+
+
+WRITERS = {'ndjson': ndjson_writer, 'csv': csv_writer, 'parquet': parquet_writer}
+
+
+# ---------------------------------------------------------------------------
+# Compression and sinks
+# ---------------------------------------------------------------------------
+
+def compress(chunks: Iterable[bytes], compression: Optional[str]) -> Iterator[bytes]:
+    """Stream-compress byte chunks with gzip or zstd (None passes them through)"""
+    if compression is None:
+        yield from chunks
+        return
+    if compression == 'gzip':
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    elif compression == 'zstd':
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        raise ValueError(f"Unknown compression: {compression}")
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_rows(columns: Sequence[str], chunks: Iterable[Rows], fmt: str = 'ndjson',
+                compression: Optional[str] = None) -> Iterator[bytes]:
+    """Encoded (and compressed) byte chunks for row chunks in one of FORMATS"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == 'zstd' and fmt != 'parquet' and not ZSTD_AVAILABLE:
+        raise RuntimeError("zstd compression requires the zstandard package")
+    if fmt == 'parquet':
+        return parquet_writer(columns, chunks, compression or 'zstd')
+    return compress(WRITERS[fmt](columns, chunks), compression)
+
+
+def export_cursor(cursor, fmt: str = 'ndjson', compression: Optional[str] = None,
+                  chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[bytes]:
+    """export_rows over an executed DB-API cursor"""
+    columns = [description[0] for description in cursor.description]
+    return export_rows(columns, fetch_chunks(cursor, chunk_size), fmt, compression)
+
+
+def filename_for(stem: str, fmt: str, compression: Optional[str] = None) -> str:
+    suffix = '' if fmt == 'parquet' else COMPRESSIONS[compression]
+    return f"{stem}{FORMATS[fmt][1]}{suffix}"
+
+
+def write_file(chunks: Iterable[bytes], path: str) -> int:
+    """Write byte chunks to path; returns the number of bytes written"""
+    written = 0
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def stream_response(chunks: Iterable[bytes], fmt: str, filename: str,
+                    compression: Optional[str] = None):
+    """Chunked Flask response that downloads the export as it is produced"""
+    from flask import Response, stream_with_context
+
+    mimetype = FORMATS[fmt][0]
+    if compression and fmt != 'parquet':
+        mimetype = {'gzip': 'application/gzip', 'zstd': 'application/zstd'}[compression]
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
@@ -7,6 +7,7 @@ import asyncio
 import websockets
 import json
 import logging
+import os
 from datetime import datetime
 from typing import Set, Dict, Any
 import threading
@@ -16,7 +17,8 @@ import time
 from nlp_engine import NLPEngine
 from analytics import SentimentAnalytics
 from monitoring import SystemMonitor
-from database import DatabaseManager
+from database import CommentAnalysis, DatabaseManager
+from write_behind import WriteBehindQueue
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +36,15 @@ class SentimentStreamingServer:
         self.monitor = SystemMonitor()
         self.db_manager = DatabaseManager()
         
+        # Comment analyses are committed in batches off the event loop
+        self.comment_writer = WriteBehindQueue(
+            self.db_manager.save_comment_analyses,
+            overflow='spill',
+            spill_dir=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stream_writer.spill'),
+            name='stream-writer',
+            decode=CommentAnalysis.from_dict
+        ).start()
+        
         # Start background monitoring
         self.monitor.start_monitoring(interval=15)
         
@@ -112,6 +123,10 @@ class SentimentStreamingServer:
             analysis_time = time.time() - start_time
             
             self.stats['analyses_performed'] += 1
+            self.comment_writer.submit_many(
+                CommentAnalysis.from_engine_result(comment, request_id)
+                for comment in result.get('comments', [])
+            )
             
             # Add metadata
             result['metadata'] = {
@@ -0,0 +1,199 @@
+"""
+Consolidated Summary Queries
+Builds one single-scan aggregate statement per summary (conditional aggregation plus
+a finest-grain GROUP BY folded into every requested grouping set) and a typed summary
+object shared with the rollup cubes
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rollups import HOUR_OF_DAY, BUCKET_DATE
+
+logger = logging.getLogger(__name__)
+
+# Time-derived dimensions per SQL dialect ({t} is the time column)
+_TIME_DIMENSIONS = {
+    'sqlite': {HOUR_OF_DAY: "strftime('%H', {t})", BUCKET_DATE: "date({t})"},
+    'postgresql': {HOUR_OF_DAY: "to_char({t}, 'HH24')", BUCKET_DATE: "to_char({t}, 'YYYY-MM-DD')"},
+}
+
+MEASURES = ('confidence', 'processing_time')
+
+# Known sentiment labels, pivoted into conditional counts instead of grouped on
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+
+@dataclass
+class AnalyticsSummary:
+    """
+    Aggregates over one time window
+
+    Built from rows carrying a count, per-measure sum and non-null count, and any
+    of the grouping dimensions, whether they come from a raw-table scan
+    (SummaryQuery) or from rollup buckets (RollupCube.aggregate).
+    """
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    total: int = 0
+    confidence_sum: float = 0.0
+    confidence_n: int = 0
+    processing_time_sum: float = 0.0
+    processing_time_n: int = 0
+    by_sentiment: Dict[str, int] = field(default_factory=dict)
+    by_source: Dict[str, int] = field(default_factory=dict)
+    by_model: Dict[str, int] = field(default_factory=dict)
+    by_language: Dict[str, int] = field(default_factory=dict)
+    by_hour: Dict[int, int] = field(default_factory=dict)
+    by_date: Dict[str, List[float]] = field(default_factory=dict)  # date -> [count, confidence sum, n]
+    flags: Dict[str, int] = field(default_factory=dict)
+    queries: int = 0
+    from_rollups: bool = False
+
+    @property
+    def average_confidence(self) -> float:
+        return self.confidence_sum / self.confidence_n if self.confidence_n else 0.0
+
+    @property
+    def average_processing_time(self) -> float:
+        return self.processing_time_sum / self.processing_time_n if self.processing_time_n else 0.0
+
+    @property
+    def daily_trends(self) -> List[Dict[str, Any]]:
+        return [
+            {'date': date, 'count': int(count), 'avg_confidence': round(conf_sum / n, 3) if n else 0}
+            for date, (count, conf_sum, n) in sorted(self.by_date.items())
+        ]
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, flags: Sequence[str] = (), queries: int = 1,
+                  from_rollups: bool = False, pivot: Optional[Dict[str, Sequence[str]]] = None
+                  ) -> 'AnalyticsSummary':
+        """Fold finest-grain rows (and pivoted counts) into every grouping set they carry"""
+        summary = cls(start=start, end=end, queries=queries, from_rollups=from_rollups,
+                      flags={name: 0 for name in flags})
+        groupings = (('sentiment', summary.by_sentiment), ('source', summary.by_source),
+                     ('model', summary.by_model), ('language', summary.by_language))
+        for row in rows:
+            count = row['count'] or 0
+            if not count:
+                continue
+            summary.total += count
+            for measure in MEASURES:
+                if f"{measure}_n" in row:
+                    setattr(summary, f"{measure}_sum", getattr(summary, f"{measure}_sum") + (row[f"{measure}_sum"] or 0))
+                    setattr(summary, f"{measure}_n", getattr(summary, f"{measure}_n") + (row[f"{measure}_n"] or 0))
+            for key, counts in groupings:
+                if key in row:
+                    value = row[key] if row[key] != '' else None  # rollups store NULL dimensions as ''
+                    counts[value] = counts.get(value, 0) + count
+            if HOUR_OF_DAY in row and row[HOUR_OF_DAY] is not None:
+                hour = int(row[HOUR_OF_DAY])
+                summary.by_hour[hour] = summary.by_hour.get(hour, 0) + count
+            if BUCKET_DATE in row and row[BUCKET_DATE] is not None:
+                day = summary.by_date.setdefault(str(row[BUCKET_DATE]), [0, 0.0, 0])
+                day[0] += count
+                day[1] += row.get('confidence_sum') or 0
+                day[2] += row.get('confidence_n') or 0
+            for name in flags:
+                summary.flags[name] += row.get(name) or 0
+            for key, values in (pivot or {}).items():
+                counts = getattr(summary, f"by_{key}")
+                known = 0
+                for i, value in enumerate(values):
+                    pivoted = row[f"{key}__{i}"] or 0
+                    if pivoted:
+                        counts[value] = counts.get(value, 0) + pivoted
+                        known += pivoted
+                if count > known:
+                    counts[None] = counts.get(None, 0) + count - known  # values outside the pivot
+        summary.by_hour = dict(sorted(summary.by_hour.items()))
+        return summary
+
+
+class SummaryQuery:
+    """
+    Single-statement summary over a raw table for arbitrary [start, end) windows
+
+    columns maps the logical names (sentiment, source, model, language, confidence,
+    processing_time, and optionally hour_of_day/bucket_date) to the table's column
+    expressions; dimensions not mapped cannot be grouped on and measures not mapped
+    are not computed, which keeps the scan on a covering index.
+
+    Grouping sets are answered by one GROUP BY at the combined finest grain and
+    folded in Python (SQLite has no GROUPING SETS). Dimensions with a known domain
+    can instead be pivoted into conditional counts, which keeps them out of the
+    GROUP BY sort, and flags add arbitrary conditional counts, e.g.
+    {'today': "{t} >= :today"}.
+    """
+
+    def __init__(self, table: str, time_column: str, columns: Dict[str, str], dialect: str = 'sqlite'):
+        if dialect not in _TIME_DIMENSIONS:
+            raise ValueError(f"dialect must be one of {sorted(_TIME_DIMENSIONS)}")
+        self.table = table
+        self.time_column = time_column
+        self.columns = columns
+        self.dialect = dialect
+
+    def build(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+              group_by: Sequence[str] = (), flags: Optional[Dict[str, str]] = None,
+              pivot: Optional[Dict[str, Sequence[str]]] = None) -> Tuple[str, Dict[str, Any]]:
+        """SQL with named parameters, usable from sqlite3 and SQLAlchemy text()"""
+        time_dimensions = _TIME_DIMENSIONS[self.dialect]
+        selects, groups, params = [], [], {}
+        for name in group_by:
+            if name in self.columns:
+                expression = self.columns[name]  # e.g. a stored hour column instead of strftime per row
+            elif name in time_dimensions:
+                expression = time_dimensions[name].format(t=self.time_column)
+            else:
+                raise ValueError(f"{self.table} has no dimension {name!r}")
+            selects.append(f"{expression} AS {name}")
+            groups.append(expression)
+
+        selects.append("COUNT(*) AS count")
+        for measure in MEASURES:
+            if measure in self.columns:
+                selects += [f"SUM({self.columns[measure]}) AS {measure}_sum",
+                            f"COUNT({self.columns[measure]}) AS {measure}_n"]
+        for name, values in (pivot or {}).items():
+            if name not in self.columns:
+                raise ValueError(f"{self.table} has no dimension {name!r}")
+            for i, value in enumerate(values):
+                selects.append(f"SUM(CASE WHEN {self.columns[name]} = :{name}__{i} THEN 1 ELSE 0 END) AS {name}__{i}")
+                params[f"{name}__{i}"] = value
+        for name, condition in (flags or {}).items():
+            selects.append(f"SUM(CASE WHEN {condition.format(t=self.time_column)} THEN 1 ELSE 0 END) AS {name}")
+
+        conditions = []
+        if start is not None:
+            conditions.append(f"{self.time_column} >= :start")
+            params['start'] = start
+        if end is not None:
+            conditions.append(f"{self.time_column} < :end")
+            params['end'] = end
+
+        sql = f"SELECT {', '.join(selects)} FROM {self.table}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        if groups:
+            sql += f" GROUP BY {', '.join(groups)}"
+        return sql, params
+
+    def run(self, execute: Callable[[str, Dict[str, Any]], Any], start: Optional[datetime] = None,
+            end: Optional[datetime] = None, group_by: Sequence[str] = (),
+            flags: Optional[Dict[str, str]] = None, pivot: Optional[Dict[str, Sequence[str]]] = None,
+            **flag_params) -> AnalyticsSummary:
+        """
+        Run the statement through execute(sql, params) -- a sqlite3 connection's
+        execute or a SQLAlchemy session wrapper -- and build the summary
+        """
+        sql, params = self.build(start, end, group_by, flags, pivot)
+        params.update(flag_params)
+        result = execute(sql, params)
+        names = list(result.keys()) if hasattr(result, 'keys') else [d[0] for d in result.description]
+        rows = [dict(zip(names, values)) for values in result.fetchall()]
+        return AnalyticsSummary.from_rows(rows, start, end, flags=list(flags or {}), pivot=pivot)
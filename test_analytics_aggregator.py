@@ -0,0 +1,129 @@
+"""
+Tests for the bounded analytics history and its running report counters
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+import analytics
+from analytics import RollingAggregator, SentimentAnalytics
+
+SENTIMENTS = ['positive', 'negative', 'neutral', 'mixed']
+EMOTIONS = ['joy', 'anger', 'sadness', 'fear', 'surprise', 'trust']
+TAGS = ['supportive', 'hateful', 'spam', 'question', 'neutral']
+WORDS = ['the', 'and', 'poa', 'sawa', 'asante', 'with', 'habari', 'karibu', 'video']
+
+
+class FakeClock:
+    """Stands in for analytics.datetime so add_analysis() stamps controlled times"""
+
+    def __init__(self, start):
+        self.moment = start
+
+    def now(self):
+        return self.moment
+
+    def __getattr__(self, name):
+        return getattr(datetime, name)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(datetime(2024, 5, 1, 9, 30))
+    monkeypatch.setattr(analytics, 'datetime', clock)
+    return clock
+
+
+def random_analysis(rng):
+    comments = [{
+        'text': ' '.join(rng.choices(WORDS, k=rng.randint(0, 5))),
+        'sentiment': rng.choice(SENTIMENTS),
+        'tag': rng.choice(TAGS),
+        'emotion': rng.sample(EMOTIONS, rng.randint(0, 3)),
+    } for _ in range(rng.choice([0, 0, 1, 2, 4]))]
+    analysis = {'video_sentiment': rng.choice(SENTIMENTS), 'video_emotion': rng.sample(EMOTIONS, rng.randint(0, 2)),
+                'comments': comments}
+    for key in rng.sample(['video_sentiment', 'video_emotion'], rng.randint(0, 1)):
+        del analysis[key]  # defaults apply to missing fields
+    return analysis
+
+
+def fill(engine, clock, rng, count, step):
+    for _ in range(count):
+        engine.add_analysis(random_analysis(rng))
+        clock.moment += step
+
+
+def same_report(engine, days_back):
+    expected = engine.generate_report_for(engine.analysis_history, days_back)
+    report = engine.generate_comprehensive_report(days_back)
+    expected.pop('generated_at', None)
+    report.pop('generated_at', None)
+    assert report == expected
+    assert repr(report) == repr(expected)  # key order, tie order and int/float types too
+    return report
+
+
+class TestRunningReport:
+    """generate_comprehensive_report() from counters equals the pass over the analyses"""
+
+    @pytest.mark.parametrize('seed', range(4))
+    def test_matches_the_list_report(self, clock, seed):
+        rng = random.Random(seed)
+        engine = SentimentAnalytics(capacity=400)
+        fill(engine, clock, rng, 700, timedelta(minutes=17))  # ~8 days, evicting the oldest 300
+        assert len(engine.analysis_history) == 400 and engine.history.evicted == 300
+        for days_back in (1, 2, 7, 30):
+            report = same_report(engine, days_back)
+        assert report['total_analyses'] == 400
+
+        clock.moment += timedelta(minutes=23)  # the cutoff now falls inside an hour bucket
+        fill(engine, clock, rng, 5, timedelta(minutes=1))
+        same_report(engine, 3)
+
+    def test_integral_and_mixed_averages_keep_their_types(self, clock):
+        engine = SentimentAnalytics()
+        for sentiment in ('positive', 'positive', 'negative', 'neutral'):
+            engine.add_analysis({'video_sentiment': sentiment, 'comments': []})
+        assert same_report(engine, 1)['sentiment_overview']['average_sentiment_score'] == 0.25
+        engine.add_analysis({'video_sentiment': 'positive', 'comments': []})
+        report = same_report(engine, 1)
+        assert type(report['sentiment_overview']['average_sentiment_score']) is float
+        assert type(report['engagement_metrics']['average_engagement_score']) is int
+
+        other = SentimentAnalytics()
+        other.add_analysis({'video_sentiment': 'positive'})
+        other.add_analysis({'video_sentiment': 'negative'})
+        assert type(same_report(other, 1)['sentiment_overview']['average_sentiment_score']) is int
+
+    def test_empty_and_stale_history(self, clock):
+        engine = SentimentAnalytics()
+        assert engine.generate_comprehensive_report() == {"error": "No analysis data available"}
+        engine.add_analysis({'video_sentiment': 'positive'})
+        clock.moment += timedelta(days=3)
+        assert engine.generate_comprehensive_report(1) == {"error": "No data available for the last 1 days"}
+
+
+class TestRollingAggregator:
+    """Bounded ring of hour buckets"""
+
+    def test_ring_is_bounded_and_ordered(self):
+        ring = RollingAggregator(capacity=5)
+        start = datetime(2024, 5, 1, 10)
+        for i in range(12):
+            ring.add(start + timedelta(minutes=25 * i), {'n': i})
+        assert len(ring) == 5 and ring.evicted == 7
+        assert [a['n'] for a in ring.analyses()] == [7, 8, 9, 10, 11]
+        assert [a['n'] for a in ring.latest(3)] == [9, 10, 11] and len(ring.latest(50)) == 5
+        assert ring.tally().videos == 5
+        assert ring.tally(start + timedelta(minutes=25 * 9)).videos == 3
+
+    def test_trend_summary_reads_the_latest_ten(self, clock):
+        engine = SentimentAnalytics(capacity=50)
+        for sentiment in ['negative'] * 30 + ['positive'] * 9 + ['mixed']:
+            engine.add_analysis({'video_sentiment': sentiment})
+        summary = engine.get_trend_summary()
+        assert summary['data_points'] == 10 and summary['latest_score'] == 0.5
+        assert summary['current_average'] == 0.95 and summary['trend'] == 'declining'
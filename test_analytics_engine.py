@@ -0,0 +1,130 @@
+"""
+Tests for the vectorized AdvancedAnalytics window pipeline
+"""
+
+import random
+import statistics
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+import analytics_engine
+from analytics_engine import AdvancedAnalytics, analyses_frame, frame_from_columns
+from database_manager import AnalysisRecord
+
+
+def make_records(count, seed=3):
+    rng = random.Random(seed)
+    newest = datetime(2024, 5, 1, 23, 59)
+    return [AnalysisRecord(id=str(i), content='x' * rng.randint(5, 300),
+                           sentiment=rng.choice(['positive', 'negative', 'neutral', 'neutral', 'mixed']),
+                           confidence=round(rng.uniform(0.2, 1.0), 3), source=rng.choice(['api', 'web', 'news']),
+                           timestamp=newest - timedelta(minutes=7 * i))
+            for i in range(count)]  # newest first, as get_recent_analyses returns them
+
+
+class FakeDatabase:
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def get_recent_analyses(self, limit=100, hours=24, fresh=True):
+        self.calls.append((limit, hours))
+        return self.records[:limit]
+
+    def get_sentiment_statistics(self, hours=24, fresh=True):
+        return {'hourly_trend': {'9': {'positive': 4}, '13': {'negative': 1}}}
+
+
+@pytest.fixture
+def database(monkeypatch):
+    database = FakeDatabase(make_records(300))
+    monkeypatch.setattr(analytics_engine, 'db_manager', database)
+    return database
+
+
+def legacy_frame(records):
+    """The frame as it was built before: object columns and a row-wise score"""
+    scores = {'positive': 1.0, 'neutral': 0.0, 'negative': -1.0}
+    df = pd.DataFrame([{'timestamp': r.timestamp, 'sentiment': r.sentiment, 'confidence': r.confidence,
+                        'source': r.source, 'content_length': len(r.content)} for r in records])
+    df = df.sort_values('timestamp', kind='stable', ignore_index=True)
+    df['hour'] = df['timestamp'].dt.hour
+    df['sentiment_score'] = df.apply(lambda row: scores.get(row['sentiment'], 0.0) * row['confidence'], axis=1)
+    return df
+
+
+class TestWindowFrame:
+    """One typed frame per window"""
+
+    def test_columns_are_typed_and_scored_from_codes(self):
+        df = frame_from_columns(['2024-05-01T10:15:00', '2024-05-01 09:00:00.5', '2024-05-01T11:00:00'],
+                                ['positive', 'negative', 'mixed'], [0.5, 0.25, 0.9], ['api', 'web', 'api'], [3, 4, 5])
+        assert isinstance(df['sentiment'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['source'].dtype, pd.CategoricalDtype)
+        assert list(df['hour']) == [9, 10, 11]  # time-ordered, parsed once
+        assert list(df['sentiment_score']) == [-0.25, 0.5, 0.0]
+        assert analyses_frame([]).empty
+
+    def test_sections_share_one_load(self, database, monkeypatch):
+        engine = AdvancedAnalytics()
+        report = engine.generate_window_report()
+        engine.analyze_sentiment_trends()
+        engine.generate_predictive_insights()
+        engagement = engine.calculate_engagement_metrics()  # limit 500 is served by the 1000-row frame
+        assert database.calls == [(1000, 24)] and engine.stats == {'frame_loads': 1, 'frame_hits': 3}
+        assert engagement == report['engagement'] and report['window']['analyses'] == 300
+
+        clock = [analytics_engine.time.monotonic() + analytics_engine.FRAME_TTL_SECONDS + 1]
+        monkeypatch.setattr(analytics_engine.time, 'monotonic', lambda: clock[0])
+        engine.calculate_engagement_metrics()
+        assert database.calls[-1] == (500, 24) and engine.stats['frame_loads'] == 2
+
+    def test_smaller_limits_read_the_newest_rows(self, database):
+        engine = AdvancedAnalytics()
+        engine.window_frame(24, 1000)
+        tail = engine.window_frame(24, 40)
+        assert len(tail) == 40 and tail['timestamp'].max() == database.records[0].timestamp
+        assert list(tail['timestamp']) == sorted(r.timestamp for r in database.records[:40])
+
+
+class TestVectorizedSections:
+    """The frame sections reproduce the row-wise and list-based results"""
+
+    def test_trend_report_matches_the_row_wise_frame(self, database):
+        records = database.records[:150]
+        engine = AdvancedAnalytics()
+        expected = engine._trend_report(legacy_frame(records))
+        report = engine._trend_report(engine.window_frame(24, 1000).tail(150))  # unobserved categories included
+        assert repr(report) == repr(expected)  # same sums in the same order: equal to the last digit, NaNs included
+
+    def test_list_sections_match_statistics(self, database):
+        records = database.records
+        confidences = [r.confidence for r in records]
+        lengths = [len(r.content) for r in records]
+        sources = Counter(r.source for r in records)
+        report = AdvancedAnalytics().generate_window_report()
+
+        engagement = report['engagement']
+        assert engagement['content_metrics'] == pytest.approx({
+            'avg_length': round(statistics.mean(lengths), 1), 'median_length': statistics.median(lengths),
+            'length_std': round(statistics.stdev(lengths), 1),
+            'short_content_ratio': sum(1 for l in lengths if l < 50) / len(lengths),
+            'long_content_ratio': sum(1 for l in lengths if l > 200) / len(lengths)})
+        assert engagement['quality_metrics']['overall_quality'] == round(statistics.mean(confidences) * 100, 1)
+        assert engagement['engagement_patterns'] == {
+            'source_diversity': 3, 'dominant_source': sources.most_common(1)[0][0],
+            'source_concentration': sources.most_common(1)[0][1] / len(records)}
+        negative = sum(r.sentiment == 'negative' for r in records) / len(records)
+        assert report['risk_assessment']['risk_score'] == (3 if negative > 0.6 else 1 if negative > 0.4 else 0) + \
+               (2 if statistics.mean(confidences) < 0.5 else 0)
+
+    def test_empty_window(self, monkeypatch):
+        monkeypatch.setattr(analytics_engine, 'db_manager', FakeDatabase([]))
+        engine = AdvancedAnalytics()
+        report = engine.generate_window_report()
+        assert report['trends'] == engine._get_empty_trend_analysis()
+        assert report['engagement'] == {'error': 'No recent data available'}
+        assert report['anomaly_detection'] == [] and report['risk_assessment']['risk_level'] == 'unknown'
@@ -0,0 +1,128 @@
+"""
+Tests for buffered API usage accounting
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from api_accounting import ApiUsageAccountant, close_all_accounting
+from rollups import API_LATENCY_CUBE, API_USAGE_CUBE, histogram_quantile, latency_bin
+from sqlite_pool import SQLiteConnectionPool
+
+T0 = datetime(2024, 5, 1, 10, 0)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'usage.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE api_usage (id INTEGER PRIMARY KEY, endpoint TEXT, timestamp DATETIME, "
+                     "response_time REAL, status_code INTEGER, error_message TEXT)")
+        API_USAGE_CUBE.install(conn)
+        API_LATENCY_CUBE.install(conn)
+    yield pool
+    pool.close_all()
+
+
+def usage(pool, group_by=('endpoint', 'status_code')):
+    with pool.read() as conn:
+        return {tuple(row[g] for g in group_by): row for row in
+                API_USAGE_CUBE.aggregate(conn, T0 - timedelta(days=1), T0 + timedelta(days=1), group_by)}
+
+
+def histogram(pool):
+    with pool.read() as conn:
+        return {row['latency_bin']: row['count'] for row in
+                API_LATENCY_CUBE.aggregate(conn, T0 - timedelta(days=1), T0 + timedelta(days=1), ('latency_bin',))}
+
+
+class TestHistogram:
+    """Response-time bins and quantile estimates"""
+
+    def test_bins_and_quantiles(self):
+        assert (latency_bin(0.005), latency_bin(0.0051), latency_bin(60), latency_bin(None)) == \
+               ('0.005', '0.01', '+Inf', None)
+        assert histogram_quantile({'0.1': 2, '0.5': 2}, 0.5) == pytest.approx(0.1)
+        assert histogram_quantile({'0.1': 2, '0.5': 2}, 0.75) == pytest.approx(0.375)
+        assert histogram_quantile({'+Inf': 1}, 0.99) == 10.0 and histogram_quantile({}, 0.5) is None
+
+
+class TestApiUsageAccountant:
+    """Aggregation, flushing and raw sampling"""
+
+    def test_requests_are_aggregated_until_flushed(self, pool):
+        accountant = ApiUsageAccountant(pool)
+        writes = pool.stats['writes']
+        for i in range(100):
+            accountant.record('/api/analyze', 0.0205 + i / 1000, 200, timestamp=T0 + timedelta(seconds=i))
+        accountant.record('/api/analyze', 0.4, 500, 'model failed', timestamp=T0)
+        accountant.record('/api/health', None, 200, timestamp=T0)
+        assert pool.stats['writes'] == writes and accountant.pending() == 4  # 2 minutes + health + 1 raw row
+
+        assert accountant.flush() == 3 * 3 + 1 + 5 * 3  # usage rows + raw row + latency rows, per granularity
+        rows = usage(pool)
+        analyze = rows[('/api/analyze', '200')]
+        assert analyze['count'] == 100 and analyze['response_time_max'] == pytest.approx(0.1195)
+        assert analyze['response_time_avg'] == pytest.approx(0.07)
+        assert rows[('/api/analyze', '500')]['count'] == 1 and rows[('/api/health', '200')]['response_time_n'] == 0
+        assert histogram(pool) == {'0.025': 5, '0.05': 25, '0.1': 50, '0.25': 20, '0.5': 1}
+        with pool.read() as conn:
+            assert conn.execute("SELECT error_message FROM api_usage").fetchall() == [('model failed',)]
+
+        accountant.record('/api/analyze', 0.03, 200, timestamp=T0)
+        accountant.flush()
+        assert usage(pool)[('/api/analyze', '200')]['count'] == 101  # merged into the existing buckets
+        assert accountant.flush() == 0
+
+    def test_sampled_rows_are_not_counted_twice(self, pool):
+        accountant = ApiUsageAccountant(pool, sample_rate=1.0)
+        for i in range(10):
+            accountant.record('/api/analyze', 0.01, 200, timestamp=T0)
+        accountant.flush()
+        assert usage(pool)[('/api/analyze', '200')]['count'] == 10 and histogram(pool) == {'0.01': 10}
+        with pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM api_usage").fetchone()[0] == 10
+        assert accountant.get_metrics()['sampled'] == 10
+
+    def test_failed_flush_keeps_the_aggregates(self, tmp_path, pool):
+        broken = SQLiteConnectionPool(str(tmp_path / 'empty.db'))
+        accountant = ApiUsageAccountant(broken, max_pending=3)
+        accountant.record('/a', 0.01, 200, timestamp=T0)
+        accountant.record('/b', 0.01, 404, timestamp=T0)
+        with pytest.raises(Exception):
+            accountant.record('/c', 0.01, 200, timestamp=T0)  # max_pending reached: flushes inline
+        assert accountant.pending() == 3 and accountant.stats['flush_failures'] == 1
+
+        accountant.pool = pool
+        accountant.record('/a', 0.02, 200, timestamp=T0)  # flushes inline again, now successfully
+        assert accountant.pending() == 0
+        rows = usage(pool)
+        assert rows[('/a', '200')]['count'] == 2 and rows[('/a', '200')]['response_time_max'] == 0.02
+        assert sum(row['count'] for row in rows.values()) == 4
+        broken.close_all()
+
+
+class TestAnalyticsManager:
+    """log_api_usage buffers; get_api_statistics reads the cubes"""
+
+    def teardown_method(self):
+        close_all_accounting()
+
+    def test_statistics(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        writes = manager.pool.stats['writes']
+        for i in range(20):
+            manager.log_api_usage('/api/analyze', 0.03 if i < 18 else 0.8, 200)
+        manager.log_api_usage('/api/analyze', 1.5, 503, 'timeout')
+        assert manager.pool.stats['writes'] == writes
+
+        stats = manager.get_api_statistics()
+        assert (stats['total_requests'], stats['error_requests']) == (21, 1)
+        assert stats['endpoint_statistics']['/api/analyze']['requests'] == 21
+        percentiles = stats['latency_percentiles']['/api/analyze']
+        assert 0.025 < percentiles['p50'] <= 0.05 and 0.5 < percentiles['p95'] <= 1.0
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM api_usage").fetchone()[0] == 1
@@ -0,0 +1,86 @@
+"""
+Tests for the Parquet archive tier
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from streaming_export import PARQUET_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow not installed")
+
+
+def _backdate(manager, days_ago):
+    """Store one analysis per day for the given ages (in days)"""
+    now = datetime.now()
+    with manager.pool.write() as conn:
+        conn.executemany("""
+            INSERT INTO analysis_results (id, content, sentiment, confidence, source, timestamp, metadata, hour)
+            VALUES (?, ?, 'positive', 0.8, 'api', ?, '{}', 12)
+        """, [(f"a{age}", f"day {age}", now - timedelta(days=age)) for age in days_ago])
+
+
+class TestParquetArchive:
+    """Tiering moves whole days, records them in the manifest and reads them back"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        from database_manager import DatabaseManager
+        return DatabaseManager(str(tmp_path / 'analytics.db'), archive_dir=str(tmp_path / 'archive'),
+                               hot_days=30, retention_days=90)
+
+    def test_cleanup_moves_cold_days(self, manager):
+        _backdate(manager, [1, 29, 31, 45, 45.2, 120])
+        manager.cleanup_expired_data()
+
+        with manager.pool.read() as conn:
+            hot = {row[0] for row in conn.execute("SELECT id FROM analysis_results")}
+        assert hot == {'a1', 'a29'}
+
+        partitions = manager.archive.partitions()
+        assert sum(p['rows'] for p in partitions) == 3  # day 120 expired past retention
+        with open(manager.archive.manifest_path) as f:
+            manifest = json.load(f)
+        assert manifest['table'] == 'analysis_results'
+        assert all(p['path'].startswith('date=') and p['bytes'] > 0 for p in manifest['partitions'])
+
+    def test_hot_and_archive_read_transparently(self, manager):
+        _backdate(manager, [1, 2, 40, 41])
+        manager.cleanup_expired_data()
+
+        records = manager.get_recent_analyses(limit=10, hours=24 * 60)
+        assert [r.id for r in records] == ['a1', 'a2', 'a40', 'a41']
+        assert records[2].timestamp < records[1].timestamp and records[2].metadata == {}
+
+        table = manager.analyses_table(datetime.now() - timedelta(days=40.5))
+        assert sorted(table['id'].to_pylist()) == ['a1', 'a2', 'a40']
+
+        ranged = manager.archive.read_table(datetime.now() - timedelta(days=42), datetime.now() - timedelta(days=40.5),
+                                            columns=['id'])
+        assert ranged.column_names == ['id'] and ranged['id'].to_pylist() == ['a41']
+
+    def test_rearchiving_a_day_adds_a_part(self, manager):
+        from archive import ParquetArchive
+
+        _backdate(manager, [35])
+        moved = manager.archive.archive(manager.pool, datetime.now() - timedelta(days=30))
+        with manager.pool.write() as conn:  # late arrival for an archived day
+            conn.execute("""INSERT INTO analysis_results (id, content, sentiment, confidence, source, timestamp)
+                            VALUES ('late', 'x', 'neutral', 0.5, 'api', ?)""", (datetime.now() - timedelta(days=35),))
+        moved += manager.archive.archive(manager.pool, datetime.now() - timedelta(days=30))
+
+        partitions = manager.archive.partitions()
+        assert moved == 2 and len(partitions) == 2 and partitions[0]['date'] == partitions[1]['date']
+        reopened = ParquetArchive(str(manager.archive.directory).rsplit('/', 1)[0], 'analysis_results')
+        assert sorted(reopened.read_table()['id'].to_pylist()) == ['a35', 'late']
+
+    def test_without_archive_rows_are_deleted(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'plain.db'))
+        _backdate(manager, [1, 31])
+        manager.cleanup_expired_data()
+        with manager.pool.read() as conn:
+            assert [row[0] for row in conn.execute("SELECT id FROM analysis_results")] == ['a1']
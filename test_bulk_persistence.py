@@ -0,0 +1,95 @@
+"""
+Tests for the bulk transactional persistence APIs
+"""
+
+from datetime import datetime
+
+import pytest
+
+from database import DatabaseManager, CommentAnalysis, SentimentType, CommentTag, ToxicityLevel
+from enhanced_database import EnhancedDatabaseManager
+from sentiment_result import SentimentResult
+
+
+def _comment(i, sentiment=SentimentType.POSITIVE):
+    return CommentAnalysis(
+        comment_id=f"c{i}", text=f"comment {i}", sentiment=sentiment, sentiment_confidence=0.9,
+        emotions=["joy"], tag=CommentTag.SUPPORTIVE, tag_confidence=0.8,
+        toxicity_level=ToxicityLevel.SAFE, toxicity_confidence=0.1, language_detected="en",
+        word_count=2, emoji_count=0, created_at=datetime.now(), video_id="v1"
+    )
+
+
+def _result(i):
+    return SentimentResult(f"text {i}", "positive", 0.9, {"positive": 0.9}, "vader", 0.001)
+
+
+class TestCommentBulkSave:
+    """database.DatabaseManager.save_comment_analyses"""
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        return DatabaseManager(connection_string=str(tmp_path / 'comments.db'))
+
+    def test_generator_input_is_chunked(self, manager):
+        writes_before = manager.pool.stats['writes']
+        saved = manager.save_comment_analyses((_comment(i) for i in range(25)), chunk_size=10)
+        assert saved == 25
+        assert len(manager.get_comments_for_video("v1")) == 25
+        assert manager.pool.stats['writes'] - writes_before == 1  # one bulk transaction
+
+    def test_failure_rolls_back_whole_batch(self, manager):
+        def comments():
+            yield _comment(1)
+            yield _comment(2)
+            raise ValueError("bad input")
+
+        assert manager.save_comment_analyses(comments(), chunk_size=1) == 0
+        assert manager.get_comments_for_video("v1") == []
+
+    def test_single_save_delegates(self, manager):
+        assert manager.save_comment_analysis(_comment(1)) is True
+        assert len(manager.get_comments_for_video("v1")) == 1
+
+    def test_save_engine_result(self, manager):
+        result = {'comments': [
+            {'text': 'great video 🔥 ❤️ ☀', 'sentiment': 'positive', 'emotion': ['joy'],
+             'tag': 'supportive', 'confidence': 0.7, 'sentiment_confidence': 0.95, 'toxicity_level': 'safe'},
+            {'text': 'meh', 'sentiment': 'unknown-label', 'emotion': [], 'tag': 'other',
+             'confidence': 0.2, 'details': {'toxicity': {'toxicity_level': 'high', 'confidence': 0.9}}},
+        ]}
+        assert manager.save_engine_result(result, video_id="v9") == 2
+
+        comments = {c.text: c for c in manager.get_comments_for_video("v9")}
+        great = comments['great video 🔥 ❤️ ☀']
+        assert great.emoji_count == 3
+        assert (great.sentiment_confidence, great.tag_confidence) == (0.95, 0.7)
+        assert comments['meh'].sentiment == SentimentType.NEUTRAL
+        assert comments['meh'].tag == CommentTag.NEUTRAL
+        assert comments['meh'].toxicity_level == ToxicityLevel.HIGH
+
+
+class TestSentimentBulkSave:
+    """Bulk save on the enhanced and SQLAlchemy managers"""
+
+    def test_enhanced_manager(self, tmp_path):
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        rows = (_result(i) if i % 2 else {'text': f'legacy {i}', 'sentiment': 'neutral'} for i in range(12))
+        assert manager.save_sentiment_analyses(rows, chunk_size=5, source='batch') == 12
+
+        analyses = manager.get_recent_analyses(limit=20)
+        assert len(analyses) == 12
+        assert all(a['metadata'].get('source') == 'batch' for a in analyses)
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            assert manager.save_sentiment_analyses((_result(i) for i in range(7)), chunk_size=3) == 7
+            analyses = manager.get_recent_analyses(limit=10)
+        assert len(analyses) == 7
+        assert {a['source'] for a in analyses} == {'batch'}
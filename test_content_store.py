@@ -0,0 +1,113 @@
+"""
+Tests for the content-addressed text store and the score memo
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from content_store import ContentStore, ScoreMemo, build_zlib_dictionary, text_hash
+from sqlite_pool import SQLiteConnectionPool
+
+HEADLINES = [f"Safaricom announces new M-Pesa tariffs for customers in Nairobi region {i}" for i in range(50)]
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'content.db'))
+    yield pool
+    pool.close_all()
+
+
+class TestContentStore:
+    """Deduplication, dictionaries and housekeeping"""
+
+    def test_texts_are_stored_once(self, pool):
+        store = ContentStore(pool)
+        hashes = store.put_many(['poa sana', 'mbaya', 'poa sana'])
+        assert hashes[0] == hashes[2] == text_hash('poa sana') and len(hashes[0]) == 16
+        assert store.put('mbaya') == hashes[1]
+        assert store.stats()['texts'] == 2
+        assert store.get_many(hashes) == {hashes[0]: 'poa sana', hashes[1]: 'mbaya'}
+
+    def test_dictionary_compression(self, pool):
+        store = ContentStore(pool)
+        plain = store.put(HEADLINES[0])
+        store.train_dictionary(HEADLINES)
+        packed = store.put_many(HEADLINES[1:])
+        with pool.read() as conn:
+            sizes = dict(conn.execute("SELECT dictionary_id, AVG(LENGTH(CAST(body AS BLOB))) FROM text_contents "
+                                      "GROUP BY dictionary_id").fetchall())
+        assert sizes[1] < sizes[0] / 2
+        reopened = ContentStore(pool)  # picks up the stored dictionary
+        assert reopened.get(plain) == HEADLINES[0] and reopened.get(packed[-1]) == HEADLINES[-1]
+        assert build_zlib_dictionary(['a b', 'c d']) == b''  # nothing repeats
+
+    def test_purge_unreferenced(self, pool):
+        store = ContentStore(pool)
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE rows (content_hash BLOB)")
+            conn.execute("CREATE INDEX idx_rows_hash ON rows(content_hash)")
+            conn.executemany("INSERT INTO rows VALUES (?)", [(h,) for h in store.put_many(HEADLINES[:10])])
+        store.put_many(HEADLINES[10:])
+        ScoreMemo(pool).record([(text_hash(HEADLINES[-1]), {'sentiment': 'neutral'})], 'vader', '1')
+        assert store.purge_unreferenced([('rows', 'content_hash')], batch_size=7) == 39
+        assert store.stats()['texts'] == 11
+
+
+class TestScoreMemo:
+    """Scored texts are looked up instead of re-analysed"""
+
+    def test_only_unscored_texts_are_analysed(self, pool):
+        memo, calls = ScoreMemo(pool), []
+
+        def analyze(text):
+            calls.append(text)
+            if text == 'boom':
+                return {'sentiment': 'neutral', 'confidence': 0.5, 'transient': True}
+            return {'sentiment': 'positive', 'confidence': 0.9, 'scores': {'positive': 0.9}}
+
+        first = memo.score_many(['a', 'b', 'a', 'boom'], 'vader', '1', analyze)
+        assert calls == ['a', 'b', 'boom'] and first[0] == first[2]
+        assert memo.score_many(['b', 'a', 'boom'], 'vader', '1', analyze)[1]['scores'] == {'positive': 0.9}
+        assert calls == ['a', 'b', 'boom', 'boom']  # transient results are not kept
+        memo.score('a', 'vader', '2', analyze)  # a new model version re-scores
+        assert calls[-1] == 'a' and memo.stats == {'hits': 3, 'misses': 5}
+
+
+class TestAnalysisContent:
+    """analysis_results rows reference their content by hash"""
+
+    def test_repeated_content_is_stored_once(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        for source in ('api', 'news', 'api'):
+            manager.store_analysis_result(HEADLINES[0], 'positive', 0.9, source, {'model': 'roberta'})
+        manager.store_analysis_result('viral comment', 'negative', 0.7, 'api')
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM text_contents").fetchone()[0] == 2
+            assert conn.execute("SELECT COUNT(DISTINCT content) FROM analysis_results").fetchone()[0] == 1
+        assert sorted(r.content for r in manager.get_recent_analyses()) == [HEADLINES[0]] * 3 + ['viral comment']
+
+        from distilled_model import iter_teacher_labels
+        assert list(iter_teacher_labels([manager.pool.db_path])) == [(HEADLINES[0], 'positive')] * 3
+
+        with manager.pool.write() as conn:
+            conn.execute("UPDATE analysis_results SET timestamp = ? WHERE source = 'api'",
+                         (datetime.now() - timedelta(days=40),))
+        report = manager.cleanup_expired_data()
+        assert report['texts_purged'] == 1 and manager.content.stats()['texts'] == 1
+
+    def test_archive_keeps_text(self, tmp_path):
+        pytest.importorskip('pyarrow')
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'), archive_dir=str(tmp_path / 'archive'))
+        manager.store_analysis_result('old headline', 'neutral', 0.6, 'news', {'model': 'vader'})
+        with manager.pool.write() as conn:
+            conn.execute("UPDATE analysis_results SET timestamp = ?", (datetime.now() - timedelta(days=40),))
+        manager.cleanup_expired_data()
+        archived = manager.archive.read_table().to_pylist()
+        assert archived[0]['content'] == 'old headline' and archived[0]['metadata'] == '{"model": "vader"}'
+        assert [r.content for r in manager.get_recent_analyses(hours=24 * 60)] == ['old headline']
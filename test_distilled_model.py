@@ -0,0 +1,143 @@
+"""
+Tests for the distilled sentiment fast tier
+"""
+
+import os
+import random
+import sqlite3
+
+import numpy as np
+import pytest
+
+from distilled_model import (
+    DistilledSentimentModel, train_distilled_model, iter_teacher_labels, preprocess_text
+)
+
+
+POSITIVE = ["love this", "amazing work", "great service", "poa sana", "asante sana",
+            "vizuri kabisa", "such a wonderful day", "best matatu ride ever"]
+NEGATIVE = ["hate this", "terrible service", "awful experience", "mbaya sana",
+            "hii ni vibaya", "worst traffic ever", "so disappointing", "huzuni tupu"]
+NEUTRAL = ["the meeting is at noon", "bus leaves from town", "report released today",
+           "weather is cloudy", "the office opens at eight", "kesho ni jumatatu"]
+
+
+def _build_teacher_db(path, rows=600):
+    """Create a sentiment_analyses table labelled as if by the transformer"""
+    rng = random.Random(7)
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE sentiment_analyses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            confidence REAL NOT NULL,
+            model_used TEXT
+        )
+    """)
+    for i in range(rows):
+        label, pool = rng.choice([('positive', POSITIVE), ('negative', NEGATIVE), ('neutral', NEUTRAL)])
+        text = f"{rng.choice(pool)} {rng.choice(pool)} #{i}"
+        conn.execute(
+            "INSERT INTO sentiment_analyses (text, sentiment, confidence, model_used) VALUES (?, ?, ?, ?)",
+            (text, label, 0.9, 'cardiffnlp/twitter-roberta-base-sentiment-latest')
+        )
+    # Rows from other models must not be used as teacher labels
+    conn.execute(
+        "INSERT INTO sentiment_analyses (text, sentiment, confidence, model_used) VALUES (?, ?, ?, ?)",
+        ('ignored vader row', 'positive', 0.5, 'vader')
+    )
+    conn.commit()
+    conn.close()
+
+
+class TestDistilledModel:
+    """Training, artifact and serving tests for the distilled tier"""
+
+    @pytest.fixture
+    def trained(self, tmp_path):
+        db_path = str(tmp_path / 'teacher.db')
+        _build_teacher_db(db_path)
+        model_dir = str(tmp_path / 'models')
+        report = train_distilled_model([db_path], model_dir, holdout=0.2, n_features=2 ** 14)
+        return db_path, model_dir, report
+
+    def test_teacher_label_filter(self, tmp_path):
+        db_path = str(tmp_path / 'teacher.db')
+        _build_teacher_db(db_path, rows=20)
+        labels = list(iter_teacher_labels([db_path]))
+        assert len(labels) == 20
+        assert all(text != 'ignored vader row' for text, _ in labels)
+
+    def test_teacher_labels_from_analysis_results(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        db_path = str(tmp_path / 'analytics.db')
+        manager = DatabaseManager(db_path)  # metadata is stored with the binary codec
+        manager.store_analysis_result('poa sana', 'positive', 0.9, 'api', {'model': 'twitter-roberta-base'})
+        manager.store_analysis_result('mbaya sana', 'negative', 0.6, 'api', {'model': 'vader'})
+        manager.store_analysis_result('no model', 'neutral', 0.6, 'api')
+        assert list(iter_teacher_labels([db_path])) == [('poa sana', 'positive')]
+
+    def test_agreement_without_holdout_is_labelled_training(self, tmp_path):
+        db_path = str(tmp_path / 'teacher.db')
+        _build_teacher_db(db_path, rows=120)
+        report = train_distilled_model([db_path], str(tmp_path / 'models'), holdout=0.0, n_features=2 ** 12)
+        assert report['evaluation_set'] == 'training' and report['samples'] == report['train_samples'] == 120
+        assert DistilledSentimentModel.load(report['artifact']).manifest['evaluation']['evaluation_set'] == 'training'
+
+    def test_swahili_markers(self):
+        assert '__sw_pos__' in preprocess_text("Poa sana")
+        assert '__sw_neg__' in preprocess_text("hii ni mbaya")
+        assert '__sheng__' in preprocess_text("maze uko poa")
+
+    def test_training_report(self, trained):
+        _, _, report = trained
+        assert report['teacher_agreement'] > 0.9
+        assert report['samples'] > 0 and report['evaluation_set'] == 'holdout'
+        assert set(report['latency_us']) == {'mean', 'p50', 'p95', 'p99'}
+        assert os.path.exists(os.path.join(report['artifact'], 'manifest.json'))
+
+    def test_artifact_is_versioned_and_memory_mapped(self, trained):
+        _, model_dir, report = trained
+        model = DistilledSentimentModel.load(model_dir)
+        assert model.version == report['version']
+        assert isinstance(model.weights, np.memmap)
+        assert model.manifest['evaluation']['teacher_agreement'] == report['teacher_agreement']
+
+    def test_predictions(self, trained):
+        _, model_dir, _ = trained
+        model = DistilledSentimentModel.load(model_dir)
+        sentiment, confidence, scores = model.predict("amazing work, poa sana")
+        assert sentiment == 'positive'
+        assert 0.0 < confidence <= 1.0
+        assert set(scores) == {'positive', 'negative', 'neutral'}
+        assert abs(sum(scores.values()) - 1.0) < 1e-5
+        assert model.predict("terrible service mbaya sana")[0] == 'negative'
+
+    def test_fast_hashing_matches_vectorizer(self, trained):
+        _, model_dir, _ = trained
+        model = DistilledSentimentModel.load(model_dir)
+        for text in ["Poa sana maze!! great service 😍", "the the the bus", ""]:
+            expected = model.vectorizer.transform([text])
+            indices, data = model._hash_features(text)
+            assert sorted(indices.tolist()) == sorted(expected.indices.tolist())
+            assert np.allclose(data[np.argsort(indices)], expected.data[np.argsort(expected.indices)])
+
+    def test_missing_artifact(self, tmp_path):
+        assert DistilledSentimentModel.load_if_available(str(tmp_path / 'nothing')) is None
+
+    def test_analyzer_distilled_tier(self, trained, monkeypatch):
+        enhanced = pytest.importorskip('enhanced_sentiment_analyzer')
+        _, model_dir, _ = trained
+        monkeypatch.setenv('DISTILLED_MODEL_PATH', model_dir)
+
+        analyzer = enhanced.EnhancedSentimentAnalyzer(cache_size=10, request_timeout=5)
+        assert analyzer.analyzers_available['distilled']
+
+        result = analyzer.analyze_sentiment("great service, asante sana", method='distilled')
+        assert result.method == 'distilled'
+        assert result.sentiment == 'positive'
+        assert result.model_used.startswith('distilled-')
+        assert analyzer.scoring_key('distilled') == ('distilled', analyzer.distilled_model.version)
+        assert analyzer.scoring_key()[0] == analyzer._select_best_method()  # what method='auto' uses
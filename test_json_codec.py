@@ -0,0 +1,93 @@
+"""
+Tests for the binary JSON column codec and its projections
+"""
+
+import json
+import sqlite3
+from datetime import datetime
+
+from json_codec import (ANALYSIS_METADATA, COMMENT_EMOTIONS, COMPRESS_MIN_BYTES, decode, encode,
+                        to_json_text)
+
+
+class TestCodec:
+    """Encoding, compression and the legacy text path"""
+
+    def test_round_trip(self):
+        for value in ({'model': 'vader', 'scores': [0.1, 0.9]}, ['joy', 'anger'], 'text', 3, {}, []):
+            stored = encode(value)
+            assert isinstance(stored, bytes) and decode(stored) == value
+        assert encode(None) is None and decode(None) is None
+
+    def test_large_values_are_compressed(self):
+        value = {'keywords': ['sentiment'] * 200}
+        stored = encode(value)
+        assert len(stored) < len(json.dumps(value)) / 5 and decode(stored) == value
+        small = {'a': 1}
+        assert len(encode(small)) < COMPRESS_MIN_BYTES and len(encode(small)) <= len(json.dumps(small))
+
+    def test_legacy_text_and_json_text(self):
+        assert decode('{"a": [1, 2]}') == {'a': [1, 2]}
+        assert decode(memoryview(encode({'a': 1}))) == {'a': 1}
+        assert json.loads(to_json_text(encode({'ü': 1}))) == {'ü': 1}
+        assert to_json_text('{"a": 1}') == '{"a": 1}' and to_json_text(None) is None
+
+    def test_projections(self):
+        assert ANALYSIS_METADATA.values({'model': 'roberta', 'x': 1})[1:] == ('roberta', None)
+        assert ANALYSIS_METADATA.values([1])[1:] == (None, None)
+        assert COMMENT_EMOTIONS.values(['joy', 'fear'])[1:] == ('joy',)
+        assert COMMENT_EMOTIONS.values({'joy': 0.2, 'fear': 0.7})[1:] == ('fear',)
+        assert COMMENT_EMOTIONS.values([])[1:] == (None,)
+
+
+class TestManagers:
+    """Encoded columns through the managers, with indexed projections"""
+
+    def test_analysis_metadata_is_encoded_filtered_and_lazy(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        manager.store_analysis_result('a', 'positive', 0.9, 'api', {'model': 'roberta', 'language': 'sw'})
+        manager.store_analysis_result('b', 'negative', 0.8, 'api', {'model': 'vader'})
+        with manager.pool.read() as conn:
+            assert {type(row[0]) for row in conn.execute("SELECT metadata FROM analysis_results")} == {bytes}
+            plan = ' '.join(row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM analysis_results WHERE model = 'vader' AND timestamp > '2024'"))
+            assert 'idx_analysis_results_model' in plan
+
+        records = manager.get_recent_analyses(model='roberta')
+        assert [r.content for r in records] == ['a'] and 'metadata' not in records[0].__dict__
+        assert records[0].metadata == {'model': 'roberta', 'language': 'sw'}
+        assert [r.content for r in manager.get_recent_analyses(language='sw', model='vader')] == []
+        assert len(manager.get_recent_analyses()) == 2
+
+    def test_legacy_text_rows_are_backfilled(self, tmp_path):
+        path = str(tmp_path / 'legacy.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE analysis_results (id TEXT PRIMARY KEY, content TEXT NOT NULL, sentiment TEXT "
+                     "NOT NULL, confidence REAL NOT NULL, source TEXT NOT NULL, timestamp DATETIME NOT NULL, "
+                     "metadata TEXT)")
+        conn.execute("INSERT INTO analysis_results VALUES ('1', 'old', 'neutral', 0.5, 'api', ?, ?)",
+                     (datetime.now(), json.dumps({'model': 'roberta-base'})))
+        conn.commit()
+        conn.close()
+
+        from database_manager import DatabaseManager
+        manager = DatabaseManager(path)
+        [record] = manager.get_recent_analyses(model='roberta-base')
+        assert record.metadata == {'model': 'roberta-base'}
+
+    def test_comment_emotions(self, tmp_path):
+        from database import CommentAnalysis, DatabaseManager
+
+        manager = DatabaseManager(connection_string=str(tmp_path / 'video.db'))
+        comment = CommentAnalysis.from_engine_result(
+            {'id': 'c1', 'text': 'wow', 'sentiment': 'positive', 'emotion': ['joy', 'surprise']}, video_id='v1')
+        assert manager.save_comment_analyses([comment]) == 1
+        assert manager.get_comments_for_video('v1')[0].emotions == ['joy', 'surprise']
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT dominant_emotion FROM comment_analyses").fetchone()[0] == 'joy'
+
+        export = tmp_path / 'export.json'
+        assert manager.export_data(str(export))
+        assert json.loads(json.load(open(export))['comment_analyses'][0]['emotions']) == ['joy', 'surprise']
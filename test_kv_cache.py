@@ -0,0 +1,155 @@
+"""
+Tests for the two-level key/value cache
+"""
+
+import threading
+import time
+
+import pytest
+
+from kv_cache import SQLiteKVStore, TieredCache
+from sqlite_pool import SQLiteConnectionPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def store(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'cache.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE analytics_cache (cache_key TEXT PRIMARY KEY, cache_data TEXT, expires_at DATETIME)")
+    yield SQLiteKVStore(pool, 'analytics_cache')
+    pool.close_all()
+
+
+class CountingStore(SQLiteKVStore):
+    def __init__(self, store, delay=0.0):
+        super().__init__(store.pool, store.table)
+        self.loads = self.writes = 0
+        self.delay = delay
+
+    def load(self, key):
+        self.loads += 1
+        time.sleep(self.delay)
+        return super().load(key)
+
+    def store_many(self, items):
+        self.writes += 1
+        return super().store_many(items)
+
+
+class TestTieredCache:
+    """Levels, expiry index, single flight and write modes"""
+
+    def test_levels_and_hit_rates(self, store):
+        TieredCache(store).set('state', {'streak': 3})
+        cache = TieredCache(store)  # cold L1 on the same table
+        assert cache.get('state') == {'streak': 3}  # L2
+        assert cache.get('state') == {'streak': 3}  # L1
+        assert cache.get('missing') is None
+        assert cache.get('loaded', loader=lambda: [1]) == [1] and TieredCache(store).get('loaded') == [1]
+        assert cache.stats['l1_hits'] == 1 and cache.stats['l2_hits'] == 1 and cache.stats['loads'] == 1
+        assert cache.hit_rates() == {'l1': 0.25, 'l2': 0.3333, 'overall': 0.5}
+
+    def test_expired_keys_are_reaped_without_being_read(self, store):
+        clock = Clock()
+        cache = TieredCache(store, clock=clock)
+        cache.set('short', 1, ttl=10)
+        for _ in range(100):
+            cache.set('long', 2, ttl=60)  # re-sets leave stale heap records behind
+        clock.now += 30
+        assert cache.reap() == 1
+        assert cache.get_metrics()['entries'] == 1 and len(cache._heap) < 100
+        clock.now += 60
+        cache.get('other')
+        assert cache.get_metrics()['entries'] == 0 and cache.stats['expired'] == 2
+
+    def test_lru_eviction_falls_back_to_l2(self, store):
+        cache = TieredCache(store, max_entries=2)
+        for key in 'abc':
+            cache.set(key, key)
+        cache.get('b')
+        cache.set('d', 'd')  # evicts c, the least recently used
+        assert list(cache._entries) == ['b', 'd'] and cache.stats['evictions'] == 2
+        assert cache.get('c') == 'c' and cache.stats['l2_hits'] == 1
+
+    def test_concurrent_misses_share_one_load(self, store):
+        TieredCache(store).set('hot', 'value')
+        counting = CountingStore(store, delay=0.05)
+        cache = TieredCache(counting)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('hot'))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == ['value'] * 8
+        assert counting.loads == 1 and cache.stats['coalesced'] == 7
+
+    def test_set_during_load_wins(self, store):
+        TieredCache(store).set('k', 'old')
+        cache = TieredCache(CountingStore(store, delay=0.1))
+        reader = threading.Thread(target=cache.get, args=('k',))
+        reader.start()
+        time.sleep(0.02)
+        cache.set('k', 'new')
+        reader.join()
+        assert cache.get('k') == 'new'
+
+    def test_write_back_buffers_until_flush(self, store):
+        counting = CountingStore(store)
+        cache = TieredCache(counting, mode='write-back', max_entries=2, max_dirty=100)
+        for i in range(5):
+            cache.set(f"k{i}", i)
+        assert counting.writes == 0 and TieredCache(store).get('k0') is None
+        assert cache.get('k0') == 0  # evicted from L1 but still dirty
+        assert cache.flush() == 5 and counting.writes == 1
+        assert TieredCache(store).get('k4') == 4
+
+        cache.delete('k4')
+        assert cache.get('k4') is None and TieredCache(store).get('k4') is None
+        with pytest.raises(ValueError):
+            TieredCache(store, mode='write-around')
+
+    def test_write_back_flushes_when_dirty_limit_reached(self, store):
+        counting = CountingStore(store)
+        cache = TieredCache(counting, mode='write-back', max_dirty=3)
+        for i in range(7):
+            cache.set(f"k{i}", i)
+        assert counting.writes == 2 and cache.get_metrics()['dirty'] == 1
+        cache.close()
+        assert TieredCache(store).get('k6') == 6
+
+
+class TestManagerCaches:
+    """Manager cache APIs on the shared cache"""
+
+    def test_enhanced_cached_data(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        path = str(tmp_path / 'enhanced.db')
+        manager = EnhancedDatabaseManager(path)
+        manager.set_cached_data('habits_state', {'goals': ['walk']}, ttl_minutes=5)
+        assert EnhancedDatabaseManager(path).cache is manager.cache
+        assert manager.get_cached_data('habits_state') == {'goals': ['walk']}
+        assert manager.cache.stats['l1_hits'] == 1
+
+    def test_content_cache_reads_existing_rows(self, tmp_path):
+        from datetime import datetime, timedelta
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        with manager.pool.write() as conn:
+            conn.execute("INSERT INTO content_cache VALUES ('old', 'page', ?, ?)",
+                         (datetime.now() + timedelta(hours=1), datetime.now()))
+        assert manager.get_cached_content('old') == 'page'
+        manager.cache_content('new', 'body', expiry_hours=0)
+        assert manager.get_cached_content('new') is None
+        manager.cache_content('new', 'body')
+        assert manager.get_cached_content('new') == 'body'
@@ -0,0 +1,142 @@
+"""
+Tests for schema migrations and query-plan regressions
+
+Every statement the hot dashboard paths run is captured with a trace callback and
+re-run through EXPLAIN QUERY PLAN; any full-table scan fails the test.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+
+from migrations import MIGRATIONS, apply_migrations, current_version, explain, full_scans, IndexAdvisor
+from sqlite_pool import SQLiteConnectionPool
+
+
+@contextmanager
+def captured_statements(pool):
+    """Collect the expanded SQL of every SELECT/DELETE run on the pool's connections"""
+    statements = []
+
+    def trace(sql):
+        head = sql.lstrip().split(None, 1)[0].upper()
+        if head in ('SELECT', 'DELETE') and 'sqlite_master' not in sql and 'PRAGMA' not in sql:
+            statements.append(sql)
+
+    connections = [pool.reader(), pool.writer]
+    for conn in connections:
+        conn.set_trace_callback(trace)
+    try:
+        yield statements
+    finally:
+        for conn in connections:
+            conn.set_trace_callback(None)
+
+
+def assert_no_full_scans(pool, statements):
+    assert statements, "no statements were captured"
+    with pool.read() as conn:
+        for sql in statements:
+            plan = explain(conn, sql)
+            assert not full_scans(plan), f"full table scan in:\n{sql}\nplan: {plan}"
+
+
+class TestMigrationRunner:
+    """Versioning, idempotence and backfill"""
+
+    def test_versions_recorded_and_idempotent(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        with manager.pool.write() as conn:
+            assert current_version(conn, 'analytics') == max(m.version for m in MIGRATIONS['analytics'])
+        assert apply_migrations(manager.pool, 'analytics') == 0
+
+    def test_backfills_hour_on_existing_database(self, tmp_path):
+        path = str(tmp_path / 'legacy.db')
+        with sqlite3.connect(path) as conn:
+            conn.execute("""CREATE TABLE analysis_results (id TEXT PRIMARY KEY, content TEXT NOT NULL,
+                            sentiment TEXT NOT NULL, confidence REAL NOT NULL, source TEXT NOT NULL,
+                            timestamp DATETIME NOT NULL, metadata TEXT)""")
+            conn.execute("INSERT INTO analysis_results VALUES ('a', 'x', 'positive', 0.9, 'api', "
+                         "'2024-05-01 13:45:00', '{}')")
+
+        from database_manager import DatabaseManager
+        manager = DatabaseManager(path)
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT hour FROM analysis_results").fetchone()[0] == 13
+
+    def test_failed_step_rolls_back(self, tmp_path):
+        from migrations import Migration
+
+        pool = SQLiteConnectionPool(str(tmp_path / 'broken.db'))
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE t (a INTEGER)")
+        broken = [Migration(1, "half applied", ["ALTER TABLE t ADD COLUMN b INTEGER", "NOT VALID SQL"])]
+
+        assert apply_migrations(pool, 'test', broken) == 0
+        with pool.read() as conn:
+            assert [r[1] for r in conn.execute("PRAGMA table_info(t)")] == ['a']
+            assert current_version(conn, 'test') == 0
+        pool.close_all()
+
+
+class TestQueryPlans:
+    """Hot read and retention paths must be served by indexes"""
+
+    def test_analytics_manager(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        manager.store_analysis_result("poa", "positive", 0.9, "api")
+        manager.store_metric("cpu", 0.5)
+        manager.log_api_usage("/api/analyze", 0.1, 200)
+
+        with captured_statements(manager.pool) as statements:
+            stats = manager.get_sentiment_statistics()
+            manager.get_recent_analyses()
+            manager.get_metrics_history("cpu")
+            manager.get_api_statistics()
+            manager.get_dashboard_summary()
+            manager.cleanup_expired_data()
+        assert_no_full_scans(manager.pool, statements)
+        assert list(stats['hourly_trend'].values()) == [{'positive': 1}]
+        assert len(list(stats['hourly_trend'])[0]) == 2  # zero-padded hour key
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        manager.save_sentiment_analysis({'text': 'hello', 'sentiment': 'neutral', 'confidence': 0.5})
+
+        with captured_statements(manager.pool) as statements:
+            summary = manager.get_analytics_summary(days=7)
+            manager.get_recent_analyses()
+        assert_no_full_scans(manager.pool, statements)
+        assert sum(summary['hourly_data'].values()) == summary['total_analyses']
+
+    def test_video_manager_retention(self, tmp_path):
+        from database import DatabaseManager
+
+        manager = DatabaseManager(connection_string=str(tmp_path / 'video.db'))
+        with captured_statements(manager.pool) as statements:
+            manager.cleanup_old_data(days_to_keep=30)
+            stats = manager.get_system_stats()
+        recent = [s for s in statements if 'created_at' in s]
+        assert_no_full_scans(manager.pool, recent)
+        assert stats['recent_activity_24h'] == 0
+
+
+class TestIndexAdvisor:
+    """Scan detection and index suggestions"""
+
+    def test_suggests_index_for_scan(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, ts TEXT, value REAL)")
+        report = IndexAdvisor(conn).analyze(
+            "SELECT kind, COUNT(*) FROM events WHERE kind = 'a' AND ts > '2024' GROUP BY kind")
+
+        assert report['full_scans'] == ['events']
+        assert report['suggestions'] == ["CREATE INDEX idx_events_kind_ts ON events(kind, ts)"]
+
+        conn.execute(report['suggestions'][0])
+        assert not IndexAdvisor(conn).analyze("SELECT * FROM events WHERE kind = 'a'")['full_scans']
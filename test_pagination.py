@@ -0,0 +1,95 @@
+"""
+Tests for keyset (cursor) pagination
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from migrations import explain
+from pagination import (InvalidCursor, decode_cursor, decode_datetime_cursor, encode_cursor,
+                        next_cursor, paginate_sequence)
+
+
+class TestCursors:
+    """Encoding and in-memory pagination"""
+
+    def test_round_trip(self):
+        moment = datetime(2024, 5, 1, 12, 30, 15, 250)
+        assert decode_cursor(encode_cursor('2024-05-01 12:30:15', 42)) == ('2024-05-01 12:30:15', 42)
+        assert decode_datetime_cursor(encode_cursor(moment, 7)) == (moment, 7)
+
+    @pytest.mark.parametrize('token', ['not-a-cursor', 'e30', encode_cursor('yesterday', 1)])
+    def test_rejects_bad_cursors(self, token):
+        with pytest.raises(InvalidCursor):
+            decode_datetime_cursor(token)
+
+    def test_paginate_sequence_walks_every_item_once(self):
+        items = [{'created_at': f"2024-05-0{1 + i % 3}", 'id': i} for i in range(25)]  # many ties
+        seen, cursor = [], None
+        while True:
+            page, cursor = paginate_sequence(items, 4, cursor)
+            seen += page
+            if cursor is None:
+                break
+        assert len(seen) == 25 and len({item['id'] for item in seen}) == 25
+        assert seen == sorted(items, key=lambda item: (item['created_at'], item['id']), reverse=True)
+
+    def test_next_cursor_stops_on_short_page(self):
+        assert next_cursor([{'created_at': 'x', 'id': 1}], limit=2) is None
+        assert next_cursor([{'created_at': 'x', 'id': 1}], limit=1) == encode_cursor('x', 1)
+
+
+class TestManagerKeysets:
+    """Cursor pages match offset pages and seek the composite index"""
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        with manager.pool.write() as conn:
+            conn.executemany(manager._INSERT_ANALYSIS, [
+                (f"t{i}", 'neutral', 0.5, None, 'vader', 0.0, '{}', f"2024-05-01 10:00:0{i % 4}", 10)
+                for i in range(23)
+            ])
+
+        by_offset = [a['id'] for offset in range(0, 23, 5) for a in manager.get_recent_analyses(5, offset)]
+        by_cursor, cursor = [], None
+        while True:
+            page = manager.get_recent_analyses(5, cursor=cursor)
+            by_cursor += [a['id'] for a in page]
+            cursor = next_cursor(page, 5, time_key='timestamp')
+            if cursor is None:
+                break
+        assert by_cursor == by_offset and len(set(by_cursor)) == 23
+
+        with manager.pool.read() as conn:
+            plan = explain(conn, "SELECT id FROM sentiment_analyses WHERE (timestamp, id) < (?, ?) "
+                                 "ORDER BY timestamp DESC, id DESC LIMIT 5", ('2024-05-01 10:00:02', 10))
+        assert any('idx_sentiment_analyses_ts_id' in detail for detail in plan)
+        assert not any('TEMP B-TREE' in detail for detail in plan)
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager, SentimentAnalysis, db
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            moment = datetime(2024, 5, 1, 10)
+            db.session.add_all([SentimentAnalysis(text=f"t{i}", sentiment='neutral', confidence=0.5,
+                                                  model_used='vader',
+                                                  created_at=moment + timedelta(seconds=i % 3))
+                                for i in range(11)])
+            db.session.commit()
+
+            by_offset = [a['id'] for offset in range(0, 11, 4) for a in manager.get_recent_analyses(4, offset)]
+            by_cursor, cursor = [], None
+            while True:
+                page = manager.get_recent_analyses(4, cursor=cursor)
+                by_cursor += [a['id'] for a in page]
+                cursor = next_cursor(page, 4)
+                if cursor is None:
+                    break
+        assert by_cursor == by_offset and len(set(by_cursor)) == 11
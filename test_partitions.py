@@ -0,0 +1,129 @@
+"""
+Tests for monthly table partitions
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from partitions import MonthlyPartitions
+from sqlite_pool import SQLiteConnectionPool
+
+COLUMNS = ('id', 'timestamp', 'kind', 'value')
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'main.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, timestamp DATETIME, kind TEXT, value REAL)")
+        conn.execute("CREATE INDEX idx_events_ts ON events(timestamp)")
+    yield pool
+    pool.close_all()
+
+
+def rows_for(months, per_month=10):
+    rows = []
+    for m in range(months):
+        start = datetime(2024, 1 + m, 1)
+        rows += [(m * 100 + i, start + timedelta(days=i * 2, hours=i), 'ab'[i % 2], float(i if m else -i))
+                 for i in range(per_month)]
+    return rows
+
+
+class TestMonthlyPartitions:
+    """Routing, pruning, cross-partition aggregates and retention by unlink"""
+
+    def test_rows_land_in_their_month_and_ranges_are_pruned(self, pool):
+        partitions = MonthlyPartitions(pool, 'events')
+        with pool.write() as conn:
+            partitions.insert(conn, COLUMNS, rows_for(5))
+        assert partitions.partitions() == ['2024_01', '2024_02', '2024_03', '2024_04', '2024_05']
+        assert partitions.partitions(datetime(2024, 2, 10), datetime(2024, 4, 1)) == ['2024_02', '2024_03']
+        with sqlite3.connect(partitions.path('2024_03')) as conn:  # a self-contained file with the indexes
+            assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 10
+            assert conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall() == \
+                   [('idx_events_ts',)]
+
+        scanned = partitions.stats['partitions_scanned']
+        rows = partitions.select(('id', 'timestamp'), datetime(2024, 2, 10), datetime(2024, 4, 1))
+        assert [r[0] for r in rows] == [*range(209, 199, -1), *range(109, 104, -1)]  # newest first
+        assert partitions.stats['partitions_scanned'] - scanned == 2
+        newest = partitions.select(('id',), limit=3)
+        assert [r[0] for r in newest] == [409, 408, 407] and partitions.stats['partitions_scanned'] - scanned == 3
+        assert partitions.select(('id',), datetime(2024, 1, 1), where='kind = ?', params=('b',),
+                                 descending=False, limit=2) == [(1,), (3,)]
+
+    def test_months_created_elsewhere_are_read(self, pool, tmp_path):
+        reader = MonthlyPartitions(pool, 'events')
+        other = SQLiteConnectionPool(str(tmp_path / 'main.db'))  # another process on the same files
+        writer = MonthlyPartitions(other, 'events')
+        with other.write() as conn:
+            writer.insert(conn, COLUMNS, rows_for(2))
+        assert reader.partitions() == ['2024_01', '2024_02']
+        assert len(reader.select(('id',), datetime(2024, 1, 1))) == 20
+        writer.drop('2024_01')
+        assert [r[0] for r in reader.select(('id',), datetime(2024, 1, 1))] == list(range(109, 99, -1))
+        other.close_all()
+
+    def test_aggregates_match_one_table(self, pool):
+        partitions = MonthlyPartitions(pool, 'events')
+        rows = rows_for(4)
+        with pool.write() as conn:
+            partitions.insert(conn, COLUMNS, rows)
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+            expected = conn.execute("SELECT kind, COUNT(*), SUM(value), MIN(value), MAX(value), AVG(value) "
+                                    "FROM events WHERE timestamp >= ? GROUP BY kind", (datetime(2024, 1, 5),)).fetchall()
+        merged = partitions.aggregate(datetime(2024, 1, 5), group_by=('kind',), measures={'value': 'value'})
+        got = sorted((r['kind'], r['count'], r['value_sum'], r['value_min'], r['value_max'], r['value_avg'])
+                     for r in merged)
+        assert got == expected
+        assert partitions.aggregate() == [{'count': 40}]
+
+    def test_drop_is_an_unlink(self, pool):
+        partitions = MonthlyPartitions(pool, 'events', max_attached=2)
+        with pool.write() as conn:
+            partitions.insert(conn, COLUMNS, rows_for(6))
+        assert len(partitions.select(('id',))) == 60  # six months through two attachment slots
+        assert partitions.drop_before(datetime(2024, 3, 15)) == 2
+        assert not os.path.exists(partitions.path('2024_01')) and os.path.exists(partitions.path('2024_03'))
+        assert len(partitions.select(('id',))) == 40 and partitions.partitions()[0] == '2024_03'
+        assert MonthlyPartitions(pool, 'events').partitions() == partitions.partitions()  # rediscovered from files
+
+    def test_rolled_back_writes_leave_nothing(self, pool):
+        partitions = MonthlyPartitions(pool, 'events')
+        with pytest.raises(RuntimeError):
+            with pool.write() as conn:
+                partitions.insert(conn, COLUMNS, rows_for(1))
+                raise RuntimeError
+        assert partitions.select(('id',)) == []
+
+
+class TestPartitionedAnalyses:
+    """DatabaseManager writing analyses to monthly partitions"""
+
+    def test_store_read_and_expire(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        path = str(tmp_path / 'analytics.db')
+        DatabaseManager(path).store_analysis_result('legacy', 'neutral', 0.5, 'api')  # before partitioning
+        manager = DatabaseManager(path, partition_dir=str(tmp_path / 'parts'), retention_days=60)
+        manager.store_analysis_result('habari njema', 'positive', 0.9, 'api', {'model': 'vader'})
+        manager.store_analysis_result('mbaya', 'negative', 0.7, 'news')
+        old = datetime.now() - timedelta(days=120)
+        with manager.pool.write() as conn:
+            manager.partitions.insert(conn, manager._STORED_COLUMNS,
+                                      [('old', 'zamani', None, 'neutral', 0.4, 'api', old, old.hour, None, None, None)])
+
+        assert [r.content for r in manager.get_recent_analyses()] == ['mbaya', 'habari njema', 'legacy']
+        assert [r.content for r in manager.get_recent_analyses(model='vader')] == ['habari njema']
+        assert [r.content for r in manager.get_recent_analyses(hours=24 * 200, limit=10)][-1] == 'zamani'
+        stats = manager.get_sentiment_statistics()
+        assert stats['total_analyses'] == 3 and stats['sentiment_distribution']['positive']['avg_confidence'] == 0.9
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM analysis_results").fetchone()[0] == 1
+
+        assert manager.cleanup_expired_data()['partitions_dropped'] >= 1
+        assert [r.content for r in manager.get_recent_analyses(hours=24 * 200)][-1] == 'legacy'
@@ -0,0 +1,133 @@
+"""
+Tests for projected repository reads
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, Text, create_engine
+
+from pagination import next_cursor
+from projections import ANALYSES, Projection, Repository
+
+METADATA = MetaData()
+NOTES = Table('notes', METADATA,
+              Column('id', Integer, primary_key=True),
+              Column('title', String(50)),
+              Column('body', Text),
+              Column('created_at', String(30)))
+
+
+def note_rows(count):
+    return [(i, f"note {i}", 'x' * 1000, f"2024-05-01 10:00:0{i % 3}") for i in range(1, count + 1)]
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine('sqlite://')
+    METADATA.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(NOTES.insert(), [dict(zip(('id', 'title', 'body', 'created_at'), row)) for row in note_rows(7)])
+    return engine
+
+
+class TestRepository:
+    """Declared views, namedtuple rows and batched deferred columns"""
+
+    def test_views_are_validated(self):
+        with pytest.raises(ValueError, match='no column'):
+            Repository(NOTES, {'list': ('id', 'missing')})
+        with pytest.raises(ValueError, match='unknown notes view'):
+            Repository(NOTES, {'list': ('id',)}).projection('detail')
+
+    def test_core_pages_and_deferred_columns(self, engine, monkeypatch):
+        notes = Repository(NOTES, {'list': ('id', 'title', 'created_at')}, deferred=('body',))
+        with engine.connect() as conn:
+            first = notes.page(conn, 'list', 3)
+            assert type(first[0]).__name__ == 'NotesListRow' and first[0]._fields == ('id', 'title', 'created_at')
+            assert [row.id for row in first] == [5, 2, 7]  # created_at DESC, id DESC
+            assert [row.id for row in notes.page(conn, 'list', 3, offset=3)] == \
+                   [row.id for row in notes.page(conn, 'list', 3, after=(first[-1].created_at, first[-1].id))]
+
+            monkeypatch.setattr('projections.DEFERRED_BATCH_SIZE', 2)
+            details = notes.load_deferred(conn, [row.id for row in first] + [5, 99])
+            assert sorted(details) == [2, 5, 7] and details[7].body == 'x' * 1000
+
+    def test_sqlite3_rows(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT, body TEXT, created_at TEXT)")
+        conn.executemany("INSERT INTO notes VALUES (?, ?, ?, ?)", note_rows(4))
+        notes = Repository(NOTES, {'list': ('id', 'title')}, deferred=('body',))
+        rows = notes.fetch(conn, 'list', "WHERE id > ? ORDER BY id", (2,))
+        assert rows == [(3, 'note 3'), (4, 'note 4')] and rows[0].title == 'note 3'
+        assert notes.load_deferred(conn, [1], ['title', 'body'])[1] == (1, 'note 1', 'x' * 1000)
+        assert conn.execute("SELECT 1").fetchone() == (1,)  # the connection's own row factory is untouched
+
+    def test_projection_row_factory_and_cursor(self):
+        projection = Projection('sentiment_analyses', 'list', ('id', 'created_at'))
+        rows = projection.make([(1, datetime(2024, 5, 1)), (2, datetime(2024, 5, 2))])
+        assert next_cursor(rows, 2) == next_cursor([{'id': 2, 'created_at': datetime(2024, 5, 2)}], 1)
+
+
+class TestManagerViews:
+    """get_recent_analyses(view=...) on both managers"""
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        with manager.pool.write() as conn:
+            conn.executemany(manager._INSERT_ANALYSIS, [
+                (f"text {i}", 'positive', 0.5, '{"positive": 0.5}', 'vader', 0.0, '{}',
+                 f"2024-05-01 10:00:0{i % 4}", 10) for i in range(9)])
+
+        full = manager.get_recent_analyses(9)
+        rows = manager.get_recent_analyses(9, view='list')
+        assert [row.id for row in rows] == [a['id'] for a in full]
+        assert 'text' not in rows[0]._fields and rows[0].model_used == 'vader'
+        cursor = next_cursor(rows[:4], 4, time_key='timestamp')
+        assert [row.id for row in manager.get_recent_analyses(5, cursor=cursor, view='list')] == \
+               [a['id'] for a in full[4:]]
+        details = manager.load_analysis_details([rows[0].id], ['text'])
+        assert details[rows[0].id].text == full[0]['text']
+        assert manager.get_recent_analyses(view='detail') == []  # undeclared views are logged, not raised
+
+    def test_enhanced_history_rows_hold_datetimes(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        manager.pool.execute_write(manager._INSERT_ANALYSIS, ('text', 'negative', 0.9, '{}', 'vader', 0.0, '{}',
+                                                              '2024-05-01 10:00:07', 10))
+        row = manager.get_recent_analyses(5, view='history')[0]
+        assert row.timestamp == datetime(2024, 5, 1, 10, 0, 7)
+        assert isinstance(row.created_at, datetime) and row.created_at.isoformat()  # as on the SQLAlchemy path
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager, SentimentAnalysis, db
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            moment = datetime(2024, 5, 1, 10)
+            db.session.add_all([SentimentAnalysis(text=f"t{i}" * 100, sentiment='neutral', confidence=0.5,
+                                                  model_used='vader', toxicity_score=0.1,
+                                                  created_at=moment + timedelta(seconds=i % 3))
+                                for i in range(11)])
+            db.session.commit()
+            manager.save_news_article('Habari', 'https://example.com/1', content='c' * 2000, source='bbc')
+
+            full = manager.get_recent_analyses(11)
+            history = manager.get_recent_analyses(11, view='history')
+            assert [row.id for row in history] == [a['id'] for a in full]
+            assert history[0].created_at == moment + timedelta(seconds=2) and history[0].toxicity_score == 0.1
+            page = manager.get_recent_analyses(4, view='history')
+            rest = manager.get_recent_analyses(7, cursor=next_cursor(page, 4), view='history')
+            assert [row.id for row in page + rest] == [row.id for row in history]
+            assert manager.load_analysis_details([page[0].id])[page[0].id].text == full[0]['text']
+
+            articles = manager.get_news_articles(view='list')
+            assert articles[0].title == 'Habari' and 'content' not in articles[0]._fields
+        assert set(ANALYSES.projection('history').columns).isdisjoint(ANALYSES.deferred)
@@ -0,0 +1,105 @@
+"""
+Tests for the batched retention engine
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from retention import RetentionEngine, RetentionRule, RetentionScheduler
+from sqlite_pool import SQLiteConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'retention.db'))
+    now = datetime.now()
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, payload TEXT, created_at TEXT)")
+        conn.execute("CREATE INDEX idx_events_created_at ON events(created_at)")
+        conn.executemany("INSERT INTO events (payload, created_at) VALUES (?, ?)",
+                         [('x' * 500, now - timedelta(days=10 if i < 900 else 0)) for i in range(1000)])
+    yield pool
+    pool.close_all()
+
+
+RULE = RetentionRule('events', 'created_at', timedelta(days=7))
+
+
+class TestRetentionEngine:
+    """Bounded batches, time budget, vacuum and reporting"""
+
+    def test_purges_in_batches_and_reclaims_space(self, pool):
+        assert RetentionEngine(pool, [RULE]).vacuum_mode() == 'incremental'  # new files via DEFAULT_PRAGMAS
+        report = RetentionEngine(pool, [RULE], batch_size=100).run()
+
+        assert report.rows_deleted == {'events': 900}
+        assert report.batches == 10 and report.complete
+        assert report.bytes_reclaimed > 0 and report.free_pages_left == 0
+        with pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 100
+
+    def test_time_budget_resumes_next_run(self, pool):
+        engine = RetentionEngine(pool, [RULE], batch_size=50)
+        partial = engine.run(time_budget=0)
+        assert not partial.complete and partial.total_deleted == 0
+        assert engine.run().total_deleted == 900
+
+    def test_writer_is_released_between_batches(self, pool):
+        engine = RetentionEngine(pool, [RULE], batch_size=10, pause=0.002)
+        inserted = []
+
+        def writer():
+            for _ in range(20):
+                with pool.write() as conn:
+                    conn.execute("INSERT INTO events (payload, created_at) VALUES ('new', ?)", (datetime.now(),))
+                inserted.append(1)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        engine.run()
+        thread.join()
+        assert len(inserted) == 20
+
+    def test_enable_incremental_vacuum_on_old_file(self, tmp_path):
+        pool = SQLiteConnectionPool(str(tmp_path / 'old.db'), pragmas={'auto_vacuum': 'NONE'})
+        with pool.write() as conn:
+            conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, created_at TEXT)")
+        engine = RetentionEngine(pool, [RULE])
+        assert engine.vacuum_mode() == 'none'
+        engine.enable_incremental_vacuum()
+        assert engine.vacuum_mode() == 'incremental'
+        pool.close_all()
+
+    def test_scheduler_collects_reports(self, pool):
+        scheduler = RetentionScheduler([RetentionEngine(pool, [RULE])], interval=3600)
+        reports = scheduler.run_once()
+        assert reports[0]['total_deleted'] == 900 and scheduler.last_reports == reports
+
+
+class TestManagerRetention:
+    """Both managers purge through the engine"""
+
+    def test_analytics_cleanup(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        manager.store_metric('cpu', 0.5)
+        with manager.pool.write() as conn:
+            conn.execute("INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES ('cpu', 1, ?)",
+                         (datetime.now() - timedelta(days=8),))
+            conn.execute("INSERT INTO content_cache VALUES ('k', 'v', ?, ?)",
+                         (datetime.now() - timedelta(minutes=1), datetime.now()))
+        report = manager.cleanup_expired_data()
+        assert report['rows_deleted'] == {'content_cache': 1, 'metrics': 1, 'analysis_results': 0}
+
+    def test_video_cleanup(self, tmp_path):
+        from database import DatabaseManager
+
+        manager = DatabaseManager(connection_string=str(tmp_path / 'video.db'))
+        with manager.pool.write() as conn:
+            conn.execute("INSERT INTO system_logs (log_id, level, message, created_at) VALUES ('old', 'INFO', 'm', ?)",
+                         ((datetime.now() - timedelta(days=40)).isoformat(),))
+        manager.log_info("fresh", "test")
+        assert manager.cleanup_old_data(days_to_keep=30) == 1
@@ -0,0 +1,184 @@
+"""
+Tests for the time-bucket rollup cubes
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from rollups import RollupCube, ANALYSIS_CUBE, HOUR_OF_DAY, BUCKET_DATE
+
+
+def _raw_table(conn):
+    conn.execute("""CREATE TABLE analysis_results (id TEXT, content TEXT, sentiment TEXT, confidence REAL,
+                    source TEXT, timestamp DATETIME, metadata TEXT, model TEXT, language TEXT)""")
+
+
+def _insert(conn, now, count):
+    for i in range(count):
+        conn.execute("INSERT INTO analysis_results VALUES (?, 'x', ?, ?, ?, ?, '{}', NULL, NULL)",
+                     (str(i), ('positive', 'negative', 'neutral')[i % 3], (i % 10) / 10,
+                      'api' if i % 4 else 'web', now - timedelta(minutes=17 * i)))
+
+
+def _cube_rows(conn):
+    return conn.execute("SELECT * FROM analysis_rollups ORDER BY 1, 2, 3, 4").fetchall()
+
+
+class TestRollupCube:
+    """Incremental maintenance, rebuilds and window queries"""
+
+    @pytest.fixture
+    def conn(self):
+        conn = sqlite3.connect(':memory:')
+        _raw_table(conn)
+        assert ANALYSIS_CUBE.install(conn)
+        return conn
+
+    def test_trigger_matches_rebuild(self, conn):
+        _insert(conn, datetime.now(), 400)
+        incremental = _cube_rows(conn)
+        assert ANALYSIS_CUBE.rebuild(conn) == len(incremental)
+        assert _cube_rows(conn) == incremental
+
+    def test_partial_rebuild_keeps_older_buckets(self, conn):
+        now = datetime.now()
+        _insert(conn, now, 400)
+        expected = _cube_rows(conn)
+        # Raw retention removed the oldest rows; their buckets must survive a partial rebuild
+        conn.execute("DELETE FROM analysis_results WHERE timestamp < ?", (now - timedelta(days=2),))
+        ANALYSIS_CUBE.rebuild(conn, start=now - timedelta(days=1))
+        assert _cube_rows(conn) == expected
+
+    @pytest.mark.parametrize('window', [timedelta(minutes=30), timedelta(hours=5), timedelta(days=1),
+                                        timedelta(days=1, minutes=7)])
+    def test_aggregates_match_raw_rows(self, conn, window):
+        now = datetime.now().replace(second=0, microsecond=0)
+        _insert(conn, now, 400)
+        start = now - window
+
+        rows = {r['sentiment']: r for r in ANALYSIS_CUBE.aggregate(conn, start, group_by=('sentiment',))}
+        raw = conn.execute("""SELECT sentiment, COUNT(*), AVG(confidence), MIN(confidence), MAX(confidence)
+                              FROM analysis_results WHERE timestamp >= ? GROUP BY sentiment""", (start,))
+        for sentiment, count, avg, low, high in raw:
+            assert rows[sentiment]['count'] == count
+            assert rows[sentiment]['confidence_avg'] == pytest.approx(avg)
+            assert (rows[sentiment]['confidence_min'], rows[sentiment]['confidence_max']) == (low, high)
+
+    def test_pseudo_dimensions(self, conn):
+        now = datetime.now()
+        _insert(conn, now, 200)
+        rows = ANALYSIS_CUBE.aggregate(conn, now - timedelta(days=1), group_by=(HOUR_OF_DAY, BUCKET_DATE))
+        assert sum(r['count'] for r in rows) == 85  # rows 0..84 fall within one day
+        assert all(len(r[HOUR_OF_DAY]) == 2 and len(r[BUCKET_DATE]) == 10 for r in rows)
+
+    def test_bucket_ranges_cover_window_without_overlap(self):
+        start, end = datetime(2024, 3, 1, 22, 17), datetime(2024, 3, 4, 5, 41)
+        assert RollupCube.bucket_ranges(start, end) == [
+            ('minute', '2024-03-01 22:17', '2024-03-01 22:59'),
+            ('minute', '2024-03-04 05:00', '2024-03-04 05:41'),
+            ('hour', '2024-03-01 23', '2024-03-01 23'),
+            ('day', '2024-03-02', '2024-03-03'),
+            ('hour', '2024-03-04 00', '2024-03-04 04'),
+        ]
+        # Leading edge older than minute retention falls back to its hour bucket
+        assert RollupCube.bucket_ranges(start, end, minute_cutoff=end)[0] == ('hour', '2024-03-01 22', '2024-03-01 22')
+
+    def test_null_measures_keep_min_max(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE api_usage (endpoint TEXT, timestamp DATETIME, response_time REAL, status_code INTEGER)")
+        from rollups import API_USAGE_CUBE
+        API_USAGE_CUBE.install(conn)
+        now = datetime.now()
+        for response_time in (None, 0.2, None, 0.5):
+            conn.execute("INSERT INTO api_usage VALUES ('/api', ?, ?, 200)", (now, response_time))
+        row, = API_USAGE_CUBE.aggregate(conn, now - timedelta(hours=1), group_by=('endpoint', 'status_code'))
+        assert (row['count'], row['response_time_n']) == (4, 2)
+        assert (row['response_time_min'], row['response_time_max']) == (0.2, 0.5)
+        assert row['response_time_avg'] == pytest.approx(0.35)
+        assert row['status_code'] == '200'
+
+    def test_prune(self, conn):
+        now = datetime.now()
+        _insert(conn, now, 400)
+        assert ANALYSIS_CUBE.prune(conn, now=now) > 0
+        oldest = conn.execute("SELECT MIN(bucket) FROM analysis_rollups WHERE granularity = 'minute'").fetchone()[0]
+        assert oldest >= (now - timedelta(days=2)).strftime('%Y-%m-%d %H:%M')
+
+
+class TestSummariesReadRollups:
+    """Summary APIs answer from the cubes"""
+
+    def test_analytics_manager(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        for i in range(6):
+            manager.store_analysis_result(f"text {i}", 'positive' if i % 2 else 'negative', 0.5 + i / 20, 'api')
+        manager.log_api_usage('/api/analyze', 0.1, 200)
+        manager.log_api_usage('/api/analyze', 0.3, 500)
+
+        stats = manager.get_sentiment_statistics()
+        assert stats['total_analyses'] == 6
+        assert stats['sentiment_distribution']['positive'] == {'count': 3, 'avg_confidence': 0.65}
+        assert stats['source_breakdown'] == {'api': 6}
+
+        api = manager.get_api_statistics()
+        assert api['endpoint_statistics']['/api/analyze'] == {'requests': 2, 'avg_response_time': 0.2}
+        assert (api['error_requests'], api['error_rate_percent']) == (1, 50.0)
+
+        summary = manager.get_dashboard_summary()['today']
+        assert (summary['total_analyses'], summary['unique_sources']) == (6, 1)
+
+    @pytest.mark.parametrize('partitioned', [False, True])
+    def test_model_and_language_dimensions(self, tmp_path, partitioned):
+        from database_manager import DatabaseManager
+
+        parts = str(tmp_path / 'parts') if partitioned else None
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'), partition_dir=parts)
+        manager.store_analysis_result('habari', 'positive', 0.9, 'api', {'model': 'vader', 'language': 'sw'})
+        manager.store_analysis_result('hello', 'negative', 0.7, 'api', {'model': 'vader', 'language': 'en'})
+        manager.store_analysis_result('hi', 'neutral', 0.5, 'api')
+        with manager.pool.read() as conn:
+            rows = ANALYSIS_CUBE.aggregate(conn, datetime.now() - timedelta(hours=1), group_by=('model', 'language'))
+        assert {(r['model'], r['language']): r['count'] for r in rows} == {('vader', 'sw'): 1, ('vader', 'en'): 1,
+                                                                           ('', ''): 1}
+
+    def test_cleanup_prunes_the_cubes(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        old = datetime.now() - timedelta(days=3)
+        with manager.pool.write() as conn:
+            ANALYSIS_CUBE.merge(conn, [(old, ('positive', 'api', '', ''), 1, [(0.5, 1, 0.5, 0.5), (0, 0, None, None)])])
+        manager.store_analysis_result('fresh', 'positive', 0.5, 'api')
+
+        report = manager.cleanup_expired_data()
+        assert report['buckets_pruned'] == {'analysis_rollups': 1, 'api_usage_rollups': 0,
+                                            'api_latency_rollups': 0}
+        with manager.pool.read() as conn:
+            minutes = conn.execute("SELECT bucket FROM analysis_rollups WHERE granularity = 'minute'").fetchall()
+            hours = conn.execute("SELECT COUNT(*) FROM analysis_rollups WHERE granularity = 'hour'").fetchone()[0]
+        assert len(minutes) == 1 and minutes[0][0] > old.strftime('%Y-%m-%d %H:%M')
+        assert hours == 2  # older hour buckets stay within their own retention
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            assert manager.rollups_enabled
+            results = [{'text': f"t{i}", 'sentiment': 'positive', 'confidence': 0.8, 'model_used': 'vader',
+                        'processing_time': 0.01, 'language': 'en'} for i in range(4)]
+            assert manager.save_sentiment_analyses(results) == 4
+
+            analytics = manager.get_analytics_summary()
+            assert analytics['total_analyses'] == 4
+            assert analytics['model_distribution'] == {'vader': 4}
+            assert analytics['language_distribution'] == {'en': 4}
+            assert analytics['daily_trends'][0]['count'] == 4
+            assert manager.get_dashboard_summary()['today']['total_analyses'] == 4
@@ -0,0 +1,120 @@
+"""
+Tests for the FTS5 full-text search indexes
+"""
+
+import sqlite3
+
+import pytest
+
+from search_index import FullTextIndex, match_query
+
+ARTICLES = FullTextIndex('articles_fts', 'articles', ['title', 'body'], weights=[4.0, 1.0])
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, title TEXT, body TEXT, sentiment TEXT)")
+    conn.executemany("INSERT INTO articles (title, body, sentiment) VALUES (?, ?, ?)", [
+        ('Markets rally', 'Stocks climbed after the earnings report', 'positive'),
+        ('Storm warning', 'Markets brace for heavy weather', 'negative'),
+        ('Quiet day', 'Nothing happened in the markets today', 'neutral'),
+    ])
+    return conn
+
+
+class TestMatchQuery:
+    """User text becomes a safe FTS5 expression"""
+
+    def test_terms_are_quoted(self):
+        assert match_query('stock "market" OR -crash', prefix=False) == '"stock" "market" "OR" "crash"'
+
+    def test_prefix_terms(self):
+        assert match_query('earn rep') == '"earn" "rep"*'
+        assert match_query('earn* rep', prefix=False) == '"earn"* "rep"'
+        assert match_query('  ?! ') is None
+
+
+class TestFullTextIndex:
+    """Trigger sync, rebuild, ranking, snippets and filters"""
+
+    def test_install_indexes_existing_rows(self, conn):
+        assert ARTICLES.install(conn)
+        assert [hit['id'] for hit in ARTICLES.search(conn, 'storm')] == [2]
+
+    def test_triggers_follow_writes(self, conn):
+        ARTICLES.install(conn)
+        conn.execute("INSERT INTO articles (title, body) VALUES ('Harvest', 'Farmers celebrate a record crop')")
+        assert len(ARTICLES.search(conn, 'farmers')) == 1
+        conn.execute("UPDATE articles SET body = 'Farmers worry about drought' WHERE title = 'Harvest'")
+        assert ARTICLES.search(conn, 'celebrate') == [] and len(ARTICLES.search(conn, 'drought')) == 1
+        conn.execute("DELETE FROM articles WHERE title = 'Harvest'")
+        assert ARTICLES.search(conn, 'drought') == []
+
+    def test_rebuild_after_untracked_writes(self, conn):
+        ARTICLES.install(conn)
+        conn.execute("DROP TRIGGER trg_articles_fts_insert")
+        conn.execute("INSERT INTO articles (title, body) VALUES ('Election', 'Voters head to the polls')")
+        assert ARTICLES.search(conn, 'voters') == []
+        ARTICLES.rebuild(conn)
+        assert len(ARTICLES.search(conn, 'voters')) == 1
+
+    def test_bm25_ranking_prefix_snippets_and_filters(self, conn):
+        ARTICLES.install(conn)
+        hits = ARTICLES.search(conn, 'market', select=('title',))
+        assert [hit['id'] for hit in hits][0] == 1  # title matches outweigh body matches
+        assert len(hits) == 3 and hits[0]['title'] == 'Markets rally'
+        assert '<mark>Markets</mark>' in hits[0]['snippet']
+        assert ARTICLES.search(conn, 'market', prefix=False) == []
+
+        filtered = ARTICLES.search(conn, 'markets', sentiment='negative', ignored=None)
+        assert [hit['id'] for hit in filtered] == [2]
+
+    def test_install_skips_other_shapes(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE articles (id INTEGER PRIMARY KEY, title TEXT)")
+        assert not ARTICLES.install(conn)
+        assert not ARTICLES.is_installed(conn)
+
+
+class TestManagerSearch:
+    """Both database managers search through the index"""
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        assert manager.search_enabled
+        manager.save_sentiment_analyses([
+            {'text': 'I love this phone', 'sentiment': 'positive', 'confidence': 0.9, 'model_used': 'vader'},
+            {'text': 'This phone is awful', 'sentiment': 'negative', 'confidence': 0.8, 'model_used': 'bert'},
+        ])
+        manager.save_news_article({'title': 'Phone sales soar', 'content': 'Record quarter', 'url': 'u'})
+
+        results = manager.search_analyses('phon', sentiment_filter='negative')
+        assert [r['text'] for r in results] == ['This phone is awful']
+        assert results[0]['model_used'] == 'bert' and '<mark>' in results[0]['snippet']
+        assert manager.search_news('sales')[0]['title'] == 'Phone sales soar'
+
+        manager.search_enabled = False  # LIKE fallback returns the same rows
+        assert [r['text'] for r in manager.search_analyses('phone', model_filter='vader')] == ['I love this phone']
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        assert manager.search_enabled
+        with app.app_context():
+            manager.save_sentiment_analyses([
+                {'text': 'Great customer service', 'sentiment': 'positive', 'confidence': 0.9, 'model_used': 'vader'},
+                {'text': 'Terrible customer support', 'sentiment': 'negative', 'confidence': 0.7, 'model_used': 'vader'},
+            ])
+            manager.save_news_article('Service outage resolved', 'https://example.com/a', 'Customers are back')
+
+            results = manager.search_analyses('customer', model_filter='vader')
+            assert len(results) == 2 and all('rank' in r for r in results)
+            assert manager.search_analyses('customer serv')[0]['text'] == 'Great customer service'
+            assert manager.search_news('outage')[0]['url'] == 'https://example.com/a'
@@ -0,0 +1,89 @@
+"""
+Tests for the compact SentimentResult type and ResultBatch container
+"""
+
+import json
+import pickle
+
+import pytest
+
+from sentiment_result import SentimentResult, ResultBatch, dumps, packb
+
+
+def _result(**overrides):
+    fields = dict(
+        text="Karibu Kenya, this is great",
+        sentiment="positive",
+        confidence=0.9,
+        scores={"positive": 0.9, "negative": 0.05, "neutral": 0.05},
+        model_used="vader",
+        processing_time=0.002,
+        method="vader",
+    )
+    fields.update(overrides)
+    return SentimentResult(**fields)
+
+
+class TestSentimentResult:
+    """Compact result object behaviour"""
+
+    def test_slots_no_instance_dict(self):
+        result = _result()
+        assert not hasattr(result, '__dict__')
+        with pytest.raises(AttributeError):
+            result.unexpected_field = 1
+
+    def test_lazy_derived_fields(self):
+        result = _result()
+        assert result.text_length == len(result.text)
+        assert result.word_count == 5
+        assert result.timestamp == result.timestamp  # stable once rendered
+        assert _result(timestamp="2024-01-01T00:00:00").timestamp == "2024-01-01T00:00:00"
+
+    def test_compatibility_aliases(self):
+        result = _result(language_detected="sw", analysis_metadata={"source": "api"})
+        assert result.language == "sw"
+        assert result.language_detected == "sw"
+        assert result.metadata == {"source": "api"}
+        assert result.analysis_metadata == {"source": "api"}
+
+    def test_to_dict_details_optional(self):
+        result = _result(details={"sentiment_scores": {"pos": 1}})
+        assert "details" in result.to_dict()
+        assert "details" not in result.to_dict(include_details=False)
+        assert "language" not in result.to_dict()
+
+    def test_json_round_trip(self):
+        result = _result()
+        data = json.loads(result.to_json())
+        assert data == json.loads(json.dumps(result.to_dict()))
+        assert isinstance(packb(result.to_dict()), bytes)
+        assert json.loads(dumps({"a": 1}, indent=2)) == {"a": 1}
+
+    def test_pickle(self):
+        result = _result(error_details="boom")
+        restored = pickle.loads(pickle.dumps(result))
+        assert restored == result
+
+
+class TestResultBatch:
+    """Struct-of-arrays container"""
+
+    def test_round_trip(self):
+        results = [_result(text=f"comment {i}", sentiment="negative" if i % 2 else "positive")
+                   for i in range(10)]
+        results[3].details = {"toxicity": {"toxicity_level": "safe"}}
+        batch = ResultBatch(results)
+
+        assert len(batch) == 10
+        assert batch.sentiment_counts() == {"positive": 5, "negative": 5}
+        assert batch[3].details == {"toxicity": {"toxicity_level": "safe"}}
+        assert batch[-1].text == "comment 9"
+        assert [r.to_dict() for r in batch] == [r.to_dict() for r in results]
+
+    def test_serialization(self):
+        batch = ResultBatch([_result(details={"big": list(range(5))})])
+        assert "details" not in json.loads(batch.to_json())[0]
+        assert "details" in json.loads(batch.to_json(include_details=True))[0]
+        lines = list(batch.to_json_lines())
+        assert len(lines) == 1 and lines[0].endswith("\n")
@@ -0,0 +1,153 @@
+"""
+Tests for read snapshots of the live database
+"""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from snapshot import SnapshotManager, close_all_snapshots
+from sqlite_pool import SQLiteConnectionPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'live.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, batch INTEGER)")
+        conn.executemany("INSERT INTO events (batch) VALUES (1)", [()] * 10)
+    yield pool
+    pool.close_all()
+
+
+def count(conn):
+    return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+class TestSnapshotManager:
+    """Copies, routing by age and snapshot lifetime"""
+
+    @pytest.mark.parametrize('method', ['backup', 'vacuum'])
+    def test_reads_see_the_snapshot_until_it_ages_out(self, pool, method):
+        clock = Clock()
+        manager = SnapshotManager(pool, max_age=60, method=method, clock=clock)
+        with manager.read() as conn:
+            assert count(conn) == 10
+        with pool.write() as conn:
+            conn.executemany("INSERT INTO events (batch) VALUES (2)", [()] * 5)
+
+        with manager.read() as conn:
+            assert count(conn) == 10
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM events")  # snapshots are read-only
+        with manager.read(fresh=True) as conn:
+            assert count(conn) == 15
+        with manager.read(max_age=0.5) as conn:
+            clock.now += 1
+            assert count(conn) == 10
+        with manager.read(max_age=0.5) as conn:
+            assert count(conn) == 15
+        assert manager.stats['snapshots'] == 2 and manager.stats['fresh_reads'] == 1
+        assert manager.get_metrics()['age_seconds'] == 0.0
+        manager.close()
+        assert not os.path.exists(manager.directory)
+
+    def test_unchanged_database_is_not_copied_again(self, pool):
+        manager = SnapshotManager(pool)
+        first = manager.refresh()
+        assert manager.refresh() is first and manager.stats['unchanged'] == 1
+        pool.execute_write("UPDATE events SET batch = 3 WHERE id = 1")
+        assert manager.refresh() is not first and manager.stats['snapshots'] == 2
+        manager.close()
+
+    def test_replaced_snapshot_lives_until_its_reader_leaves(self, pool):
+        manager = SnapshotManager(pool)
+        with manager.read() as conn:
+            old = manager._current.path
+            pool.execute_write("DELETE FROM events WHERE batch = 1")
+            manager.refresh()
+            assert os.path.exists(old) and count(conn) == 10  # the report still sees one state
+        assert not os.path.exists(old)
+        with manager.read() as conn:
+            assert count(conn) == 0
+        manager.close()
+
+    def test_in_memory_and_orphans(self, pool, tmp_path):
+        memory = SnapshotManager(SQLiteConnectionPool(':memory:'))
+        with memory.read() as conn:
+            assert conn.execute("SELECT 1").fetchone() == (1,)
+        assert memory.refresh() is None and memory.stats['fresh_reads'] == 1
+
+        orphan = tmp_path / 'live.db.snapshots' / '999999999'
+        orphan.mkdir(parents=True)
+        (orphan / 'live.db.1').write_bytes(b'')
+        SnapshotManager(pool)
+        assert not orphan.exists()
+        with pytest.raises(ValueError):
+            SnapshotManager(pool, method='replica')
+
+
+class TestManagerSnapshots:
+    """Analytics reads of the managers on the shared snapshot"""
+
+    def teardown_method(self):
+        close_all_snapshots()
+
+    def test_database_manager(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        manager.store_analysis_result('first text', 'positive', 0.9, 'api')
+        assert manager.get_sentiment_statistics(fresh=False)['total_analyses'] == 1
+        manager.store_analysis_result('second text', 'negative', 0.8, 'api')
+        assert [r.content for r in manager.get_recent_analyses(fresh=False)] == ['first text']
+        assert len(manager.get_recent_analyses()) == 2
+        assert manager.snapshots.stats['snapshot_reads'] == 2
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            manager.save_sentiment_analysis({'text': 'habari', 'sentiment': 'neutral', 'confidence': 0.5})
+            assert [a['text'] for a in manager.get_recent_analyses(fresh=False)] == ['habari']
+            manager.save_sentiment_analysis({'text': 'mpya', 'sentiment': 'positive', 'confidence': 0.7})
+            assert len(manager.get_recent_analyses(fresh=False)) == 1
+            assert len(manager.get_recent_analyses()) == 2
+
+    def test_enhanced_manager_behind_the_dashboard_routes(self, tmp_path, monkeypatch):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        with manager.pool.write() as conn:
+            conn.executemany(manager._INSERT_ANALYSIS, [
+                (f"text {i}", ('positive', 'negative')[i % 2], 0.8, '{}', 'vader', 0.0, '{}',
+                 f"2024-05-01 10:00:0{i}", 10) for i in range(6)])
+        assert len(manager.get_recent_analyses(fresh=False, view='history')) == 6
+        manager.pool.execute_write(manager._INSERT_ANALYSIS, ('late', 'neutral', 0.5, '{}', 'vader', 0.0, '{}',
+                                                              '2024-05-01 10:00:09', 10))
+        assert len(manager.get_recent_analyses(fresh=False)) == 6 and len(manager.get_recent_analyses()) == 7
+
+        monkeypatch.chdir(tmp_path)  # the dashboard creates its default databases on import
+        dashboard = pytest.importorskip('dashboard')
+        from advanced_analytics_engine import AdvancedAnalyticsEngine
+        monkeypatch.setattr(dashboard, 'advanced_analytics_engine', AdvancedAnalyticsEngine())
+        monkeypatch.setattr(dashboard, 'real_db_manager', manager, raising=False)
+        client = dashboard.app.test_client()
+        for route in ('/api/analytics/advanced/trends', '/api/analytics/advanced/user',
+                      '/api/analytics/advanced/report', '/api/analytics/trends'):
+            assert client.get(route).status_code == 200, route
+        assert client.get('/api/analytics/advanced/trends').get_json()['count'] == 6
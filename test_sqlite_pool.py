@@ -0,0 +1,121 @@
+"""
+Tests for the shared SQLite connection pool
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from sqlite_pool import SQLiteConnectionPool, get_pool, close_all_pools
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'pool.db'))
+    with pool.write() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)")
+    yield pool
+    pool.close_all()
+
+
+class TestSQLiteConnectionPool:
+    """Connection reuse, pragmas and serialized writes"""
+
+    def test_wal_and_pragmas(self, pool):
+        with pool.read() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    def test_reader_is_persistent_per_thread(self, pool):
+        with pool.read() as first:
+            pass
+        with pool.read() as second:
+            pass
+        assert first is second
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(pool.reader()))
+        thread.start()
+        thread.join()
+        assert other[0] is not first
+
+    def test_write_commits_and_rolls_back(self, pool):
+        with pool.write() as conn:
+            conn.execute("INSERT INTO items (value) VALUES ('kept')")
+
+        with pytest.raises(RuntimeError):
+            with pool.write() as conn:
+                conn.execute("INSERT INTO items (value) VALUES ('discarded')")
+                raise RuntimeError("boom")
+
+        with pool.read() as conn:
+            values = [row[0] for row in conn.execute("SELECT value FROM items")]
+        assert values == ['kept']
+        assert pool.stats['rollbacks'] == 1
+
+    def test_nested_writes_share_transaction(self, pool):
+        with pytest.raises(ValueError):
+            with pool.write() as outer:
+                outer.execute("INSERT INTO items (value) VALUES ('outer')")
+                with pool.write() as inner:
+                    assert inner is outer
+                    inner.execute("INSERT INTO items (value) VALUES ('inner')")
+                raise ValueError("abort outer")
+
+        with pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+    def test_concurrent_writers_and_readers(self, pool):
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(50):
+                    with pool.write() as conn:
+                        conn.execute("INSERT INTO items (value) VALUES (?)", (f"{n}-{i}",))
+                    with pool.read() as conn:
+                        conn.execute("SELECT COUNT(*) FROM items").fetchone()
+            except sqlite3.Error as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not errors
+        with pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 400
+
+    def test_shared_registry(self, tmp_path):
+        path = str(tmp_path / 'shared.db')
+        try:
+            assert get_pool(path) is get_pool(path)
+            assert get_pool(':memory:') is not get_pool(':memory:')
+        finally:
+            close_all_pools()
+
+
+class TestManagersUsePool:
+    """Database managers route their connections through the pool"""
+
+    def test_database_manager(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        manager = DatabaseManager(str(tmp_path / 'analytics.db'))
+        manager.store_analysis_result("poa sana", "positive", 0.9, "api")
+        stats = manager.get_sentiment_statistics()
+        assert stats['total_analyses'] == 1
+        assert manager.pool.get_status()['journal_mode'] == 'wal'
+
+    def test_enhanced_database_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        manager.save_sentiment_analysis({'text': 'hello', 'sentiment': 'neutral', 'confidence': 0.5})
+        assert len(manager.get_recent_analyses()) == 1
+        manager.set_cached_data('key', {'a': 1})
+        assert manager.get_cached_data('key') == {'a': 1}
@@ -0,0 +1,191 @@
+"""
+Tests for the shared storage engine and the managers built on it
+"""
+
+import sqlite3
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from storage_engine import API_USAGE, SENTIMENT_ANALYSES, StorageEngine, get_storage, storage_url
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = get_storage(str(tmp_path / 'shared.db'))
+    storage.create_all()
+    return storage
+
+
+class TestStorageEngine:
+    """Core statements on the shared pool connections"""
+
+    def test_urls_and_registry(self, tmp_path):
+        path = str(tmp_path / 'a.db')
+        assert storage_url(path) == storage_url(f"sqlite:///{path}") == f"sqlite:///{path}"
+        assert get_storage(path) is get_storage(f"sqlite:///{path}")
+        assert get_storage(path).pool is get_storage(path).pool
+        assert get_storage(':memory:') is not get_storage(':memory:')
+
+    def test_insert_defaults_and_json(self, storage):
+        pk = storage.insert(SENTIMENT_ANALYSES, {'text': 't', 'sentiment': 'positive', 'confidence': 0.9,
+                                                 'scores': {'positive': 0.9}})
+        with storage.read() as conn:
+            row = conn.execute(select(SENTIMENT_ANALYSES).where(SENTIMENT_ANALYSES.c.id == pk)).mappings().one()
+        assert row['scores'] == {'positive': 0.9}
+        assert row['hour'] == row['timestamp'].hour and row['created_at'] is not None
+        with storage.pool.read() as conn:  # the raw managers see JSON text
+            assert conn.execute("SELECT scores FROM sentiment_analyses").fetchone()[0] == '{"positive": 0.9}'
+
+    def test_begin_nests_with_pool_writes_and_rolls_back(self, storage):
+        with pytest.raises(RuntimeError):
+            with storage.begin():
+                storage.insert_many(API_USAGE, [{'endpoint': '/a'}] * 3, chunk_size=2)
+                with storage.pool.write() as conn:
+                    conn.execute("INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES ('m', 1, ?)",
+                                 (datetime.now(),))
+                raise RuntimeError
+        with storage.pool.write() as conn:
+            storage.insert(API_USAGE, {'endpoint': '/b'})  # joins the raw transaction
+        with storage.pool.read() as conn:
+            assert conn.execute("SELECT endpoint FROM api_usage").fetchall() == [('/b',)]
+            assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 0
+
+    def test_create_all_reconciles_old_tables_and_merges(self, tmp_path):
+        old = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(old)
+        conn.execute("CREATE TABLE api_usage (id INTEGER PRIMARY KEY AUTOINCREMENT, endpoint TEXT NOT NULL, "
+                     "timestamp DATETIME NOT NULL, response_time REAL, status_code INTEGER, error_message TEXT)")
+        conn.execute("INSERT INTO api_usage (endpoint, timestamp, status_code) VALUES ('/old', '2024-01-01', 200)")
+        conn.commit()
+        conn.close()
+
+        legacy = StorageEngine(old)
+        assert {'api_usage.method', 'api_usage.ip_address', 'api_usage.user_agent'} <= set(legacy.create_all())
+
+        shared = get_storage(str(tmp_path / 'merged.db'))
+        shared.create_all()
+        shared.insert(API_USAGE, {'endpoint': '/new'})
+        assert shared.merge(old)['api_usage'] == 1
+        with shared.read() as conn:
+            assert sorted(conn.execute(select(API_USAGE.c.endpoint)).scalars()) == ['/new', '/old']
+
+
+class TestSharedManagers:
+    """The four managers on one database, one pool and one writer"""
+
+    def test_managers_share_one_writer(self, tmp_path):
+        from flask import Flask
+        from database import DatabaseManager as VideoDatabase
+        from database_manager import DatabaseManager
+        from enhanced_database import EnhancedDatabaseManager
+        from real_database import RealDatabaseManager
+
+        path = str(tmp_path / 'shared.db')
+        video, analytics = VideoDatabase(connection_string=path), DatabaseManager(path)
+        enhanced = EnhancedDatabaseManager(path)
+        real = RealDatabaseManager(database_url=f"sqlite:///{path}")
+        app = Flask(__name__)
+        real.init_app(app)
+        assert video.pool is analytics.pool is enhanced.pool is real.storage.pool
+
+        with pytest.raises(RuntimeError):
+            with real.storage.begin():  # one transaction across every manager
+                analytics.store_analysis_result('c', 'positive', 0.9, 'api')
+                enhanced.save_sentiment_analysis({'text': 'e', 'sentiment': 'neutral'})
+                real.log_api_usage('/api/analyze', 'POST', response_code=200)
+                video.log_info('saved', 'test')
+                raise RuntimeError
+        with real.storage.begin():
+            analytics.log_api_usage('/api/analyze', 0.05, 200)
+            real.log_api_usage('/api/analyze', 'POST', response_code=500, processing_time=0.1)
+            real.save_sentiment_analysis({'text': 'r', 'sentiment': 'positive', 'confidence': 0.8})
+            enhanced.save_sentiment_analysis({'text': 'e', 'sentiment': 'neutral'})
+
+        assert analytics.get_recent_analyses() == []
+        stats = analytics.get_api_statistics()
+        assert stats['total_requests'] == 2 and stats['error_requests'] == 1
+        assert [a['text'] for a in enhanced.get_recent_analyses()] == ['e', 'r']
+        with app.app_context():
+            assert sorted(a['text'] for a in real.get_recent_analyses()) == ['e', 'r']
+
+    def test_upgraded_file_has_one_sentiment_cube(self, tmp_path):
+        from flask import Flask
+        from enhanced_database import EnhancedDatabaseManager
+        from real_database import RealDatabaseManager
+        from rollups import RollupCube, SENTIMENT_CUBE
+
+        path = str(tmp_path / 'old.db')
+        conn = sqlite3.connect(path)  # an enhanced_database file from before the shared schema
+        conn.execute("CREATE TABLE sentiment_analyses (id INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT NOT NULL, "
+                     "sentiment TEXT NOT NULL, confidence REAL NOT NULL, scores TEXT, model_used TEXT, "
+                     "processing_time REAL, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP, metadata TEXT)")
+        RollupCube('sentiment_rollups', 'sentiment_analyses', 'timestamp', {'sentiment': '{row}.sentiment'},
+                   {}).install(conn)  # the former enhanced cube
+        conn.execute("INSERT INTO sentiment_analyses (text, sentiment, confidence, timestamp) "
+                     "VALUES ('old', 'negative', 0.4, '2024-05-01 10:00:00')")
+        conn.commit()
+        conn.close()
+
+        enhanced = EnhancedDatabaseManager(path)
+        real = RealDatabaseManager(database_url=f"sqlite:///{path}")
+        app = Flask(__name__)
+        real.init_app(app)
+        enhanced.save_sentiment_analysis({'text': 'e', 'sentiment': 'neutral', 'confidence': 0.5})
+        real.save_sentiment_analysis({'text': 'r', 'sentiment': 'positive', 'confidence': 0.8})
+
+        with enhanced.pool.read() as conn:
+            triggers = conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' "
+                                    "AND tbl_name = 'sentiment_analyses' AND name LIKE '%rollups%'").fetchall()
+            assert triggers == [(f"trg_{SENTIMENT_CUBE.name}_insert",)]
+            assert conn.execute("SELECT created_at FROM sentiment_analyses WHERE text = 'old'").fetchone() == \
+                   ('2024-05-01 10:00:00',)  # backfilled from timestamp
+            assert conn.execute("SELECT COUNT(*) FROM sentiment_analyses WHERE created_at IS NULL").fetchone()[0] == 0
+            minutes = conn.execute(f"SELECT SUM(count) FROM {SENTIMENT_CUBE.name} "
+                                   "WHERE granularity = 'minute'").fetchone()[0]
+        assert minutes == 3  # every row counted once, whichever manager wrote it
+        summary = enhanced.analytics_summary(datetime(2024, 5, 1))
+        assert summary.from_rollups and summary.total == 3
+        assert summary.by_sentiment == {'negative': 1, 'neutral': 1, 'positive': 1}
+        with app.app_context():
+            assert [a['text'] for a in real.get_recent_analyses(10)] == ['r', 'e', 'old']
+
+    def test_merge_keeps_stored_texts(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        old, shared = str(tmp_path / 'old.db'), str(tmp_path / 'shared.db')
+        legacy, analytics = DatabaseManager(old), DatabaseManager(shared)
+        analytics.content.train_dictionary(['karibu sana ' * 40])
+        legacy.content.train_dictionary(['habari ya leo ' * 40])  # the same id, another dictionary
+        text = 'habari ya leo, bei ya unga imepanda sana ' * 4
+        legacy.store_analysis_result(text, 'positive', 0.9, 'api')
+        analytics.store_analysis_result('already here', 'neutral', 0.5, 'api')
+
+        copied = get_storage(shared).merge(old)
+        assert copied['text_contents'] == 1 and copied['text_dictionaries'] == 1
+        assert sorted(record.content for record in DatabaseManager(shared).get_recent_analyses()) == \
+               ['already here', text]
+
+    def test_merge_keeps_metric_history(self, tmp_path):
+        from database_manager import DatabaseManager
+
+        old, older, shared = str(tmp_path / 'old.db'), str(tmp_path / 'older.db'), str(tmp_path / 'shared.db')
+        legacy = DatabaseManager(old)
+        legacy.store_metric('response_time', 0.25, 'api')
+        legacy.timeseries.flush(final=True)
+        conn = sqlite3.connect(older)  # metrics rows from before the segment store
+        conn.execute("CREATE TABLE metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, metric_name TEXT NOT NULL, "
+                     "metric_value REAL NOT NULL, timestamp DATETIME NOT NULL, category TEXT)")
+        conn.execute("INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES ('queue_depth', 3, ?)",
+                     (datetime.now().isoformat(' '),))
+        conn.commit()
+        conn.close()
+
+        analytics = DatabaseManager(shared)
+        assert get_storage(shared).merge(old)['metric_segments'] > 0
+        assert get_storage(shared).merge(older)['metrics'] == 1
+        assert [point['value'] for point in analytics.get_metrics_history('response_time', category='api')] == [0.25]
+        assert [point['value'] for point in analytics.get_metrics_history('queue_depth')] == [3]
+        with analytics.pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 0
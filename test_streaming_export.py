@@ -0,0 +1,113 @@
+"""
+Tests for constant-memory streaming exports
+"""
+
+import io
+import csv
+import gzip
+import json
+import sqlite3
+
+import pytest
+
+from streaming_export import (PARQUET_AVAILABLE, export_cursor, export_rows, fetch_chunks,
+                              json_document, write_file)
+
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE t (id INTEGER, label TEXT, score REAL)")
+    conn.executemany("INSERT INTO t VALUES (?, ?, ?)",
+                     [(i, None if i < 4 else f"l{i}", i / 10) for i in range(10)])
+    return conn.execute("SELECT * FROM t ORDER BY id")
+
+
+class TestWriters:
+    """Every format round-trips and is produced chunk by chunk"""
+
+    def test_fetch_chunks(self, cursor):
+        assert [len(rows) for rows in fetch_chunks(cursor, 4)] == [4, 4, 2]
+
+    def test_ndjson_gzip(self, cursor):
+        chunks = list(export_cursor(cursor, 'ndjson', 'gzip', chunk_size=3))
+        lines = gzip.decompress(b''.join(chunks)).decode().splitlines()
+        assert [json.loads(line)['id'] for line in lines] == list(range(10))
+        assert json.loads(lines[5]) == {'id': 5, 'label': 'l5', 'score': 0.5}
+
+    def test_csv(self, cursor):
+        chunks = list(export_cursor(cursor, 'csv', chunk_size=3))
+        assert len(chunks) == 4
+        rows = list(csv.reader(io.StringIO(b''.join(chunks).decode())))
+        assert rows[0] == ['id', 'label', 'score'] and len(rows) == 11
+
+    def test_csv_serialises_json_columns(self):
+        data = b''.join(export_rows(['scores'], [[({'positive': 0.9},)]], 'csv')).decode()
+        assert data.splitlines()[1] == '"{""positive"": 0.9}"'
+
+    @pytest.mark.skipif(not PARQUET_AVAILABLE, reason="pyarrow not installed")
+    def test_parquet_row_groups(self, cursor):
+        import pyarrow.parquet as pq
+
+        data = b''.join(export_cursor(cursor, 'parquet', chunk_size=4))
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        assert parquet.num_row_groups == 3
+        table = parquet.read().to_pydict()
+        assert table['id'] == list(range(10))
+        assert table['label'][:5] == [None] * 4 + ['l4']  # first chunk all NULL -> string column
+
+    def test_unknown_format(self):
+        with pytest.raises(ValueError):
+            export_rows(['a'], [], 'xml')
+
+    def test_json_document(self, tmp_path):
+        path = str(tmp_path / 'export.json')
+        write_file(json_document({'period_hours': 24},
+                                 {'metrics': {'cpu': iter([('t1', 1.5)]), 'idle': []},
+                                  'alerts': (a for a in [{'id': 1}, {'id': 2}]), 'none': []}), path)
+        with open(path) as f:
+            assert json.load(f) == {'period_hours': 24, 'metrics': {'cpu': [['t1', 1.5]], 'idle': []},
+                                    'alerts': [{'id': 1}, {'id': 2}], 'none': []}
+
+
+class TestManagerExports:
+    """Managers export through the streaming writers"""
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        manager.save_sentiment_analyses([{'text': f"t{i}", 'sentiment': 'positive', 'confidence': 0.5}
+                                         for i in range(7)])
+        lines = b''.join(manager.export_stream('ndjson', chunk_size=2)).decode().splitlines()
+        assert [json.loads(line)['text'] for line in lines] == [f"t{i}" for i in range(7)]
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from real_database import RealDatabaseManager
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            manager.save_sentiment_analyses([{'text': f"t{i}", 'sentiment': 'neutral', 'confidence': 0.5,
+                                              'model_used': 'vader', 'scores': {'neutral': 0.5}}
+                                             for i in range(5)])
+            lines = b''.join(manager.export_stream('ndjson', chunk_size=2)).decode().splitlines()
+            exported = json.loads(manager.export_data('json'))
+            rows = list(csv.DictReader(io.StringIO(manager.export_data('csv'))))
+
+        assert len(lines) == len(exported) == len(rows) == 5
+        assert json.loads(lines[0])['scores'] == exported[0]['scores'] == {'neutral': 0.5}
+        assert exported[0]['created_at'] == rows[0]['created_at'] and 'T' in rows[0]['created_at']
+
+    def test_video_database_json_export(self, tmp_path):
+        from database import DatabaseManager
+
+        manager = DatabaseManager(connection_string=str(tmp_path / 'video.db'))
+        path = str(tmp_path / 'export.json')
+        assert manager.export_data(path)
+        with open(path) as f:
+            document = json.load(f)
+        assert set(document) == {'export_timestamp', 'database_type', 'video_analyses',
+                                 'comment_analyses', 'analytics_reports'}
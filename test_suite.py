@@ -187,7 +187,7 @@ class TestSentimentAnalyzer:
         """Test automatic method selection"""
         result = analyzer.analyze_sentiment(sample_texts["positive"], method="auto")
         assert result.sentiment in ["positive", "negative", "neutral"]
-        assert result.method in ["huggingface", "vader", "textblob", "basic_fallback"]
+        assert result.method in ["huggingface", "distilled", "vader", "textblob", "basic_fallback"]
     
     def test_ensemble_analysis(self, analyzer, sample_texts):
         """Test ensemble analysis combining multiple methods"""
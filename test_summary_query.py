@@ -0,0 +1,149 @@
+"""
+Tests for the single-scan summary query builder
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from rollups import HOUR_OF_DAY, BUCKET_DATE
+from summary_query import AnalyticsSummary, SummaryQuery
+
+COLUMNS = {'sentiment': 'sentiment', 'model': 'model_used', 'confidence': 'confidence',
+           'processing_time': 'processing_time'}
+
+
+def _selects(pool):
+    """Trace SELECT statements on a pool's connections; returns (list, stop)"""
+    statements = []
+    connections = [pool.reader(), pool.writer]
+
+    def trace(sql):
+        if sql.lstrip().upper().startswith('SELECT') and 'sqlite_master' not in sql:
+            statements.append(sql)
+
+    for conn in connections:
+        conn.set_trace_callback(trace)
+    return statements, lambda: [conn.set_trace_callback(None) for conn in connections]
+
+
+class TestSummaryQuery:
+    """SQL generation and folding of grouping sets"""
+
+    @pytest.fixture
+    def conn(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute("""CREATE TABLE sentiment_analyses (sentiment TEXT, confidence REAL, model_used TEXT,
+                        processing_time REAL, timestamp DATETIME)""")
+        base = datetime(2024, 5, 1, 10, 30)
+        rows = [('positive', 0.9, 'vader', 0.01, base),
+                ('positive', 0.7, 'bert', None, base + timedelta(hours=1)),
+                ('negative', 0.4, 'vader', 0.03, base + timedelta(days=1)),
+                ('neutral', 0.5, 'vader', 0.02, base - timedelta(days=3))]
+        conn.executemany("INSERT INTO sentiment_analyses VALUES (?, ?, ?, ?, ?)", rows)
+        return conn
+
+    def test_every_grouping_set_from_one_statement(self, conn):
+        query = SummaryQuery('sentiment_analyses', 'timestamp', COLUMNS)
+        sql, _ = query.build(group_by=('sentiment', 'model', HOUR_OF_DAY, BUCKET_DATE))
+        assert sql.count('SELECT') == 1
+
+        summary = query.run(conn.execute, start=datetime(2024, 5, 1),
+                            group_by=('sentiment', 'model', HOUR_OF_DAY, BUCKET_DATE))
+        assert isinstance(summary, AnalyticsSummary)
+        assert summary.total == 3
+        assert summary.by_sentiment == {'positive': 2, 'negative': 1}
+        assert summary.by_model == {'vader': 2, 'bert': 1}
+        assert summary.by_hour == {10: 2, 11: 1}
+        assert summary.average_confidence == pytest.approx(2.0 / 3)
+        assert summary.average_processing_time == pytest.approx(0.02)  # NULLs excluded
+        assert [d['count'] for d in summary.daily_trends] == [2, 1]
+
+    def test_arbitrary_range_and_conditional_counts(self, conn):
+        query = SummaryQuery('sentiment_analyses', 'timestamp', COLUMNS)
+        summary = query.run(conn.execute, datetime(2024, 4, 1), datetime(2024, 5, 2),
+                            group_by=('sentiment',), flags={'confident': "confidence >= :threshold"},
+                            threshold=0.6)
+        assert summary.total == 3
+        assert summary.flags == {'confident': 2}
+
+    def test_pivot_replaces_group_by(self, conn):
+        query = SummaryQuery('sentiment_analyses', 'timestamp', COLUMNS)
+        sql, _ = query.build(pivot={'sentiment': ('positive', 'negative')})
+        assert 'GROUP BY' not in sql
+
+        summary = query.run(conn.execute, pivot={'sentiment': ('positive', 'negative')})
+        assert summary.by_sentiment == {'positive': 2, 'negative': 1, None: 1}  # neutral is outside the pivot
+
+    def test_dialects(self):
+        sql, params = SummaryQuery('t', 'created_at', COLUMNS, dialect='postgresql').build(
+            datetime(2024, 1, 1), group_by=(HOUR_OF_DAY,))
+        assert "to_char(created_at, 'HH24') AS hour_of_day" in sql
+        assert set(params) == {'start'}
+        with pytest.raises(ValueError):
+            SummaryQuery('t', 'created_at', COLUMNS, dialect='oracle')
+        with pytest.raises(ValueError):
+            SummaryQuery('t', 'created_at', COLUMNS).build(group_by=('language',))
+
+
+class TestManagerQueryCounts:
+    """Summaries issue exactly one statement whether or not rollups apply"""
+
+    def test_enhanced_manager(self, tmp_path):
+        from enhanced_database import EnhancedDatabaseManager
+
+        manager = EnhancedDatabaseManager(str(tmp_path / 'enhanced.db'))
+        manager.save_sentiment_analyses([{'text': f"t{i}", 'sentiment': ('positive', 'negative')[i % 2],
+                                          'confidence': 0.5 + i / 100} for i in range(10)])
+
+        statements, stop = _selects(manager.pool)
+        try:
+            cube = manager.get_analytics_summary(days=7)
+            assert len(statements) == 1 and 'sentiment_analyses_rollups' in statements[0]
+
+            statements.clear()
+            now = datetime.utcnow()
+            ranged = manager.get_analytics_summary(start=now - timedelta(days=7), end=now + timedelta(minutes=1))
+            assert len(statements) == 1 and 'FROM sentiment_analyses' in statements[0]
+
+            statements.clear()
+            manager.get_dashboard_summary()
+            assert len(statements) == 1
+        finally:
+            stop()
+
+        assert cube['total_analyses'] == ranged['total_analyses'] == 10
+        assert cube['sentiment_distribution'] == ranged['sentiment_distribution']
+        assert cube['average_confidence'] == ranged['average_confidence']
+
+    def test_real_database_manager(self, tmp_path):
+        from flask import Flask
+        from sqlalchemy import event
+        from real_database import RealDatabaseManager, db
+
+        app = Flask(__name__)
+        manager = RealDatabaseManager(database_url=f"sqlite:///{tmp_path / 'real.db'}")
+        manager.init_app(app)
+        with app.app_context():
+            manager.save_sentiment_analyses([{'text': f"t{i}", 'sentiment': 'positive', 'confidence': 0.6,
+                                              'model_used': 'vader', 'language': 'en'} for i in range(5)])
+            manager.rollups_enabled = False  # e.g. a non-SQLite backend
+
+            statements = []
+            listener = lambda conn, cursor, sql, *args: statements.append(sql)
+            event.listen(db.engine, 'before_cursor_execute', listener)
+            try:
+                analytics = manager.get_analytics_summary()
+                assert len(statements) == 1
+                statements.clear()
+                summary = manager.get_dashboard_summary()
+                assert len(statements) == 1
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', listener)
+
+        assert analytics['total_analyses'] == 5
+        assert analytics['model_distribution'] == {'vader': 5}
+        assert analytics['daily_trends'][0]['count'] == 5
+        assert summary['today']['total_analyses'] == summary['week']['total_analyses'] == 5
+        assert summary['today']['top_model'] == 'vader'
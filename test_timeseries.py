@@ -0,0 +1,142 @@
+"""
+Tests for the compressed time-series store
+"""
+
+import math
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlite_pool import SQLiteConnectionPool
+from timeseries import Segment, TimeSeriesStore, close_all_timeseries, install_timeseries
+
+T0 = datetime(2024, 5, 1, 10, 0)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = SQLiteConnectionPool(str(tmp_path / 'metrics.db'))
+    with pool.write() as conn:
+        install_timeseries(conn)
+    yield pool
+    pool.close_all()
+
+
+def clock_at(moment):
+    return lambda: moment.timestamp()
+
+
+class TestSegment:
+    """Gorilla encoding of timestamps and value columns"""
+
+    def test_round_trip(self):
+        rng = random.Random(7)
+        segment, points, ts = Segment(), [], 1_714_550_400_000
+        for i in range(300):
+            ts += 10_000 + (rng.randint(-300, 300) if i % 5 == 0 else 0) + (10 ** 9 if i == 150 else 0)
+            value = rng.choice([42.0, 42.5, rng.random() * 100, -3.25e10, 0.0, float(i)])
+            segment.append(ts, value)
+            points.append((ts, value))
+        assert Segment.decode(segment.to_bytes()) == points
+
+        buckets = Segment(4)
+        rows = [(ts + i * 60_000, rng.random(), rng.random(), rng.random() * 60, float(i + 1)) for i in range(50)]
+        for row in rows:
+            buckets.append(*row)
+        assert Segment.decode(buckets.to_bytes()) == rows
+
+    def test_regular_series_compress(self):
+        segment = Segment()
+        for i in range(256):
+            segment.append(1_714_550_400_000 + i * 10_000, round(30 + 5 * math.sin(i / 40)))
+        assert segment.nbytes < 256 * 2  # vs 16 bytes per (timestamp, double)
+
+
+class TestTimeSeriesStore:
+    """Downsampling, memory ceiling, persistence and retention"""
+
+    def test_tiers_aggregate_samples(self):
+        store = TimeSeriesStore(clock=clock_at(T0 + timedelta(hours=3)))
+        for i in range(3 * 360):  # every 10 s for three hours
+            store.append('cpu_usage', i % 6, T0 + timedelta(seconds=10 * i))
+        store.append('cpu_usage', 100, T0 + timedelta(seconds=5))  # late, its minute already closed
+
+        minutes = store.query('cpu_usage', T0, T0 + timedelta(minutes=2), tier='1m')
+        assert [p['count'] for p in minutes] == [7, 6, 6]
+        assert minutes[0]['max'] == 100 and minutes[1] == {**minutes[1], 'min': 0, 'max': 5, 'value': 2.5}
+        hours = store.query('cpu_usage', T0, tier='1h')
+        assert [p['count'] for p in hours] == [361, 360, 360]  # the last hour is still open
+        assert len(store.query('cpu_usage', T0 + timedelta(hours=2, minutes=59))) == 6  # raw by default
+        assert store.summary('cpu_usage', T0) == {'minimum': 0, 'maximum': 100,
+                                                  'average': (1080 * 2.5 + 100) / 1081, 'count': 1081}
+
+    def test_memory_is_bounded(self):
+        store = TimeSeriesStore(segment_points=16, memory_segments=2, max_series=2)
+        for i in range(10_000):
+            store.append('requests', i, T0 + timedelta(seconds=i))
+        metrics = store.get_metrics()
+        assert metrics['raw_points_in_memory'] <= 3 * 16 and metrics['samples'] == 10_000
+        assert store.append('b', 1) and not store.append('c', 1) and store.stats['dropped_series'] == 1
+
+    def test_segments_persist_and_expire_per_tier(self, pool):
+        store = TimeSeriesStore(pool, segment_points=32)
+        for i in range(200):
+            store.append('latency', i / 10, T0 + timedelta(minutes=i))
+        store.close()
+        with pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM metric_segments WHERE resolution = 0").fetchone()[0] == 7
+
+        reopened = TimeSeriesStore(pool, clock=clock_at(T0 + timedelta(hours=4)))
+        assert len(reopened.query('latency', T0)) == 200
+        assert [p['count'] for p in reopened.query('latency', T0, tier='1h')] == [60, 60, 60, 20]
+        assert reopened.purge(T0 + timedelta(days=8)) == 7 + 7  # raw and 1m segments only
+        assert [p['count'] for p in reopened.query('latency', T0, tier='1d')] == [200]
+        assert reopened.query('latency', T0, tier='raw') == [] and reopened.metrics() == ['latency']
+
+
+class TestIntegrations:
+    """The analytics manager and the system monitor record into the store"""
+
+    def teardown_method(self):
+        close_all_timeseries()
+
+    def test_legacy_metrics_rows_are_imported(self, tmp_path):
+        path = str(tmp_path / 'analytics.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE metrics (id INTEGER PRIMARY KEY AUTOINCREMENT, metric_name TEXT NOT NULL, "
+                     "metric_value REAL NOT NULL, timestamp DATETIME NOT NULL, category TEXT)")
+        now = datetime.now()
+        conn.executemany("INSERT INTO metrics (metric_name, metric_value, timestamp) VALUES ('cpu', ?, ?)",
+                         [(float(i), now - timedelta(minutes=10 - i)) for i in range(5)])
+        conn.execute("INSERT INTO metrics (metric_name, metric_value, timestamp, category) "
+                     "VALUES ('cpu', 70.0, ?, 'host')", (now - timedelta(minutes=3),))
+        conn.commit()
+        conn.close()
+
+        from database_manager import DatabaseManager
+        manager = DatabaseManager(path)
+        manager.store_metric('cpu', 9.0)
+        history = manager.get_metrics_history('cpu')
+        assert [p['value'] for p in history] == [0.0, 1.0, 2.0, 3.0, 4.0, 9.0]
+        assert isinstance(history[0]['timestamp'], str)
+        assert sum(p['count'] for p in manager.get_metrics_history('cpu', tier='1h')) == 6
+        manager.store_metric('cpu', 80.0, category='host')
+        assert [p['value'] for p in manager.get_metrics_history('cpu', category='host')] == [70.0, 80.0]
+        assert manager.get_metric_names() == ['cpu', 'host/cpu'] and manager.get_metric_names('host') == ['cpu']
+        with manager.pool.read() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 0
+        assert manager.cleanup_expired_data()['metric_segments_purged'] == 0
+
+    def test_system_monitor_history(self, tmp_path):
+        from monitoring import SystemMonitor
+
+        monitor = SystemMonitor()
+        for i in range(30):
+            monitor.record_api_request('/api/analyze', 0.1 * (i % 10), 200)
+        report = monitor.get_performance_report(hours_back=1)
+        stats = report['response_time_stats']
+        assert stats['total_requests'] == 30 and stats['maximum'] == pytest.approx(0.9)
+        assert stats['median'] == pytest.approx(0.45)
+        assert monitor.export_metrics(str(tmp_path / 'metrics.json'))
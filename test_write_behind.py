@@ -0,0 +1,148 @@
+"""
+Tests for the write-behind persistence queue
+"""
+
+import os
+import json
+import stat
+import threading
+import time
+
+import pytest
+
+from write_behind import WriteBehindQueue
+
+
+class _Sink:
+    """Bulk save stand-in that records every batch"""
+
+    def __init__(self, fail=False, delay=0.0):
+        self.batches = []
+        self.fail = fail
+        self.delay = delay
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, batch):
+        self.release.wait()
+        time.sleep(self.delay)
+        if self.fail:
+            return 0  # bulk APIs report a rolled-back batch this way
+        self.batches.append(list(batch))
+        return len(batch)
+
+    @property
+    def items(self):
+        return [item for batch in self.batches for item in batch]
+
+
+class TestWriteBehindQueue:
+    """Batching, backpressure, durability and shutdown"""
+
+    def test_coalesces_into_batches(self):
+        sink = _Sink()
+        queue = WriteBehindQueue(sink, batch_size=10, flush_interval=5.0).start()
+        for i in range(25):
+            queue.submit(i)
+        assert queue.flush(timeout=5)
+        queue.close()
+
+        assert sink.items == list(range(25))
+        assert [len(b) for b in sink.batches][:2] == [10, 10]
+        metrics = queue.get_metrics()
+        assert metrics['written'] == 25 and metrics['queue_depth'] == 0
+        assert metrics['flush_latency_ms']['avg'] >= 0
+
+    def test_time_trigger(self):
+        sink = _Sink()
+        queue = WriteBehindQueue(sink, batch_size=100, flush_interval=0.05).start()
+        queue.submit('a')
+        deadline = time.time() + 2
+        while not sink.items and time.time() < deadline:
+            time.sleep(0.01)
+        queue.close()
+        assert sink.items == ['a']
+
+    def test_sync_durability_waits_for_commit(self):
+        sink = _Sink()
+        queue = WriteBehindQueue(sink, batch_size=100, flush_interval=60).start()
+        assert queue.submit('durable', durability='sync', timeout=5) is True
+        assert sink.items == ['durable']
+        queue.close()
+
+    def test_sync_reports_failure(self):
+        queue = WriteBehindQueue(_Sink(fail=True), flush_interval=60).start()
+        assert queue.submit('lost', durability='sync', timeout=5) is False
+        assert queue.get_metrics()['failed'] == 1
+        queue.close()
+
+    def test_drop_oldest(self):
+        sink = _Sink()
+        queue = WriteBehindQueue(sink, max_size=3, overflow='drop_oldest')  # writer not started
+        for i in range(5):
+            assert queue.submit(i)
+        assert queue.get_metrics()['dropped'] == 2
+        queue.close()
+        assert sink.items == [2, 3, 4]
+
+    def test_block_times_out(self):
+        queue = WriteBehindQueue(_Sink(), max_size=1, overflow='block', block_timeout=0.05)
+        assert queue.submit(1) is True
+        assert queue.submit(2) is False
+        assert queue.get_metrics()['blocked'] == 1
+        queue.close()
+
+    def test_spill_to_disk_and_replay(self, tmp_path):
+        sink = _Sink()
+        spill_dir = tmp_path / 'spill'
+        queue = WriteBehindQueue(sink, max_size=2, overflow='spill', spill_dir=str(spill_dir))
+        for i in range(5):
+            assert queue.submit({'n': i})
+        assert queue.get_metrics()['spilled'] == 3
+        assert stat.S_IMODE(os.stat(spill_dir).st_mode) == 0o700
+        assert os.path.basename(queue.spill_path) == f"write-behind.{os.getpid()}.jsonl"
+        with open(queue.spill_path) as f:
+            assert [json.loads(line) for line in f] == [{'n': 2}, {'n': 3}, {'n': 4}]  # JSON lines, not pickle
+
+        queue.close()
+        assert sorted(item['n'] for item in sink.items) == [0, 1, 2, 3, 4]
+        assert os.listdir(spill_dir) == []
+
+    def test_failed_batches_spill_for_retry(self, tmp_path):
+        sink = _Sink(fail=True)
+        queue = WriteBehindQueue(sink, flush_interval=0.01, overflow='spill', spill_dir=str(tmp_path / 'spill'),
+                                 retry_interval=60).start()
+        queue.submit('x')
+        assert queue.flush(timeout=5)
+        assert os.path.exists(queue.spill_path)
+
+        sink.fail = False
+        queue._next_drain = 0.0
+        queue.close()
+        assert sink.items == ['x']
+
+    def test_spill_files_of_other_processes(self, tmp_path, monkeypatch):
+        spill_dir = tmp_path / 'spill'
+        spill_dir.mkdir(mode=0o777)
+        os.chmod(spill_dir, 0o777)
+        live, dead = 1001, 1002
+        (spill_dir / f"write-behind.{live}.jsonl").write_text('{"n": "live"}\n')
+        (spill_dir / f"write-behind.{dead}.jsonl").write_text('{"n": "dead"}\n{"n": "torn')
+        (spill_dir / f"write-behind.{dead}.3.draining").write_text('{"n": "half-drained"}\n')
+        monkeypatch.setattr('write_behind._process_alive', lambda pid: pid == live)
+
+        sink = _Sink()
+        queue = WriteBehindQueue(sink, overflow='spill', spill_dir=str(spill_dir),
+                                 encode=lambda item: {'n': item}, decode=lambda record: record['n'])
+        assert stat.S_IMODE(os.stat(spill_dir).st_mode) == 0o700  # tightened
+        queue.close()
+        assert sorted(sink.items) == ['dead', 'half-drained']  # the live worker's file and the torn line stay out
+        assert os.listdir(spill_dir) == [f"write-behind.{live}.jsonl"]
+
+    def test_rejects_unknown_modes(self):
+        with pytest.raises(ValueError):
+            WriteBehindQueue(_Sink(), overflow='explode')
+        with pytest.raises(ValueError):
+            WriteBehindQueue(_Sink(), overflow='spill')
+        with pytest.raises(ValueError):
+            WriteBehindQueue(_Sink()).submit(1, durability='eventually')
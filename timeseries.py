@@ -0,0 +1,678 @@
+"""
+Time-Series Store
+Per-metric columnar segments with Gorilla compression (delta-of-delta timestamps,
+XOR-encoded floats), downsampled as samples arrive into 1m/1h/1d min/max/avg/count
+tiers that each keep their own retention, with a fixed memory ceiling per series
+
+Usage:
+    python timeseries.py sentiment_analytics.db                              # series and storage size
+    python timeseries.py sentiment_analytics.db cpu_usage --tier 1h --hours 48
+"""
+
+import os
+import time
+import struct
+import atexit
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+Timestamp = Union[datetime, float, int, None]
+
+
+@dataclass(frozen=True)
+class Tier:
+    """One resolution of every series: raw samples (resolution 0) or fixed-width buckets"""
+    name: str
+    resolution: int  # seconds
+    retention: timedelta
+
+
+DEFAULT_TIERS = (
+    Tier('raw', 0, timedelta(days=1)),
+    Tier('1m', 60, timedelta(days=7)),
+    Tier('1h', 3600, timedelta(days=90)),
+    Tier('1d', 86400, timedelta(days=3 * 365)),
+)
+
+# A metric recorded with a category is stored as the series '<category>/<metric>'
+CATEGORY_SEPARATOR = '/'
+
+# Points per segment before it is sealed (Gorilla's blocks hold about two hours)
+SEGMENT_POINTS = 256
+# Sealed segments kept per series and tier when there is no database to spill to
+MEMORY_SEGMENTS = 32
+
+TIMESERIES_SQL = [
+    """CREATE TABLE IF NOT EXISTS metric_segments (
+        metric TEXT NOT NULL,
+        resolution INTEGER NOT NULL,
+        start_ms INTEGER NOT NULL,
+        end_ms INTEGER NOT NULL,
+        points INTEGER NOT NULL,
+        data BLOB NOT NULL,
+        PRIMARY KEY (metric, resolution, start_ms)
+    ) WITHOUT ROWID""",
+    # per-tier retention purge
+    "CREATE INDEX IF NOT EXISTS idx_metric_segments_expiry ON metric_segments(resolution, end_ms)",
+]
+
+
+def install_timeseries(conn):
+    for statement in TIMESERIES_SQL:
+        conn.execute(statement)
+
+
+def to_ms(moment: Timestamp) -> int:
+    """Epoch milliseconds for a datetime (naive = local time), epoch seconds or now"""
+    if moment is None:
+        return int(time.time() * 1000)
+    if isinstance(moment, datetime):
+        return int(moment.timestamp() * 1000)
+    return int(moment * 1000)
+
+
+# ---------------------------------------------------------------------------
+# Gorilla codec
+# ---------------------------------------------------------------------------
+
+class BitWriter:
+    __slots__ = ('data', '_acc', '_bits')
+
+    def __init__(self):
+        self.data = bytearray()
+        self._acc = 0
+        self._bits = 0
+
+    def write(self, value: int, bits: int):
+        self._acc = (self._acc << bits) | value
+        self._bits += bits
+        while self._bits >= 8:
+            self._bits -= 8
+            self.data.append((self._acc >> self._bits) & 0xFF)
+        self._acc &= (1 << self._bits) - 1
+
+    def getvalue(self) -> bytes:
+        if self._bits:
+            return bytes(self.data) + bytes([(self._acc << (8 - self._bits)) & 0xFF])
+        return bytes(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data) + (1 if self._bits else 0)
+
+
+class BitReader:
+    __slots__ = ('data', 'pos')
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, bits: int) -> int:
+        end = self.pos + bits
+        first, last = self.pos >> 3, (end + 7) >> 3
+        chunk = int.from_bytes(self.data[first:last], 'big')
+        self.pos = end
+        return (chunk >> ((last << 3) - end)) & ((1 << bits) - 1)
+
+    def bit(self) -> int:
+        byte = self.data[self.pos >> 3]
+        value = (byte >> (7 - (self.pos & 7))) & 1
+        self.pos += 1
+        return value
+
+
+# Delta-of-delta buckets: (control bits, control width, value width)
+_DOD_BUCKETS = ((0b10, 2, 7), (0b110, 3, 9), (0b1110, 4, 12))
+_pack_double = struct.Struct('>d').pack
+_unpack_bits = struct.Struct('>Q').unpack
+_pack_bits = struct.Struct('>Q').pack
+_unpack_double = struct.Struct('>d').unpack
+
+
+def _float_bits(value: float) -> int:
+    return _unpack_bits(_pack_double(value))[0]
+
+
+class _XorColumn:
+    """One float column: the first value verbatim, then XORs with the previous value"""
+    __slots__ = ('out', 'prev', 'leading', 'trailing')
+
+    def __init__(self):
+        self.out = BitWriter()
+        self.prev = None
+        self.leading = self.trailing = -1
+
+    def append(self, value: float):
+        bits = _float_bits(value)
+        if self.prev is None:
+            self.out.write(bits, 64)
+        else:
+            xor = bits ^ self.prev
+            if xor == 0:
+                self.out.write(0, 1)
+            else:
+                leading = min(64 - xor.bit_length(), 31)
+                trailing = (xor & -xor).bit_length() - 1
+                if self.leading >= 0 and leading >= self.leading and trailing >= self.trailing:
+                    # fits the previous meaningful window: '10' + the window
+                    self.out.write(0b10, 2)
+                    self.out.write(xor >> self.trailing, 64 - self.leading - self.trailing)
+                else:
+                    meaningful = 64 - leading - trailing
+                    self.out.write(0b11, 2)
+                    self.out.write(leading, 5)
+                    self.out.write(meaningful - 1, 6)
+                    self.out.write(xor >> trailing, meaningful)
+                    self.leading, self.trailing = leading, trailing
+        self.prev = bits
+
+
+def _read_xor_column(data: bytes, count: int) -> List[float]:
+    reader = BitReader(data)
+    values = []
+    prev = leading = trailing = 0
+    for i in range(count):
+        if i == 0:
+            prev = reader.read(64)
+        elif reader.bit():
+            if reader.bit():
+                leading = reader.read(5)
+                meaningful = reader.read(6) + 1
+                trailing = 64 - leading - meaningful
+            prev ^= reader.read(64 - leading - trailing) << trailing
+        values.append(_unpack_double(_pack_bits(prev))[0])
+    return values
+
+
+class Segment:
+    """
+    Gorilla-compressed points (timestamp ms, value, ...) of one series and tier
+
+    Timestamps and each value column are separate bit streams (columnar): regular
+    sampling makes most delta-of-deltas a single 0 bit and slowly changing values
+    XOR to a handful of meaningful bits.
+    """
+    __slots__ = ('columns', 'count', 'start', 'end', '_times', '_prev_ts', '_prev_delta', '_values')
+
+    _HEADER = struct.Struct('>BI')
+
+    def __init__(self, columns: int = 1):
+        self.columns = columns
+        self.count = 0
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._times = BitWriter()
+        self._prev_ts = self._prev_delta = 0
+        self._values = [_XorColumn() for _ in range(columns)]
+
+    def append(self, ts: int, *values: float):
+        out = self._times
+        if self.count == 0:
+            out.write(ts, 64)
+            self.start = ts
+        else:
+            delta = ts - self._prev_ts
+            dod = delta - self._prev_delta
+            if dod == 0:
+                out.write(0, 1)
+            else:
+                for control, width, bits in _DOD_BUCKETS:
+                    low = -(1 << (bits - 1)) + 1
+                    if low <= dod <= 1 << (bits - 1):
+                        out.write(control, width)
+                        out.write(dod - low, bits)
+                        break
+                else:
+                    out.write(0b1111, 4)
+                    out.write(dod + (1 << 63), 64)
+            self._prev_delta = delta
+        self._prev_ts = ts
+        self.start = min(self.start, ts)
+        self.end = ts if self.end is None else max(self.end, ts)
+        for column, value in zip(self._values, values):
+            column.append(float(value))
+        self.count += 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._times) + sum(len(column.out) for column in self._values)
+
+    def to_bytes(self) -> bytes:
+        streams = [self._times.getvalue()] + [column.out.getvalue() for column in self._values]
+        return (self._HEADER.pack(self.columns, self.count)
+                + b''.join(struct.pack('>I', len(stream)) for stream in streams) + b''.join(streams))
+
+    @classmethod
+    def decode(cls, data: bytes) -> List[tuple]:
+        """(timestamp ms, value, ...) tuples of an encoded segment"""
+        columns, count = cls._HEADER.unpack_from(data)
+        offset = cls._HEADER.size
+        lengths = struct.unpack_from(f">{columns + 1}I", data, offset)
+        offset += 4 * (columns + 1)
+        streams = []
+        for length in lengths:
+            streams.append(bytes(data[offset:offset + length]))
+            offset += length
+
+        reader = BitReader(streams[0])
+        times = []
+        ts = delta = 0
+        for i in range(count):
+            if i == 0:
+                ts = reader.read(64)
+            else:
+                if reader.bit():
+                    for control_bits in range(1, 4):
+                        if not reader.bit():
+                            bits = _DOD_BUCKETS[control_bits - 1][2]
+                            dod = reader.read(bits) - (1 << (bits - 1)) + 1
+                            break
+                    else:
+                        dod = reader.read(64) - (1 << 63)
+                    delta += dod
+                ts += delta
+            times.append(ts)
+        return list(zip(times, *(_read_xor_column(stream, count) for stream in streams[1:])))
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def series_key(metric: str, category: Optional[str] = None) -> str:
+    """Series name of a metric, prefixed with its category when it has one"""
+    return f"{category}{CATEGORY_SEPARATOR}{metric}" if category else metric
+
+
+class _Series:
+    __slots__ = ('name', 'open', 'buckets', 'sealed', 'dirty')
+
+    def __init__(self, name: str, tiers: Sequence[Tier], memory_segments: int):
+        self.name = name
+        # raw segments hold (value,), bucket tiers (min, max, sum, count)
+        self.open = {tier.name: Segment(1 if tier.resolution == 0 else 4) for tier in tiers}
+        self.buckets: Dict[str, list] = {}  # tier -> [bucket start ms, min, max, sum, count]
+        self.sealed: Dict[str, Deque[Segment]] = {tier.name: deque(maxlen=memory_segments) for tier in tiers}
+        self.dirty = False
+
+
+class TimeSeriesStore:
+    """
+    Compressed metric history with automatic downsampling
+
+    Each sample goes into the series' open raw segment and into the open bucket
+    of every downsampled tier; a closed bucket becomes one (min, max, sum, count)
+    point of that tier's open segment. Full segments are sealed and, with a pool,
+    written to metric_segments (flush() also saves the open ones), so memory per
+    series stays at one open segment and bucket per tier. Without a pool the last
+    memory_segments sealed segments per tier are kept instead. Samples that arrive
+    after their bucket closed are stored as an extra point for that bucket;
+    queries merge points of the same bucket.
+    """
+
+    def __init__(self, pool=None, tiers: Sequence[Tier] = DEFAULT_TIERS, segment_points: int = SEGMENT_POINTS,
+                 memory_segments: int = MEMORY_SEGMENTS, max_series: int = 1000, flush_interval: float = 60.0,
+                 name: str = 'timeseries', clock: Callable[[], float] = time.time):
+        if not tiers or tiers[0].resolution != 0:
+            raise ValueError("the first tier must hold raw samples (resolution 0)")
+        self.pool = pool
+        self.tiers = list(tiers)
+        self.segment_points = segment_points
+        self.memory_segments = memory_segments
+        self.max_series = max_series
+        self.flush_interval = flush_interval
+        self.name = name
+        self.clock = clock
+
+        self._series: Dict[str, _Series] = {}
+        self._pending: List[Tuple[str, Tier, Segment]] = []  # sealed, not yet written
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {'samples': 0, 'late_samples': 0, 'dropped_series': 0, 'sealed': 0,
+                      'segments_written': 0, 'segments_purged': 0, 'flushes': 0}
+
+    # -- writing --------------------------------------------------------------
+
+    def append(self, metric: str, value: float, timestamp: Timestamp = None) -> bool:
+        """Record one sample; False when the series limit is reached"""
+        ts = to_ms(timestamp)
+        value = float(value)
+        with self._lock:
+            series = self._series.get(metric)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    self.stats['dropped_series'] += 1
+                    return False
+                series = self._series[metric] = _Series(metric, self.tiers, self.memory_segments)
+            self._add(series, self.tiers[0], ts, value)
+            for tier in self.tiers[1:]:
+                self._bucket(series, tier, ts, value)
+            series.dirty = True
+            self.stats['samples'] += 1
+        return True
+
+    def append_many(self, samples: Iterable[Tuple[str, float, Timestamp]]) -> int:
+        return sum(self.append(metric, value, timestamp) for metric, value, timestamp in samples)
+
+    def _add(self, series: _Series, tier: Tier, ts: int, *values: float):
+        segment = series.open[tier.name]
+        segment.append(ts, *values)
+        if segment.count >= self.segment_points:
+            self._seal(series, tier)
+
+    def _seal(self, series: _Series, tier: Tier):
+        segment = series.open[tier.name]
+        if not segment.count:
+            return
+        series.open[tier.name] = Segment(segment.columns)
+        if self.pool is not None:
+            self._pending.append((series.name, tier, segment))
+        else:
+            series.sealed[tier.name].append(segment)
+        self.stats['sealed'] += 1
+
+    def _bucket(self, series: _Series, tier: Tier, ts: int, value: float):
+        width = tier.resolution * 1000
+        start = ts - ts % width
+        bucket = series.buckets.get(tier.name)
+        if bucket is None or start > bucket[0]:
+            if bucket is not None:
+                self._add(series, tier, *bucket)
+            series.buckets[tier.name] = [start, value, value, value, 1]
+        elif start == bucket[0]:
+            bucket[1] = min(bucket[1], value)
+            bucket[2] = max(bucket[2], value)
+            bucket[3] += value
+            bucket[4] += 1
+        else:
+            self.stats['late_samples'] += 1
+            self._add(series, tier, start, value, value, value, 1)
+
+    # -- persistence ----------------------------------------------------------
+
+    def segment_rows(self, final: bool = False) -> List[tuple]:
+        """
+        metric_segments rows for sealed segments not yet written and dirty open ones
+
+        final=True first closes every open bucket (used on shutdown), so nothing
+        recorded is left only in memory.
+        """
+        with self._lock:
+            if final:
+                for series in self._series.values():
+                    for tier in self.tiers[1:]:
+                        bucket = series.buckets.pop(tier.name, None)
+                        if bucket is not None:
+                            series.open[tier.name].append(*bucket)
+                            series.dirty = True
+            segments = self._pending
+            self._pending = []
+            for series in self._series.values():
+                if series.dirty:
+                    segments += [(series.name, tier, series.open[tier.name]) for tier in self.tiers
+                                 if series.open[tier.name].count]
+                    series.dirty = False
+            return [(metric, tier.resolution, segment.start, segment.end, segment.count, segment.to_bytes())
+                    for metric, tier, segment in segments]
+
+    def flush(self, final: bool = False) -> int:
+        """Write sealed and open segments to metric_segments; returns how many"""
+        if self.pool is None:
+            return 0
+        rows = self.segment_rows(final)
+        if rows:
+            with self.pool.write() as conn:
+                write_segments(conn, rows)
+            self.stats['segments_written'] += len(rows)
+        self.stats['flushes'] += 1
+        return len(rows)
+
+    def purge(self, now: Timestamp = None) -> int:
+        """Drop segments that ended before their tier's retention; returns how many"""
+        now_ms = to_ms(now if now is not None else self.clock())
+        purged = 0
+        with self._lock:
+            for tier in self.tiers:
+                cutoff = now_ms - int(tier.retention.total_seconds() * 1000)
+                for series in self._series.values():
+                    sealed = series.sealed[tier.name]
+                    while sealed and sealed[0].end < cutoff:
+                        sealed.popleft()
+                        purged += 1
+        if self.pool is not None:
+            with self.pool.write() as conn:
+                for tier in self.tiers:
+                    cutoff = now_ms - int(tier.retention.total_seconds() * 1000)
+                    purged += conn.execute("DELETE FROM metric_segments WHERE resolution = ? AND end_ms < ?",
+                                           (tier.resolution, cutoff)).rowcount
+        self.stats['segments_purged'] += purged
+        return purged
+
+    # -- reading --------------------------------------------------------------
+
+    def tier(self, name: str) -> Tier:
+        for tier in self.tiers:
+            if tier.name == name:
+                return tier
+        raise ValueError(f"unknown tier {name!r} (have {[t.name for t in self.tiers]})")
+
+    def pick_tier(self, start: Timestamp, buckets: bool = False) -> Tier:
+        """Finest tier (only downsampled ones if buckets) whose retention still covers start"""
+        age = to_ms(self.clock()) - to_ms(start)
+        candidates = self.tiers[1:] if buckets else self.tiers
+        for tier in candidates:
+            if age <= tier.retention.total_seconds() * 1000:
+                return tier
+        return self.tiers[-1]
+
+    def _points(self, metric: str, tier: Tier, start: int, end: int) -> List[tuple]:
+        start -= max(tier.resolution * 1000 - 1, 0)  # buckets that began before start still overlap it
+        segments: Dict[int, Any] = {}
+        if self.pool is not None:
+            with self.pool.read() as conn:
+                for seg_start, data in conn.execute(
+                        "SELECT start_ms, data FROM metric_segments WHERE metric = ? AND resolution = ? "
+                        "AND start_ms <= ? AND end_ms >= ?", (metric, tier.resolution, end, start)):
+                    segments[seg_start] = data
+        provisional = None
+        with self._lock:
+            series = self._series.get(metric)
+            if series is not None:
+                in_memory = list(series.sealed[tier.name]) + [s for m, t, s in self._pending
+                                                              if m == metric and t is tier]
+                in_memory.append(series.open[tier.name])
+                for segment in in_memory:
+                    if segment.count and segment.start <= end and segment.end >= start:
+                        segments[segment.start] = segment.to_bytes()  # newer than a saved copy
+                provisional = series.buckets.get(tier.name)
+                provisional = tuple(provisional) if provisional else None
+        points = [point for data in segments.values() for point in Segment.decode(data)
+                  if start <= point[0] <= end]
+        if provisional is not None and start <= provisional[0] <= end:
+            points.append(provisional)
+        return sorted(points)
+
+    def query(self, metric: str, start: Timestamp, end: Timestamp = None,
+              tier: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Points of one series in [start, end], oldest first
+
+        Raw points are {'timestamp', 'value'}; bucket points (every bucket that
+        overlaps the range, timestamped with its start) add 'min', 'max' and 'count'
+        with 'value' the bucket average. tier defaults to the finest one that still
+        covers start.
+        """
+        chosen = self.tier(tier) if tier else self.pick_tier(start)
+        points = self._points(metric, chosen, to_ms(start), to_ms(end))
+        if chosen.resolution == 0:
+            return [{'timestamp': datetime.fromtimestamp(ts / 1000), 'value': value} for ts, value in points]
+        merged: Dict[int, list] = {}
+        for ts, low, high, total, count in points:
+            bucket = merged.get(ts)
+            if bucket is None:
+                merged[ts] = [low, high, total, count]
+            else:
+                bucket[0], bucket[1] = min(bucket[0], low), max(bucket[1], high)
+                bucket[2] += total
+                bucket[3] += count
+        return [{'timestamp': datetime.fromtimestamp(ts / 1000), 'value': total / count, 'min': low,
+                 'max': high, 'count': int(count)} for ts, (low, high, total, count) in sorted(merged.items())]
+
+    def summary(self, metric: str, start: Timestamp, end: Timestamp = None,
+                tier: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """
+        min / max / average / count of a series over [start, end] (None without data)
+
+        Computed from bucket tiers by default, which are exact for whole buckets
+        and need far fewer points than the raw samples.
+        """
+        points = self.query(metric, start, end, tier or self.pick_tier(start, buckets=True).name)
+        if not points:
+            return None
+        if 'count' not in points[0]:
+            values = [point['value'] for point in points]
+            return {'minimum': min(values), 'maximum': max(values), 'average': sum(values) / len(values),
+                    'count': len(values)}
+        count = sum(point['count'] for point in points)
+        return {'minimum': min(point['min'] for point in points), 'maximum': max(point['max'] for point in points),
+                'average': sum(point['value'] * point['count'] for point in points) / count, 'count': count}
+
+    def metrics(self, category: Optional[str] = None) -> List[str]:
+        """
+        Names of the series recorded by this process and, with a pool, stored ones;
+        with a category, the metric names recorded under it (without the prefix)
+        """
+        names = set(self._series)
+        if self.pool is not None:
+            with self.pool.read() as conn:
+                names.update(row[0] for row in conn.execute("SELECT DISTINCT metric FROM metric_segments"))
+        if category is not None:
+            prefix = series_key('', category)
+            names = {name[len(prefix):] for name in names if name.startswith(prefix)}
+        return sorted(names)
+
+    # -- background flushing --------------------------------------------------
+
+    def start(self) -> 'TimeSeriesStore':
+        """Flush and purge every flush_interval in a background thread, and flush on exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def _run(self):
+        next_purge = 0.0
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() >= next_purge:
+                    next_purge = time.monotonic() + 3600
+                    self.purge()
+            except Exception as e:
+                logger.error(f"❌ {self.name} flush failed: {e}")
+
+    def close(self):
+        """Stop the flusher and write everything recorded, open buckets included"""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.flush(final=True)
+        except Exception as e:
+            logger.error(f"❌ {self.name} final flush failed: {e}")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            memory = sum(segment.nbytes for series in self._series.values()
+                         for segments in (series.open.values(), *series.sealed.values()) for segment in segments)
+            memory += sum(segment.nbytes for _, _, segment in self._pending)
+            raw = self.tiers[0].name
+            raw_points = sum(series.open[raw].count + sum(s.count for s in series.sealed[raw])
+                             for series in self._series.values())
+        return {**self.stats, 'series': len(self._series), 'pending_segments': len(self._pending),
+                'memory_bytes': memory, 'raw_points_in_memory': raw_points,
+                'tiers': {tier.name: tier.retention.total_seconds() for tier in self.tiers}}
+
+
+def write_segments(conn, rows: Sequence[tuple]):
+    """Upsert (metric, resolution, start_ms, end_ms, points, data) rows"""
+    conn.executemany("INSERT OR REPLACE INTO metric_segments (metric, resolution, start_ms, end_ms, points, data) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+
+def import_metrics_table(conn, table: str = 'metrics'):
+    """Migration step: encode the one-row-per-sample metrics table into metric_segments"""
+    store = TimeSeriesStore(memory_segments=1 << 30, max_series=1 << 30)
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    category = 'category' if 'category' in columns else 'NULL'
+    for name, value, moment, tag in conn.execute(
+            f"SELECT metric_name, metric_value, timestamp, {category} FROM {table} "
+            f"ORDER BY metric_name, timestamp"):
+        store.append(series_key(name, tag), value, datetime.fromisoformat(moment) if isinstance(moment, str) else moment)
+    rows = []
+    for series in store._series.values():
+        for tier in store.tiers:
+            series.sealed[tier.name].append(series.open[tier.name])
+            bucket = series.buckets.get(tier.name)
+            if bucket is not None:
+                series.sealed[tier.name][-1].append(*bucket)
+            rows += [(series.name, tier.resolution, s.start, s.end, s.count, s.to_bytes())
+                     for s in series.sealed[tier.name] if s.count]
+    write_segments(conn, rows)
+
+
+_stores: Dict[str, TimeSeriesStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_timeseries(pool, **options) -> TimeSeriesStore:
+    """Return the shared (started) store for a pool's database, creating it on first use"""
+    if pool.in_memory:
+        return TimeSeriesStore(pool, **options).start()
+    key = os.path.abspath(pool.db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = TimeSeriesStore(pool, name=f"timeseries:{os.path.basename(key)}", **options).start()
+            _stores[key] = store
+        return store
+
+
+def close_all_timeseries():
+    """Flush and stop every shared store (used on shutdown and in tests)"""
+    with _stores_lock:
+        for store in _stores.values():
+            store.close()
+        _stores.clear()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from sqlite_pool import SQLiteConnectionPool
+
+    parser = argparse.ArgumentParser(description='Inspect the metric time-series store')
+    parser.add_argument('db_path', help='SQLite database file')
+    parser.add_argument('metric', nargs='?', help='Series to print')
+    parser.add_argument('--tier', help='Tier to read (default: finest covering the range)')
+    parser.add_argument('--hours', type=float, default=24)
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(SQLiteConnectionPool(args.db_path))
+    if args.metric:
+        for point in store.query(args.metric, datetime.now() - timedelta(hours=args.hours), tier=args.tier):
+            print({**point, 'timestamp': point['timestamp'].isoformat()})
+    else:
+        with store.pool.read() as connection:
+            for row in connection.execute("SELECT metric, resolution, COUNT(*), SUM(points), SUM(LENGTH(data)) "
+                                          "FROM metric_segments GROUP BY metric, resolution"):
+                print(dict(zip(('metric', 'resolution', 'segments', 'points', 'bytes'), row)))
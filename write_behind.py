@@ -0,0 +1,355 @@
+"""
+Write-Behind Persistence Queue
+Bounded in-memory queue drained by a background writer that coalesces request-path
+inserts into batched transactions
+"""
+
+import os
+import json
+import stat
+import time
+import atexit
+import logging
+import itertools
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# What submit() does when the queue is full
+OVERFLOW_POLICIES = ('block', 'drop_oldest', 'spill')
+
+# Per-call durability: 'async' returns as soon as the item is queued,
+# 'sync' waits until the batch containing it has been committed
+DURABILITY_MODES = ('async', 'sync')
+
+
+def _record(item: Any) -> Any:
+    """Default spill encoding: result objects by their to_dict(), anything else as is"""
+    return item.to_dict() if hasattr(item, 'to_dict') else item
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _private_directory(path: str) -> str:
+    """Create path as a 0700 directory, refusing one another user owns or can write to"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, 'getuid') and info.st_uid != os.getuid():
+        raise PermissionError(f"spill directory {path} is owned by another user")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+class _Pending:
+    """Completion handle for a 'sync' submission"""
+
+    __slots__ = ('event', 'ok')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.ok = False
+
+
+class WriteBehindQueue:
+    """
+    Background batch writer for a bulk save function
+
+    Items are appended to a bounded deque and written by one daemon thread through
+    flush_func(batch), which must persist the batch in a single transaction (e.g.
+    EnhancedDatabaseManager.save_sentiment_analyses) and either raise or return a
+    short row count on failure. A batch is written as soon as batch_size items are
+    waiting, a 'sync' caller is waiting, or flush_interval seconds have passed.
+
+    Overflow and failed batches spill to spill_dir (created 0700) as JSON lines,
+    one file per process, through encode(item) and back through decode(record).
+    A drain claims its own file, and those of processes that have exited, by
+    renaming them first, so workers sharing the directory never replay or
+    delete each other's records.
+    """
+
+    def __init__(self, flush_func: Callable[[List[Any]], Any], max_size: int = 10_000,
+                 batch_size: int = 500, flush_interval: float = 0.5, overflow: str = 'block',
+                 spill_dir: Optional[str] = None, block_timeout: Optional[float] = 5.0,
+                 retry_interval: float = 30.0, name: str = 'write-behind',
+                 encode: Callable[[Any], Any] = _record, decode: Callable[[Any], Any] = lambda record: record):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        if overflow == 'spill' and not spill_dir:
+            raise ValueError("overflow='spill' requires a spill_dir")
+
+        self.flush_func = flush_func
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.spill_dir = _private_directory(spill_dir) if spill_dir else None
+        self.encode = encode
+        self.decode = decode
+        self.block_timeout = block_timeout
+        self.retry_interval = retry_interval
+        self.name = name
+
+        self._queue: Deque[tuple] = deque()
+        self._cond = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._claims = itertools.count()
+        self._in_flight = 0
+        self._sync_waiting = 0
+        self._flush_requested = False
+        self._closed = False
+        self._next_drain = 0.0
+        self._thread: Optional[threading.Thread] = None
+        self._latencies: Deque[float] = deque(maxlen=1000)
+
+        self.stats = {
+            'enqueued': 0, 'written': 0, 'dropped': 0, 'spilled': 0, 'failed': 0,
+            'flushes': 0, 'max_depth': 0, 'blocked': 0,
+        }
+
+    # Producer side
+
+    def start(self) -> 'WriteBehindQueue':
+        """Start the writer thread and register a flush on interpreter exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def submit(self, item: Any, durability: str = 'async', timeout: Optional[float] = None) -> bool:
+        """
+        Queue an item for the next batch
+
+        Returns False if the item was dropped, or with durability='sync' if it was
+        not committed within the timeout.
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"durability must be one of {DURABILITY_MODES}")
+        if self._closed:
+            logger.warning(f"⚠️  {self.name} is closed; writing item directly")
+            return self._write([item])
+
+        pending = _Pending() if durability == 'sync' else None
+
+        with self._cond:
+            if len(self._queue) >= self.max_size and not self._make_room():
+                if self.overflow == 'spill':
+                    self._spill([item])
+                    return durability == 'async'
+                self.stats['dropped'] += 1
+                return False
+
+            self._queue.append((item, pending))
+            self.stats['enqueued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], len(self._queue))
+            if pending is not None:
+                # A caller is waiting, so don't hold the item until the timer fires
+                self._sync_waiting += 1
+                self._cond.notify_all()
+            elif len(self._queue) >= self.batch_size:
+                self._cond.notify_all()
+
+        if pending is None:
+            return True
+        return pending.event.wait(timeout) and pending.ok
+
+    def submit_many(self, items: Iterable[Any], durability: str = 'async') -> int:
+        """Queue several items; returns how many were accepted"""
+        return sum(1 for item in items if self.submit(item, durability))
+
+    def _make_room(self) -> bool:
+        """Apply the overflow policy while holding the lock; True if there is now space"""
+        if self.overflow == 'drop_oldest':
+            _, pending = self._queue.popleft()
+            if pending is not None:
+                self._sync_waiting -= 1
+                pending.event.set()
+            self.stats['dropped'] += 1
+            return True
+        if self.overflow == 'block':
+            self.stats['blocked'] += 1
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: len(self._queue) < self.max_size or self._closed,
+                                       timeout=self.block_timeout) and not self._closed
+        return False
+
+    # Writer side
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: (self._closed or self._sync_waiting or self._flush_requested
+                             or len(self._queue) >= self.batch_size),
+                    timeout=self.flush_interval
+                )
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._sync_waiting -= sum(1 for _, pending in batch if pending is not None)
+                self._in_flight = len(batch)
+                closing = self._closed and not self._queue
+                self._cond.notify_all()
+
+            if batch:
+                items = [item for item, _ in batch]
+                ok = self._write(items)
+                if not ok and self.spill_dir:
+                    # Keep failed batches on disk and retry them once the queue is idle
+                    self._spill(items)
+                    self._next_drain = time.monotonic() + self.retry_interval
+                for _, pending in batch:
+                    if pending is not None:
+                        pending.ok = ok
+                        pending.event.set()
+            elif self.spill_dir and time.monotonic() >= self._next_drain:
+                self._drain_spill()
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+            if closing and not batch:
+                return
+
+    def _write(self, items: List[Any]) -> bool:
+        """Hand one batch to the bulk save function and record its latency"""
+        start = time.perf_counter()
+        try:
+            written = self.flush_func(items)
+            # The bulk save APIs report a rolled-back batch by returning 0 rows
+            if isinstance(written, int) and not isinstance(written, bool) and written < len(items):
+                raise RuntimeError(f"only {written} of {len(items)} rows written")
+            ok = True
+            self.stats['written'] += len(items)
+        except Exception as e:
+            logger.error(f"❌ {self.name} flush of {len(items)} items failed: {e}")
+            ok = False
+            self.stats['failed'] += len(items)
+        self._latencies.append(time.perf_counter() - start)
+        self.stats['flushes'] += 1
+        return ok
+
+    # Disk spill
+
+    @property
+    def spill_path(self) -> Optional[str]:
+        """This process's spill file (JSON lines)"""
+        if not self.spill_dir:
+            return None
+        return os.path.join(self.spill_dir, f"{self.name}.{os.getpid()}.jsonl")
+
+    def _spill(self, items: List[Any]):
+        lines = ''.join(json.dumps(self.encode(item), default=str, separators=(',', ':')) + '\n'
+                        for item in items)
+        with self._spill_lock:
+            fd = os.open(self.spill_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            with os.fdopen(fd, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        self.stats['spilled'] += len(items)
+
+    def _claim_spill(self) -> List[str]:
+        """Rename this process's spill file, and any left by exited processes, out of the writers' way"""
+        pid = os.getpid()
+        claimed = []
+        with self._spill_lock:
+            for entry in sorted(os.listdir(self.spill_dir)):
+                owner = entry[len(self.name) + 1:].split('.', 1)[0]
+                if not entry.startswith(f"{self.name}.") or not owner.isdigit():
+                    continue
+                own_file = int(owner) == pid and entry.endswith('.jsonl')
+                if not own_file and (int(owner) == pid or _process_alive(int(owner))):
+                    continue
+                target = os.path.join(self.spill_dir, f"{self.name}.{pid}.{next(self._claims)}.draining")
+                try:
+                    os.rename(os.path.join(self.spill_dir, entry), target)  # atomic: one claimant wins
+                except FileNotFoundError:
+                    continue
+                claimed.append(target)
+        return claimed
+
+    def _read_spill(self, path: str) -> List[Any]:
+        items = []
+        with open(path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    items.append(self.decode(json.loads(line)))
+                except (ValueError, TypeError, KeyError) as e:
+                    logger.warning(f"⚠️  {self.name} skipped unreadable spill record {path}:{number}: {e}")
+        return items
+
+    def _drain_spill(self):
+        """Replay spilled items once the in-memory queue has emptied"""
+        claimed = self._claim_spill()
+        if not claimed:
+            return
+        items = [item for path in claimed for item in self._read_spill(path)]
+
+        for start in range(0, len(items), self.batch_size):
+            if not self._write(items[start:start + self.batch_size]):
+                self._spill(items[start:])
+                self._next_drain = time.monotonic() + self.retry_interval
+                break
+        else:
+            logger.info(f"💾 {self.name} replayed {len(items)} spilled items")
+        for path in claimed:
+            os.remove(path)
+
+    # Lifecycle
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued item has been handed to the writer and written"""
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self._queue and not self._in_flight, timeout=timeout)
+            finally:
+                self._flush_requested = False
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Flush outstanding items and stop the writer thread"""
+        if self._closed:
+            return
+        if self._thread is not None:
+            self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._queue:
+            items = [item for item, _ in self._queue]
+            self._queue.clear()
+            if not self._write(items) and self.spill_dir:
+                self._spill(items)
+        if self.spill_dir:
+            self._drain_spill()
+        logger.info(f"✅ {self.name} closed ({self.stats['written']} items written)")
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth, throughput counters and flush latency"""
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        return {
+            'queue_depth': len(self._queue),
+            'max_size': self.max_size,
+            'overflow': self.overflow,
+            'running': self._thread is not None and self._thread.is_alive(),
+            **self.stats,
+            'flush_latency_ms': {
+                'last': round(self._latencies[-1] * 1000, 3) if count else 0.0,
+                'avg': round(sum(latencies) / count * 1000, 3) if count else 0.0,
+                'p95': round(latencies[min(count - 1, int(count * 0.95))] * 1000, 3) if count else 0.0,
+            },
+        }